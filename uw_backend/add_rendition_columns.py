@@ -0,0 +1,35 @@
+"""
+One-time migration: Add image rendition columns to model_pictures and company_info.
+Run with: python add_rendition_columns.py
+"""
+from sqlalchemy import create_engine, text
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+engine = create_engine(DATABASE_URL)
+
+COLUMNS = [
+    ('model_pictures', 'width', 'INTEGER'),
+    ('model_pictures', 'height', 'INTEGER'),
+    ('model_pictures', 'renditions', 'JSONB'),
+    ('model_pictures', 'rendition_status', 'VARCHAR'),
+    ('company_info', 'company_logo_renditions', 'JSONB'),
+    ('company_info', 'company_logo_rendition_status', 'VARCHAR'),
+]
+
+with engine.connect() as conn:
+    for table, column, column_type in COLUMNS:
+        # Check if column already exists
+        result = conn.execute(text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = :table AND column_name = :column"
+        ), {"table": table, "column": column})
+        if result.fetchone():
+            print(f"Column '{column}' already exists on {table}. No changes needed.")
+        else:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+            conn.commit()
+            print(f"Successfully added '{column}' column to {table} table.")
@@ -0,0 +1,25 @@
+"""
+One-time migration: Add schema_version column to model_types table.
+Run with: python add_schema_version_column.py
+"""
+from sqlalchemy import create_engine, text
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+engine = create_engine(DATABASE_URL)
+
+with engine.connect() as conn:
+    # Check if column already exists
+    result = conn.execute(text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_name = 'model_types' AND column_name = 'schema_version'"
+    ))
+    if result.fetchone():
+        print("Column 'schema_version' already exists on model_types. No changes needed.")
+    else:
+        conn.execute(text("ALTER TABLE model_types ADD COLUMN schema_version INTEGER NOT NULL DEFAULT 0"))
+        conn.commit()
+        print("Successfully added 'schema_version' column to model_types table.")
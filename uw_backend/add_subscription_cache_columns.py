@@ -0,0 +1,31 @@
+"""
+One-time migration: Add subscription_synced_at and stripe_customer_fingerprint columns to users.
+Run with: python add_subscription_cache_columns.py
+"""
+from sqlalchemy import create_engine, text
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+engine = create_engine(DATABASE_URL)
+
+COLUMNS = {
+    'subscription_synced_at': 'TIMESTAMP',
+    'stripe_customer_fingerprint': 'VARCHAR',
+}
+
+with engine.connect() as conn:
+    for column, column_type in COLUMNS.items():
+        # Check if column already exists
+        result = conn.execute(text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = 'users' AND column_name = :column"
+        ), {"column": column})
+        if result.fetchone():
+            print(f"Column '{column}' already exists on users. No changes needed.")
+        else:
+            conn.execute(text(f"ALTER TABLE users ADD COLUMN {column} {column_type}"))
+            conn.commit()
+            print(f"Successfully added '{column}' column to users table.")
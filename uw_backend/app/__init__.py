@@ -1,71 +1,47 @@
 from flask import Flask
 from flask_cors import CORS
-from app.db import db
+from app.db import db, engine_options_from_env, close_request_sessions, set_read_primary_cookie
+from app.utils.compression import init_compression
 from app.routes.user import user_bp
 from app.routes.model import model_bp
 import os
 from dotenv import load_dotenv
 import os
 
-from google.auth import default, exceptions as google_auth_exceptions
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 from app.routes.health import health_bp  # Add this line near your other imports
 from app.routes.billing import billing_bp
+from app.services.stripe_events import start_worker as start_stripe_worker
+from app.services.google_drive_service import warm_up_clients
 
 import logging
-logging.basicConfig(level=logging.INFO)
+from app.utils.logs import configure_logging, init_request_ids
+# JSON lines by default; LOG_LEVEL / LOG_LEVELS / LOG_FORMAT (see app/utils/logs.py)
+configure_logging()
 
 load_dotenv()
 
-SERVICE_ACCOUNT_FILE = os.getenv("SERVICE_ACCOUNT_FILE")
-
-
-def test_gdrive_access():
-    try:
-        SCOPES = ["https://www.googleapis.com/auth/drive.file"]
-
-        # Use local service account file if available, otherwise use default creds
-        if SERVICE_ACCOUNT_FILE and os.path.exists("./" + SERVICE_ACCOUNT_FILE):
-            print("🔑 Using local service account credentials. (init.py)")
-            creds = Credentials.from_service_account_file("./" + SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-            logging.info("🔑 Using local service account credentials.")
-        else:
-            print("🔑 Using default GCP credentials (Cloud Run). (init.py)")
-            creds, _ = default(scopes=SCOPES)
-            logging.info("🔐 Using default GCP credentials (Cloud Run).")
-
-        # Try accessing the Drive API
-        drive_service = build("drive", "v3", credentials=creds)
-        drive_service.files().list(pageSize=1).execute()
-        logging.info("✅ Google Drive access verified successfully.")
-
-    except google_auth_exceptions.DefaultCredentialsError as e:
-        logging.error(f"❌ DefaultCredentialsError: {e}")
-    except Exception as e:
-        logging.error(f"❌ Google Drive API access failed: {e}")
-
-
 origins = os.getenv("CORS_ALLOWED_ORIGINS", "").split(",")
 print("ORIGINS", origins)
 def create_app():
     try:
         load_dotenv()
-        test_gdrive_access()
         app = Flask(__name__)
 
         # Set the database URI from environment or fallback
         app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-            "pool_size": 5,
-            "max_overflow": 10,
-            "pool_timeout": 30,
-            "pool_recycle": 1800
-        }
+        # Pool sizing via DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT / DB_POOL_RECYCLE / DB_POOL_PRE_PING
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options_from_env()
 
         db.init_app(app)
+        app.teardown_appcontext(close_request_sessions)
+        # gzip/brotli for large JSON bodies (COMPRESS_MIN_BYTES); stats at /api/health/compression
+        init_compression(app)
+        # Optional read replica (DATABASE_REPLICA_URL); keeps a writer's next reads on the primary
+        app.after_request(set_read_primary_cookie)
+        # X-Request-ID on every log record and response
+        init_request_ids(app)
         logging.info(f"✅ ALLOWED ORIGINS: {origins}")
         # Configure CORS
         CORS(app, 
@@ -74,7 +50,8 @@ def create_app():
             r"/api/*": {
                 "origins": origins,
                 "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-                "allow_headers": ["Content-Type", "Authorization", "X-User-Email"],
+                "allow_headers": ["Content-Type", "Authorization", "X-User-Email", "X-Table-Format", "If-None-Match", "X-Request-ID"],
+                "expose_headers": ["ETag", "X-Request-ID"],
             }
         })
 
@@ -84,6 +61,12 @@ def create_app():
         app.register_blueprint(health_bp, url_prefix="/api")
         app.register_blueprint(billing_bp, url_prefix="/api")
 
+        # Applies stored Stripe webhook events in the background (STRIPE_WEBHOOK_INLINE_WORKER)
+        start_stripe_worker(app)
+        # Google clients are built on first use; GOOGLE_CLIENTS_WARMUP=true builds them in the background at startup
+        if os.getenv("GOOGLE_CLIENTS_WARMUP", "false").lower() == "true":
+            warm_up_clients()
+
         return app
     except Exception as e:
             import traceback
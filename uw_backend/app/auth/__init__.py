@@ -1 +1,2 @@
 from .auth0 import requires_auth
+from .identity import current_internal_user, invalidate_user
@@ -1,18 +1,34 @@
 import json
 import os
+import hashlib
+import threading
+from collections import OrderedDict
 import requests
 from jose import jwt
 from flask import request, g
 from functools import wraps
 import time
 
+from app.auth.identity import resolve_internal_user
+
 AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN")
 API_AUDIENCE = os.getenv("AUTH0_API_AUDIENCE")
 ALGORITHMS = ["RS256"]
 
 JWKS_CACHE = None
 JWKS_CACHE_TIME = 0
-JWKS_CACHE_TTL = 60 * 60  # 1 hour
+JWKS_CACHE_TTL = 60 * 60  # 1 hour; after this, serve stale keys while refreshing in the background
+JWKS_MAX_STALE = 24 * 60 * 60  # past this, block on a refresh instead of trusting old keys
+JWKS_FETCH_TIMEOUT = float(os.getenv("AUTH0_JWKS_TIMEOUT", 5))
+JWKS_FORCED_REFRESH_INTERVAL = 60  # min seconds between refreshes triggered by an unknown kid
+_jwks_lock = threading.Lock()
+_jwks_refreshing = False
+_jwks_last_forced = 0
+
+# Verified token payloads, keyed by token hash, kept until the token's own exp
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 1024))
+_token_cache = OrderedDict()
+_token_lock = threading.Lock()
 
 class AuthError(Exception):
     def __init__(self, error, status_code):
@@ -31,17 +47,102 @@ def get_token_auth_header():
 
     return parts[1]
 
-def get_jwks():
+def _fetch_jwks():
     global JWKS_CACHE, JWKS_CACHE_TIME
-    now = time.time()
-    if JWKS_CACHE is None or now - JWKS_CACHE_TIME > JWKS_CACHE_TTL:
-        jwks_url = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json"
-        JWKS_CACHE = requests.get(jwks_url).json()
-        JWKS_CACHE_TIME = now
+    jwks_url = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json"
+    resp = requests.get(jwks_url, timeout=JWKS_FETCH_TIMEOUT)
+    resp.raise_for_status()
+    JWKS_CACHE = resp.json()
+    JWKS_CACHE_TIME = time.time()
     return JWKS_CACHE
 
+
+def _refresh_jwks_in_background():
+    global _jwks_refreshing
+    with _jwks_lock:
+        if _jwks_refreshing:
+            return
+        _jwks_refreshing = True
+
+    def run():
+        global _jwks_refreshing
+        try:
+            _fetch_jwks()
+        except Exception as e:
+            print(f"⚠️ Background JWKS refresh failed, keeping cached keys: {e}")
+        finally:
+            _jwks_refreshing = False
+
+    threading.Thread(target=run, name="jwks-refresh", daemon=True).start()
+
+
+def get_jwks(force=False):
+    """
+    Stale-while-revalidate JWKS cache. Only the very first fetch, a forced refresh
+    (unknown kid) or keys older than JWKS_MAX_STALE block the request; otherwise an
+    expired cache is served while one background thread refreshes it.
+    """
+    age = time.time() - JWKS_CACHE_TIME
+    if JWKS_CACHE is not None and not force:
+        if age > JWKS_MAX_STALE:
+            try:
+                return _fetch_jwks()
+            except Exception as e:
+                print(f"⚠️ JWKS refresh failed, using keys cached {int(age)}s ago: {e}")
+        elif age > JWKS_CACHE_TTL:
+            _refresh_jwks_in_background()
+        return JWKS_CACHE
+    with _jwks_lock:
+        # Another request may have fetched while we waited for the lock
+        if JWKS_CACHE is not None and time.time() - JWKS_CACHE_TIME < age:
+            return JWKS_CACHE
+        return _fetch_jwks()
+
+
+def _find_rsa_key(jwks, kid):
+    for key in jwks.get("keys", []):
+        if key["kid"] == kid:
+            return {
+                "kty": key["kty"],
+                "kid": key["kid"],
+                "use": key["use"],
+                "n": key["n"],
+                "e": key["e"]
+            }
+    return {}
+
+
+def _token_key(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def get_cached_payload(token):
+    key = _token_key(token)
+    with _token_lock:
+        entry = _token_cache.get(key)
+        if not entry:
+            return None
+        exp, payload = entry
+        if exp <= time.time():
+            del _token_cache[key]
+            return None
+        _token_cache.move_to_end(key)
+        return dict(payload)
+
+
+def cache_payload(token, payload):
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)):
+        return
+    with _token_lock:
+        _token_cache[_token_key(token)] = (exp, payload)
+        _token_cache.move_to_end(_token_key(token))
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
 def verify_decode_jwt(token):
     """Fetch Auth0 public keys and verify token."""
+    global _jwks_last_forced
     try:
         jwks = get_jwks()
         
@@ -54,17 +155,12 @@ def verify_decode_jwt(token):
         if "kid" not in unverified_header:
             raise AuthError({"code": "invalid_header", "description": "No kid in token header"}, 401)
             
-        rsa_key = {}
-        for key in jwks["keys"]:
-            if key["kid"] == unverified_header["kid"]:
-                rsa_key = {
-                    "kty": key["kty"],
-                    "kid": key["kid"],
-                    "use": key["use"],
-                    "n": key["n"],
-                    "e": key["e"]
-                }
-                break
+        rsa_key = _find_rsa_key(jwks, unverified_header["kid"])
+        if not rsa_key:
+            # Keys may have rotated; refetch once (rate-limited so bad tokens can't hammer Auth0)
+            if time.time() - _jwks_last_forced > JWKS_FORCED_REFRESH_INTERVAL:
+                _jwks_last_forced = time.time()
+                rsa_key = _find_rsa_key(get_jwks(force=True), unverified_header["kid"])
 
         if not rsa_key:
             raise AuthError({"code": "no_rsa_key", "description": "No matching RSA key found"}, 401)
@@ -90,8 +186,16 @@ def requires_auth(f):
     def decorated(*args, **kwargs):
         try:
             token = get_token_auth_header()
-            payload = verify_decode_jwt(token)
+            payload = get_cached_payload(token)
+            if payload is None:
+                payload = verify_decode_jwt(token)
+                cache_payload(token, payload)
             g.current_user = payload
+            try:
+                g.internal_user = resolve_internal_user(payload.get("sub"))
+            except Exception as e:
+                print(f"⚠️ Could not resolve internal user for {payload.get('sub')}: {e}")
+                g.internal_user = None
         except AuthError as e:
             return json.dumps(e.error), e.status_code
         return f(*args, **kwargs)
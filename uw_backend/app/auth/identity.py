@@ -0,0 +1,94 @@
+"""
+Internal user resolution for authenticated requests.
+
+requires_auth attaches the caller's internal User (id, email, plan_tier, is_active) to
+`g.internal_user`, served from a short TTL cache keyed by the Auth0 `sub` so handlers
+don't each re-query the users table. Any ORM write to a User invalidates its entry once
+the transaction commits; code that updates users with raw SQL should call invalidate_user.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from flask import g, has_request_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.db import get_session
+from app.models.user import User
+
+USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 60))
+
+InternalUser = namedtuple("InternalUser", ["id", "auth0_user_id", "email", "plan_tier", "is_active"])
+
+_cache = {}  # sub -> (expires_at, InternalUser)
+_lock = threading.Lock()
+
+
+def _load_user(sub):
+    session = get_session()
+    try:
+        user = session.query(User).filter_by(auth0_user_id=sub).first()
+        if not user:
+            return None
+        return InternalUser(user.id, user.auth0_user_id, user.email, user.plan_tier, user.is_active)
+    finally:
+        session.close()
+
+
+def resolve_internal_user(sub):
+    """Return the cached InternalUser for an Auth0 sub, loading it on a miss. Unknown subs are not cached."""
+    if not sub:
+        return None
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(sub)
+        if entry and entry[0] > now:
+            return entry[1]
+    internal_user = _load_user(sub)
+    if internal_user is not None:
+        with _lock:
+            _cache[sub] = (now + USER_CACHE_TTL, internal_user)
+    return internal_user
+
+
+def invalidate_user(sub=None):
+    """Drop one cached user, or the whole cache when sub is None."""
+    with _lock:
+        if sub is None:
+            _cache.clear()
+        else:
+            _cache.pop(sub, None)
+
+
+def current_internal_user():
+    """The internal user for this request (resolved once, then reused)."""
+    if not has_request_context():
+        return None
+    if "internal_user" not in g:
+        current_user = getattr(g, "current_user", None) or {}
+        g.internal_user = resolve_internal_user(current_user.get("sub"))
+    return g.internal_user
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_writes(session, flush_context):
+    subs = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            subs.add(obj.auth0_user_id)
+            # A relinked account must also drop the entry under its previous sub
+            subs.update(inspect(obj).attrs.auth0_user_id.history.deleted or ())
+    if subs:
+        session.info.setdefault("_dirty_user_subs", set()).update(subs)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for sub in session.info.pop("_dirty_user_subs", ()):
+        invalidate_user(sub)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_writes(session):
+    session.info.pop("_dirty_user_subs", None)
@@ -1,7 +1,280 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask import g, has_app_context, has_request_context, request
 import os
+import threading
+import time
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
 
 db = SQLAlchemy()
 
-Base = declarative_base() 
\ No newline at end of file
+Base = declarative_base()
+
+
+class PoolStats:
+    """Running totals of how long requests waited for a pooled connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.last_wait_ms = 0.0
+
+    def record(self, wait_ms, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            self.last_wait_ms = wait_ms
+
+    def snapshot(self):
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(self.wait_total_ms / waits, 2) if waits else 0.0,
+                'wait_max_ms': round(self.wait_max_ms, 2),
+                'wait_last_ms': round(self.last_wait_ms, 2),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited (includes new-connection time)."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record((time.perf_counter() - started) * 1000, timed_out=True)
+            raise
+        pool_stats.record((time.perf_counter() - started) * 1000)
+        return conn
+
+
+def engine_options_from_env():
+    """Pool settings for SQLALCHEMY_ENGINE_OPTIONS; defaults match the previous hard-coded values."""
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "false").lower() == "true",
+    }
+
+
+def pool_metrics():
+    pool = db.engine.pool
+    metrics = {
+        'pool_class': type(pool).__name__,
+        'size': pool.size() if hasattr(pool, 'size') else None,
+        'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+        'checked_in': pool.checkedin() if hasattr(pool, 'checkedin') else None,
+        'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+        'max_overflow': getattr(pool, '_max_overflow', None),
+        'timeout': pool.timeout() if hasattr(pool, 'timeout') else None,
+    }
+    metrics.update(pool_stats.snapshot())
+    replica = _replica_engine
+    if replica is not None:
+        metrics['replica'] = {
+            'checked_out': replica.pool.checkedout(),
+            'checked_in': replica.pool.checkedin(),
+            'overflow': replica.pool.overflow(),
+            'lag_seconds': _replica_health['lag'],
+        }
+    with _read_counts_lock:
+        metrics['read_routing'] = dict(_read_counts)
+    return metrics
+
+
+def get_session():
+    """
+    Open a Session. Inside a request/app context it is also registered on `g` and
+    closed at teardown, so early returns and exceptions can never leak a connection.
+    The connection itself is only checked out on first query (see release_connection).
+    """
+    session = Session(db.engine)
+    if has_app_context():
+        g.setdefault('_db_sessions', []).append(session)
+    return session
+
+
+# --- Read replica routing ---
+# With DATABASE_REPLICA_URL set, handlers that only read can use get_read_session() to
+# query the replica. Reads fall back to the primary when the replica lags by more than
+# REPLICA_MAX_LAG_SECONDS (or cannot be reached), and for REPLICA_RYW_SECONDS after the
+# caller's own commit so users always see what they just wrote.
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", 2))
+REPLICA_RYW_SECONDS = int(os.getenv("REPLICA_RYW_SECONDS", 10))
+READ_PRIMARY_COOKIE = "uw_read_primary_until"
+
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+_replica_engine = None
+_replica_lock = threading.Lock()
+_replica_health = {'checked_at': 0.0, 'lag': None}
+_recent_writers = {}  # auth0 sub -> time.time() until which reads stay on the primary
+_read_counts = {}
+_read_counts_lock = threading.Lock()
+
+
+def replica_engine():
+    """Engine for DATABASE_REPLICA_URL (created on first use), or None when no replica is configured."""
+    global _replica_engine
+    url = os.getenv("DATABASE_REPLICA_URL")
+    if not url:
+        return None
+    if _replica_engine is None:
+        with _replica_lock:
+            if _replica_engine is None:
+                options = engine_options_from_env()
+                # Checkout timing stays a primary-pool metric
+                options["poolclass"] = QueuePool
+                _replica_engine = create_engine(url, **options)
+    return _replica_engine
+
+
+def replica_lag(engine):
+    """Replica lag in seconds, re-measured at most every REPLICA_LAG_CHECK_INTERVAL; None if unreachable."""
+    now = time.monotonic()
+    if now - _replica_health['checked_at'] < REPLICA_LAG_CHECK_INTERVAL:
+        return _replica_health['lag']
+    try:
+        with engine.connect() as conn:
+            lag = float(conn.execute(REPLICA_LAG_SQL).scalar() or 0)
+    except Exception as e:
+        print(f"⚠️ Replica lag check failed, reading from primary: {e}")
+        lag = None
+    _replica_health.update(checked_at=now, lag=lag)
+    return lag
+
+
+def _current_sub():
+    current_user = getattr(g, "current_user", None) or {}
+    return current_user.get("sub")
+
+
+def recently_wrote():
+    """True while the caller is inside their read-your-writes window (cookie or this worker's marker)."""
+    if not has_request_context():
+        return False
+    now = time.time()
+    try:
+        if float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > now:
+            return True
+    except ValueError:
+        pass
+    sub = _current_sub()
+    return bool(sub) and _recent_writers.get(sub, 0) > now
+
+
+def mark_recent_write():
+    """Pin this caller's reads to the primary for REPLICA_RYW_SECONDS. Called on commit; raw-SQL writers can call it directly."""
+    if not has_request_context():
+        return
+    g._db_wrote = True
+    sub = _current_sub()
+    if sub:
+        now = time.time()
+        if len(_recent_writers) > 1000:
+            for stale in [k for k, until in _recent_writers.items() if until <= now]:
+                _recent_writers.pop(stale, None)
+        _recent_writers[sub] = now + REPLICA_RYW_SECONDS
+
+
+def read_engine():
+    """(engine, reason) a read-only request should use."""
+    replica = replica_engine()
+    if replica is None:
+        return db.engine, 'no_replica'
+    if recently_wrote():
+        return db.engine, 'read_your_writes'
+    lag = replica_lag(replica)
+    if lag is None:
+        return db.engine, 'replica_unavailable'
+    if lag > REPLICA_MAX_LAG_SECONDS:
+        return db.engine, 'replica_lag'
+    return replica, 'replica'
+
+
+def get_read_session():
+    """
+    Session for read-only handlers: the replica when configured and safe to read from,
+    else the primary. Never write through it.
+    """
+    engine, reason = read_engine()
+    with _read_counts_lock:
+        _read_counts[reason] = _read_counts.get(reason, 0) + 1
+    session = Session(engine)
+    if has_app_context():
+        g.setdefault('_db_sessions', []).append(session)
+    return session
+
+
+@event.listens_for(Session, "after_flush")
+def _note_write(session, flush_context):
+    session.info["_wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed_write(session):
+    if session.info.pop("_wrote", False):
+        mark_recent_write()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_write(session):
+    session.info.pop("_wrote", None)
+
+
+def set_read_primary_cookie(response):
+    """Carry the read-your-writes window to whichever worker serves the caller's next read."""
+    if g.get('_db_wrote') and replica_engine() is not None:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, str(int(time.time() + REPLICA_RYW_SECONDS)),
+            max_age=REPLICA_RYW_SECONDS, httponly=True, secure=True, samesite='None'
+        )
+    return response
+
+
+def release_connection(session):
+    """
+    Return the session's connection to the pool before slow external work (Sheets, Drive,
+    Stripe). Only valid while nothing has been written: the read transaction is rolled back
+    and loaded objects reload lazily on next access.
+    """
+    if session.new or session.dirty or session.deleted:
+        raise RuntimeError("release_connection called with pending changes")
+    if session.in_transaction():
+        session.rollback()
+
+
+def close_request_sessions(exc=None):
+    for session in g.pop('_db_sessions', []):
+        try:
+            if exc is not None:
+                session.rollback()
+            session.close()
+        except Exception as e:
+            print(f"⚠️ Failed to close request session: {e}")
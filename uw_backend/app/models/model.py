@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Text, Integer, Boolean, ForeignKey, DateTime, Float
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, String, Text, Integer, Boolean, ForeignKey, DateTime, Float, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from sqlalchemy.sql import func
 import uuid
 from app.db import Base
@@ -16,6 +16,7 @@ class ModelType(Base):
     google_sheet_url = Column(String)
     show_retail = Column(Boolean, default=True)
     show_rental_units = Column(Boolean, default=True)
+    schema_version = Column(Integer, default=0)  # bumped by every section/field edit, see app/utils/schema_cache.py
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
 
@@ -23,7 +24,7 @@ class ModelTypeSection(Base):
     __tablename__ = 'model_type_sections'
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    model_type_id = Column(UUID(as_uuid=True), ForeignKey('model_types.id'), nullable=False)
+    model_type_id = Column(UUID(as_uuid=True), ForeignKey('model_types.id'), nullable=False, index=True)
     name = Column(String, nullable=False)
     order = Column(Integer)
     created_at = Column(DateTime, server_default=func.now())
@@ -33,7 +34,7 @@ class ModelTypeSection(Base):
 class ModelTypeSectionField(Base):
     __tablename__ = 'model_type_section_fields'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    section_id = Column(UUID(as_uuid=True), ForeignKey('model_type_sections.id'), nullable=False)
+    section_id = Column(UUID(as_uuid=True), ForeignKey('model_type_sections.id'), nullable=False, index=True)
     description = Column(String)
     field_title = Column(String, nullable=False)
     field_key = Column(String, nullable=False)
@@ -50,7 +51,7 @@ class UserModel(Base):
     __tablename__ = 'user_models'
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False, index=True)
     model_type_id = Column(UUID(as_uuid=True), ForeignKey('model_types.id'), nullable=False)
     active = Column(Boolean, default=True)
     name = Column(String, nullable=False)
@@ -67,20 +68,31 @@ class UserModelVersion(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_model_id = Column(UUID(as_uuid=True), ForeignKey('user_models.id'), nullable=False)
     version_number = Column(Integer, nullable=False)
-    google_sheet_url = Column(String)        # URL to the linked Google Sheet
+    google_sheet_url = Column(String, index=True)  # URL to the linked Google Sheet
     levered_irr = Column(String)             # e.g. "33.9%"
     levered_moic = Column(String)            # e.g. "2.78x"
-    table_mapping_output = Column(JSONB)     # styled table content for frontend rendering
+    levered_irr_value = Column(Float)        # numeric shadow of levered_irr, e.g. 33.9
+    levered_moic_value = Column(Float)       # numeric shadow of levered_moic, e.g. 2.78
+    table_mapping_output = Column(JSONB)     # styled table content for frontend rendering (compact form, see app/utils/table_codec.py)
     variables = Column(JSONB)                # e.g. { "Going-in Cap Rate": "5.25%" }
     sensitivity_tables = Column(JSONB)       # e.g. { status: 'generating' } or { irr_table: {...}, moic_table: {...} }
+    field_values = Column(JSONB)             # { field_id: { value, start_month, end_month } }, see app/utils/field_store.py
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
 
+    __table_args__ = (
+        Index('ix_user_model_versions_field_values', 'field_values', postgresql_using='gin'),
+        Index('ix_user_model_versions_user_model_id_version_number', 'user_model_id', version_number.desc()),
+        Index('ix_user_model_versions_levered_irr_value', 'levered_irr_value'),
+        Index('ix_user_model_versions_levered_moic_value', 'levered_moic_value'),
+    )
+
+# Legacy per-field rows; new versions store values in UserModelVersion.field_values
 class UserModelFieldValue(Base):
     __tablename__ = 'user_model_field_values'
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False)
+    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False, index=True)
     field_id = Column(UUID(as_uuid=True), ForeignKey('model_type_section_fields.id'), nullable=False)
     value = Column(Text)
     start_month = Column(Integer)
@@ -91,7 +103,7 @@ class UserModelFieldValue(Base):
 class Unit(Base):
     __tablename__ = 'units'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False)
+    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False, index=True)
     rent_type = Column(String)
     vacate_flag = Column(Integer)
     layout = Column(String)
@@ -104,7 +116,7 @@ class Unit(Base):
 class DevelopmentUnit(Base):
     __tablename__ = 'development_units'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False)
+    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False, index=True)
     unit_type = Column(String)
     avg_sf = Column(Float)
     units = Column(Integer)
@@ -115,7 +127,7 @@ class DevelopmentUnit(Base):
 class MarketRentAssumption(Base):
     __tablename__ = 'market_rent_assumptions'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False)
+    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False, index=True)
     layout = Column(String)
     pf_rent = Column(Integer)
     created_at = Column(DateTime, server_default=func.now())
@@ -124,7 +136,7 @@ class MarketRentAssumption(Base):
 class GrowthRates(Base):
     __tablename__ = 'growth_rates'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False)
+    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False, index=True)
     name = Column(String)
     value = Column(Float)
     type = Column(String)
@@ -134,7 +146,7 @@ class GrowthRates(Base):
 class AmenityIncome(Base):
     __tablename__ = 'amenity_income'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False)
+    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False, index=True)
     name = Column(String)
     start_month = Column(Integer)
     utilization = Column(Float)
@@ -146,7 +158,7 @@ class AmenityIncome(Base):
 class OperatingExpenses(Base):
     __tablename__ = 'operating_expenses'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False)
+    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False, index=True)
     name = Column(String)
     factor = Column(Float)
     broker = Column(Float)
@@ -158,7 +170,7 @@ class OperatingExpenses(Base):
 class Expenses(Base):
     __tablename__ = 'expenses'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False)
+    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False, index=True)
     name = Column(String)
     factor = Column(String)
     cost_per = Column(Float)
@@ -173,7 +185,7 @@ class Expenses(Base):
 class RetailIncome(Base):
     __tablename__ = 'retail_income'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False)
+    user_model_version_id = Column(UUID(as_uuid=True), ForeignKey('user_model_versions.id'), nullable=False, index=True)
     suite = Column(String)
     tenant_name = Column(String)
     square_feet = Column(Float)
@@ -197,6 +209,10 @@ class ModelNote(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
 
+    __table_args__ = (
+        Index('ix_model_notes_user_model_id_status_created_at', 'user_model_id', 'status', created_at.desc()),
+    )
+
 class ModelPicture(Base):
     __tablename__ = 'model_pictures'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -205,9 +221,18 @@ class ModelPicture(Base):
     description = Column(Text)
     picture_order = Column(Integer)
     status = Column(String, default='active')
+    width = Column(Integer)
+    height = Column(Integer)
+    # {"thumb": {"width", "height", "webp": {"url", "object_name", "bytes"}, "jpeg": {...}}, "medium": {...}}
+    renditions = Column(JSONB(none_as_null=True))
+    rendition_status = Column(String)  # pending | ready | failed | unavailable
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
 
+    __table_args__ = (
+        Index('ix_model_pictures_user_model_id_status_order', 'user_model_id', 'status', 'picture_order'),
+    )
+
 class ModelTag(Base):
     __tablename__ = 'model_tags'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -218,6 +243,28 @@ class ModelTag(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
 
+    __table_args__ = (
+        Index('ix_model_tags_user_model_id_status', 'user_model_id', 'status'),
+        Index('ix_model_tags_active_tag_name', 'tag_name', 'user_model_id', postgresql_where=(status == 'active')),
+    )
+
+# Denormalized search text per user_model (name, address, active tags, latest-version
+# tenants, active notes). Kept current by app/utils/search_index.py on commit.
+class ModelSearchDocument(Base):
+    __tablename__ = 'model_search_documents'
+    user_model_id = Column(UUID(as_uuid=True), ForeignKey('user_models.id', ondelete='CASCADE'), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    document = Column(Text, nullable=False, default='')
+    search_vector = Column(TSVECTOR)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index('ix_model_search_documents_search_vector', 'search_vector', postgresql_using='gin'),
+        # Requires the pg_trgm extension (create_db.py / migrate_search_index.py)
+        Index('ix_model_search_documents_document_trgm', 'document', postgresql_using='gin',
+              postgresql_ops={'document': 'gin_trgm_ops'}),
+    )
+
 # --- User-submitted Issues / Feedback ---
 class Issue(Base):
     __tablename__ = 'issues'
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey, Text, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 import uuid
@@ -22,6 +22,8 @@ class User(Base):
     cancel_at_period_end = Column(Boolean, default=False)
     plan_price_id = Column(String, nullable=True)
     plan_tier = Column(String, nullable=True, default="freemium")
+    subscription_synced_at = Column(DateTime, nullable=True)  # last time the fields above were confirmed from Stripe
+    stripe_customer_fingerprint = Column(String, nullable=True)  # hash of the profile last pushed to the Stripe customer
 
 
 class UserInfo(Base):
@@ -53,6 +55,8 @@ class CompanyInfo(Base):
     company_email = Column(String)
     company_phone_number = Column(String)
     company_logo_url = Column(String)  # URL string
+    company_logo_renditions = Column(JSONB(none_as_null=True))  # same layout as ModelPicture.renditions (webp + png)
+    company_logo_rendition_status = Column(String)  # pending | ready | failed | unavailable
 
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
@@ -71,3 +75,25 @@ class SubscriptionEvent(Base):
     stripe_event_id = Column(String, unique=True, nullable=True, index=True)
     
     created_at = Column(DateTime, server_default=func.now())
+
+
+class StripeWebhookEvent(Base):
+    """Raw Stripe webhook deliveries, stored once per event id and applied by the billing worker."""
+    __tablename__ = "stripe_webhook_events"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    stripe_event_id = Column(String, unique=True, nullable=False)
+    event_type = Column(String, nullable=False)
+    customer_id = Column(String, nullable=True)
+    stripe_created = Column(Integer, nullable=True)  # Stripe's event timestamp; defines per-customer order
+    payload = Column(JSONB, nullable=False)
+
+    status = Column(String, nullable=False, default="pending")  # pending | processed | skipped | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    received_at = Column(DateTime, server_default=func.now())
+    processed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_stripe_webhook_events_status_customer_created', 'status', 'customer_id', 'stripe_created'),
+    )
@@ -1,36 +1,51 @@
 import os
+import json
+import hashlib
 import stripe
 from flask import Blueprint, request, jsonify, g, current_app as app
 from app.auth import requires_auth
 from sqlalchemy.orm import Session
-from app.db import db
-from app.models.user import User, SubscriptionEvent
+from app.db import db, get_session, release_connection
+from app.models.user import User
+from app.services.stripe_events import (
+    PRICE_ID_MAX, PRICE_ID_PRO, PRICE_ID_FREEMIUM, PRICE_ID_MAP, TIER_PRICE_MAP, record_event, apply_customer_inline
+)
+from app.services.subscription_state import mark_synced
 
 stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
-PRICE_ID_MAX = os.environ.get("PRICE_ID_MAX")
-PRICE_ID_PRO = os.environ.get("PRICE_ID_PRO")
-PRICE_ID_FREEMIUM = os.environ.get("PRICE_ID_FREEMIUM")
-
-PRICE_ID_MAP = {
-    PRICE_ID_MAX: "max",
-    PRICE_ID_PRO: "pro",
-    PRICE_ID_FREEMIUM: "freemium"
-}
-
-TIER_PRICE_MAP = {
-    "max": PRICE_ID_MAX,
-    "pro": PRICE_ID_PRO,
-    "freemium": PRICE_ID_FREEMIUM
-}
 PROMO_CODE = os.environ.get("STRIPE_PROMO_CODE", "").strip()
 PROMO_TRIAL_DAYS = int(os.environ.get("PROMO_TRIAL_DAYS", "60"))
 
 billing_bp = Blueprint("billing", __name__)
 
 
-def get_session():
-    with app.app_context():
-        return Session(db.engine)
+
+
+def customer_profile(auth0_sub: str, email: str | None) -> dict:
+    return {
+        "name": email or None,
+        "email": email or None,
+        "description": email or auth0_sub,
+        "metadata": {"auth0_sub": auth0_sub, "auth0_email": email or ""},
+    }
+
+
+def profile_fingerprint(profile: dict) -> str:
+    return hashlib.sha256(json.dumps(profile, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def sync_customer_profile(session, user, profile: dict) -> bool:
+    """Push the profile to the Stripe customer only when it differs from what was last sent."""
+    fingerprint = profile_fingerprint(profile)
+    if user.stripe_customer_fingerprint == fingerprint:
+        return False
+    try:
+        stripe.Customer.modify(user.stripe_customer_id, **profile)
+    except Exception:
+        return False
+    user.stripe_customer_fingerprint = fingerprint
+    session.commit()
+    return True
 
 
 def get_or_create_customer(auth0_sub: str, email: str | None):
@@ -42,17 +57,14 @@ def get_or_create_customer(auth0_sub: str, email: str | None):
             session.add(user)
             session.commit()
             session.refresh(user)
+        # Prefer the stored email (backfilled from the JWT if missing)
+        if (not user.email) and email:
+            user.email = email
+            session.commit()
+        profile = customer_profile(auth0_sub, user.email or email)
         if user.stripe_customer_id:
             # Ensure customer has a friendly name/description
-            try:
-                stripe.Customer.modify(
-                    user.stripe_customer_id,
-                    name=(email or None),
-                    email=(email or None),
-                    description=(email or auth0_sub)
-                )
-            except Exception:
-                pass
+            sync_customer_profile(session, user, profile)
             return user.stripe_customer_id
         # Try to find an existing customer by email to avoid duplicates
         if email:
@@ -62,27 +74,14 @@ def get_or_create_customer(auth0_sub: str, email: str | None):
                     candidate = existing.data[0]
                     user.stripe_customer_id = candidate.id
                     session.commit()
-                    try:
-                        stripe.Customer.modify(
-                            candidate.id,
-                            name=(email or None),
-                            email=(email or None),
-                            description=(email or auth0_sub),
-                            metadata={"auth0_sub": auth0_sub, "auth0_email": email or ""}
-                        )
-                    except Exception:
-                        pass
+                    sync_customer_profile(session, user, profile)
                     return candidate.id
             except Exception:
                 pass
         # Create a new customer
-        cust = stripe.Customer.create(
-            email=email or None,
-            name=email or None,
-            description=(email or auth0_sub),
-            metadata={"auth0_sub": auth0_sub, "auth0_email": email or ""}
-        )
+        cust = stripe.Customer.create(**profile)
         user.stripe_customer_id = cust.id
+        user.stripe_customer_fingerprint = profile_fingerprint(profile)
         session.commit()
         return cust.id
     finally:
@@ -115,27 +114,6 @@ def customer_has_any_subscription(customer_id: str) -> bool:
     return False
 
 
-def log_subscription_event(session, user_id, event_type, from_tier, to_tier, stripe_event_id):
-    """Logs a subscription event to the database for auditability and idempotency."""
-    if not stripe_event_id:
-        return
-        
-    existing = session.query(SubscriptionEvent).filter(SubscriptionEvent.stripe_event_id == stripe_event_id).first()
-    if existing:
-        return existing
-        
-    event = SubscriptionEvent(
-        user_id=user_id,
-        event_type=event_type,
-        from_tier=from_tier,
-        to_tier=to_tier,
-        stripe_event_id=stripe_event_id
-    )
-    session.add(event)
-    session.commit()
-    return event
-
-
 @billing_bp.route("/billing/setup-intent", methods=["POST"])
 @requires_auth
 def create_setup_intent():
@@ -145,31 +123,9 @@ def create_setup_intent():
     if not auth0_sub:
         return jsonify({"error": "unauthorized"}), 401
     try:
+        # Also backfills the stored email and syncs the customer profile if it changed
         customer_id = get_or_create_customer(auth0_sub, email)
-        # Fetch authoritative email from DB (update it from JWT if missing)
-        session = get_session()
-        effective_email = email
-        try:
-            db_user = session.query(User).filter(User.auth0_user_id == auth0_sub).first()
-            if db_user:
-                if (not db_user.email) and email:
-                    db_user.email = email
-                    session.commit()
-                effective_email = db_user.email or email
-        finally:
-            session.close()
 
-        # Ensure Stripe customer has email set
-        try:
-            stripe.Customer.modify(
-                customer_id,
-                name=auth0_sub,
-                email=(effective_email or None),
-                description=(effective_email or auth0_sub),
-                metadata={"auth0_sub": auth0_sub, "auth0_email": effective_email or ""}
-            )
-        except Exception:
-            pass
         si = stripe.SetupIntent.create(
             customer=customer_id,
             automatic_payment_methods={"enabled": True}
@@ -201,37 +157,14 @@ def start_promo_subscription():
     try:
         target_price_id = PRICE_ID_PRO
         target_tier = "pro"
-        # Ensure a customer exists
+        # Ensure a customer exists; also backfills the stored email and syncs the customer profile
         customer_id = get_or_create_customer(auth0_sub, email)
-        # Fetch authoritative email from DB (update it from JWT if missing)
-        session = get_session()
-        effective_email = email
-        try:
-            db_user = session.query(User).filter(User.auth0_user_id == auth0_sub).first()
-            if db_user:
-                if (not db_user.email) and email:
-                    db_user.email = email
-                    session.commit()
-                effective_email = db_user.email or email
-        finally:
-            session.close()
-        # Keep Stripe customer updated with email
-        try:
-            stripe.Customer.modify(
-                customer_id,
-                name=auth0_sub,
-                email=(effective_email or None),
-                description=(effective_email or auth0_sub),
-                metadata={"auth0_sub": auth0_sub, "auth0_email": effective_email or ""}
-            )
-        except Exception:
-            pass
         # Create subscription with extended trial; no payment method required
         sub = stripe.Subscription.create(
             customer=customer_id,
             items=[{"price": target_price_id}],
             trial_period_days=max(1, int(PROMO_TRIAL_DAYS)),
-            metadata={"auth0_sub": auth0_sub, "auth0_email": effective_email or "", "promo_code": promo_code, "tier": target_tier}
+            metadata={"auth0_sub": auth0_sub, "auth0_email": email or "", "promo_code": promo_code, "tier": target_tier}
         )
         # Ensure the subscription is set to cancel at period end by default (no auto-renew)
         try:
@@ -250,6 +183,7 @@ def start_promo_subscription():
                 user.plan_tier = target_tier
                 user.current_period_end = sub.get("current_period_end") or None
                 user.cancel_at_period_end = bool(sub.get("cancel_at_period_end")) if hasattr(sub, 'cancel_at_period_end') else False
+                mark_synced(user)
                 session.commit()
         finally:
             session.close()
@@ -278,31 +212,8 @@ def start_subscription():
     if not target_price_id:
         return jsonify({"error": "PRICE_ID not configured"}), 500
     try:
+        # Also backfills the stored email and syncs the customer profile if it changed
         customer_id = get_or_create_customer(auth0_sub, email)
-        # Fetch authoritative email from DB (update it from JWT if missing)
-        session = get_session()
-        effective_email = email
-        try:
-            db_user = session.query(User).filter(User.auth0_user_id == auth0_sub).first()
-            if db_user:
-                if (not db_user.email) and email:
-                    db_user.email = email
-                    session.commit()
-                effective_email = db_user.email or email
-        finally:
-            session.close()
-
-        # Ensure Stripe customer has email set just before creating subscription
-        try:
-            stripe.Customer.modify(
-                customer_id,
-                name=auth0_sub,
-                email=(effective_email or None),
-                description=(effective_email or auth0_sub),
-                metadata={"auth0_sub": auth0_sub, "auth0_email": effective_email or ""}
-            )
-        except Exception:
-            pass
 
         sub_to_update = None
         session_find = get_session()
@@ -352,6 +263,7 @@ def start_subscription():
                 user.plan_tier = tier
                 user.current_period_end = sub.get("current_period_end") or None
                 user.cancel_at_period_end = bool(sub.get("cancel_at_period_end")) if hasattr(sub, 'cancel_at_period_end') else False
+                mark_synced(user)
                 session.commit()
         finally:
             session.close()
@@ -510,6 +422,7 @@ def get_subscription_details():
                     user.plan_price_id = None
                     user.plan_tier = "freemium"
                     user.stripe_subscription_id = None
+                mark_synced(user)
                 session2.commit()
         except Exception:
             # best-effort; do not block the response if persistence fails
@@ -528,98 +441,32 @@ def get_subscription_details():
 
 @billing_bp.route("/stripe/webhook", methods=["POST"])
 def stripe_webhook():
+    """
+    Verify and store the event, apply the customer's pending events in order, then
+    acknowledge (app/services/stripe_events.py). Redeliveries of an already stored event
+    id are acknowledged without being stored again; anything not applied here (customer
+    busy, failure) is picked up by the fallback worker.
+    """
     payload = request.data
     sig_header = request.headers.get("Stripe-Signature")
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload, sig_header, os.environ["STRIPE_WEBHOOK_SECRET"]
         )
+        event = json.loads(payload)
     except Exception as e:
         return str(e), 400
 
-    t = event["type"]
-    data = event["data"]["object"]
-    stripe_event_id = event.get("id")
-
-    if t == "checkout.session.completed":
-        customer_id = data.get("customer")
-        sub_id = data.get("subscription")
-        if customer_id and sub_id:
-            session = get_session()
-            try:
-                user = session.query(User).filter(User.stripe_customer_id == customer_id).first()
-                if user:
-                    user.stripe_subscription_id = sub_id
-                    session.commit()
-            finally:
-                session.close()
-    
-    if t == "invoice.payment_failed":
-        customer_id = data.get("customer")
-        if customer_id:
-            session = get_session()
-            try:
-                user = session.query(User).filter(User.stripe_customer_id == customer_id).first()
-                if user:
-                    old_tier = user.plan_tier
-                    user.plan_tier = "freemium"
-                    user.subscription_status = "past_due"
-                    log_subscription_event(session, user.id, "downgraded", old_tier, "freemium", stripe_event_id)
-                    session.commit()
-            finally:
-                session.close()
-
-    if t in ("customer.subscription.created", "customer.subscription.updated", "customer.subscription.deleted"):
-        sub = data
-        customer_id = sub.get("customer")
-        status = sub.get("status")
-        current_period_end = sub.get("current_period_end")
-        cancel_at_period_end = bool(sub.get("cancel_at_period_end"))
-        price_id = None
-        try:
-            items = sub.get("items", {}).get("data", [])
-            if items and items[0].get("price"):
-                price_id = items[0]["price"].get("id")
-        except Exception:
-            price_id = None
-            
-        if customer_id:
-            session = get_session()
-            try:
-                user = session.query(User).filter(User.stripe_customer_id == customer_id).first()
-                if user:
-                    old_status = user.subscription_status
-                    old_tier = user.plan_tier
-                    
-                    user.subscription_status = status
-                    user.current_period_end = current_period_end
-                    user.cancel_at_period_end = cancel_at_period_end
-                    if price_id:
-                        user.plan_price_id = price_id
-                    user.stripe_subscription_id = sub.get("id", user.stripe_subscription_id)
-
-                    if t == "customer.subscription.deleted" or status in ("past_due", "unpaid", "canceled"):
-                        if old_tier != "freemium":
-                            user.plan_tier = "freemium"
-                            log_subscription_event(session, user.id, "downgraded", old_tier, "freemium", stripe_event_id)
-                    
-                    elif status == "active" and old_status in ("past_due", "unpaid", "incomplete"):
-                        last_event = session.query(SubscriptionEvent).filter(
-                            SubscriptionEvent.user_id == user.id,
-                            SubscriptionEvent.event_type == "downgraded"
-                        ).order_by(SubscriptionEvent.created_at.desc()).first()
-                        
-                        if last_event and last_event.from_tier:
-                            user.plan_tier = last_event.from_tier
-                            log_subscription_event(session, user.id, "upgraded", "freemium", user.plan_tier, stripe_event_id)
-                        elif price_id:
-                            user.plan_tier = PRICE_ID_MAP.get(price_id, "freemium")
-                    
-                    elif status in ("active", "trialing") and price_id:
-                        user.plan_tier = PRICE_ID_MAP.get(price_id, "freemium")
-
-                    session.commit()
-            finally:
-                session.close()
+    session = get_session()
+    try:
+        record_event(session, event)
+    except Exception as e:
+        session.rollback()
+        print(f"❌ [POST /stripe/webhook] failed to store {event.get('id')}: {e}")
+        # Non-2xx makes Stripe retry the delivery
+        return "", 500
+    finally:
+        session.close()
 
-    return "", 200
\ No newline at end of file
+    apply_customer_inline(lambda: Session(db.engine), event)
+    return "", 200
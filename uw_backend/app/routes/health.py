@@ -1,9 +1,121 @@
+import hmac
 import logging
-from flask import Blueprint, jsonify
+import os
+from functools import wraps
+from flask import Blueprint, jsonify, request
+from sqlalchemy import text
+from app.auth import requires_auth
+from app.db import pool_metrics, get_session
+from app.services.stripe_events import webhook_stats
+from app.utils.image_fetch import cache as image_cache
+from app.utils.compression import compression_stats
+from app.services.google_drive_service import check_google_access, clients_initialized
+from app.services.sheets_concurrency import read_stats
+from app.services.sheets_batch import write_stats
 
 health_bp = Blueprint("health", __name__)
 
+# Monitoring can send this as X-Internal-Token instead of an Auth0 bearer token
+HEALTH_STATS_TOKEN = os.getenv("HEALTH_STATS_TOKEN")
+
+
+def _has_internal_token():
+    sent = request.headers.get("X-Internal-Token")
+    return bool(HEALTH_STATS_TOKEN and sent and hmac.compare_digest(sent, HEALTH_STATS_TOKEN))
+
+
+def requires_stats_access(f):
+    """Internal stats: a matching X-Internal-Token, else a signed-in user (requires_auth)."""
+    authed = requires_auth(f)
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if _has_internal_token():
+            return f(*args, **kwargs)
+        return authed(*args, **kwargs)
+    return decorated
+
+
 @health_bp.route("/health", methods=["GET"])
 def health_check():
+    """Liveness probe; the only unauthenticated health endpoint with a body."""
     logging.info("✅ Health check endpoint hit")
-    return jsonify({"status": "ok"}), 200
\ No newline at end of file
+    return jsonify({"status": "ok"}), 200
+
+
+@health_bp.route("/health/db_pool", methods=["GET"])
+@requires_stats_access
+def db_pool_health():
+    """Live connection pool usage: checked-out/overflow counts and checkout wait times."""
+    return jsonify(pool_metrics()), 200
+
+
+@health_bp.route("/health/compression", methods=["GET"])
+@requires_stats_access
+def compression_health():
+    """Per-endpoint response sizes before/after compression, with bytes saved and ratio."""
+    return jsonify(compression_stats()), 200
+
+
+@health_bp.route("/health/stripe_webhooks", methods=["GET"])
+@requires_stats_access
+def stripe_webhooks_health():
+    """Stored Stripe events by status and the age of the oldest one still pending."""
+    session = get_session()
+    try:
+        return jsonify(webhook_stats(session)), 200
+    finally:
+        session.close()
+
+
+@health_bp.route("/health/image_cache", methods=["GET"])
+@requires_stats_access
+def image_cache_health():
+    """Entries, bytes and hit/miss counts for the in-memory picture/logo cache."""
+    return jsonify(image_cache.stats()), 200
+
+
+@health_bp.route("/health/sheets_reads", methods=["GET"])
+@requires_stats_access
+def sheets_reads_health():
+    """Concurrent Sheets read pool: worker count, time spent waiting on the quota limiter, batchGet latency."""
+    return jsonify(read_stats()), 200
+
+
+@health_bp.route("/health/sheets_writes", methods=["GET"])
+@requires_stats_access
+def sheets_writes_health():
+    """Chunked Sheets writes: chunk limits, time spent waiting on the write quota, recent per-chunk latency."""
+    return jsonify(write_stats()), 200
+
+
+@health_bp.route("/health/ready", methods=["GET"])
+def readiness_check():
+    """
+    Readiness probe: database round trip, plus a live Google Drive call when ?google=1 or
+    READINESS_CHECK_GOOGLE=true. Returns 503 if any check fails. Probes get only the status;
+    the per-check details and ?google=1 need an X-Internal-Token.
+    """
+    detailed = _has_internal_token()
+    checks = {}
+    session = get_session()
+    try:
+        session.execute(text("SELECT 1"))
+        checks["database"] = {"ok": True}
+    except Exception as e:
+        checks["database"] = {"ok": False, "error": str(e)}
+    finally:
+        session.close()
+
+    default_google = os.getenv("READINESS_CHECK_GOOGLE", "false")
+    check_google = (request.args.get("google", default_google) if detailed else default_google).lower() in ("1", "true")
+    if check_google:
+        checks["google"] = check_google_access()
+    else:
+        checks["google"] = {"skipped": True, "initialized": clients_initialized()}
+
+    ready = all(c.get("ok", True) for c in checks.values())
+    body = {"status": "ready" if ready else "unavailable"}
+    if detailed:
+        body["checks"] = checks
+    return jsonify(body), 200 if ready else 503
@@ -1,13 +1,21 @@
-from flask import Blueprint, request, jsonify, current_app as app, send_file
+from flask import Blueprint, request, jsonify, current_app as app, send_file, Response, stream_with_context
 from flask_cors import cross_origin
-from app.db import db
+from app.db import db, get_session, get_read_session, release_connection
 from app.models.model import (
     ModelType, ModelTypeSection, ModelTypeSectionField,
     UserModel, UserModelVersion, UserModelFieldValue,
     Unit, MarketRentAssumption, GrowthRates, AmenityIncome, OperatingExpenses, 
     RetailIncome, Expenses, Issue, ModelNote, ModelPicture, ModelTag, DevelopmentUnit
 )
-from app.auth import requires_auth
+from app.auth import requires_auth, current_internal_user
+from app.utils.field_store import write_field_values, read_field_values, load_field_values
+from app.utils.table_codec import encode_tables, tables_for_response, wants_compact_tables
+from app.utils.numbers import set_return_metrics
+from app.utils.schema_cache import get_schema, schema_etag, field_lookups, bump_schema_version
+from app.utils.http_cache import make_etag, not_modified, with_etag
+from app.utils.search_index import search_user_models
+from app.utils.image_fetch import fetch_images, to_data_url
+from app.services.image_renditions import renditions_available, schedule_picture_renditions, parse_size, pick_rendition
 from sqlalchemy.orm import Session
 import uuid
 from app.models.user import User
@@ -16,8 +24,10 @@ from google.oauth2.service_account import Credentials
 from google.auth import default
 import re
 import logging
-from app.services.google_drive_service import generate_google_sheet_for_user_model, update_google_sheet_and_get_values, update_google_sheet_and_get_values_final, update_google_sheet_and_get_values_intermediate, update_google_sheet_field_values_and_get_values, update_user_model_expense_table, generate_sensitivity_analysis_tables, extract_variables_from_sheet_batch
+from app.services.google_drive_service import generate_google_sheet_for_user_model, update_google_sheet_and_get_values, update_google_sheet_and_get_values_final, update_google_sheet_and_get_values_intermediate, plan_intermediate_dry_run, update_google_sheet_field_values_and_get_values, update_user_model_expense_table, generate_sensitivity_analysis_tables, extract_variables_from_sheet_batch
 from app.services.google_drive_service import export_google_sheet, gs_client
+from app.services.sheets_async import run_pipeline, run_intermediate_pipeline
+from app.services.proforma import run_proforma, remember_inputs, refresh_inputs, preview_field_updates, load_version_inputs
 from datetime import datetime
 import os
 from google.auth import default
@@ -31,9 +41,11 @@ except Exception:
 from sqlalchemy import text
 from sqlalchemy.sql import func
 import base64
+import json
 import requests
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+from app.utils.logs import summarize
+
+logger = logging.getLogger(__name__)
 
 SERVICE_ACCOUNT_FILE = os.getenv("SERVICE_ACCOUNT_FILE")
 
@@ -41,9 +53,6 @@ model_bp = Blueprint('model', __name__)
 
 origins = os.getenv("CORS_ALLOWED_ORIGINS", "").split(",")
 
-def get_session():
-    with app.app_context():
-        return Session(db.engine)
 
 # Model Type CRUD
 @model_bp.route('/model_types', methods=['GET'])
@@ -95,7 +104,8 @@ def update_model_type(model_type_id):
             model_type.show_retail = data['show_retail']
         if 'show_rental_units' in data:
             model_type.show_rental_units = data['show_rental_units']
-            
+
+        bump_schema_version(session, model_type_id=model_type.id)
         session.commit()
         return jsonify({
             'id': str(model_type.id),
@@ -123,6 +133,7 @@ def delete_model_type(model_type_id):
         if model_type is None:
             return jsonify({'error': 'Model type not found'}), 404
         model_type.is_active = False
+        bump_schema_version(session, model_type_id=model_type.id)
         session.commit()
         return jsonify({'message': 'Model type deactivated successfully'}), 200
     except Exception as e:
@@ -137,50 +148,21 @@ def delete_model_type(model_type_id):
 def get_model_type(model_type_id):
     session = get_session()
     try:
-        logging.debug(f"Fetching model type with ID: {model_type_id}")
+        logger.debug("Fetching model type with ID: %s", model_type_id)
         
         model_type = session.query(ModelType).get(model_type_id)
         if model_type is None:
-            logging.warning(f"Model type not found for ID: {model_type_id}")
+            logger.warning("Model type not found for ID: %s", model_type_id)
             return jsonify({'error': 'Model type not found'}), 404
-        sections = session.query(ModelTypeSection).filter_by(model_type_id=model_type.id).all()
-        sections_data = []
-        for section in sections:
-            fields = session.query(ModelTypeSectionField).filter_by(section_id=section.id).all()
-            fields_data = [{
-                'id': str(field.id),
-                'description': field.description,
-                'field_title': field.field_title,
-                'field_key': field.field_key,
-                'field_type': field.field_type,
-                'default_value': field.default_value,
-                'required': field.required,
-                'time_phased': field.time_phased,
-                'order': field.order,
-                'active': field.active
-            } for field in fields]
-            sections_data.append({
-                'id': str(section.id),
-                'name': section.name,
-                'order': section.order,
-                'fields': fields_data,
-                'active': section.active
-            })
-        return jsonify({
-            'id': str(model_type.id),
-            'name': model_type.name,
-            'description': model_type.description,
-            'created_at': model_type.created_at.isoformat() if model_type.created_at else None,
-            'updated_at': model_type.updated_at.isoformat() if model_type.updated_at else None,
-            'is_active': model_type.is_active,
-            'google_sheet_url': model_type.google_sheet_url,
-            'development_model': model_type.development_model,
-            'show_retail': model_type.show_retail,
-            'show_rental_units': model_type.show_rental_units,
-            'sections': sections_data
-        }), 200
+
+        etag = schema_etag(model_type)
+        # Also matches the -gzip / -br ETag the compression middleware sends back
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        return with_etag(jsonify(get_schema(session, model_type)), etag)
     except Exception as e:
-        logging.error(f"Error fetching model type: {e}", exc_info=True)
+        logger.error("Error fetching model type: %s", e, exc_info=True)
         return jsonify({'error': str(e)}), 500
     finally:
         session.close()
@@ -202,7 +184,7 @@ def create_full_model_type():
     """
     session = get_session()
     data = request.get_json()
-    print(data)
+    logger.debug("model_type payload %s", summarize(data))
     try:
         
         # Create the model type (google_sheet_url is optional)
@@ -298,7 +280,7 @@ def create_user_model():
         print("🚀 Starting user model creation...")
         data = request.get_json()
 
-        print(data.get('user_model_field_values'))
+        logger.debug("user_model_field_values %s", summarize(data.get('user_model_field_values')))
         # Validate UUIDs
         # Filter out badly formed field_values (missing or invalid field_id)
         valid_field_values = []
@@ -311,6 +293,54 @@ def create_user_model():
         data['user_model_field_values'] = valid_field_values
         print("✅ Field UUIDs validated.")
 
+        # Field lookup by field_id from the cached model type schema
+        model_type = session.query(ModelType).get(data['model_type_id'])
+        lookups = field_lookups(get_schema(session, model_type)) if model_type else {}
+
+        field_values = []
+        for field_value in data.get('user_model_field_values', []):
+            field_id = field_value['field_id']
+            field_meta = lookups.get(field_id, {})
+            field_values.append({
+                "field_id": field_id,
+                "field_title": field_meta.get('field_title'),
+                "field_key": field_meta.get('field_key'),
+                "field_type": field_meta.get('field_type'),
+                "section": field_meta.get('section'),
+                "value": field_value['value'],
+                "start_month": field_value.get('start_month'),
+                "end_month": field_value.get('end_month')
+            })
+        
+        print(f"✅ Added {len(field_values)} field values.")
+
+        # Nothing has been written yet: hand the connection back to the pool while Sheets recalculates
+        release_connection(session)
+
+        # Call Google Sheet generation service
+        print("🧾 Generating Google Sheet for user model...")
+        logger.debug("field_values %s", summarize(field_values))
+
+        # Extract the Google Sheet ID from the provided URL
+        google_sheet_url = data.get('google_sheet_url')
+        if not google_sheet_url or '/d/' not in google_sheet_url:
+            raise Exception("Invalid or missing Google Sheet URL")
+        sheet_id = google_sheet_url.split('/d/')[1].split('/')[0]
+
+        # Generate outputs from Google Sheet
+        result = update_google_sheet_and_get_values_final(
+            copied_sheet_id=sheet_id,
+            copied_sheet_url=google_sheet_url,
+            mapped_values=field_values,
+            market_json=data.get('market_rent_assumptions'),
+            rental_assumptions_json=data.get('units'),
+            rental_growth_json=data.get('growth_rates'),
+            amenity_income_json=data.get('amenity_income'),
+            expenses_json=data.get('operating_expenses'),
+            retail_income_json=data.get('retail_income'),
+            development_model=data.get('development_model')
+        )
+
         # Create user model
         user_model = UserModel(
             user_id=data['user_id'],
@@ -433,77 +463,12 @@ def create_user_model():
             )
             session.add(new_income)
 
-        # Get all section fields and build lookup by field_id
-        section_fields = session.query(ModelTypeSectionField).join(
-            ModelTypeSection, ModelTypeSection.id == ModelTypeSectionField.section_id
-        ).filter(ModelTypeSection.model_type_id == user_model.model_type_id).add_columns(
-            ModelTypeSection.name.label("section_name")
-        ).all()
-
-        field_title_lookup = {str(f[0].id): f[0].field_title for f in section_fields}
-        field_key_lookup = {str(f[0].id): f[0].field_key for f in section_fields}
-        field_type_lookup = {str(f[0].id): f[0].field_type for f in section_fields}
-        section_lookup = {str(f[0].id): f[1] for f in section_fields}
-
-        # Add field values
-        field_values = []
-        for field_value in data.get('user_model_field_values', []):
-            field_id = field_value['field_id']
-            fv = UserModelFieldValue(
-                user_model_version_id=user_model_version.id,
-                field_id=field_id,
-                value=field_value['value'],
-                start_month=field_value.get('start_month',''),
-                end_month=field_value.get('end_month','')
-            )
-            session.add(fv)
-
-            field_values.append({
-                "field_id": field_id,
-                "field_title": field_title_lookup.get(field_id),
-                "field_key": field_key_lookup.get(field_id),
-                "field_type": field_type_lookup.get(field_id),
-                "section": section_lookup.get(field_id),
-                "value": field_value['value'],
-                "start_month": field_value.get('start_month'),
-                "end_month": field_value.get('end_month')
-            })
-        
-        print(f"✅ Added {len(field_values)} field values.")
-
-        # Resolve relationships
-        user_model.user = session.query(User).get(user_model.user_id)
-        user_model.model_type = session.query(ModelType).get(user_model.model_type_id)
-        print(f"🔄 Linked user and model_type to user_model.")
-
-        # Call Google Sheet generation service
-        print("🧾 Generating Google Sheet for user model...")
-        print(field_values)
-
-        # Extract the Google Sheet ID from the provided URL
-        google_sheet_url = data.get('google_sheet_url')
-        if not google_sheet_url or '/d/' not in google_sheet_url:
-            raise Exception("Invalid or missing Google Sheet URL")
-        sheet_id = google_sheet_url.split('/d/')[1].split('/')[0]
-
-        # Generate outputs from Google Sheet
-        result = update_google_sheet_and_get_values_final(
-            copied_sheet_id=sheet_id,
-            copied_sheet_url=google_sheet_url,
-            mapped_values=field_values,
-            market_json=data.get('market_rent_assumptions'),
-            rental_assumptions_json=data.get('units'),
-            rental_growth_json=data.get('growth_rates'),
-            amenity_income_json=data.get('amenity_income'),
-            expenses_json=data.get('operating_expenses'),
-            retail_income_json=data.get('retail_income'),
-            development_model=data.get('development_model')
-        )
+        # Add field values (single JSONB write on the version)
+        write_field_values(user_model_version, data.get('user_model_field_values', []))
 
         # Save outputs to DB
-        user_model_version.levered_irr = result['levered_irr']
-        user_model_version.levered_moic = result['levered_moic']
-        user_model_version.table_mapping_output = result['tables']
+        set_return_metrics(user_model_version, result['levered_irr'], result['levered_moic'])
+        user_model_version.table_mapping_output = encode_tables(result['tables'])
         user_model_version.variables = result['variables']
         print("📦 Saved sheet URL, variables, and tables to UserModelVersion.")
         session.commit()
@@ -540,7 +505,7 @@ def upload_model_picture(user_model_id):
         auth0_user_id = current_user.get("sub") if current_user and "sub" in current_user else None
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj:
             return jsonify({'error': 'User not found'}), 401
         user_model = session.query(UserModel).get(user_model_id)
@@ -568,7 +533,9 @@ def upload_model_picture(user_model_id):
         blob = bucket.blob(object_name)
         blob.cache_control = "public, max-age=31536000"
         content_type = file.mimetype or 'application/octet-stream'
-        blob.upload_from_file(file.stream, content_type=content_type)
+        # Keep the bytes: the rendition pool resizes from them instead of re-downloading
+        content = file.read()
+        blob.upload_from_string(content, content_type=content_type)
 
         public_url = None
         signed_url = None
@@ -604,17 +571,21 @@ def upload_model_picture(user_model_id):
             picture_url=str(final_url),
             description=str(description),
             picture_order=next_order,
-            status='active'
+            status='active',
+            rendition_status='pending' if renditions_available() else 'unavailable'
         )
         session.add(pic)
         session.commit()
+        if renditions_available():
+            schedule_picture_renditions(app._get_current_object(), pic.id, bucket_name, object_name, content, make_public)
         return jsonify({
             'id': str(pic.id),
             'user_model_id': str(pic.user_model_id),
             'picture_url': pic.picture_url,
             'description': pic.description,
             'picture_order': pic.picture_order,
-            'status': pic.status
+            'status': pic.status,
+            'rendition_status': pic.rendition_status
         }), 201
     except Exception as e:
         try:
@@ -637,21 +608,32 @@ def list_model_pictures(user_model_id):
         auth0_user_id = current_user.get("sub") if current_user and "sub" in current_user else None
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj:
             return jsonify({'error': 'User not found'}), 401
         user_model = session.query(UserModel).get(user_model_id)
         if not user_model or str(user_model.user_id) != str(user_obj.id):
             return jsonify({'error': 'Forbidden: user does not own this model'}), 403
 
+        # ?size=thumb|medium|original|<px> serves the smallest rendition that fits (default original)
+        try:
+            longest = parse_size(request.args.get('size'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        image_format = request.args.get('image_format') or ('webp' if 'image/webp' in (request.headers.get('Accept') or '') else 'jpeg')
+
         rows = session.query(ModelPicture).filter_by(user_model_id=user_model.id).filter(ModelPicture.status == 'active').order_by(ModelPicture.picture_order.asc().nulls_last(), ModelPicture.created_at.desc()).all()
         data = [{
             'id': str(p.id),
             'user_model_id': str(p.user_model_id),
-            'picture_url': p.picture_url,
+            'picture_url': pick_rendition(p.renditions, p.picture_url, longest, image_format),
+            'original_url': p.picture_url,
             'description': p.description,
             'picture_order': p.picture_order,
             'status': p.status,
+            'width': p.width,
+            'height': p.height,
+            'rendition_status': p.rendition_status,
             'created_at': p.created_at.isoformat() if p.created_at else None,
             'updated_at': p.updated_at.isoformat() if p.updated_at else None
         } for p in rows]
@@ -678,7 +660,7 @@ def update_model_picture(picture_id):
         auth0_user_id = current_user.get("sub") if current_user and "sub" in current_user else None
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj or not user_model or str(user_model.user_id) != str(user_obj.id):
             return jsonify({'error': 'Forbidden: user does not own this model'}), 403
 
@@ -733,7 +715,7 @@ def remove_model_picture(picture_id):
         auth0_user_id = current_user.get("sub") if current_user and "sub" in current_user else None
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj or not user_model or str(user_model.user_id) != str(user_obj.id):
             return jsonify({'error': 'Forbidden: user does not own this model'}), 403
 
@@ -761,36 +743,50 @@ def get_model_pictures_data_urls(user_model_id):
         auth0_user_id = current_user.get("sub") if current_user and "sub" in current_user else None
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj:
             return jsonify({'error': 'User not found'}), 401
         user_model = session.query(UserModel).get(user_model_id)
         if not user_model or str(user_model.user_id) != str(user_obj.id):
             return jsonify({'error': 'Forbidden: user does not own this model'}), 403
 
+        # ?size=thumb|medium|original|<px>; data URLs default to JPEG since exports may not decode WebP
+        try:
+            longest = parse_size(request.args.get('size'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        image_format = request.args.get('image_format') or 'jpeg'
+
         rows = session.query(ModelPicture).filter_by(user_model_id=user_model.id).filter(ModelPicture.status == 'active').order_by(
             ModelPicture.picture_order.asc().nulls_last(),
             ModelPicture.created_at.desc()
         ).all()
 
-        out = []
-        for p in rows:
-            url = p.picture_url
-            data_url = None
-            try:
-                resp = requests.get(url, timeout=10)
-                if resp.ok:
-                    content = resp.content
-                    ctype = resp.headers.get('Content-Type') or 'image/jpeg'
-                    b64 = base64.b64encode(content).decode('utf-8')
-                    data_url = f"data:{ctype};base64,{b64}"
-            except Exception:
-                data_url = None
-            out.append({
-                'id': str(p.id),
-                'description': p.description,
-                'picture_url': data_url or url
-            })
+        pictures = [{'id': str(p.id), 'description': p.description,
+                     'url': pick_rendition(p.renditions, p.picture_url, longest, image_format)} for p in rows]
+        session.close()
+
+        # ?format=ndjson streams one line per picture as each download finishes (with its list 'index')
+        if request.args.get('format') == 'ndjson' or 'application/x-ndjson' in (request.headers.get('Accept') or ''):
+            def generate():
+                for i, content, ctype in fetch_images([p['url'] for p in pictures]):
+                    pic = pictures[i]
+                    yield json.dumps({
+                        'index': i,
+                        'id': pic['id'],
+                        'description': pic['description'],
+                        'picture_url': to_data_url(content, ctype) if content is not None else pic['url']
+                    }) + "\n"
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson'), 200
+
+        out = [None] * len(pictures)
+        for i, content, ctype in fetch_images([p['url'] for p in pictures]):
+            pic = pictures[i]
+            out[i] = {
+                'id': pic['id'],
+                'description': pic['description'],
+                'picture_url': to_data_url(content, ctype) if content is not None else pic['url']
+            }
         return jsonify(out), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -805,7 +801,7 @@ def create_user_model_new_version():
     try:
         print("🚀 Starting new version creation for existing user model...")
         data = request.get_json()
-        print("data", data)
+        logger.debug("request payload %s", summarize(data))
         user_model_id = data.get('id')
         if not user_model_id:
             raise Exception("Missing id in request data")
@@ -815,6 +811,53 @@ def create_user_model_new_version():
         if not user_model:
             raise Exception(f"UserModel with id {user_model_id} not found")
 
+        # Field lookup by field_id from the cached model type schema
+        model_type = session.query(ModelType).get(user_model.model_type_id)
+        lookups = field_lookups(get_schema(session, model_type)) if model_type else {}
+
+        field_values = []
+        for field_value in data.get('user_model_field_values', []):
+            field_id = field_value['field_id']
+            field_meta = lookups.get(field_id, {})
+            field_values.append({
+                "field_id": field_id,
+                "field_title": field_meta.get('field_title'),
+                "field_key": field_meta.get('field_key'),
+                "field_type": field_meta.get('field_type'),
+                "section": field_meta.get('section'),
+                "value": field_value['value'],
+                "start_month": field_value.get('start_month'),
+                "end_month": field_value.get('end_month')
+            })
+        
+        print(f"✅ Added {len(field_values)} field values.")
+
+        # Nothing has been written yet: hand the connection back to the pool while Sheets recalculates
+        release_connection(session)
+
+        # Call Google Sheet generation service
+        print("🧾 Generating Google Sheet for user model version...")
+        logger.debug("field_values %s", summarize(field_values))
+
+        # Extract the Google Sheet ID from the provided URL
+        google_sheet_url = data.get('google_sheet_url')
+        if not google_sheet_url or '/d/' not in google_sheet_url:
+            raise Exception("Invalid or missing Google Sheet URL")
+        sheet_id = google_sheet_url.split('/d/')[1].split('/')[0]
+
+        result = update_google_sheet_and_get_values_final(
+            copied_sheet_id=sheet_id,
+            copied_sheet_url=google_sheet_url,
+            mapped_values=field_values,
+            market_json=data.get('market_rent_assumptions'),
+            rental_assumptions_json=data.get('units'),
+            rental_growth_json=data.get('growth_rates'),
+            amenity_income_json=data.get('amenity_income'),
+            expenses_json=data.get('operating_expenses'),
+            retail_income_json=data.get('retail_income'),
+            development_model=data.get('development_model', False)
+        )
+
         print(f"Found UserModel with ID: {user_model.id}")
 
         # Update core model fields (editable in Edit Model) only if changed
@@ -960,76 +1003,12 @@ def create_user_model_new_version():
             )
             session.add(new_income)
 
-        # Get all section fields and build lookup by field_id
-        section_fields = session.query(ModelTypeSectionField).join(
-            ModelTypeSection, ModelTypeSection.id == ModelTypeSectionField.section_id
-        ).filter(ModelTypeSection.model_type_id == user_model.model_type_id).add_columns(
-            ModelTypeSection.name.label("section_name")
-        ).all()
-
-        field_title_lookup = {str(f[0].id): f[0].field_title for f in section_fields}
-        field_key_lookup = {str(f[0].id): f[0].field_key for f in section_fields}
-        field_type_lookup = {str(f[0].id): f[0].field_type for f in section_fields}
-        section_lookup = {str(f[0].id): f[1] for f in section_fields}
-
-        # Add field values
-        field_values = []
-        for field_value in data.get('user_model_field_values', []):
-            field_id = field_value['field_id']
-            fv = UserModelFieldValue(
-                user_model_version_id=user_model_version.id,
-                field_id=field_id,
-                value=field_value['value'],
-                start_month=field_value.get('start_month',''),
-                end_month=field_value.get('end_month','')
-            )
-            session.add(fv)
-
-            field_values.append({
-                "field_id": field_id,
-                "field_title": field_title_lookup.get(field_id),
-                "field_key": field_key_lookup.get(field_id),
-                "field_type": field_type_lookup.get(field_id),
-                "section": section_lookup.get(field_id),
-                "value": field_value['value'],
-                "start_month": field_value.get('start_month'),
-                "end_month": field_value.get('end_month')
-            })
-        
-        print(f"✅ Added {len(field_values)} field values.")
-
-        # Resolve relationships
-        user_model.user = session.query(User).get(user_model.user_id)
-        user_model.model_type = session.query(ModelType).get(user_model.model_type_id)
-        print(f"🔄 Linked user and model_type to user_model.")
-
-        # Call Google Sheet generation service
-        print("🧾 Generating Google Sheet for user model version...")
-        print(field_values)
-
-        # Extract the Google Sheet ID from the provided URL
-        google_sheet_url = data.get('google_sheet_url')
-        if not google_sheet_url or '/d/' not in google_sheet_url:
-            raise Exception("Invalid or missing Google Sheet URL")
-        sheet_id = google_sheet_url.split('/d/')[1].split('/')[0]
-
-        result = update_google_sheet_and_get_values_final(
-            copied_sheet_id=sheet_id,
-            copied_sheet_url=google_sheet_url,
-            mapped_values=field_values,
-            market_json=data.get('market_rent_assumptions'),
-            rental_assumptions_json=data.get('units'),
-            rental_growth_json=data.get('growth_rates'),
-            amenity_income_json=data.get('amenity_income'),
-            expenses_json=data.get('operating_expenses'),
-            retail_income_json=data.get('retail_income'),
-            development_model=data.get('development_model', False)
-        )
+        # Add field values (single JSONB write on the version)
+        write_field_values(user_model_version, data.get('user_model_field_values', []))
 
         # Save outputs to DB
-        user_model_version.levered_irr = result['levered_irr']
-        user_model_version.levered_moic = result['levered_moic']
-        user_model_version.table_mapping_output = result['tables']
+        set_return_metrics(user_model_version, result['levered_irr'], result['levered_moic'])
+        user_model_version.table_mapping_output = encode_tables(result['tables'])
         user_model_version.variables = result['variables']
         print("📦 Saved sheet URL, variables, and tables to UserModelVersion.")
 
@@ -1051,18 +1030,61 @@ def create_user_model_new_version():
 
 
 
+def _wants_preview(data):
+    return request.args.get('preview', str(data.get('preview', ''))).lower() in ('1', 'true')
+
+
+def _sheet_access(session, google_sheet_url):
+    """
+    (user, saved version or None, None) when the caller may use this sheet's preview inputs,
+    else (None, None, error response). A sheet not yet linked to a version (model still
+    being created) is only reachable through the caller's own cache entries.
+    """
+    user_obj = current_internal_user()
+    if not user_obj:
+        return None, None, (jsonify({'error': 'User not found'}), 401)
+    found = session.query(UserModelVersion, UserModel.user_id).join(
+        UserModel, UserModel.id == UserModelVersion.user_model_id
+    ).filter(UserModelVersion.google_sheet_url == google_sheet_url).order_by(
+        UserModelVersion.version_number.desc()
+    ).first()
+    if found is None:
+        return user_obj, None, None
+    version, owner_id = found
+    if str(owner_id) != str(user_obj.id):
+        return None, None, (jsonify({'error': 'Forbidden: user does not own this model'}), 403)
+    return user_obj, version, None
+
+
 @model_bp.route('/user_models_single_field_updates', methods=['POST'])
 @cross_origin(origins=origins, supports_credentials=True)
 @requires_auth
 def user_models_single_field_update():
+    session = get_read_session()
     try:
         data = request.get_json()
-        print("data", data)
+        logger.debug("request payload %s", summarize(data))
         google_sheet_url = data.get('google_sheet_url')
         if not google_sheet_url or '/d/' not in google_sheet_url:
             raise Exception("Invalid or missing Google Sheet URL")
         sheet_id = google_sheet_url.split('/d/')[1].split('/')[0]
 
+        user_obj, version, denied = _sheet_access(session, google_sheet_url)
+        if denied:
+            return denied
+
+        # ?preview=1 re-runs the in-process pro-forma on the caller's last payload for this sheet
+        # (or the saved version's inputs), no Sheets call
+        if _wants_preview(data):
+            result = preview_field_updates(
+                user_obj.id, sheet_id, data.get('updates'), include_monthly=data.get('monthly', False),
+                load_inputs=(lambda: load_version_inputs(session, version)) if version is not None else None
+            )
+            if result is None:
+                return jsonify({'error': 'No inputs for this sheet; run the intermediate update first'}), 404
+            return jsonify({"result": result}), 200
+        release_connection(session)
+
         result = update_google_sheet_field_values_and_get_values(
             copied_sheet_id=sheet_id,
             mapped_values=data.get('updates'),
@@ -1070,6 +1092,7 @@ def user_models_single_field_update():
             variable_mapping=data.get('variable_mapping'),
             development_model=data.get('development_model', False)
         )
+        refresh_inputs(user_obj.id, sheet_id, data.get('updates'))
 
 
 
@@ -1082,6 +1105,8 @@ def user_models_single_field_update():
         
         print(f"❌ Exception occurred: {str(e)}")
         return jsonify({'error': str(e)}), 500
+    finally:
+        session.close()
 
 
 
@@ -1094,7 +1119,7 @@ def create_user_model_intermediate():
         print("🚀 Starting user model creation...")
         data = request.get_json()
 
-        print("data", data)
+        logger.debug("request payload %s", summarize(data))
 
         address = data.get('street_address', '') + ' ' + data.get('city', '') + ', ' + data.get('state', '') + ' ' + data.get('zip_code', '')
 
@@ -1104,7 +1129,7 @@ def create_user_model_intermediate():
             raise Exception("Invalid or missing Google Sheet URL")
         sheet_id = google_sheet_url.split('/d/')[1].split('/')[0]
 
-        result = update_google_sheet_and_get_values_intermediate(
+        pipeline_args = dict(
             copied_sheet_id=sheet_id,
             copied_sheet_url=google_sheet_url,
             mapped_values=data.get('user_model_field_values'),
@@ -1120,6 +1145,29 @@ def create_user_model_intermediate():
             expenses_json=data.get('expenses'),
             property_name=data.get('name')
         )
+        user_obj, version, denied = _sheet_access(session, google_sheet_url)
+        if denied:
+            return denied
+        remember_inputs(user_obj.id, sheet_id, data)
+        pipeline_args['mapping_scope'] = (str(user_obj.id), version.id if version else None)
+
+        # ?preview=1 evaluates the pro-forma in-process (NOI, IRR, MOIC) without calling Google
+        if _wants_preview(data):
+            return jsonify({"result": run_proforma(data, include_monthly=data.get('monthly', True))}), 200
+
+        # ?dry_run=1 plans the structured update and returns its stats without calling Google
+        if request.args.get('dry_run', str(data.get('dry_run', ''))).lower() in ('1', 'true'):
+            return jsonify({"result": plan_intermediate_dry_run(model_mapping=data.get('model_mapping'), **pipeline_args)}), 200
+
+        # ?pipeline=async (or SHEETS_PIPELINE=async) runs the overlapped asyncio variant on the shared loop;
+        # this thread still blocks until it finishes, so it cuts latency per build, not thread usage
+        if request.args.get('pipeline', os.getenv('SHEETS_PIPELINE', 'sync')) == 'async':
+            result = run_pipeline(run_intermediate_pipeline(**pipeline_args))
+        else:
+            result = update_google_sheet_and_get_values_intermediate(**pipeline_args)
+
+        if wants_compact_tables(request):
+            result['tables'] = encode_tables(result.get('tables'))
 
         return jsonify({"result": result}), 201
 
@@ -1141,7 +1189,7 @@ def update_user_expense_table():
         print("🚀 Starting user model creation...")
         data = request.get_json()
 
-        print("data", data)
+        logger.debug("request payload %s", summarize(data))
         
         google_sheet_url = data.get('google_sheet_url')
         if not google_sheet_url or '/d/' not in google_sheet_url:
@@ -1188,7 +1236,7 @@ def get_user_model(user_model_id):
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj:
             return jsonify({'error': 'User not found'}), 401
         current_user_id = user_obj.id
@@ -1227,44 +1275,28 @@ def get_user_model(user_model_id):
             # Use most recent
             user_model_version = all_versions[0]
 
-        # Get field values for the selected version
-        field_values = (
-            session.query(UserModelFieldValue, ModelTypeSectionField)
-            .join(ModelTypeSectionField, UserModelFieldValue.field_id == ModelTypeSectionField.id)
-            .filter(UserModelFieldValue.user_model_version_id == user_model_version.id)
-            .all()
+        # Versions are immutable apart from updated_at-stamped writes, so these parts identify the body
+        etag = make_etag(
+            'user_model', user_model.id, user_model.updated_at, user_model.active,
+            user_model_version.id, user_model_version.updated_at,
+            all_versions[0].id, len(all_versions), model_type.schema_version,
+            wants_compact_tables(request)
         )
-        field_values_data = [{
-            'field_id': str(fv.field_id),
-            'field_key': field.field_key,
-            'value': fv.value,
-            'start_month': fv.start_month,
-            'end_month': fv.end_month
-        } for fv, field in field_values]
-
-        # Get model sections and fields
-        sections = session.query(ModelTypeSection).filter_by(model_type_id=model_type.id).all()
-        sections_data = []
-        for section in sections:
-            fields = session.query(ModelTypeSectionField).filter_by(section_id=section.id).all()
-            fields_data = [{
-                'id': str(field.id),
-                'description': field.description,
-                'field_title': field.field_title,
-                'field_key': field.field_key,
-                'field_type': field.field_type,
-                'default_value': field.default_value,
-                'required': field.required,
-                'time_phased': field.time_phased,
-                'order': field.order,
-                'active': field.active
-            } for field in fields]
-            sections_data.append({
-                'id': str(section.id),
-                'name': section.name,
-                'order': section.order,
-                'fields': fields_data
-            })
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        # Get model sections and fields (cached per schema version)
+        sections_data = [{
+            'id': section['id'],
+            'name': section['name'],
+            'order': section['order'],
+            'fields': section['fields']
+        } for section in get_schema(session, model_type)['sections']]
+
+        # Get field values for the selected version
+        field_key_lookup = {f['id']: f['field_key'] for section in sections_data for f in section['fields']}
+        field_values_data = read_field_values(session, user_model_version, field_key_lookup)
 
         # Add units to the response
         units = session.query(Unit).filter_by(user_model_version_id=user_model_version.id).all()
@@ -1350,7 +1382,7 @@ def get_user_model(user_model_id):
             'recovery_start_month': income.recovery_start_month
         } for income in retail_income]
 
-        return jsonify({
+        return with_etag(jsonify({
             'id': str(user_model.id),
             'name': user_model.name,
             'street_address': user_model.street_address,
@@ -1375,7 +1407,7 @@ def get_user_model(user_model_id):
             'google_sheet_url': user_model_version.google_sheet_url,
             'levered_irr': user_model_version.levered_irr,
             'levered_moic': user_model_version.levered_moic,
-            'table_mapping_output': user_model_version.table_mapping_output,
+            'table_mapping_output': tables_for_response(user_model_version.table_mapping_output, wants_compact_tables(request)),
             'sensitivity_tables': user_model_version.sensitivity_tables,
             'units': units_data,
             'market_rent_assumptions': market_rent_assumptions_data,
@@ -1386,7 +1418,7 @@ def get_user_model(user_model_id):
             'retail_income': retail_income_data
             ,
             'development_units': development_units_data
-        }), 200
+        }), etag), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -1427,7 +1459,7 @@ def get_user_model_version(user_model_version_id):
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj:
             return jsonify({'error': 'User not found'}), 401
         current_user_id = user_obj.id
@@ -1436,35 +1468,24 @@ def get_user_model_version(user_model_version_id):
         if str(user_model.user_id) != str(current_user_id):
             return jsonify({'error': 'Forbidden: user does not own this model'}), 403
 
-
-        # Get model sections and fields first
-        sections = session.query(ModelTypeSection).filter_by(model_type_id=model_type.id).all()
-        sections_data = []
-        for section in sections:
-            fields = session.query(ModelTypeSectionField).filter_by(section_id=section.id).all()
-  
-            fields_data = [{
-                'id': str(field.id),
-                'description': field.description,
-                'field_title': field.field_title,
-                'field_key': field.field_key,
-                'field_type': field.field_type,
-                'default_value': field.default_value,
-                'required': field.required,
-                'time_phased': field.time_phased,
-                'order': field.order,
-                'active': field.active
-            } for field in fields]
-            print("FIELDS_DATA", fields_data);
-            sections_data.append({
-                'id': str(section.id),
-                'name': section.name,
-                'order': section.order,
-                'fields': fields_data
-            })
+        etag = make_etag(
+            'user_model_version', user_model_version.id, user_model_version.updated_at,
+            user_model.updated_at, model_type.schema_version, wants_compact_tables(request)
+        )
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        # Get model sections and fields first (cached per schema version)
+        sections_data = [{
+            'id': section['id'],
+            'name': section['name'],
+            'order': section['order'],
+            'fields': section['fields']
+        } for section in get_schema(session, model_type)['sections']]
 
         # Now get field values with field_key lookup (include missing fields as null)
-        field_values = session.query(UserModelFieldValue).filter_by(user_model_version_id=user_model_version.id).all()
+        field_values = load_field_values(session, user_model_version)
 
         # Create lookups for field properties by field_id
         field_key_lookup = {}
@@ -1474,21 +1495,18 @@ def get_user_model_version(user_model_version_id):
                 field_key_lookup[field['id']] = field['field_key']
                 field_type_lookup[field['id']] = field['field_type']
 
-        # Map existing values by field_id (string)
-        values_by_id = {str(fv.field_id): fv for fv in field_values}
-
         # Build a complete list for all fields
         field_values_data = []
         for section in sections_data:
             for f in section['fields']:
-                existing = values_by_id.get(f['id'])
+                existing = field_values.get(f['id']) or {}
                 field_values_data.append({
                     'field_id': f['id'],
                     'field_key': f['field_key'],
                     'field_type': f['field_type'],
-                    'value': getattr(existing, 'value', None),
-                    'start_month': getattr(existing, 'start_month', None),
-                    'end_month': getattr(existing, 'end_month', None)
+                    'value': existing.get('value'),
+                    'start_month': existing.get('start_month'),
+                    'end_month': existing.get('end_month')
                 })
 
         # Add units to the response
@@ -1580,7 +1598,7 @@ def get_user_model_version(user_model_version_id):
             'recovery_start_month': income.recovery_start_month
         } for income in retail_income]
 
-        return jsonify({
+        return with_etag(jsonify({
             'id': str(user_model.id),
             'name': user_model.name,
             'street_address': user_model.street_address,
@@ -1604,7 +1622,7 @@ def get_user_model_version(user_model_version_id):
             'google_sheet_url': user_model_version.google_sheet_url,
             'levered_irr': user_model_version.levered_irr,
             'levered_moic': user_model_version.levered_moic,
-            'table_mapping_output': user_model_version.table_mapping_output,
+            'table_mapping_output': tables_for_response(user_model_version.table_mapping_output, wants_compact_tables(request)),
             'sensitivity_tables': user_model_version.sensitivity_tables,
             'units': units_data,
             'market_rent_assumptions': market_rent_assumptions_data,
@@ -1615,7 +1633,7 @@ def get_user_model_version(user_model_version_id):
             'retail_income': retail_income_data
             ,
             'development_units': development_units_data
-        }), 200
+        }), etag), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -1627,7 +1645,7 @@ def get_user_model_version(user_model_version_id):
 @cross_origin(origins=origins, supports_credentials=True)
 @requires_auth
 def get_all_user_models():
-    session = get_session()
+    session = get_read_session()
     try:
         # --- Debug context ---
         import time, traceback as _tb
@@ -1642,18 +1660,17 @@ def get_all_user_models():
         if not user_id:
             return jsonify({'error': 'User ID is required'}), 400
 
-        # Try to validate UUID shape (do not fail hard; just log)
+        # The fingerprint query casts to UUID, so reject anything else here rather than 500 there
         try:
-            _ = uuid.UUID(str(user_id))
-            print(f"🆔 [GET /user_models] user_id looks like UUID")
-        except Exception:
-            print(f"⚠️ [GET /user_models] user_id is not a full UUID: '{user_id}' (will still query as string match)")
+            user_id = str(uuid.UUID(str(user_id)))
+        except ValueError:
+            return jsonify({'error': f"Invalid user_id: '{user_id}'"}), 400
 
         # Resolve internal user for auth visibility (not enforcing ownership here, only logging)
         internal_user = None
         try:
             if auth0_user_id:
-                internal_user = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+                internal_user = current_internal_user()
         except Exception as _e:
             print(f"⚠️ [GET /user_models] failed resolving internal user for auth0_sub={auth0_user_id}: {_e}")
 
@@ -1662,6 +1679,23 @@ def get_all_user_models():
         else:
             print(f"👤 [GET /user_models] caller internal_user not resolved")
 
+        # Cheap fingerprint of everything the list shows; lets unchanged dashboards revalidate with a 304
+        fingerprint = session.execute(text("""
+            SELECT
+                (SELECT COUNT(*) FROM user_models m WHERE m.user_id = CAST(:user_id AS UUID)),
+                (SELECT MAX(m.updated_at) FROM user_models m WHERE m.user_id = CAST(:user_id AS UUID)),
+                (SELECT COUNT(*) || ':' || COALESCE(MAX(GREATEST(v.created_at, COALESCE(v.updated_at, v.created_at)))::text, '')
+                   FROM user_model_versions v JOIN user_models m ON m.id = v.user_model_id
+                  WHERE m.user_id = CAST(:user_id AS UUID)),
+                (SELECT COUNT(*) || ':' || COALESCE(MAX(GREATEST(t.created_at, COALESCE(t.updated_at, t.created_at)))::text, '')
+                   FROM model_tags t JOIN user_models m ON m.id = t.user_model_id
+                  WHERE m.user_id = CAST(:user_id AS UUID))
+        """), {'user_id': str(user_id)}).fetchone()
+        etag = make_etag('user_models', user_id, *fingerprint)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
         q_started = time.monotonic()
         # Query all user models for the user and join with ModelType
         user_models = session.query(UserModel, ModelType.name).join(ModelType, UserModel.model_type_id == ModelType.id).filter(UserModel.user_id == user_id).all()
@@ -1722,7 +1756,7 @@ def get_all_user_models():
             })
         total_ms = int((time.monotonic() - started_at) * 1000)
         print(f"✅ [GET /user_models] returning {len(user_models_data)} items in {total_ms} ms")
-        return jsonify(user_models_data), 200
+        return with_etag(jsonify(user_models_data), etag), 200
     except Exception as e:
         print(f"❌ [GET /user_models] error: {e}")
         _tb.print_exc()
@@ -1732,6 +1766,245 @@ def get_all_user_models():
 
 
 
+# Latest version per model for one user; served by ix_user_model_versions_user_model_id_version_number
+PORTFOLIO_DEALS_CTE = """
+WITH latest AS (
+    SELECT DISTINCT ON (v.user_model_id)
+           v.user_model_id, v.id AS version_id, v.version_number, v.created_at AS version_created_at,
+           v.levered_irr, v.levered_moic, v.levered_irr_value, v.levered_moic_value
+    FROM user_model_versions v
+    JOIN user_models m ON m.id = v.user_model_id
+    WHERE m.user_id = :user_id
+    ORDER BY v.user_model_id, v.version_number DESC
+), deals AS (
+    SELECT m.id, m.name, m.street_address, m.city, m.state, m.zip_code, m.active,
+           m.model_type_id, mt.name AS model_type,
+           l.version_id, l.version_number, l.version_created_at,
+           l.levered_irr, l.levered_moic, l.levered_irr_value, l.levered_moic_value
+    FROM latest l
+    JOIN user_models m ON m.id = l.user_model_id
+    JOIN model_types mt ON mt.id = m.model_type_id
+    WHERE {filters}
+)
+"""
+
+PORTFOLIO_SORT_COLUMNS = {
+    'irr': 'levered_irr_value',
+    'moic': 'levered_moic_value',
+    'name': 'name',
+    'updated_at': 'version_created_at',
+}
+
+PORTFOLIO_GROUPS = {
+    'user': ("'all'", ""),
+    'model_type': ("d.model_type", ""),
+    'tag': ("t.tag_name", "JOIN model_tags t ON t.user_model_id = d.id AND t.status = 'active'"),
+}
+
+
+def _portfolio_filters(args):
+    """Translate query args into a SQL filter clause and bind params for the deals CTE."""
+    clauses = ["TRUE"]
+    params = {}
+    for arg, column, op in (
+        ('min_irr', 'l.levered_irr_value', '>='), ('max_irr', 'l.levered_irr_value', '<='),
+        ('min_moic', 'l.levered_moic_value', '>='), ('max_moic', 'l.levered_moic_value', '<='),
+    ):
+        raw = args.get(arg)
+        if raw not in (None, ''):
+            params[arg] = float(raw)
+            clauses.append(f"{column} {op} :{arg}")
+    if args.get('model_type_id'):
+        params['model_type_id'] = str(uuid.UUID(args.get('model_type_id')))
+        clauses.append("m.model_type_id = CAST(:model_type_id AS UUID)")
+    if args.get('tag'):
+        params['tag'] = args.get('tag')
+        clauses.append(
+            "EXISTS (SELECT 1 FROM model_tags t WHERE t.user_model_id = m.id AND t.status = 'active' AND t.tag_name = :tag)"
+        )
+    if args.get('active') in ('true', 'false'):
+        params['active'] = args.get('active') == 'true'
+        clauses.append("m.active = :active")
+    return " AND ".join(clauses), params
+
+
+def _own_user_id():
+    """(user_id, None) for the signed-in user, or (None, error response) when missing or another user's id is asked for."""
+    user_obj = current_internal_user()
+    if not user_obj:
+        return None, (jsonify({'error': 'User not found'}), 401)
+    requested = request.args.get('user_id')
+    if requested and requested.strip().lower() != str(user_obj.id).lower():
+        return None, (jsonify({'error': "Forbidden: cannot read another user's models"}), 403)
+    return str(user_obj.id), None
+
+
+@model_bp.route('/user_models/portfolio', methods=['GET'])
+@cross_origin(origins=origins, supports_credentials=True)
+@requires_auth
+def get_user_models_portfolio():
+    """
+    Filter, sort and aggregate a user's deals on the latest version's IRR/MOIC, all in SQL.
+
+    Scoped to the signed-in user (a user_id param, if sent, must be theirs).
+    Query params: min_irr, max_irr, min_moic, max_moic, model_type_id, tag, active,
+    sort (irr|moic|name|updated_at), order (asc|desc), limit, offset,
+    group_by (user|model_type|tag), percentiles (comma-separated fractions, default 0.25,0.5,0.75).
+    """
+    session = get_session()
+    try:
+        user_id, denied = _own_user_id()
+        if denied:
+            return denied
+        try:
+            filters, params = _portfolio_filters(request.args)
+            limit = min(int(request.args.get('limit', 100)), 500)
+            offset = max(int(request.args.get('offset', 0)), 0)
+            percentiles = [float(p) for p in (request.args.get('percentiles') or '0.25,0.5,0.75').split(',') if p.strip()]
+        except ValueError as e:
+            return jsonify({'error': f'Invalid parameter: {e}'}), 400
+        if any(p < 0 or p > 1 for p in percentiles):
+            return jsonify({'error': 'Percentiles must be between 0 and 1'}), 400
+
+        sort_column = PORTFOLIO_SORT_COLUMNS.get(request.args.get('sort', 'irr'))
+        if not sort_column:
+            return jsonify({'error': f"sort must be one of {sorted(PORTFOLIO_SORT_COLUMNS)}"}), 400
+        order = 'ASC' if request.args.get('order', 'desc').lower() == 'asc' else 'DESC'
+        group_key, group_join = PORTFOLIO_GROUPS.get(request.args.get('group_by', 'user'), (None, None))
+        if group_key is None:
+            return jsonify({'error': f"group_by must be one of {sorted(PORTFOLIO_GROUPS)}"}), 400
+
+        params.update({'user_id': user_id, 'limit': limit, 'offset': offset, 'percentiles': percentiles})
+        cte = PORTFOLIO_DEALS_CTE.format(filters=filters)
+
+        rows = session.execute(text(
+            cte + f"SELECT *, COUNT(*) OVER () AS total FROM deals "
+                  f"ORDER BY {sort_column} {order} NULLS LAST, id LIMIT :limit OFFSET :offset"
+        ), params).mappings().all()
+
+        stats_rows = session.execute(text(
+            cte + f"""
+            SELECT {group_key} AS group_key,
+                   COUNT(*) AS deal_count,
+                   COUNT(d.levered_irr_value) AS irr_count,
+                   AVG(d.levered_irr_value) AS irr_avg,
+                   MIN(d.levered_irr_value) AS irr_min,
+                   MAX(d.levered_irr_value) AS irr_max,
+                   percentile_cont(CAST(:percentiles AS FLOAT8[])) WITHIN GROUP (ORDER BY d.levered_irr_value) AS irr_percentiles,
+                   COUNT(d.levered_moic_value) AS moic_count,
+                   AVG(d.levered_moic_value) AS moic_avg,
+                   MIN(d.levered_moic_value) AS moic_min,
+                   MAX(d.levered_moic_value) AS moic_max,
+                   percentile_cont(CAST(:percentiles AS FLOAT8[])) WITHIN GROUP (ORDER BY d.levered_moic_value) AS moic_percentiles
+            FROM deals d {group_join}
+            GROUP BY 1
+            ORDER BY 1
+            """
+        ), params).mappings().all()
+
+        def _stats(row, metric):
+            values = row[f'{metric}_percentiles'] or []
+            return {
+                'count': row[f'{metric}_count'],
+                'avg': row[f'{metric}_avg'],
+                'min': row[f'{metric}_min'],
+                'max': row[f'{metric}_max'],
+                'percentiles': {str(p): v for p, v in zip(percentiles, values)},
+            }
+
+        return jsonify({
+            'total': rows[0]['total'] if rows else 0,
+            'limit': limit,
+            'offset': offset,
+            'deals': [{
+                'id': str(r['id']),
+                'name': r['name'],
+                'street_address': r['street_address'],
+                'city': r['city'],
+                'state': r['state'],
+                'zip_code': r['zip_code'],
+                'active': r['active'],
+                'model_type_id': str(r['model_type_id']),
+                'model_type': r['model_type'],
+                'version_id': str(r['version_id']),
+                'version_number': r['version_number'],
+                'updated_at': r['version_created_at'].isoformat() if r['version_created_at'] else None,
+                'levered_irr': r['levered_irr'],
+                'levered_moic': r['levered_moic'],
+                'levered_irr_value': r['levered_irr_value'],
+                'levered_moic_value': r['levered_moic_value'],
+            } for r in rows],
+            'group_by': request.args.get('group_by', 'user'),
+            'stats': [{
+                'group': s['group_key'],
+                'deal_count': s['deal_count'],
+                'irr': _stats(s, 'irr'),
+                'moic': _stats(s, 'moic'),
+            } for s in stats_rows],
+        }), 200
+    except Exception as e:
+        print(f"❌ [GET /user_models/portfolio] error: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        session.close()
+
+
+
+
+@model_bp.route('/user_models/search', methods=['GET'])
+@cross_origin(origins=origins, supports_credentials=True)
+@requires_auth
+def search_user_models_route():
+    """
+    Ranked search over a user's deals: name, address, active tags, latest-version tenant names and notes.
+
+    Scoped to the signed-in user (a user_id param, if sent, must be theirs).
+    Query params: q (required), limit (default 20, max 100), offset, include_inactive.
+    Terms are prefix-matched; trigram word similarity also catches typos and partial words.
+    """
+    session = get_read_session()
+    try:
+        user_id, denied = _own_user_id()
+        if denied:
+            return denied
+        q = (request.args.get('q') or '').strip()
+        if not q:
+            return jsonify({'error': 'Query parameter "q" is required'}), 400
+        try:
+            limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+            offset = max(int(request.args.get('offset', 0)), 0)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid parameter: {e}'}), 400
+        include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
+
+        started = time.monotonic()
+        total, rows = search_user_models(session, user_id, q[:200], limit, offset, include_inactive)
+        return jsonify({
+            'query': q,
+            'total': total,
+            'limit': limit,
+            'offset': offset,
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+            'results': [{
+                'id': str(r.user_model_id),
+                'name': r.name,
+                'street_address': r.street_address,
+                'city': r.city,
+                'state': r.state,
+                'zip_code': r.zip_code,
+                'active': r.active,
+                'model_type': r.model_type_name,
+                'updated_at': r.updated_at.isoformat() if r.updated_at else None,
+                'rank': round(float(r.rank), 4),
+                'snippet': r.snippet,
+            } for r in rows],
+        }), 200
+    except Exception as e:
+        print(f"❌ [GET /user_models/search] error: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        session.close()
+
 
 @model_bp.route('/user_models/<uuid:user_model_id>/tags', methods=['POST'])
 @cross_origin(origins=origins, supports_credentials=True)
@@ -1918,6 +2191,7 @@ def update_model_type_google_sheet(model_type_id):
 
             # Update model type with Google Sheet URL
             model_type.google_sheet_url = google_sheet_url
+            bump_schema_version(session, model_type_id=model_type.id)
             session.commit()
 
             return jsonify({
@@ -1944,75 +2218,71 @@ def update_model_type_google_sheet(model_type_id):
 def generate_sheet(model_type_id):
     session = get_session()
     try:
-        print(f"🔧 [DEBUG] Starting generate_sheet for model_type_id: {model_type_id}")
+        logger.debug("Starting generate_sheet for model_type_id: %s", model_type_id)
         
         # Retrieve the template file ID from the model type
         model_type = session.query(ModelType).get(model_type_id)
         if not model_type:
-            print(f"❌ [DEBUG] Model type not found: {model_type_id}")
+            logger.warning("Model type not found: %s", model_type_id)
             return jsonify({'error': 'Model type not found'}), 404
             
         if not model_type.google_sheet_url:
-            print(f"❌ [DEBUG] Google Sheet URL not found for model type: {model_type_id}")
+            logger.warning("Google Sheet URL not found for model type: %s", model_type_id)
             return jsonify({'error': 'Google Sheet URL not found for this model type'}), 404
 
-        print(f"✅ [DEBUG] Found model type: {model_type.name}")
-        print(f"🔗 [DEBUG] Google Sheet URL: {model_type.google_sheet_url}")
+        logger.debug("Found model type: %s", model_type.name)
+        logger.debug("Google Sheet URL: %s", model_type.google_sheet_url)
 
         # Extract template file ID from the Google Sheet URL
         match = re.search(r'/d/([a-zA-Z0-9-_]+)', model_type.google_sheet_url)
         if not match:
-            print(f"❌ [DEBUG] Invalid Google Sheet URL format: {model_type.google_sheet_url}")
+            logger.warning("Invalid Google Sheet URL format: %s", model_type.google_sheet_url)
             return jsonify({'error': 'Invalid Google Sheet URL format'}), 400
 
         template_file_id = match.group(1)
-        print(f"🆔 [DEBUG] Extracted template file ID: {template_file_id}")
+        logger.debug("Extracted template file ID: %s", template_file_id)
 
         # Retrieve user_model data from the request
         data = request.get_json()
-        print(f"📄 [DEBUG] Request data: {data}")
+        logger.debug("Request data: %s", summarize(data))
         
         user_id = data.get('user_id')
         user_model_field_values = data.get('user_model_field_values', [])
 
         if not user_id:
-            print(f"❌ [DEBUG] User ID not provided in request")
+            logger.warning("User ID not provided in request")
             return jsonify({'error': 'User ID is required'}), 400
 
-        print(f"👤 [DEBUG] User ID: {user_id}")
+        logger.debug("User ID: %s", user_id)
 
         # Query the user's email using the user_id
         user = session.query(User).get(user_id)
         if not user:
-            print(f"❌ [DEBUG] User not found: {user_id}")
+            logger.warning("User not found: %s", user_id)
             return jsonify({'error': 'User not found'}), 404
             
         if not user.email:
-            print(f"❌ [DEBUG] User email not available: {user_id}")
+            logger.warning("User email not available: %s", user_id)
             return jsonify({'error': 'User email not available'}), 404
 
         user_email = user.email
-        print(f"📧 [DEBUG] User email: {user_email}")
+        logger.debug("User email: %s", user_email)
 
         # Generate the Google Sheet using the user's email and other data
-        print(f"🚀 [DEBUG] Calling generate_google_sheet_for_user_model...")
+        logger.debug("Calling generate_google_sheet_for_user_model...")
         try:
             sheet_url = generate_google_sheet_for_user_model(
                 user_email=user_email,
                 template_file_id=template_file_id
             )
-            print(f"✅ [DEBUG] Successfully generated sheet URL: {sheet_url}")
+            logger.debug("Successfully generated sheet URL: %s", sheet_url)
             return jsonify({"sheet_url": sheet_url}), 200
         except Exception as google_error:
-            print(f"❌ [DEBUG] Error in generate_google_sheet_for_user_model: {str(google_error)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in generate_google_sheet_for_user_model: %s", google_error, exc_info=True)
             return jsonify({"error": f"Google Sheet generation failed: {str(google_error)}"}), 500
             
     except Exception as e:
-        print(f"❌ [DEBUG] Exception in generate_sheet: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Exception in generate_sheet: %s", e, exc_info=True)
         return jsonify({"error": str(e)}), 500
     finally:
         session.close()
@@ -2023,9 +2293,9 @@ def generate_sheet(model_type_id):
 def generate_sensitivity_analysis():
     session = get_session()
     try:
-        print("🔧 [DEBUG] Starting sensitivity analysis generation...")
+        logger.debug("Starting sensitivity analysis generation...")
         data = request.get_json()
-        print(f"📄 [DEBUG] Request data: {data}")
+        logger.debug("Request data: %s", summarize(data))
 
         google_sheet_url = data.get('google_sheet_url')
         max_price = data.get('max_price')
@@ -2063,7 +2333,8 @@ def generate_sensitivity_analysis():
         if not match:
             return jsonify({'error': 'Invalid Google Sheet URL format'}), 400
         sheet_id = match.group(1)
-        print(f"🆔 [DEBUG] Extracted sheet ID: {sheet_id}")
+        logger.debug("Extracted sheet ID: %s", sheet_id)
+        release_connection(session)
 
         # Run analysis
         try:
@@ -2072,16 +2343,14 @@ def generate_sensitivity_analysis():
                 max_price=float(max_price),
                 min_cap_rate=float(min_cap_rate)
             )
-            print(f"✅ [DEBUG] Successfully generated sensitivity analysis")
+            logger.debug("Successfully generated sensitivity analysis")
             # Save results
             if user_model_version:
                 user_model_version.sensitivity_tables = result
                 session.commit()
             return jsonify(result), 200
         except Exception as analysis_error:
-            print(f"❌ [DEBUG] Error in sensitivity analysis: {str(analysis_error)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in sensitivity analysis: %s", analysis_error, exc_info=True)
             # Reset generating flag to allow retries
             if user_model_version:
                 user_model_version.sensitivity_tables = None
@@ -2089,9 +2358,7 @@ def generate_sensitivity_analysis():
             return jsonify({"error": f"Sensitivity analysis failed: {str(analysis_error)}"}), 500
 
     except Exception as e:
-        print(f"❌ [DEBUG] Exception in sensitivity analysis: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Exception in sensitivity analysis: %s", e, exc_info=True)
         return jsonify({"error": str(e)}), 500
     finally:
         session.close()
@@ -2120,7 +2387,7 @@ def download_worksheet(version_id):
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
 
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj:
             return jsonify({'error': 'User not found'}), 401
         current_user_id = user_obj.id
@@ -2128,19 +2395,26 @@ def download_worksheet(version_id):
         # Fetch the user_model_version and its user_model to check ownership
         user_model_version = session.query(UserModelVersion).get(version_id)
         if user_model_version is None:
-            print(f"❌ [DEBUG] UserModelVersion not found for id: {version_id}")
+            logger.warning("UserModelVersion not found for id: %s", version_id)
             return jsonify({'error': 'User model version not found'}), 404
 
         user_model = session.query(UserModel).get(user_model_version.user_model_id)
         if user_model is None:
-            print(f"❌ [DEBUG] UserModel not found for id: {user_model_version.user_model_id}")
+            logger.warning("UserModel not found for id: %s", user_model_version.user_model_id)
             return jsonify({'error': 'User model not found'}), 404
 
         # user_model.user_id is UUID, current_user_id may be str or UUID
         if str(user_model.user_id) != str(current_user_id):
             return jsonify({'error': 'Forbidden: user does not own this model'}), 403
 
-        print(f"🔽 [DEBUG] Download worksheet endpoint called for version_id: {version_id}")
+        # development_model lives on ModelType, not UserModel
+        model_type = session.query(ModelType).filter_by(id=user_model.model_type_id).first()
+        development_model = bool(getattr(model_type, "development_model", False)) if model_type else False
+        google_sheet_url = user_model_version.google_sheet_url
+        # Everything below is Sheets/Drive work; don't hold a pooled connection through the export
+        release_connection(session)
+
+        logger.debug("Download worksheet endpoint called for version_id: %s", version_id)
         # Optional: accept notes from POST body
         payload = None
         try:
@@ -2155,18 +2429,18 @@ def download_worksheet(version_id):
         if notes_payload is not None:
             try:
                 # Keep a brief log for debugging; extend to persist/use as needed
-                print(f"📝 [DEBUG] Received {len(notes_payload) if hasattr(notes_payload,'__len__') else 'some'} notes with download request")
+                logger.debug("Received %s notes with download request", len(notes_payload) if hasattr(notes_payload,'__len__') else 'some')
             except Exception:
-                print("📝 [DEBUG] Received notes payload with download request")
+                logger.debug("Received notes payload with download request")
 
-        print(f"✅ [DEBUG] Found UserModelVersion: {user_model_version}")
-        print(f"🔗 [DEBUG] Google Sheet URL: {user_model_version.google_sheet_url}")
+        logger.debug("Found UserModelVersion: %s", version_id)
+        logger.debug("Google Sheet URL: %s", google_sheet_url)
 
         try:
-            sheet_id = user_model_version.google_sheet_url.split('/d/')[1].split('/')[0]
-            print(f"🆔 [DEBUG] Extracted Google Sheet ID: {sheet_id}")
+            sheet_id = google_sheet_url.split('/d/')[1].split('/')[0]
+            logger.debug("Extracted Google Sheet ID: %s", sheet_id)
         except Exception as e:
-            print(f"❌ [DEBUG] Failed to extract sheet_id from URL: {user_model_version.google_sheet_url}")
+            logger.warning("Failed to extract sheet_id from URL: %s", google_sheet_url)
             traceback.print_exc()
             return jsonify({'error': 'Invalid Google Sheet URL format'}), 400
 
@@ -2217,14 +2491,11 @@ def download_worksheet(version_id):
                         print("ℹ️ Unable to remove bold format from notes range (non-fatal).")
                 notes_elapsed_ms = (time.perf_counter() - t_notes) * 1000
         except Exception as e:
-            print(f"⚠️ [DEBUG] Failed to write notes to sheet: {e}")
+            logger.warning("Failed to write notes to sheet: %s", e)
             # Continue anyway; export will still proceed
 
         t_export = time.perf_counter()
         try:
-            # development_model lives on ModelType, not UserModel
-            model_type = session.query(ModelType).filter_by(id=user_model.model_type_id).first()
-            development_model = bool(getattr(model_type, "development_model", False)) if model_type else False
             response = export_google_sheet(
                 sheet_id,
                 filename="worksheet_export.xlsx",
@@ -2232,11 +2503,8 @@ def download_worksheet(version_id):
             )
         except Exception as e:
             export_elapsed_ms = (time.perf_counter() - t_export) * 1000
-            print(
-                f"❌ [DEBUG] Failed to export Google Sheet for sheet_id={sheet_id} "
-                f"after {export_elapsed_ms:.0f}ms: {e}"
-            )
-            traceback.print_exc()
+            logger.error("Failed to export Google Sheet for sheet_id=%s after %.0fms: %s",
+                         sheet_id, export_elapsed_ms, e, exc_info=True)
             return jsonify({'error': f'Failed to export Google Sheet: {str(e)}'}), 500
 
         export_elapsed_ms = (time.perf_counter() - t_export) * 1000
@@ -2245,12 +2513,13 @@ def download_worksheet(version_id):
             f"⏱️ [download_worksheet] version_id={version_id} "
             f"notes_write_ms={notes_elapsed_ms:.0f} export_ms={export_elapsed_ms:.0f} total_ms={total_ms:.0f}"
         )
-        print("⬇️ [DEBUG] Sending file to client.")
+        logger.debug("Sending file to client.")
         return response
     except Exception as e:
-        print(f"❌ [DEBUG] Exception in download_worksheet: {str(e)}")
-        traceback.print_exc()
+        logger.error("Exception in download_worksheet: %s", e, exc_info=True)
         return jsonify({'error': str(e)}), 500
+    finally:
+        session.close()
 
 @model_bp.route('/model_type_section_fields/<uuid:field_id>', methods=['PUT', 'PATCH'])
 @cross_origin(origins=origins, supports_credentials=True)
@@ -2281,8 +2550,10 @@ def update_model_type_section_field(field_id):
             field.time_phased = data['time_phased']
         if 'order' in data:
             field.order = data['order']
-        if 'section_id' in data:
+        bump_schema_version(session, section_id=field.section_id)
+        if 'section_id' in data and str(data['section_id']) != str(field.section_id):
             field.section_id = data['section_id']
+            bump_schema_version(session, section_id=data['section_id'])
 
         session.commit()
         return jsonify({'message': 'ModelTypeSectionField updated successfully'}), 200
@@ -2318,6 +2589,7 @@ def create_model_type_section_field():
             order=data.get('order', 0)
         )
         session.add(new_field)
+        bump_schema_version(session, section_id=data['section_id'])
         session.commit()
 
         return jsonify({'message': 'ModelTypeSectionField created successfully', 'id': str(new_field.id)}), 201
@@ -2339,6 +2611,7 @@ def delete_model_type_section_field(field_id):
 
         # Only set 'active' to False instead of deleting
         field.active = False
+        bump_schema_version(session, section_id=field.section_id)
         session.commit()
 
         return jsonify({'message': 'ModelTypeSectionField set to inactive'}), 200
@@ -2365,6 +2638,7 @@ def delete_model_type_section(section_id):
 
         # Instead of deleting, set 'active' to False
         section.active = False
+        bump_schema_version(session, model_type_id=section.model_type_id)
         session.commit()
 
         return jsonify({'message': 'ModelTypeSection set to inactive'}), 200
@@ -2393,6 +2667,7 @@ def create_model_type_section():
             order=data.get('order', 0)
         )
         session.add(new_section)
+        bump_schema_version(session, model_type_id=data['model_type_id'])
         session.commit()
 
         return jsonify({
@@ -2422,6 +2697,7 @@ def update_model_type_section(section_id):
         if 'order' in data:
             section.order = data['order']
 
+        bump_schema_version(session, model_type_id=section.model_type_id)
         session.commit()
         return jsonify({'message': 'ModelTypeSection updated successfully'}), 200
     except Exception as e:
@@ -2461,7 +2737,7 @@ def set_user_model_active(user_model_id):
 @cross_origin(origins=origins, supports_credentials=True)
 @requires_auth
 def admin_list_users():
-    session = get_session()
+    session = get_read_session()
     try:
         users = session.query(User).all()
         data = []
@@ -2543,7 +2819,7 @@ def create_model_note(user_model_id):
         auth0_user_id = current_user.get("sub") if current_user and "sub" in current_user else None
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj:
             return jsonify({'error': 'User not found'}), 401
 
@@ -2587,7 +2863,7 @@ def list_model_notes(user_model_id):
         auth0_user_id = current_user.get("sub") if current_user and "sub" in current_user else None
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj:
             return jsonify({'error': 'User not found'}), 401
 
@@ -2641,7 +2917,7 @@ def update_model_note(note_id):
         auth0_user_id = current_user.get("sub") if current_user and "sub" in current_user else None
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj:
             return jsonify({'error': 'User not found'}), 401
         if str(user_model.user_id) != str(user_obj.id):
@@ -2684,7 +2960,7 @@ def remove_model_note(note_id):
         auth0_user_id = current_user.get("sub") if current_user and "sub" in current_user else None
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj:
             return jsonify({'error': 'User not found'}), 401
         if str(user_model.user_id) != str(user_obj.id):
@@ -2719,7 +2995,7 @@ def create_issue():
         auth0_user_id = current_user.get("sub") if current_user and "sub" in current_user else None
         if not auth0_user_id:
             return jsonify({'error': 'User not authenticated'}), 401
-        user_obj = session.query(User).filter_by(auth0_user_id=auth0_user_id).first()
+        user_obj = current_internal_user()
         if not user_obj:
             return jsonify({'error': 'User not found'}), 401
 
@@ -2743,7 +3019,7 @@ def create_issue():
 @cross_origin(origins=origins, supports_credentials=True)
 @requires_auth
 def list_issues():
-    session = get_session()
+    session = get_read_session()
     try:
         q = session.query(Issue, User).join(User, Issue.user_id == User.id).order_by(Issue.created_at.desc())
         rows = q.all()
@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app as app, g
 from flask_cors import cross_origin
-from app.db import db
+from app.db import db, get_session, release_connection
 from app.models.user import User, UserInfo, CompanyInfo
 from sqlalchemy import or_
 from sqlalchemy.exc import IntegrityError
 from app.auth import requires_auth
+from app.services.subscription_state import schedule_refresh
+from app.utils.image_fetch import fetch_image
+from app.services.image_renditions import renditions_available, schedule_logo_renditions, parse_size, pick_rendition
 import traceback
 from sqlalchemy.orm import Session
 import os
@@ -25,50 +28,8 @@ user_bp = Blueprint('user', __name__)
 origins = os.getenv("CORS_ALLOWED_ORIGINS", "").split(",")
 stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
 
-def get_session():
-    with app.app_context():
-        return Session(db.engine)
 
 
-def refresh_user_subscription_from_stripe(session: Session, user: User) -> bool:
-    """
-    Best-effort refresh of the user's subscription fields from Stripe.
-    Returns True if an update was attempted, False if skipped.
-    """
-    if not user or not user.stripe_customer_id:
-        return False
-    try:
-        lst = stripe.Subscription.list(customer=user.stripe_customer_id, limit=1)
-        sub = None
-        if getattr(lst, 'data', []):
-            try:
-                sub = stripe.Subscription.retrieve(lst.data[0].id, expand=["items.data.price"])
-            except Exception:
-                sub = lst.data[0]
-        if sub:
-            item = sub.get("items", {}).get("data", [None])[0]
-            price = item.get("price") if item else None
-            user.stripe_subscription_id = sub.get("id", user.stripe_subscription_id)
-            user.subscription_status = sub.get("status")
-            user.current_period_end = sub.get("current_period_end")
-            user.cancel_at_period_end = bool(sub.get("cancel_at_period_end"))
-            user.plan_price_id = (price or {}).get("id")
-        else:
-            user.stripe_subscription_id = None
-            user.subscription_status = None
-            user.current_period_end = None
-            user.cancel_at_period_end = None
-            user.plan_price_id = None
-        session.commit()
-        return True
-    except Exception:
-        try:
-            session.rollback()
-        except Exception:
-            pass
-        return False
-
-        
 @user_bp.before_request
 def before_request():
     pass
@@ -189,39 +150,19 @@ def company_logo_data_url():
         info = session.query(CompanyInfo).filter_by(user_id=user.id).first()
         if not info or not info.company_logo_url:
             return jsonify({'exists': False}), 200
-        url = info.company_logo_url
-        content = None
-        content_type = 'image/png'
-        # Try GCS client first
-        ok = False
+        # ?size=thumb|medium|original|<px>; PNG by default to keep transparency in exports
+        try:
+            longest = parse_size(request.args.get('size'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        url = pick_rendition(info.company_logo_renditions, info.company_logo_url, longest,
+                             request.args.get('image_format') or 'png')
+        # GCS client for bucket URLs (cached by object generation), HTTP otherwise
         try:
-            if storage is not None and url.startswith('https://storage.googleapis.com/'):
-                p = urlparse(url)
-                path = unquote(p.path.lstrip('/'))
-                # path is bucket/obj
-                parts = path.split('/', 1)
-                if len(parts) == 2:
-                    bucket_name, object_name = parts
-                    client = storage.Client()
-                    bucket = client.bucket(bucket_name)
-                    blob = bucket.blob(object_name)
-                    content = blob.download_as_bytes()
-                    content_type = blob.content_type or content_type
-                    ok = True
+            content, content_type = fetch_image(url)
         except Exception as e:
-            print(f"[company_logo/data_url] GCS download failed: {e}")
-            ok = False
-        # Fallback: HTTP GET (signed URL works server-side)
-        if not ok:
-            try:
-                r = requests.get(url, timeout=20)
-                r.raise_for_status()
-                content = r.content
-                content_type = r.headers.get('Content-Type', content_type)
-                ok = True
-            except Exception as e:
-                print(f"[company_logo/data_url] HTTP fetch failed: {e}")
-                return jsonify({'error': 'Could not fetch logo'}), 500
+            print(f"[company_logo/data_url] fetch failed: {e}")
+            return jsonify({'error': 'Could not fetch logo'}), 500
         data_url = f"data:{content_type};base64,{base64.b64encode(content).decode('ascii')}"
         return jsonify({'exists': True, 'dataUrl': data_url}), 200
     except Exception as e:
@@ -257,6 +198,7 @@ def company_info_handler():
                 'company_email': info.company_email,
                 'company_phone_number': info.company_phone_number,
                 'company_logo_url': info.company_logo_url,
+                'company_logo_rendition_status': info.company_logo_rendition_status,
                 'created_at': info.created_at.isoformat() if info.created_at else None,
                 'updated_at': info.updated_at.isoformat() if info.updated_at else None,
             }), 200
@@ -275,6 +217,9 @@ def company_info_handler():
             if 'company_phone_number' in payload:
                 info.company_phone_number = payload.get('company_phone_number')
             if 'company_logo_url' in payload:
+                if payload.get('company_logo_url') != info.company_logo_url:
+                    info.company_logo_renditions = None
+                    info.company_logo_rendition_status = None
                 info.company_logo_url = payload.get('company_logo_url')
 
             session.add(info)
@@ -358,7 +303,9 @@ def upload_company_logo():
         blob.cache_control = "public, max-age=31536000"
         content_type = file.mimetype or 'application/octet-stream'
         try:
-            blob.upload_from_file(file.stream, content_type=content_type)
+            # Keep the bytes: the rendition pool resizes from them instead of re-downloading
+            content = file.read()
+            blob.upload_from_string(content, content_type=content_type)
             print(f"[company_logo/upload] Uploaded to gs://{bucket_name}/{object_name}")
         except Exception as e:
             print(f"[company_logo/upload] upload_from_file failed: {e}")
@@ -396,12 +343,16 @@ def upload_company_logo():
         if not info:
             info = CompanyInfo(user_id=user.id)
         info.company_logo_url = str(final_url)
+        info.company_logo_renditions = None
+        info.company_logo_rendition_status = 'pending' if renditions_available() else 'unavailable'
         try:
             session.add(info)
             session.commit()
         except Exception as e:
             print(f"[company_logo/upload] DB commit failed: {e}")
             raise
+        if renditions_available():
+            schedule_logo_renditions(app._get_current_object(), info.id, bucket_name, object_name, content, make_public)
 
         return jsonify({
             'message': 'uploaded',
@@ -466,11 +417,8 @@ def check_user():
                 user = session.query(User).filter(or_(User.email == email, User.auth0_user_id == auth0_user_id)).first()
                 if not user:
                     raise
-                # Refresh from Stripe if we already have a customer
-                try:
-                    refresh_user_subscription_from_stripe(session, user)
-                except Exception:
-                    pass
+                # Stored subscription state is webhook-fed; refresh from Stripe in the background if stale
+                schedule_refresh(app._get_current_object(), user)
                 return jsonify({
                     'message': 'User exists',
                     'id': str(user.id),
@@ -484,11 +432,8 @@ def check_user():
                     'plan_price_id': user.plan_price_id,
                     'plan_tier': user.plan_tier or 'freemium'
                 }), 200
-        # Refresh from Stripe on login if we have a customer id
-        try:
-            refresh_user_subscription_from_stripe(session, user)
-        except Exception:
-            pass
+        # Stored subscription state is webhook-fed; refresh from Stripe in the background if stale
+        schedule_refresh(app._get_current_object(), user)
         return jsonify({
             'message': 'User exists',
             'id': str(user.id),
@@ -1,28 +1,37 @@
 import gspread
-from googleapiclient.discovery import build
 from google.oauth2.service_account import Credentials
 from pathlib import Path
 from collections import defaultdict
-import pandas as pd
 from flask import send_file
 import io
 import uuid
 import tempfile
-import ezodf
 import os
 import sys
 import time
-import gspread.utils
-from gspread.utils import rowcol_to_a1
 from google.auth import default
 from dotenv import load_dotenv
-from googleapiclient.errors import HttpError
-import openpyxl
-from openpyxl import load_workbook
 import google.auth.transport.requests
 import requests
-from gspread.utils import a1_to_rowcol, rowcol_to_a1
-from gspread_formatting import CellFormat, NumberFormat, format_cell_range
+from app.utils.a1 import column_letter, column_letters, column_index, parse_a1, to_a1, GridRange
+from app.services.sheets_concurrency import execute_all, batch_get_values
+from app.services.sheets_batch import dispatch_batch_update, dispatch_values_update
+from app.services.sheet_plan import SheetSnapshot, build_plan, remember_mapping, cached_mapping
+from app.utils.model_mapping import ModelVariableMapping
+from app.utils.logs import summarize
+import logging
+
+logger = logging.getLogger(__name__)
+
+# openpyxl, gspread_formatting and the googleapiclient discovery machinery are imported
+# inside the functions that use them, so routes that never touch a spreadsheet
+# (and worker boot) don't pay for them. Keep it that way: check_import_budget.py.
+
+
+def build(*args, **kwargs):
+    """googleapiclient.discovery.build, imported on first use."""
+    from googleapiclient.discovery import build as discovery_build
+    return discovery_build(*args, **kwargs)
 
 load_dotenv()
 
@@ -44,216 +53,238 @@ PARENT_FOLDER_ID = os.getenv("GOOGLE_PARENT_FOLDER_ID")
 PARENT_FOLDER_ID = '14dBWRN-2ItiRLRy9HWfy1U3oF_p7MzPt'
 # PARENT_FOLDER_ID = '1xoc6MuOW8ULr3PIucwoEhG0hwpWeIxdk'
 
-# Long-timeout transport for Sheets API (avoids "read operation timed out" on batchGet)
-SHEETS_LONG_TIMEOUT_TRANSPORT = None
+# Google clients are built lazily on first use (see google_clients), so importing this
+# module does no credential lookups or network I/O. check_google_access is the opt-in
+# readiness probe that replaces the old import-time SSL test.
+import ssl
+import threading
+import urllib3
+from google.auth.transport.requests import AuthorizedSession
+
+# Disable SSL warnings for cleaner logs
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# Set environment variables for better SSL handling
+os.environ['HTTPLIB2_DEBUG'] = '0'  # Disable httplib2 debug logging
+
+# Additional SSL environment variables to help with handshake issues
+os.environ['SSL_CERT_FILE'] = ''
+os.environ['SSL_CERT_DIR'] = ''
+
+
+# BEST PRACTICE: Create a custom HTTP transport using requests/urllib3 instead of httplib2
+class RequestsTransport:
+    def __init__(self, credentials):
+        self.session = AuthorizedSession(credentials)
+        # Configure session with modern SSL settings
+        self.session.timeout = 60
+        self.session.verify = True
+
+        # Configure urllib3 with better SSL settings
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=urllib3.Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[500, 502, 503, 504]
+            )
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
-def _set_sheets_long_timeout_transport(transport):
-    global SHEETS_LONG_TIMEOUT_TRANSPORT
-    SHEETS_LONG_TIMEOUT_TRANSPORT = transport
+    def request(self, uri, method="GET", **kwargs):
+        try:
+            # Map httplib2 parameters to requests parameters
+            requests_kwargs = {}
 
-# Determine environment: Use local creds if file is specified, otherwise use default (Cloud Run, GCP, etc.)
-try:
-    if SERVICE_ACCOUNT_FILE and os.path.exists("./" + SERVICE_ACCOUNT_FILE):
-        print("🔑 Using local service account credentials. (gdrive)")
-        print(f"📁 Service account file path: ./{SERVICE_ACCOUNT_FILE}")
-        creds = Credentials.from_service_account_file("./" + SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    else:
-        print("🔐 Using default GCP credentials (Cloud Run). (gdrive)")
-        print(f"📁 SERVICE_ACCOUNT_FILE env var: {SERVICE_ACCOUNT_FILE}")
-        creds, _ = default(scopes=SCOPES)
-    
-    print("✅ Credentials initialized successfully")
-    
-    # Configure modern HTTP transport using requests/urllib3 instead of httplib2
-    import ssl
-    
-    # BEST PRACTICE: Create a custom HTTP transport using requests/urllib3 instead of httplib2
-    import requests
-    import urllib3
-    import ssl
-    from google.auth.transport.requests import AuthorizedSession
-    
-    # Disable SSL warnings for cleaner logs
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-    
-    # Create a custom HTTP transport class that bypasses httplib2 completely
-    class RequestsTransport:
-        def __init__(self, credentials):
-            self.session = AuthorizedSession(credentials)
-            # Configure session with modern SSL settings
-            self.session.timeout = 60
-            self.session.verify = True
-            
-            # Configure urllib3 with better SSL settings
-            adapter = requests.adapters.HTTPAdapter(
-                pool_connections=10,
-                pool_maxsize=10,
-                max_retries=urllib3.Retry(
-                    total=3,
-                    backoff_factor=0.5,
-                    status_forcelist=[500, 502, 503, 504]
-                )
-            )
-            self.session.mount('https://', adapter)
-            self.session.mount('http://', adapter)
-            
-        def request(self, uri, method="GET", **kwargs):
-            try:
-                # Map httplib2 parameters to requests parameters
-                requests_kwargs = {}
-                
-                # Handle body parameter (httplib2 uses 'body', requests uses 'data')
-                if 'body' in kwargs:
-                    requests_kwargs['data'] = kwargs.pop('body')
-                
-                # Handle headers
-                if 'headers' in kwargs:
-                    requests_kwargs['headers'] = kwargs.pop('headers')
-                
-                # Handle any other parameters
-                requests_kwargs.update(kwargs)
-                
-                response = self.session.request(method, uri, **requests_kwargs)
-                
-                # Return tuple format that httplib2 expects: (response_object, content)
-                # The response object needs to have a 'status' attribute
-                class ResponseObject:
-                    def __init__(self, status_code):
-                        self.status = status_code
-                        self.reason = "OK" if status_code == 200 else "Error"
-                
-                return ResponseObject(response.status_code), response.content
-            except Exception as e:
-                # Convert requests exceptions to httplib2-like format
-                raise Exception(f"Request failed: {str(e)}")
-                
-        def close(self):
-            self.session.close()
-
-    # Transport with configurable timeout for long-running Sheets batchGet (many ranges)
-    class RequestsTransportWithTimeout:
-        def __init__(self, credentials, timeout_seconds=180):
-            self._session = AuthorizedSession(credentials)
-            self._session.verify = True
-            self._timeout = timeout_seconds
-            adapter = requests.adapters.HTTPAdapter(
-                pool_connections=10,
-                pool_maxsize=10,
-                max_retries=urllib3.Retry(
-                    total=3,
-                    backoff_factor=0.5,
-                    status_forcelist=[500, 502, 503, 504]
-                )
+            # Handle body parameter (httplib2 uses 'body', requests uses 'data')
+            if 'body' in kwargs:
+                requests_kwargs['data'] = kwargs.pop('body')
+
+            # Handle headers
+            if 'headers' in kwargs:
+                requests_kwargs['headers'] = kwargs.pop('headers')
+
+            # Handle any other parameters
+            requests_kwargs.update(kwargs)
+
+            response = self.session.request(method, uri, **requests_kwargs)
+
+            # Return tuple format that httplib2 expects: (response_object, content)
+            # The response object needs to have a 'status' attribute
+            class ResponseObject:
+                def __init__(self, status_code):
+                    self.status = status_code
+                    self.reason = "OK" if status_code == 200 else "Error"
+
+            return ResponseObject(response.status_code), response.content
+        except Exception as e:
+            # Convert requests exceptions to httplib2-like format
+            raise Exception(f"Request failed: {str(e)}")
+
+    def close(self):
+        self.session.close()
+
+
+# Transport with configurable timeout for long-running Sheets batchGet (many ranges)
+class RequestsTransportWithTimeout:
+    def __init__(self, credentials, timeout_seconds=180):
+        self._session = AuthorizedSession(credentials)
+        self._session.verify = True
+        self._timeout = timeout_seconds
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=urllib3.Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[500, 502, 503, 504]
             )
-            self._session.mount('https://', adapter)
-            self._session.mount('http://', adapter)
+        )
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
 
-        def request(self, uri, method="GET", **kwargs):
-            try:
-                requests_kwargs = {}
-                if 'body' in kwargs:
-                    requests_kwargs['data'] = kwargs.pop('body')
-                if 'headers' in kwargs:
-                    requests_kwargs['headers'] = kwargs.pop('headers')
-                requests_kwargs.setdefault('timeout', self._timeout)
-                requests_kwargs.update(kwargs)
-                response = self._session.request(method, uri, **requests_kwargs)
-                class ResponseObject:
-                    def __init__(self, status_code):
-                        self.status = status_code
-                        self.reason = "OK" if status_code == 200 else "Error"
-                return ResponseObject(response.status_code), response.content
-            except Exception as e:
-                raise Exception(f"Request failed: {str(e)}")
+    def request(self, uri, method="GET", **kwargs):
+        try:
+            requests_kwargs = {}
+            if 'body' in kwargs:
+                requests_kwargs['data'] = kwargs.pop('body')
+            if 'headers' in kwargs:
+                requests_kwargs['headers'] = kwargs.pop('headers')
+            requests_kwargs.setdefault('timeout', self._timeout)
+            requests_kwargs.update(kwargs)
+            response = self._session.request(method, uri, **requests_kwargs)
+            class ResponseObject:
+                def __init__(self, status_code):
+                    self.status = status_code
+                    self.reason = "OK" if status_code == 200 else "Error"
+            return ResponseObject(response.status_code), response.content
+        except Exception as e:
+            raise Exception(f"Request failed: {str(e)}")
 
-        def close(self):
-            self._session.close()
+    def close(self):
+        self._session.close()
 
-    # Create our custom transport
-    custom_transport = RequestsTransport(creds)
-    _set_sheets_long_timeout_transport(RequestsTransportWithTimeout(creds, timeout_seconds=180))
 
-    # Test the credentials by building the services with custom transport
-    gs_client = gspread.authorize(creds)
-    
-    # Build services with custom transport (bypassing httplib2 completely)
-    drive_service = build('drive', 'v3', http=custom_transport)
-    sheets_service = build('sheets', 'v4', http=custom_transport)
-    
-    # Test SSL connection to Google APIs using our custom transport
-    try:
-        print("🔍 Testing SSL connection to Google APIs...")
-        status_code, content = custom_transport.request('GET', 'https://www.googleapis.com/discovery/v1/apis')
-        print(f"✅ SSL test successful: {status_code}")
-    except Exception as e:
-        print(f"⚠️ SSL test failed: {str(e)}")
-        print("🔧 This might indicate network or SSL configuration issues")
-    
-    # Set environment variables for better SSL handling
-    os.environ['PYTHONHTTPSVERIFY'] = '1'
-    os.environ['HTTPLIB2_DEBUG'] = '0'  # Disable httplib2 debug logging
-    os.environ['OPENSSL_CONF'] = ''  # Use system OpenSSL configuration
-    
-    # Additional SSL environment variables to help with handshake issues
-    os.environ['SSL_CERT_FILE'] = ''
-    os.environ['SSL_CERT_DIR'] = ''
-    
-    print("🔧 SSL Configuration:")
-    print(f"   - OpenSSL Version: {ssl.OPENSSL_VERSION}")
-    print(f"   - Python HTTPS Verify: {os.environ.get('PYTHONHTTPSVERIFY', 'Not set')}")
-    print(f"   - Requests Version: {requests.__version__}")
-    print(f"   - urllib3 Version: {urllib3.__version__}")
-    print(f"   - Using BEST PRACTICE: requests/urllib3 transport (bypassing httplib2)")
-    print(f"   - SSL errors should be eliminated with modern transport")
-    
-    print("✅ Google services built successfully")
-    
-except Exception as e:
-    print(f"❌ Error initializing Google credentials: {str(e)}")
-    import traceback
-    traceback.print_exc()
-    raise
+class GoogleClients:
+    """Credentials, transports and API clients for the service account, built together."""
 
+    def __init__(self):
+        # Determine environment: Use local creds if file is specified, otherwise use default (Cloud Run, GCP, etc.)
+        if SERVICE_ACCOUNT_FILE and os.path.exists("./" + SERVICE_ACCOUNT_FILE):
+            print("🔑 Using local service account credentials. (gdrive)")
+            print(f"📁 Service account file path: ./{SERVICE_ACCOUNT_FILE}")
+            self.creds = Credentials.from_service_account_file("./" + SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+        else:
+            print("🔐 Using default GCP credentials (Cloud Run). (gdrive)")
+            print(f"📁 SERVICE_ACCOUNT_FILE env var: {SERVICE_ACCOUNT_FILE}")
+            self.creds, _ = default(scopes=SCOPES)
+        print("✅ Credentials initialized successfully")
+
+        self.transport = RequestsTransport(self.creds)
+        # Long-timeout transport for Sheets API (avoids "read operation timed out" on batchGet)
+        self.long_timeout_transport = RequestsTransportWithTimeout(self.creds, timeout_seconds=180)
+        self.gs_client = gspread.authorize(self.creds)
+
+        # Build services with custom transport (bypassing httplib2 completely)
+        self.drive_service = build('drive', 'v3', http=self.transport)
+        self.sheets_service = build('sheets', 'v4', http=self.transport)
+
+        print("🔧 SSL Configuration:")
+        print(f"   - OpenSSL Version: {ssl.OPENSSL_VERSION}")
+        print(f"   - Python HTTPS Verify: {os.environ.get('PYTHONHTTPSVERIFY', 'Not set')}")
+        print(f"   - Requests Version: {requests.__version__}")
+        print(f"   - urllib3 Version: {urllib3.__version__}")
+
+
+_clients = None
+_clients_lock = threading.Lock()
+
+
+def google_clients():
+    """The shared GoogleClients, built once on first use (thread-safe; retried on the next call if it fails)."""
+    global _clients
+    if _clients is None:
+        with _clients_lock:
+            if _clients is None:
+                started = time.perf_counter()
+                try:
+                    _clients = GoogleClients()
+                except Exception as e:
+                    print(f"❌ Error initializing Google credentials: {str(e)}")
+                    import traceback
+                    traceback.print_exc()
+                    raise
+                print(f"✅ Google services built successfully in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return _clients
 
-def update_copied_sheet_values(sheet_id, mapped_values, df):
-    print("🔄 Starting sheet update...")
-    copied_sheet = gs_client.open_by_key(sheet_id)
 
-    # Clean column names
-    df.columns = [col.strip() for col in df.columns]
-    # print(f"🧾 Cleaned columns in df: {df.columns.tolist()}")
+def clients_initialized():
+    return _clients is not None
 
-    # Build location map: (section, field_key) → (sheet_name, cell)
-    location_map = {}
-    start_month_map = {}
-    end_month_map = {}
 
-    for i, row in df.iterrows():
-        try:
-            # print(f"🔍 Row {i} raw: {row.to_dict()}")
+def get_credentials():
+    return google_clients().creds
 
-            section = (row.get('section') or '').strip()
-            field_key = (row.get('field_key') or '').strip()
-            loc_str = (row.get('location') or '').strip()
-            start_month_loc_str = (row.get('start_month_location') or '').strip()
-            end_month_loc_str = (row.get('end_month_location') or '').strip()
 
-            if loc_str.startswith('=') and '!' in loc_str:
-                sheet_part, cell = loc_str[1:].split('!', 1)
-                location_map[(section, field_key)] = (sheet_part.strip().strip("'").strip('"'), cell.strip())
+def sheets_long_timeout_transport():
+    return google_clients().long_timeout_transport
 
-            if start_month_loc_str.startswith('=') and '!' in start_month_loc_str:
-                sheet_part, cell = start_month_loc_str[1:].split('!', 1)
-                start_month_map[(section, field_key)] = (sheet_part.strip().strip("'").strip('"'), cell.strip())
 
-            if end_month_loc_str.startswith('=') and '!' in end_month_loc_str:
-                sheet_part, cell = end_month_loc_str[1:].split('!', 1)
-                end_month_map[(section, field_key)] = (sheet_part.strip().strip("'").strip('"'), cell.strip())
+class _LazyClient:
+    """Module-level stand-in for a shared client; resolves it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(getattr(google_clients(), self._name), attr)
+
+    def __repr__(self):
+        return f"<lazy {self._name}{'' if clients_initialized() else ' (not built)'}>"
 
-        except Exception as e:
-            print(f"❌ Error processing row {i}: {e}")
 
-    # print(f"📍 Mapped fields: main={len(location_map)}, start_month={len(start_month_map)}, end_month={len(end_month_map)}")
+gs_client = _LazyClient("gs_client")
+drive_service = _LazyClient("drive_service")
+sheets_service = _LazyClient("sheets_service")
+
+
+def check_google_access():
+    """
+    Readiness probe: build the clients if needed and make one cheap Drive call.
+    Returns a dict with ok / elapsed_ms / error; never raises.
+    """
+    was_initialized = clients_initialized()
+    started = time.perf_counter()
+    try:
+        google_clients().drive_service.files().list(pageSize=1, fields="files(id)").execute()
+        ok, error = True, None
+    except Exception as e:
+        ok, error = False, str(e)
+    return {
+        "ok": ok,
+        "error": error,
+        "initialized_before_check": was_initialized,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def warm_up_clients():
+    """Build the clients on a background thread so the first Sheets request does not pay for it."""
+    def _warm():
+        try:
+            google_clients()
+        except Exception:
+            pass  # already logged; the first real request will retry
+    threading.Thread(target=_warm, name="google-clients-warmup", daemon=True).start()
+
+
+def update_copied_sheet_values(sheet_id, mapped_values, model_variable_mapping):
+    print("🔄 Starting sheet update...")
+    copied_sheet = gs_client.open_by_key(sheet_id)
+
+    # Cell lookups below are by field_key alone (case-insensitive), via the mapping's indexes
 
     # Build batch update payloads
     updates_by_sheet = defaultdict(list)
@@ -275,11 +306,7 @@ def update_copied_sheet_values(sheet_id, mapped_values, df):
         # === Main field
         # Only use field_key for lookup (ignore section)
         # Try direct match first
-        sheet_cell = None
-        for map_key in location_map.keys():
-            if map_key[1].strip().lower() == key.strip().lower():
-                sheet_cell = location_map[map_key]
-                break
+        sheet_cell = model_variable_mapping.cell_for_field_key(key)
 
         if sheet_cell:
             # print(f"🔍 Field type: {field_type}, Field Key: {key}, Value: {value}\n")
@@ -302,11 +329,7 @@ def update_copied_sheet_values(sheet_id, mapped_values, df):
         # === Optional start_month
         if 'start_month' in item:
             sm_value = item['start_month']
-            sm_cell = None
-            for map_key in start_month_map.keys():
-                if map_key[1].strip().lower() == key.strip().lower():
-                    sm_cell = start_month_map[map_key]
-                    break
+            sm_cell = model_variable_mapping.cell_for_field_key(key, 'start_month_location')
             if sm_cell and sm_value:
                 sm_sheet, sm_loc = sm_cell
                 updates_by_sheet[sm_sheet].append({
@@ -318,11 +341,7 @@ def update_copied_sheet_values(sheet_id, mapped_values, df):
         # === Optional end_month
         if 'end_month' in item:
             em_value = item['end_month']
-            em_cell = None
-            for map_key in end_month_map.keys():
-                if map_key[1].strip().lower() == key.strip().lower():
-                    em_cell = end_month_map[map_key]
-                    break
+            em_cell = model_variable_mapping.cell_for_field_key(key, 'end_month_location')
             if em_cell and em_value:
                 em_sheet, em_loc = em_cell
                 updates_by_sheet[em_sheet].append({
@@ -343,6 +362,7 @@ def update_copied_sheet_values(sheet_id, mapped_values, df):
             print(f"✅ Batch updated {len(updates)} cells in '{sheet_name}'")
             
             if sheet_name == "Retail Assumptions":
+                from gspread_formatting import CellFormat, NumberFormat, format_cell_range
                 fmt = CellFormat(
                     numberFormat=NumberFormat(type="NUMBER", pattern='0.0 "year"')
                 )
@@ -661,7 +681,7 @@ def export_google_sheet_old(sheet_id: str, filename: str = "exported_model.xlsx"
     """
 
     XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    drive_export_service = build('drive', 'v3', credentials=creds)
+    drive_export_service = build('drive', 'v3', credentials=get_credentials())
 
     # Download XLSX from Google Drive
     request = drive_export_service.files().export_media(
@@ -675,6 +695,7 @@ def export_google_sheet_old(sheet_id: str, filename: str = "exported_model.xlsx"
         tmp_in_path = tmp_in.name
 
     # Open and clean XLSX using openpyxl
+    from openpyxl import load_workbook
     workbook = load_workbook(tmp_in_path)
     sheets_to_remove = {"Variable Mapping", "Table Mapping", "Model Variable Mapping"}
     sheets_to_hide = {"Underwriting Assumptions"}
@@ -828,40 +849,34 @@ def extract_tables_for_storage_batch(sheet_id, table_mapping_data, sheets_servic
     print(f"📦 Fetching {len(ranges)} table ranges from Google Sheets...")
     print(f"🔍 Final ranges to fetch: {ranges}")
     
-    # First, let's check what sheets exist in the spreadsheet
-    try:
-        spreadsheet_info = sheets_service.spreadsheets().get(
-            spreadsheetId=sheet_id,
-            ranges=[],
-            includeGridData=False
-        ).execute()
+    # One grid read per range (avoids merging issues), fanned out on the shared read pool;
+    # the sheet-list lookup rides along as the first request. Results come back in order.
+    requests_ = [sheets_service.spreadsheets().get(spreadsheetId=sheet_id, ranges=[], includeGridData=False)]
+    requests_ += [
+        sheets_service.spreadsheets().get(spreadsheetId=sheet_id, ranges=[range_notation], includeGridData=True)
+        for range_notation in ranges
+    ]
+    results = execute_all(requests_, http=sheets_long_timeout_transport(), return_exceptions=True)
+
+    spreadsheet_info = results[0]
+    if isinstance(spreadsheet_info, Exception):
+        print(f"⚠️ Could not fetch sheet info: {spreadsheet_info}")
+    else:
         sheet_names = [sheet['properties']['title'] for sheet in spreadsheet_info.get('sheets', [])]
         print(f"📋 Available sheets: {sheet_names}")
-    except Exception as e:
-        print(f"⚠️ Could not fetch sheet info: {e}")
-    
-    # Make separate API calls for each range to avoid merging issues
+
     all_data_entries = []
-    for i, range_notation in enumerate(ranges):
-        try:
-            print(f"🔍 Fetching range {i+1}/{len(ranges)}: {range_notation}")
-            result = sheets_service.spreadsheets().get(
-                spreadsheetId=sheet_id,
-                ranges=[range_notation],
-                includeGridData=True
-            ).execute()
-            
-            sheet_data = result.get("sheets", [])
-            if sheet_data and sheet_data[0].get("data"):
-                data_entry = sheet_data[0]["data"][0]
-                data_entry["range"] = range_notation  # Add range info for debugging
-                all_data_entries.append(data_entry)
-                print(f"✅ Successfully fetched range: {range_notation}")
-            else:
-                print(f"⚠️ No data returned for range: {range_notation}")
-                
-        except Exception as e:
-            print(f"❌ Error fetching range {range_notation}: {e}")
+    for range_notation, result in zip(ranges, results[1:]):
+        if isinstance(result, Exception):
+            print(f"❌ Error fetching range {range_notation}: {result}")
+            continue
+        sheet_data = result.get("sheets", [])
+        if sheet_data and sheet_data[0].get("data"):
+            data_entry = sheet_data[0]["data"][0]
+            data_entry["range"] = range_notation  # Add range info for debugging
+            all_data_entries.append(data_entry)
+        else:
+            print(f"⚠️ No data returned for range: {range_notation}")
     
     data_entries = all_data_entries
 
@@ -884,7 +899,8 @@ def extract_tables_for_storage_batch(sheet_id, table_mapping_data, sheets_servic
     for i, grid in enumerate(data_entries):
         try:
             grid_data = grid.get('rowData', [])
-            location = ranges[i]
+            # Failed ranges are skipped above, so take the location from the entry, not its index
+            location = grid["range"]
             table_entry = range_map.get(location)
             table_name = table_entry.get("table_name")
             table_order = table_entry.get("table_order")
@@ -930,7 +946,7 @@ def extract_tables_for_storage_batch(sheet_id, table_mapping_data, sheets_servic
             })
 
         except Exception as e:
-            print(f"❌ Error processing range {ranges[i]}: {e}")
+            print(f"❌ Error processing range {grid.get('range')}: {e}")
 
     print(f"✅ Successfully extracted {len(output)} tables")
     output.sort(key=lambda x: x.get("table_order") if isinstance(x.get("table_order"), int) else float("inf"))
@@ -972,22 +988,18 @@ def _get_stale_variables(variables):
     return stale
 
 
-def extract_variables_from_sheet_batch(sheet_id, variable_data, sheets_service, max_retries=3, development_model=False):
+# Seconds to wait for recalculation before each variable read attempt
+RETRY_DELAYS = [5, 8, 12]
+
+
+def collect_variable_ranges(variable_data):
     """
-    Extracts variables from a Google Sheet in batch, minimizing API calls for speed.
-    - If a variable location is a literal, it's used directly.
-    - If a variable location is a formula (starts with '=' and contains '!'), it's batched for a single API call.
-    - Retries with increasing delays if stale values (#REF!, empty key variables) are detected.
+    Split the Variable Mapping rows into literal values and cell references.
+    Returns (variables with literals filled in, unique ranges in order, range -> variable names).
     """
     variables = {}
     ranges = []
     location_map = {}
-
-    # if development_model:
-    #     print("ENABLING ITERATIVE CALCULATION - lowering max")
-    #     enable_iterative_calculation(sheet_id, max_iterations=10, threshold=1)
-
-    # Preprocess: collect all ranges and literals in one pass
     for entry in variable_data:
         name = entry.get("variable_name")
         location = entry.get("variable_location")
@@ -1003,41 +1015,47 @@ def extract_variables_from_sheet_batch(sheet_id, variable_data, sheets_service,
             location_map[clean_location].append(name)
         else:
             variables[name] = location  # Literal value
+    return variables, ranges, location_map
+
+
+def apply_variable_values(variables, ranges, location_map, value_ranges):
+    """Fill `variables` from batchGet valueRanges aligned with `ranges` (first cell of each)."""
+    for cell_location, value_range in zip(ranges, value_ranges):
+        values = value_range.get("values", [[]])
+        value = values[0][0] if values and values[0] else ""
+        for name in location_map.get(cell_location, []):
+            variables[name] = value
+
+
+def extract_variables_from_sheet_batch(sheet_id, variable_data, sheets_service, max_retries=3, development_model=False):
+    """
+    Extracts variables from a Google Sheet in batch, minimizing API calls for speed.
+    - If a variable location is a literal, it's used directly.
+    - If a variable location is a formula (starts with '=' and contains '!'), it's batched for a single API call.
+    - Retries with increasing delays if stale values (#REF!, empty key variables) are detected.
+    """
+    # if development_model:
+    #     print("ENABLING ITERATIVE CALCULATION - lowering max")
+    #     enable_iterative_calculation(sheet_id, max_iterations=10, threshold=1)
 
+    variables, ranges, location_map = collect_variable_ranges(variable_data)
     if not ranges:
         return variables
 
     # Retry loop: wait for Google Sheets to finish recalculating
     # Delays: 5s initial, then 8s, 12s between retry attempts
-    RETRY_DELAYS = [5, 8, 12]
     for attempt in range(max_retries + 1):
         delay = RETRY_DELAYS[attempt] if attempt < len(RETRY_DELAYS) else RETRY_DELAYS[-1]
         time.sleep(delay)
         print(f"[extract_variables] Attempt {attempt + 1}/{max_retries + 1} (waited {delay}s)")
 
-        # Clear formula-based variables for this attempt
-        for loc in location_map:
-            for name in location_map[loc]:
-                variables.pop(name, None)
-
-        # Batch get all ranges (smaller chunks reduce per-request time and avoid read timeouts)
-        CHUNK_SIZE = 30
-        for i in range(0, len(ranges), CHUNK_SIZE):
-            chunk = ranges[i:i+CHUNK_SIZE]
-            print("ABOUT TO GET CHUNK")
-            result = sheets_service.spreadsheets().values().batchGet(
-                spreadsheetId=sheet_id,
-                ranges=chunk,
-                valueRenderOption='FORMATTED_VALUE'
-            ).execute()
-            print("GOT CHUNK")
-            for j, value_range in enumerate(result.get("valueRanges", [])):
-                cell_location = chunk[j]
-                names = location_map.get(cell_location, [])
-                values = value_range.get("values", [[]])
-                value = values[0][0] if values and values[0] else ""
-                for name in names:
-                    variables[name] = value
+        # Batch get all ranges in concurrent chunks sized from observed latency (avoids read timeouts)
+        value_ranges = batch_get_values(
+            sheets_service, sheet_id, ranges,
+            http=sheets_long_timeout_transport(),
+            valueRenderOption='FORMATTED_VALUE'
+        )
+        apply_variable_values(variables, ranges, location_map, value_ranges)
 
         # Check if values look valid
         if not _has_stale_values(variables):
@@ -1927,20 +1945,8 @@ import re
 
 def a1_to_row_col(cell):
     """Convert A1 notation (e.g., 'B12' or 'Sheet1!B12') to 0-based row, col."""
-    if '!' in cell:
-        _, cell = cell.split('!', 1)  # Remove sheet name
-
-    match = re.match(r"^([A-Z]+)(\d+)$", cell)
-    if not match:
-        raise ValueError(f"Invalid A1 cell reference: {cell}")
-    
-    col_letters, row = match.groups()
-
-    # Convert column letters to number (A=0, B=1, ..., Z=25, AA=26, etc.)
-    col = 0
-    for c in col_letters:
-        col = col * 26 + (ord(c.upper()) - ord('A') + 1)
-    return int(row) - 1, col - 1
+    row, col = parse_a1(cell)
+    return row - 1, col - 1
 
 
 
@@ -1957,8 +1963,8 @@ def get_rental_growth_assumptions_inserts(assumptions_ws, rental_growth_json, mo
     end_row = start_row + num_rows
 
     # Column letters for name/value
-    col_letter_name = chr(ord('A') + start_col)
-    col_letter_value = chr(ord('A') + start_col + 1)
+    col_letter_name = column_letter(start_col + 1)
+    col_letter_value = column_letter(start_col + 2)
 
     # Prepare values
     values = [
@@ -2069,11 +2075,11 @@ def get_noi_growth_factor_formula_update(
     # Build the row of formulas
     row_values = []
     for col in range(noi_formula_col_start, noi_formula_col_end + 1):
-        col_letter = rowcol_to_a1(1, col).replace("1", "")
+        col_letter = column_letter(col)
         formula = f"=(1 + ({max_expr} / 12))^{col_letter}15"
         row_values.append(formula)
 
-    range_str = f"'{sheet_name}'!{rowcol_to_a1(noi_formula_row, noi_formula_col_start)}:{rowcol_to_a1(noi_formula_row, noi_formula_col_end)}"
+    range_str = f"'{sheet_name}'!{to_a1(noi_formula_row, noi_formula_col_start)}:{to_a1(noi_formula_row, noi_formula_col_end)}"
 
     return {
         "range": range_str,
@@ -2092,15 +2098,15 @@ def get_rent_roll_growth_formula_updates(rental_growth_ws, rental_growth_json, g
         row_formulas = []
         for j in range(num_columns):
             col_index = start_col_index + j
-            col_letter = rowcol_to_a1(1, col_index).replace("1", "")
+            col_letter = column_letter(col_index)
             header_row = 6 + growth_num_rows  # e.g., 9 when growth_num_rows == 3
             formula = f"=(1+($D{row_num}/12))^{col_letter}${header_row}"
             row_formulas.append(formula)
         formulas.append(row_formulas)
 
-    start_col_letter = rowcol_to_a1(1, start_col_index).replace("1", "")
+    start_col_letter = column_letter(start_col_index)
     end_col_index = start_col_index + num_columns - 1
-    end_col_letter = rowcol_to_a1(1, end_col_index).replace("1", "")
+    end_col_letter = column_letter(end_col_index)
 
     value_payload = {
         "range": f"'Rent Roll Model'!{start_col_letter}{growth_start_row}:{end_col_letter}{growth_start_row + growth_num_rows - 1}",
@@ -2182,7 +2188,7 @@ def get_rent_roll_assumption_row_inserts(rent_roll_ws, rental_assumptions_json,
         month_row = 6 + growth_length
 
         for col_idx in range(10, 142):  # Columns J to EU
-            col_letter = gspread.utils.rowcol_to_a1(1, col_idx).replace("1", "")
+            col_letter = column_letter(col_idx)
             formula = (
                 f"=IFERROR(IF($D{current_row}=0,$G{current_row},"
                 f"IF({col_letter}${month_row}<$E{current_row},$G{current_row},"
@@ -2194,7 +2200,7 @@ def get_rent_roll_assumption_row_inserts(rent_roll_ws, rental_assumptions_json,
         rows_to_insert.append(row)
 
     num_columns = max(len(r) for r in rows_to_insert) - 1
-    end_col_letter = gspread.utils.rowcol_to_a1(1, num_columns + 1).replace("1", "")
+    end_col_letter = column_letter(num_columns + 1)
 
     value_payload = {
         "range": f"'Rent Roll Model'!B{start_row}:{end_col_letter}{start_row + num_rental_rows - 1}",
@@ -2210,13 +2216,13 @@ def get_total_summary_row_updates(rent_roll_ws, sheet_name, start_row, num_rows,
     logic_start_row = sum_row + 1
     weighted_row = sum_row + 4
 
-    start_col_letter = rowcol_to_a1(1, start_col_index).replace("1", "")
-    end_col_letter = rowcol_to_a1(1, start_col_index + num_columns - 1).replace("1", "")
+    start_col_letter = column_letter(start_col_index)
+    end_col_letter = column_letter(start_col_index + num_columns - 1)
 
     # === SUM row formulas
     sum_values = [""] * (start_col_index - 2) + ["Rent Roll"]
     for col_idx in range(start_col_index, start_col_index + num_columns):
-        col_letter = rowcol_to_a1(1, col_idx).replace("1", "")
+        col_letter = column_letter(col_idx)
         sum_values.append(f"=SUM({col_letter}{start_row}:{col_letter}{start_row + num_rows - 1})")
 
     # === Logic rows (3 rows)
@@ -2224,7 +2230,7 @@ def get_total_summary_row_updates(rent_roll_ws, sheet_name, start_row, num_rows,
     for r in range(3):
         row_values = [""] * (start_col_index - 1)
         for col_idx in range(start_col_index, start_col_index + num_columns):
-            col_letter = rowcol_to_a1(1, col_idx).replace("1", "")
+            col_letter = column_letter(col_idx)
             data_range = f"{col_letter}{start_row}:{col_letter}{start_row + num_rows - 1}"
             if r == 0:
                 formula = f"=COUNTIF({data_range},\">0\")"
@@ -2250,7 +2256,7 @@ def get_total_summary_row_updates(rent_roll_ws, sheet_name, start_row, num_rows,
     # === Weighted row
     weighted_values = [""] * (start_col_index - 1)
     for col_idx in range(start_col_index, start_col_index + num_columns):
-        col_letter = rowcol_to_a1(1, col_idx).replace("1", "")
+        col_letter = column_letter(col_idx)
         row_range = f"{col_letter}{start_row}:{col_letter}{start_row + num_rows - 1}"
         total_cell = f"{col_letter}{sum_row}"
         # Vacancy SUM row index = 15 + rental_growth_len + num_units*2
@@ -2811,7 +2817,7 @@ def get_amenity_income_formula_update(
 
         for j in range(num_months):
             col_index = start_col + j
-            col_letter = rowcol_to_a1(1, col_index).replace("1", "")
+            col_letter = column_letter(col_index)
             formula = (
                 f"=IF({col_letter}{month_row}<'{amenity_sheet}'!$D{amenity_row},"
                 f"0,"
@@ -2822,7 +2828,7 @@ def get_amenity_income_formula_update(
         all_rows.append(row)
 
     total_cols = len(all_rows[0])
-    end_col_letter = rowcol_to_a1(1, total_cols).replace("1", "")
+    end_col_letter = column_letter(total_cols)
     end_row = start_row + num_amenities - 1
     range_str = f"'{noi_sheet}'!A{start_row}:{end_col_letter}{end_row}"
 
@@ -2856,7 +2862,7 @@ def get_amenity_income_formula_update_industrial(
 
         for j in range(num_months):
             col_index = start_col + j
-            col_letter = rowcol_to_a1(1, col_index).replace("1", "")
+            col_letter = column_letter(col_index)
             formula = (
                 f"=IF('{amenity_sheet}'!D{amenity_row}<={col_letter}14,"
                 f"'{amenity_sheet}'!I{amenity_row}*{col_letter}10,0)"
@@ -2868,7 +2874,7 @@ def get_amenity_income_formula_update_industrial(
         all_rows.append(row)
 
     total_cols = len(all_rows[0])
-    end_col_letter = rowcol_to_a1(1, total_cols).replace("1", "")
+    end_col_letter = column_letter(total_cols)
     end_row = start_row + num_amenities - 1
     range_str = f"'{noi_sheet}'!A{start_row}:{end_col_letter}{end_row}"
 
@@ -2929,7 +2935,7 @@ def get_noi_summary_row_update_payload(
 
     # Define range to update
     total_cols = len(all_rows[0])
-    end_col_letter = rowcol_to_a1(1, total_cols).replace("1", "")
+    end_col_letter = column_letter(total_cols)
     end_row = noi_start_row + num_rows - 1
     range_str = f"'{noi_sheet}'!A{noi_start_row}:{end_col_letter}{end_row}"
 
@@ -3015,9 +3021,9 @@ def get_operating_expenses_insert_request(spreadsheet, expenses_json, start_row=
 
 
 def get_mapped_cell_location(model_variable_mapping, section, field_key):
-    for row in model_variable_mapping.to_dict(orient="records"):
-        if row["section"].strip() == section.strip() and row["field_key"].strip() == field_key.strip():
-            return row.get("location", "").replace("=", "")
+    entry = model_variable_mapping.lookup(section, field_key)
+    if entry is not None:
+        return (entry.location or "").replace("=", "")
     print(f"DEBUG: No location found for {section} {field_key}")
     return None
 
@@ -3432,7 +3438,7 @@ def get_inflation_reference_updates(assumption_row_mapping, model_variable_mappi
     else:
         print("⚠️ Warning: Expense Inflation not found in assumption_row_mapping")
 
-    print("inflation_updates", updates)
+    logger.debug("inflation_updates %s", summarize(updates))
 
     return updates
 
@@ -3464,7 +3470,7 @@ def get_operating_expense_formula_update_payloads(
         formula_row = []
         for j in range(num_months):
             col_index = start_col + j
-            col_letter = rowcol_to_a1(1, col_index).replace("1", "")
+            col_letter = column_letter(col_index)
             # formula = f"='{op_exp_sheet}'!$H{op_row}*{col_letter}$11"
 
             # Operating Expenses table columns:
@@ -3480,8 +3486,8 @@ def get_operating_expense_formula_update_payloads(
             formula_row.append(formula)
         formula_rows.append(formula_row)
 
-    start_col_letter = rowcol_to_a1(1, start_col).replace("1", "")
-    end_col_letter = rowcol_to_a1(1, end_col_index).replace("1", "")
+    start_col_letter = column_letter(start_col)
+    end_col_letter = column_letter(end_col_index)
     e_range = f"'{noi_sheet}'!{start_col_letter}{start_row}:{end_col_letter}{end_row}"
 
     return [
@@ -3520,9 +3526,9 @@ def get_operating_expense_formula_update_payloads_industrial(
         formula_row = []
         for j in range(num_months):
             col_index = start_col + j
-            col_letter = rowcol_to_a1(1, col_index).replace("1", "")
+            col_letter = column_letter(col_index)
             # Retail Assumptions monthlies start at column M (index 13)
-            ra_col_letter = rowcol_to_a1(1, 14 + j).replace("1", "")
+            ra_col_letter = column_letter(14 + j)
             ra_row = ra_start_row + i
             # Directly reference monthly totals from Retail Assumptions
             formula = f"='{op_exp_sheet}'!{ra_col_letter}{ra_row}"
@@ -3530,8 +3536,8 @@ def get_operating_expense_formula_update_payloads_industrial(
         formula_rows.append(formula_row)
 
 
-    start_col_letter = rowcol_to_a1(1, start_col).replace("1", "")
-    end_col_letter = rowcol_to_a1(1, end_col_index).replace("1", "")
+    start_col_letter = column_letter(start_col)
+    end_col_letter = column_letter(end_col_index)
     e_range = f"'{noi_sheet}'!{start_col_letter}{start_row}:{end_col_letter}{end_row}"
 
     return [
@@ -3563,12 +3569,12 @@ def get_expense_sum_row_to_noi_walk_payload(
     sum_row = []
     for j in range(num_months):
         col_index = start_col + j
-        col_letter = rowcol_to_a1(1, col_index).replace("1", "")
+        col_letter = column_letter(col_index)
         formula = f"=SUM({col_letter}{row_start}:{col_letter}{row_end})"
         sum_row.append(formula)
 
-    start_col_letter = rowcol_to_a1(1, start_col).replace("1", "")
-    end_col_letter = rowcol_to_a1(1, start_col + num_months - 1).replace("1", "")
+    start_col_letter = column_letter(start_col)
+    end_col_letter = column_letter(start_col + num_months - 1)
     range_str = f"'{sheet_name}'!{start_col_letter}{start_sum_row}:{end_col_letter}{start_sum_row}"
 
     # Column B label: reference the "Total Operating Expenses" label from the Operating Expenses sheet
@@ -3624,12 +3630,12 @@ def get_expense_sum_row_to_noi_walk_payload_industrial(
     sum_row = []
     for j in range(num_months):
         col_index = start_col + j
-        col_letter = rowcol_to_a1(1, col_index).replace("1", "")
+        col_letter = column_letter(col_index)
         formula = f"=SUM({col_letter}{row_start}:{col_letter}{row_end})"
         sum_row.append(formula)
 
-    start_col_letter = rowcol_to_a1(1, start_col).replace("1", "")
-    end_col_letter = rowcol_to_a1(1, start_col + num_months - 1).replace("1", "")
+    start_col_letter = column_letter(start_col)
+    end_col_letter = column_letter(start_col + num_months - 1)
     range_str = f"'{sheet_name}'!{start_col_letter}{start_sum_row}:{end_col_letter}{start_sum_row}"
 
     # Column B label: "Total Operating Expenses" written directly
@@ -3721,7 +3727,7 @@ def get_noi_expense_rows_insert_and_update(
         all_rows.append(row)
 
     total_cols = len(all_rows[0])
-    end_col_letter = rowcol_to_a1(1, total_cols).replace("1", "")
+    end_col_letter = column_letter(total_cols)
     end_row = noi_start_row + num_rows - 1
     range_str = f"'{noi_sheet}'!A{noi_start_row}:{end_col_letter}{end_row}"
 
@@ -3804,7 +3810,7 @@ def get_noi_expense_rows_insert_and_update_industrial(
         all_rows.append(row)
 
     total_cols = len(all_rows[0])
-    end_col_letter = rowcol_to_a1(1, total_cols).replace("1", "")
+    end_col_letter = column_letter(total_cols)
     end_row = noi_start_row + num_rows - 1
     range_str = f"'{noi_sheet}'!A{noi_start_row}:{end_col_letter}{end_row}"
 
@@ -3835,13 +3841,13 @@ def get_ntm_update_payload(
     for i in range(target_num_cols):
         start_idx = formula_start_col + i
         end_idx = start_idx + formula_range_width
-        start_letter = rowcol_to_a1(1, start_idx).replace("1", "")
-        end_letter = rowcol_to_a1(1, end_idx).replace("1", "")
+        start_letter = column_letter(start_idx)
+        end_letter = column_letter(end_idx)
         formula = f"=SUM({start_letter}{row_1}:{end_letter}{row_1})"
         values.append(formula)
 
-    output_start_letter = rowcol_to_a1(1, target_start_col).replace("1", "")
-    output_end_letter = rowcol_to_a1(1, target_start_col + target_num_cols - 1).replace("1", "")
+    output_start_letter = column_letter(target_start_col)
+    output_end_letter = column_letter(target_start_col + target_num_cols - 1)
     range_str = f"'{sheet_name}'!{output_start_letter}{target_row}:{output_end_letter}{target_row}"
 
     return {
@@ -4000,7 +4006,7 @@ def get_rental_reference_fix_payload(
                     changed = True
 
             if changed:
-                col_letter = chr(ord('A') + j)
+                col_letter = column_letter(j + 1)
                 corrected_payloads.append({
                     "range": f"'{sheet_name}'!{col_letter}{cell_row}",
                     "values": [[new_value]]
@@ -4201,18 +4207,12 @@ def get_retail_assumptions_inserts(spreadsheet, retail_income, sheet_name="Retai
         if development_model:
             for col_idx in range(11, 109):  # L is column 11 (0-based), EQ is column 144
                 # Convert column index to column letter(s)
-                if col_idx < 26:
-                    col_letter = chr(ord('A') + col_idx)
-                else:
-                    col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+                col_letter = column_letter(col_idx + 1)
                 row[col_idx] = f"=($G{current_row}<={col_letter}$5)*($J{current_row}/12)*(1+$H{current_row})^(ROUNDUP(MAX({col_letter}$5-$G{current_row}+1,0)/12,0)-1)"
         else:
             for col_idx in range(11, 145):  # L is column 11 (0-based), EQ is column 144
                 # Convert column index to column letter(s)
-                if col_idx < 26:
-                    col_letter = chr(ord('A') + col_idx)
-                else:
-                    col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+                col_letter = column_letter(col_idx + 1)
                 row[col_idx] = f"=($G{current_row}<={col_letter}$5)*($J{current_row}/12)*(1+$H{current_row})^(ROUNDUP(MAX({col_letter}$5-$G{current_row}+1,0)/12,0)-1)"
             
         rows.append(row)
@@ -4258,530 +4258,6 @@ def get_retail_assumptions_inserts(spreadsheet, retail_income, sheet_name="Retai
 
 
 
-# def get_retail_assumptions_summary_row(retail_income, sheet_name='Retail Assumptions', development_model=False):
-#     """
-#     Creates a summary row with formulas for the retail assumptions data.
-#     This row goes after all the retail income entries.
-#     """
-#     start_row = 6 + len(retail_income)  # Row after all retail entries
-#     end_row = start_row
-    
-#     # Create the summary row with formulas
-#     summary_row = [""] * 145  # Initialize with empty strings for all columns
-    
-#     summary_row[1] = "Total Base Retail Income"
-    
-#     # Column E: =MIN(E6:E<6+len(retail_income))
-#     data_end_row = 6 + len(retail_income) - 1
-#     summary_row[4] = f"=MIN(E6:E{data_end_row})"
-    
-#     # Column F: =SUM(F6:F<6+len(retail_income))
-#     summary_row[5] = f"=SUM(F6:F{data_end_row})"
-    
-#     # Column G: =MIN(G6:G<6+len(retail_income))
-#     summary_row[6] = f"=MIN(G6:G{data_end_row})"
-    
-#     # Column H: =IFERROR(SUMPRODUCT(H6:H<data_end>,J6:J<data_end>)/J<summary_row>,0)
-#     summary_row[7] = f"=IFERROR(SUMPRODUCT(H6:H{data_end_row},J6:J{data_end_row})/J{start_row},0)"
-    
-#     # Column I: =IFERROR(SUMPRODUCT(I6:I<data_end>,F6:F<data_end>)/F<summary_row>,0)
-#     summary_row[8] = f"=IFERROR(SUMPRODUCT(I6:I{data_end_row},F6:F{data_end_row})/F{start_row},0)"
-    
-#     # Column J: =SUM(J6:J<data_end>)
-#     summary_row[9] = f"=SUM(J6:J{data_end_row})"
-    
-#     # Columns L through EQ (columns 11 through 144): Sum formulas
-#     for col_idx in range(11, 145):  # L is column 11 (0-based), EQ is column 144
-#         # Convert column index to column letter(s)
-#         if col_idx < 26:
-#             col_letter = chr(ord('A') + col_idx)
-#         else:
-#             col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
-#         summary_row[col_idx] = f"=SUM({col_letter}6:{col_letter}{data_end_row})"
-    
-#     # Update payload
-#     update_payload = {
-#         "range": f"'{sheet_name}'!A{start_row}:EQ{start_row}",
-#         "values": [summary_row]
-#     }
-    
-#     return update_payload
-
-
-
-# def get_retail_recovery_summary_row(retail_income, sheet_name='Retail Assumptions'):
-#     """
-#     Creates a summary row with formulas for the retail recovery data.
-#     This row goes after all the retail recovery entries.
-#     """
-#     start_row = 10 + len(retail_income)*2  # Row after all retail entries
-#     end_row = start_row
-#     data_start_row = 10 + len(retail_income)
-    
-#     # Create the summary row with formulas
-#     summary_row = [""] * 145  # Initialize with empty strings for all columns
-    
-#     summary_row[1] = "Total Recovery Income"
-    
-#     # Column E: =MIN(E6:E<6+len(retail_income))
-#     data_end_row = 10 + len(retail_income)*2 
-    
-#     # Column I: 
-#     summary_row[8] = f"=IFERROR(J{data_end_row}/F{6 + len(retail_income)},0)"
-    
-#     # Column J: =SUM(J6:J<data_end>)
-#     summary_row[9] = f"=SUM(J{10 + len(retail_income)}:J{data_end_row -1})"
-    
-#     # Columns L through EQ (columns 11 through 144): Sum formulas
-#     for col_idx in range(11, 145):  # L is column 11 (0-based), EQ is column 144
-#         # Convert column index to column letter(s)
-#         if col_idx < 26:
-#             col_letter = chr(ord('A') + col_idx)
-#         else:
-#             col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
-#         summary_row[col_idx] = f"=SUM({col_letter}{data_start_row}:{col_letter}{data_end_row -1})"
-    
-#     # Update payload
-#     update_payload = {
-#         "range": f"'{sheet_name}'!A{start_row}:EQ{start_row}",
-#         "values": [summary_row]
-#     }
-    
-#     return update_payload
-
-# def get_retail_assumptions_occ_row(retail_income, sheet_name='Retail Assumptions'):
-#     """
-#     Creates an occ row below the summary row with SUMIF formulas.
-#     """
-#     start_row = 6 + len(retail_income) + 1  # Row after summary row
-#     data_end_row = 6 + len(retail_income) - 1  # Last data row
-#     summary_row_num = 6 + len(retail_income)  # Summary row number
-    
-#     # Create the occ row with formulas
-#     occ_row = [""] * 145  # Initialize with empty strings for all columns
-    
-#     occ_row[10] = "Occ."
-    
-#     # Columns L through EO (columns 11 through 144): SUMIF formulas
-#     for col_idx in range(11, 145):  # L is column 11 (0-based), EO is column 144
-#         # Convert column index to column letter(s)
-#         if col_idx < 26:
-#             col_letter = chr(ord('A') + col_idx)
-#         else:
-#             col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
-#         occ_row[col_idx] = f"=IFERROR(SUMIF($E$6:$E${data_end_row},\"<=\"&{col_letter}5,$F$6:$F${data_end_row})/$F${summary_row_num},0)"
-    
-#     # Update payload
-#     update_payload = {
-#         "range": f"'{sheet_name}'!A{start_row}:EQ{start_row}",
-#         "values": [occ_row]
-#     }
-    
-#     return update_payload
-
-
-# def get_retail_recovery_inserts(spreadsheet, retail_income, retail_expenses, sheet_name='Retail Assumptions'):
-#     """
-#     Creates insert request and update payload for retail recovery rows.
-#     """
-#     retail_income_length = len(retail_income)
-#     start_row = 10 + retail_income_length  # Starting row for recovery section
-#     ws = spreadsheet.worksheet(sheet_name)
-#     sheet_id = ws._properties["sheetId"]
-#     # Insert request for new rows
-#     insert_request = {
-#         "insertDimension": {
-#             "range": {
-#                 "sheetId": sheet_id,
-#                 "dimension": "ROWS",
-#                 "startIndex": start_row - 1,  # 0-based index
-#                 "endIndex": start_row - 1 + retail_income_length
-#             }
-#         }
-#     }
-    
-#     # Create data rows
-#     data_rows = []
-#     for i, item in enumerate(retail_income):
-#         row = [""] * 145  # Initialize with empty strings for all columns
-        
-#         # Column B: reference to previous table (=+B6, =+B7, etc.)
-#         row[1] = f"=+B{6 + i}"
-        
-#         # Column C: reference to previous table (=+C6, =+C7, etc.)
-#         row[2] = f"=+C{6 + i}"
-        
-#         # Column F: recovery_start_month
-#         row[5] = item.get("recovery_start_month", "")
-        
-#         # Column H: =IFERROR(F{current_row}/$F${summary_row},0)
-#         current_row = 10 + i + retail_income_length
-#         summary_row = 6 + retail_income_length  # Summary row from previous table
-#         upper_row = 6 + i 
-#         row[7] = f"=IFERROR(F{upper_row}/$F${summary_row},0)"
-#         print(current_row)
-
-#         # Column I: =IFERROR(J{current_row}/F{prev_table_row},0)
-#         prev_table_row = 6 + i
-#         row[8] = f"=IFERROR(J{current_row}/F{prev_table_row},0)"
-        
-#         # Column J: =+H{current_row}*$J${reference_row}
-#         reference_row = 17 + retail_income_length * 2 + len(retail_expenses)
-#         row[9] = f"=+H{current_row}*$J${reference_row}"
-        
-#         # Columns L through EO (columns 11 through 144): =IFERROR((COL$5>=$F{current_row})*$H{current_row}*COL${reference_row},0)
-#         for col_idx in range(11, 145):  # L is column 11 (0-based), EO is column 144
-#             # Convert column index to column letter(s)
-#             if col_idx < 26:
-#                 col_letter = chr(ord('A') + col_idx)
-#             else:
-#                 col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
-#             row[col_idx] = f"=IFERROR(({col_letter}$5>=$F{current_row})*$H{current_row}*{col_letter}${reference_row},0)"
-        
-#         data_rows.append(row)
-    
-#     # Update payload
-#     update_payload = {
-#         "range": f"'{sheet_name}'!A{start_row}:EQ{start_row + retail_income_length - 1}",
-#         "values": data_rows
-#     }
-
-#     # Formatting: all inserted row values B–J non-bold; only B, C, F blue
-#     end_row = start_row + retail_income_length  # exclusive
-#     format_requests = [
-#         {
-#             "repeatCell": {
-#                 "range": {
-#                     "sheetId": sheet_id,
-#                     "startRowIndex": start_row - 1,
-#                     "endRowIndex": end_row,
-#                     "startColumnIndex": 1,  # B
-#                     "endColumnIndex": 10   # up to J (exclusive)
-#                 },
-#                 "cell": {"userEnteredFormat": {"textFormat": {"bold": False}}},
-#                 "fields": "userEnteredFormat.textFormat.bold"
-#             }
-#         },
-#         {
-#             "repeatCell": {
-#                 "range": {
-#                     "sheetId": sheet_id,
-#                     "startRowIndex": start_row - 1,
-#                     "endRowIndex": end_row,
-#                     "startColumnIndex": 1,  # B
-#                     "endColumnIndex": 3    # C (exclusive)
-#                 },
-#                 "cell": {"userEnteredFormat": {"textFormat": {"foregroundColor": {"red": 0, "green": 0, "blue": 1}}}},
-#                 "fields": "userEnteredFormat.textFormat.foregroundColor"
-#             }
-#         },
-#         {
-#             "repeatCell": {
-#                 "range": {
-#                     "sheetId": sheet_id,
-#                     "startRowIndex": start_row - 1,
-#                     "endRowIndex": end_row,
-#                     "startColumnIndex": 5,  # F
-#                     "endColumnIndex": 6
-#                 },
-#                 "cell": {"userEnteredFormat": {"textFormat": {"foregroundColor": {"red": 0, "green": 0, "blue": 1}}}},
-#                 "fields": "userEnteredFormat.textFormat.foregroundColor"
-#             }
-#         },
-#         {
-#             # Format Column I (Pro Rata Share) as percentage
-#             "repeatCell": {
-#                 "range": {
-#                     "sheetId": sheet_id,
-#                     "startRowIndex": start_row - 1,
-#                     "endRowIndex": end_row,
-#                     "startColumnIndex": 8,  # I
-#                     "endColumnIndex": 9
-#                 },
-#                 "cell": {
-#                     "userEnteredFormat": {
-#                         "numberFormat": {
-#                             "type": "PERCENT",
-#                             "pattern": "0.00%"
-#                         }
-#                     }
-#                 },
-#                 "fields": "userEnteredFormat.numberFormat"
-#             }
-#         }
-#     ]
-
-#     return insert_request, update_payload, format_requests
-
-
-# def get_retail_expenses_inserts(spreadsheet, retail_income, retail_expenses, retail_growth_rate, sheet_name, development_model=False):
-#     """
-#     Insert retail expenses rows and update with data
-#     """
-#     retail_income_length = len(retail_income)
-#     retail_expenses_length = len(retail_expenses)
-    
-#     end_column = 145
-#     if development_model:
-#         end_column = 109
-#     # Calculate starting row
-#     start_row = 17 + retail_income_length * 2
-
-#     ws = spreadsheet.worksheet(sheet_name)
-#     sheet_id = ws._properties["sheetId"]
-    
-#     # Create insert request
-#     insert_request = {
-#         "insertDimension": {
-#             "range": {
-#                 "sheetId": sheet_id,
-#                 "dimension": "ROWS",
-#                 "startIndex": start_row - 1,  # 0-based index
-#                 "endIndex": start_row - 1 + retail_expenses_length
-#             }
-#         }
-#     }
-    
-#     # Create data rows
-#     data_rows = []
-#     for i, expense in enumerate(retail_expenses):
-#         row = [""] * end_column  # Initialize with empty strings for all columns
-#         current_row = start_row + i
-        
-#         # Column B: expense name
-#         row[1] = expense.get("name", "")
-        
-#         # Column G: retail growth rate
-#         row[6] = f"{retail_growth_rate}%"
-        
-#         # Column I: cost_per
-#         row[8] = expense.get("cost_per", "")
-        
-#         # Column J: =F{6 + len(retail_expenses)} * I{current_row}
-#         reference_row = 6 + retail_income_length
-#         row[9] = f"=F{reference_row}*I{current_row}"
-        
-#         # Columns L through EO (columns 11 through 144): =IFERROR($J{current_row}/12*COL${reference_row_20}*(1+$G{current_row})^(ROUNDUP(COL$5/12,0)-1),0)
-#         reference_occ_row = 6 + retail_income_length + 1  
-#         for col_idx in range(11, end_column):  # L is column 11 (0-based), EO is column 144
-#             # Convert column index to column letter(s)
-#             if col_idx < 26:
-#                 col_letter = chr(ord('A') + col_idx)
-#             else:
-#                 col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
-#             row[col_idx] = f"=IFERROR($J{current_row}/12*{col_letter}${reference_occ_row}*(1+$G{current_row})^(ROUNDUP({col_letter}$5/12,0)-1),0)"
-        
-#         data_rows.append(row)
-    
-#     # Update payload
-#     update_payload = {
-#         "range": f"'{sheet_name}'!A{start_row}:EO{start_row + retail_expenses_length - 1}",
-#         "values": data_rows
-#     }
-
-#     # Formatting for inserted rows: B–J non-bold; only column I blue
-#     end_row = start_row + retail_expenses_length  # exclusive
-#     format_requests = [
-#         {
-#             "repeatCell": {
-#                 "range": {
-#                     "sheetId": sheet_id,
-#                     "startRowIndex": start_row - 1,
-#                     "endRowIndex": end_row,
-#                     "startColumnIndex": 1,  # B
-#                     "endColumnIndex": 10   # up to J (exclusive)
-#                 },
-#                 "cell": {"userEnteredFormat": {"textFormat": {"bold": False}}},
-#                 "fields": "userEnteredFormat.textFormat.bold"
-#             }
-#         },
-#         {
-#             "repeatCell": {
-#                 "range": {
-#                     "sheetId": sheet_id,
-#                     "startRowIndex": start_row - 1,
-#                     "endRowIndex": end_row,
-#                     "startColumnIndex": 8,  # I
-#                     "endColumnIndex": 9
-#                 },
-#                 "cell": {"userEnteredFormat": {"textFormat": {"foregroundColor": {"red": 0, "green": 0, "blue": 1}}}},
-#                 "fields": "userEnteredFormat.textFormat.foregroundColor"
-#             }
-#         }
-#     ]
-
-#     return insert_request, update_payload, format_requests
-
-# def get_retail_expenses_summary_row(retail_income, retail_expenses, sheet_name, development_model=False):
-#     """
-#     Creates the summary row for retail expenses.
-#     Row position: 17 + len(retail_income)*2 + len(retail_expenses)
-#     """
-#     retail_income_length = len(retail_income)
-#     retail_expenses_length = len(retail_expenses)
-    
-#     end_column = 145
-#     if development_model:
-#         end_column = 109
-#     # Calculate row position
-#     summary_row = 17 + retail_income_length * 2 + retail_expenses_length
-    
-#     # Initialize row with empty strings
-#     row = [""] * end_column
-    
-#     # Column B: text
-#     row[1] = "Total Retail Operating Expenses"
-    
-#     # Column I: =IFERROR(J{summary_row}/F{6 + retail_income_length},0)
-#     reference_row = 6 + retail_income_length
-#     row[8] = f"=IFERROR(J{summary_row}/F{reference_row},0)"
-    
-#     # Column J: SUM of retail expenses column J
-#     expenses_start_row = 17 + retail_income_length * 2
-#     expenses_end_row = expenses_start_row + retail_expenses_length - 1
-#     row[9] = f"=SUM(J{expenses_start_row}:J{expenses_end_row})"
-    
-#     # Columns L through EO (columns 11 through 144): SUM of expense rows for that column
-#     for col_idx in range(11, end_column):  # L is column 11 (0-based), EO is column 144
-#         # Convert column index to column letter(s)
-#         if col_idx < 26:
-#             col_letter = chr(ord('A') + col_idx)
-#         else:
-#             col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
-#         row[col_idx] = f"=SUM({col_letter}{expenses_start_row}:{col_letter}{expenses_end_row})"
-    
-#     # Update payload
-#     update_payload = {
-#         "range": f"'{sheet_name}'!A{summary_row}:EO{summary_row}",
-#         "values": [row]
-#     }
-    
-#     return update_payload
-
-
-
-
-# def get_retail_assumptions_inserts(spreadsheet, retail_income, sheet_name="Retail Assumptions", start_row=6, development_model=False):
-#     """
-#     Returns insert and update requests for retail income data in the Retail Assumptions sheet.
-    
-#     Args:
-#         spreadsheet: The gspread spreadsheet object
-#         retail_income: List of retail income dictionaries
-#         sheet_name: Name of the sheet to update (default: "Retail Assumptions")
-#         start_row: Starting row for insertions (default: 6)
-    
-#     Returns:
-#         tuple: (insert_request, update_payload, format_requests)
-#     """
-#     ws = spreadsheet.worksheet(sheet_name)
-#     sheet_id = ws._properties["sheetId"]
-    
-#     num_rows = len(retail_income)
-#     end_row = start_row + num_rows - 1
-    
-#     # Insert request - insert rows starting at start_row
-#     insert_request = {
-#         "insertDimension": {
-#             "range": {
-#                 "sheetId": sheet_id,
-#                 "dimension": "ROWS",
-#                 "startIndex": start_row - 1,  # 0-based index
-#                 "endIndex": start_row - 1 + num_rows
-#             },
-#             "inheritFromBefore": False
-#         }
-#     }
-    
-#     # Build rows for update - need to extend range to include all columns we're writing to
-#     rows = []
-#     for i, entry in enumerate(retail_income):
-#         current_row = start_row + i
-#         row = [""] * 145  # Columns A through EQ (145 columns total)
-        
-#         # Column B: suite
-#         row[1] = entry.get("suite", "")
-        
-#         # Column C: tenant_name  
-#         row[2] = entry.get("tenant_name", "")
-        
-#         # Column D: blank
-#         row[3] = ""
-        
-#         # Column E: lease_start_month
-#         row[4] = entry.get("lease_start_month", "")
-        
-#         # Column F: square_feet
-#         row[5] = entry.get("square_feet", "")
-        
-#         # Column G: lease_start_month (same as E)
-#         row[6] = entry.get("lease_start_month", "")
-        
-#         # Column H: annual_bumps (with percent sign)
-#         annual_bumps = entry.get("annual_bumps", "")
-#         if annual_bumps != "":
-#             row[7] = f"{annual_bumps}%"
-#         else:
-#             row[7] = ""
-        
-#         # Column I: rent_per_square_foot_per_year
-#         row[8] = entry.get("rent_per_square_foot_per_year", "")
-        
-#         # Column J: Formula I<row> * F<row>
-#         row[9] = f"=I{current_row}*F{current_row}"
-        
-#         # Columns L through EQ (columns 11 through 144): Formula pattern
-#         for col_idx in range(11, 145):  # L is column 11 (0-based), EQ is column 144
-#             # Convert column index to column letter(s)
-#             if col_idx < 26:
-#                 col_letter = chr(ord('A') + col_idx)
-#             else:
-#                 col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
-#             row[col_idx] = f"=($G{current_row}<={col_letter}$5)*($J{current_row}/12)*(1+$H{current_row})^(ROUNDUP(MAX({col_letter}$5-$G{current_row}+1,0)/12,0)-1)"
-        
-#         rows.append(row)
-    
-#     # Update payload - extend range to cover all columns we're writing to (A to EQ)
-#     update_payload = {
-#         "range": f"'{sheet_name}'!A{start_row}:EQ{end_row}",
-#         "values": rows
-#     }
-
-#     # Format requests: make B–J non-bold, and color B–I blue for inserted rows
-#     # Note: Google Sheets uses 0-based indices. B=1, I=8, J=9 (endColumnIndex is exclusive)
-#     format_requests = [
-#         {
-#             "repeatCell": {
-#                 "range": {
-#                     "sheetId": sheet_id,
-#                     "startRowIndex": start_row - 1,
-#                     "endRowIndex": end_row,
-#                     "startColumnIndex": 1,  # B
-#                     "endColumnIndex": 10   # up to J (exclusive)
-#                 },
-#                 "cell": {"userEnteredFormat": {"textFormat": {"bold": False}}},
-#                 "fields": "userEnteredFormat.textFormat.bold"
-#             }
-#         },
-#         {
-#             "repeatCell": {
-#                 "range": {
-#                     "sheetId": sheet_id,
-#                     "startRowIndex": start_row - 1,
-#                     "endRowIndex": end_row,
-#                     "startColumnIndex": 1,  # B
-#                     "endColumnIndex": 9    # up to I (exclusive)
-#                 },
-#                 "cell": {"userEnteredFormat": {"textFormat": {"foregroundColor": {"red": 0, "green": 0, "blue": 1}}}},
-#                 "fields": "userEnteredFormat.textFormat.foregroundColor"
-#             }
-#         }
-#     ]
-
-#     return insert_request, update_payload, format_requests
-
-
-
 def get_retail_assumptions_summary_row(retail_income, sheet_name='Retail Assumptions', development_model=False):
     """
     Creates a summary row with formulas for the retail assumptions data.
@@ -4820,10 +4296,7 @@ def get_retail_assumptions_summary_row(retail_income, sheet_name='Retail Assumpt
         end_column = 109
     for col_idx in range(11, end_column):  # L is column 11 (0-based), EQ is column 144
         # Convert column index to column letter(s)
-        if col_idx < 26:
-            col_letter = chr(ord('A') + col_idx)
-        else:
-            col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+        col_letter = column_letter(col_idx + 1)
         summary_row[col_idx] = f"=SUM({col_letter}6:{col_letter}{data_end_row})"
     
     # Update payload
@@ -4866,10 +4339,7 @@ def get_retail_recovery_summary_row(retail_income, sheet_name='Retail Assumption
     # Columns L through EQ (columns 11 through 144): Sum formulas
     for col_idx in range(11, end_column):  # L is column 11 (0-based), EQ is column 144
         # Convert column index to column letter(s)
-        if col_idx < 26:
-            col_letter = chr(ord('A') + col_idx)
-        else:
-            col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+        col_letter = column_letter(col_idx + 1)
         summary_row[col_idx] = f"=SUM({col_letter}{data_start_row}:{col_letter}{data_end_row -1})"
     
     # Update payload
@@ -4899,10 +4369,7 @@ def get_retail_assumptions_occ_row(retail_income, sheet_name='Retail Assumptions
     # Columns L through EO (columns 11 through 144): SUMIF formulas
     for col_idx in range(11, end_column):  # L is column 11 (0-based), EO is column 144
         # Convert column index to column letter(s)
-        if col_idx < 26:
-            col_letter = chr(ord('A') + col_idx)
-        else:
-            col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+        col_letter = column_letter(col_idx + 1)
         occ_row[col_idx] = f"=IFERROR(SUMIF($E$6:$E${data_end_row},\"<=\"&{col_letter}5,$F$6:$F${data_end_row})/$F${summary_row_num},0)"
     
     # Update payload
@@ -4969,10 +4436,7 @@ def get_retail_recovery_inserts(spreadsheet, retail_income, retail_expenses, she
         # Columns L through EO (columns 11 through 144): =IFERROR((COL$5>=$F{current_row})*$H{current_row}*COL${reference_row},0)
         for col_idx in range(11, end_column):  # L is column 11 (0-based), EO is column 144
             # Convert column index to column letter(s)
-            if col_idx < 26:
-                col_letter = chr(ord('A') + col_idx)
-            else:
-                col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+            col_letter = column_letter(col_idx + 1)
             row[col_idx] = f"=IFERROR(({col_letter}$5>=$F{current_row})*$H{current_row}*{col_letter}${reference_row},0)"
         
         data_rows.append(row)
@@ -5082,10 +4546,7 @@ def get_retail_expenses_inserts(spreadsheet, retail_income, retail_expenses, ret
         reference_occ_row = 6 + retail_income_length + 1  
         for col_idx in range(11, end_column):  # L is column 11 (0-based), EO is column 144
             # Convert column index to column letter(s)
-            if col_idx < 26:
-                col_letter = chr(ord('A') + col_idx)
-            else:
-                col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+            col_letter = column_letter(col_idx + 1)
             row[col_idx] = f"=IFERROR($J{current_row}/12*{col_letter}${reference_occ_row}*(1+$G{current_row})^(ROUNDUP({col_letter}$5/12,0)-1),0)"
         
         data_rows.append(row)
@@ -5162,10 +4623,7 @@ def get_retail_expenses_summary_row(retail_income, retail_expenses, sheet_name,
     # Columns L through EO (columns 11 through 144): SUM of expense rows for that column
     for col_idx in range(11, end_column):  # L is column 11 (0-based), EO is column 144
         # Convert column index to column letter(s)
-        if col_idx < 26:
-            col_letter = chr(ord('A') + col_idx)
-        else:
-            col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+        col_letter = column_letter(col_idx + 1)
         row[col_idx] = f"=SUM({col_letter}{expenses_start_row}:{col_letter}{expenses_end_row})"
     
     # Update payload
@@ -5252,10 +4710,7 @@ def get_retail_assumptions_inserts_industrial(spreadsheet, retail_income, sheet_
         # Columns M through EQ (columns 12 through 144): Formula pattern
         for col_idx in range(13, 147):  # M is column 12 (0-based), EQ is column 144
             # Convert column index to column letter(s)
-            if col_idx < 26:
-                col_letter = chr(ord('A') + col_idx)
-            else:
-                col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+            col_letter = column_letter(col_idx + 1)
             # Use L (Annual Rent) and I (Annual Bumps) after column additions
             row[col_idx] = f"=($G{current_row}<={col_letter}$5)*($L{current_row}/12)*(1+$I{current_row})^(ROUNDUP(MAX({col_letter}$5-$G{current_row}+1,0)/12,0)-1)"
         
@@ -5407,10 +4862,7 @@ def get_retail_assumptions_summary_row_industrial(retail_income, sheet_name='Ret
     # Columns M through EQ (columns 12 through 144): Sum formulas for monthly values
     for col_idx in range(13, 147):  # M is column 12 (0-based), EQ is column 144
         # Convert column index to column letter(s)
-        if col_idx < 26:
-            col_letter = chr(ord('A') + col_idx)
-        else:
-            col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+        col_letter = column_letter(col_idx + 1)
         summary_row[col_idx] = f"=SUM({col_letter}6:{col_letter}{data_end_row})"
     
     # Update payload
@@ -5451,10 +4903,7 @@ def get_retail_recovery_summary_row_industrial(retail_income, sheet_name='Retail
     # Columns L through EQ (columns 11 through 144): Sum formulas
     for col_idx in range(13, 147):  # L is column 11 (0-based), EQ is column 144
         # Convert column index to column letter(s)
-        if col_idx < 26:
-            col_letter = chr(ord('A') + col_idx)
-        else:
-            col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+        col_letter = column_letter(col_idx + 1)
         summary_row[col_idx] = f"=SUM({col_letter}{data_start_row}:{col_letter}{data_end_row -1})"
     
     # Update payload
@@ -5481,10 +4930,7 @@ def get_retail_assumptions_occ_row_industrial(retail_income, sheet_name='Retail
     # Columns L through EO (columns 11 through 144): SUMIF formulas
     for col_idx in range(13, 147):  # L is column 11 (0-based), EO is column 144
         # Convert column index to column letter(s)
-        if col_idx < 26:
-            col_letter = chr(ord('A') + col_idx)
-        else:
-            col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+        col_letter = column_letter(col_idx + 1)
         occ_row[col_idx] = f"=IFERROR(SUMIF($E$6:$E${data_end_row},\"<=\"&{col_letter}5,$F$6:$F${data_end_row})/$F${summary_row_num},0)"
     
     # Update payload
@@ -5566,10 +5012,7 @@ def get_retail_recovery_inserts_industrial(spreadsheet, retail_income, retail_ex
         # =IFERROR((COL$5>=$F{current_row})*$I{current_row}*COL${reference_row},0)
         for col_idx in range(13, 147):  # M is column 12 (0-based), EO is column 144
             # Convert column index to column letter(s)
-            if col_idx < 26:
-                col_letter = chr(ord('A') + col_idx)
-            else:
-                col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+            col_letter = column_letter(col_idx + 1)
             row[col_idx] = f"=IFERROR(({col_letter}$5>=$F{current_row})*$I{current_row}*{col_letter}${reference_row},0)"
         
         data_rows.append(row)
@@ -5763,10 +5206,7 @@ def get_retail_expenses_inserts_industrial(spreadsheet, retail_income, retail_ex
         reference_occ_row = 6 + retail_income_length + 1
         for col_idx in range(13, 147):  # M..EQ
             # Convert column index to column letter(s)
-            if col_idx < 26:
-                col_letter = chr(ord('A') + col_idx)
-            else:
-                col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+            col_letter = column_letter(col_idx + 1)
             # Use Annual (L) and Growth (E)
             row[col_idx] = f"=IFERROR($L{current_row}/12*{col_letter}${reference_occ_row}*(1+$E{current_row})^(ROUNDUP({col_letter}$5/12,0)-1),0)"
         
@@ -5901,10 +5341,7 @@ def get_retail_expenses_summary_row_industrial(retail_income, retail_expenses, s
     # Columns L through EO (columns 11 through 144): SUM of expense rows for that column
     for col_idx in range(13, 147):  # L is column 11 (0-based), EO is column 144
         # Convert column index to column letter(s)
-        if col_idx < 26:
-            col_letter = chr(ord('A') + col_idx)
-        else:
-            col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+        col_letter = column_letter(col_idx + 1)
         row[col_idx] = f"=SUM({col_letter}{expenses_start_row}:{col_letter}{expenses_end_row})"
     
     # Update payload
@@ -5930,29 +5367,10 @@ def insert_expense_rows_to_sheet_payloads(spreadsheet, sheet_name, expenses, mod
     # print("EXPENSES", expenses)
     # Sort so that "Total percent of other expenses" is always at the end
     expenses = sorted(expenses, key=lambda x: x.get("factor") == "Total percent of other expenses")
-    from string import ascii_uppercase
-
-    def generate_excel_columns(start='J', end='EL'):
-        def col_index(c):
-            result = 0
-            for i, char in enumerate(reversed(c)):
-                result += (ascii_uppercase.index(char) + 1) * (26 ** i)
-            return result
-
-        def col_name(index):
-            name = ""
-            while index > 0:
-                index, remainder = divmod(index - 1, 26)
-                name = chr(65 + remainder) + name
-            return name
-
-        start_idx = col_index(start)
-        end_idx = col_index(end)
-        return [col_name(i) for i in range(start_idx, end_idx + 1)]
     if development_model:
-        month_columns = generate_excel_columns('J', 'DZ')
+        month_columns = column_letters('J', 'DZ')
     else:
-        month_columns = generate_excel_columns('J', 'EL')
+        month_columns = column_letters('J', 'EL')
 
 
     format_requests = []
@@ -6610,6 +6028,61 @@ def run_full_sheet_update(
     development_model=False,
     development_units_json=None
 ):
+    """Snapshot the sheet, plan every insert/format/value payload against it, then apply the plan."""
+    snapshot = SheetSnapshot.capture(spreadsheet)
+    plan = plan_full_sheet_update(
+        snapshot,
+        market_json=market_json,
+        rental_assumptions_json=rental_assumptions_json,
+        rental_growth_json=rental_growth_json,
+        amenity_income_json=amenity_income_json,
+        operating_expenses_json=operating_expenses_json,
+        model_variable_mapping=model_variable_mapping,
+        address=address,
+        retail_income=retail_income,
+        expenses_json=expenses_json,
+        property_name=property_name,
+        development_model=development_model,
+        development_units_json=development_units_json,
+    )
+    execute_sheet_update_plan(spreadsheet, plan)
+    return plan
+
+
+def execute_sheet_update_plan(spreadsheet, plan):
+    """Apply a SheetUpdatePlan: structural requests in order, then the value payloads."""
+    # Size-bounded chunks: structural requests in order, then values pipelined (SHEETS_WRITE_*)
+    dispatch_batch_update(spreadsheet, plan.requests, label="[run_full_sheet_update] batchUpdate")
+
+    if plan.enable_iterative:
+        enable_iterative_calculation(spreadsheet.id, max_iterations=10)
+
+    dispatch_values_update(spreadsheet, plan.values, label="[run_full_sheet_update] values")
+    print("✅ All inserts and updates applied.")
+
+
+def plan_full_sheet_update(
+    snapshot,
+    market_json,
+    rental_assumptions_json,
+    rental_growth_json,
+    amenity_income_json,
+    operating_expenses_json,
+    model_variable_mapping,
+    address,
+    retail_income,
+    expenses_json,
+    property_name,
+    development_model=False,
+    development_units_json=None
+):
+    """
+    Build the full structured update as a SheetUpdatePlan without writing anything.
+    `snapshot` is a SheetSnapshot (captured or synthetic); the builders read it the way they
+    read the live spreadsheet.
+    """
+    planning_started = time.perf_counter()
+    spreadsheet = snapshot
 
     industrial_model = False
     if len(operating_expenses_json) == 0:
@@ -6793,7 +6266,7 @@ def run_full_sheet_update(
         print(f"[run_full_sheet_update] operating_expense_rows_insert ops:{len(operating_expense_rows_insert)}")
 
     
-    print("assumption_row_mapping", assumption_row_mapping)
+    logger.debug("[run_full_sheet_update] assumption_row_mapping %s", summarize(assumption_row_mapping))
     if len(assumption_row_mapping) > 0:
         inflation_updates = get_inflation_reference_updates(assumption_row_mapping, model_variable_mapping)
     else: 
@@ -7170,7 +6643,7 @@ def run_full_sheet_update(
         retail_expenses_format_requests
     ]
 
-    print("ALL INSERT REQUESTS", insert_requests)
+    logger.debug("[run_full_sheet_update] insert requests %s", summarize(insert_requests))
     format_requests = [growth_format_request, vacancy_format_request, total_summary_format, *closing_cost_format_requests, *hard_costs_format_requests, *soft_costs_format_requests, *legal_costs_format_requests, *reserves_format_requests, *operating_expenses_format]
 
     # === Combine Update Payloads ===
@@ -7223,18 +6696,15 @@ def run_full_sheet_update(
         reserves_update_payloads
     ]
 
-    # === Run all operations ===
-    spreadsheet.batch_update({"requests": insert_requests + format_requests})
-    # spreadsheet.batch_update({"requests": insert_requests})
-
-
-    if development_model:
-        enable_iterative_calculation(spreadsheet.id, max_iterations=10)
-
-    spreadsheet.values_batch_update({"valueInputOption": "USER_ENTERED", "data": update_payloads})
-
-
-    print("✅ All inserts and updates applied.")
+    # Requests are flattened, deduplicated and merged here (SHEETS_OPTIMIZE_REQUESTS)
+    plan = build_plan(
+        snapshot.id, insert_requests + format_requests, update_payloads,
+        enable_iterative=development_model,
+        planning_ms=(time.perf_counter() - planning_started) * 1000,
+        snapshot=snapshot,
+    )
+    logger.info("[run_full_sheet_update] plan %s", plan.stats)
+    return plan
 
 
 
@@ -7256,7 +6726,7 @@ def update_google_sheet_and_get_values(
     print("📤 Starting Google Sheet generation workflow...")
     timings = {}
 
-    sheets_service = build("sheets", "v4", credentials=creds)
+    sheets_service = build("sheets", "v4", credentials=get_credentials())
 
     # Step 1: Fetch all mappings
     t0 = time.time()
@@ -7277,14 +6747,13 @@ def update_google_sheet_and_get_values(
     table_mapping_values = result['valueRanges'][1].get('values', [])
     variable_mapping_values = result['valueRanges'][2].get('values', [])
 
-    df = pd.DataFrame(model_mapping_values[1:], columns=model_mapping_values[0])
-    # print("DF", df)
+    df = ModelVariableMapping.from_values(model_mapping_values)
     table_mapping_data = [dict(zip(table_mapping_values[0], row)) for row in table_mapping_values[1:]]
     variable_data = [dict(zip(variable_mapping_values[0], row)) for row in variable_mapping_values[1:]]
 
     t1 = time.time()
     timings['load_mapping'] = t1 - t0
-    print(f"✅ Loaded mapping DataFrame with {len(df)} rows in {timings['load_mapping']:.3f}s")
+    print(f"✅ Loaded model variable mapping with {len(df)} rows in {timings['load_mapping']:.3f}s")
 
     # Step 2: Update cell-level values
     t2 = time.time()
@@ -7320,7 +6789,8 @@ def update_google_sheet_and_get_values(
     variables = extract_variables_from_sheet_batch(copied_sheet_id, variable_data, sheets_service, development_model=development_model)
     t5 = time.time()
     timings['extract_variables'] = t5 - t4
-    print(f"📈 Extracted variables: {variables} in {timings['extract_variables']:.3f}s")
+    print(f"📈 Extracted {len(variables)} variables in {timings['extract_variables']:.3f}s")
+    logger.debug("extracted variables %s", variables)
 
 
     t6 = time.time()
@@ -7354,6 +6824,59 @@ def update_google_sheet_and_get_values(
     }
 
 
+def plan_intermediate_dry_run(
+    copied_sheet_id,
+    copied_sheet_url,
+    mapped_values,
+    market_json,
+    rental_assumptions_json,
+    rental_growth_json,
+    amenity_income_json,
+    expenses_json,
+    operating_expenses_json,
+    retail_income_json,
+    development_model,
+    development_units_json,
+    address,
+    property_name,
+    model_mapping=None,
+    mapping_scope=None
+):
+    """
+    Plan the intermediate workflow's structured update without calling Google and return its
+    stats. Uses `model_mapping` records when given, else the mapping last read for this sheet
+    under the same `mapping_scope`.
+    """
+    if model_mapping:
+        df = ModelVariableMapping.from_records(model_mapping)
+    else:
+        df = cached_mapping(mapping_scope, copied_sheet_id)
+    if df is None:
+        raise ValueError("dry_run needs model_mapping (or a prior run for this sheet)")
+
+    plan = plan_full_sheet_update(
+        SheetSnapshot.synthetic(copied_sheet_id),
+        market_json=market_json or [],
+        rental_assumptions_json=rental_assumptions_json or [],
+        rental_growth_json=rental_growth_json or [],
+        amenity_income_json=amenity_income_json or [],
+        operating_expenses_json=operating_expenses_json or [],
+        model_variable_mapping=df,
+        address=address,
+        retail_income=retail_income_json or [],
+        expenses_json=expenses_json or [],
+        property_name=property_name,
+        development_model=development_model,
+        development_units_json=development_units_json
+    )
+    return {
+        "dry_run": True,
+        "sheet_url": copied_sheet_url,
+        "mapped_values": len(mapped_values or []),
+        "plan": plan.stats,
+    }
+
+
 def update_google_sheet_and_get_values_intermediate(
     copied_sheet_id,
     copied_sheet_url,
@@ -7368,12 +6891,13 @@ def update_google_sheet_and_get_values_intermediate(
     development_model,
     development_units_json,
     address,
-    property_name
+    property_name,
+    mapping_scope=None
 ):
     print("📤 Starting Google Sheet generation workflow intermediate...")
     timings = {}
 
-    sheets_service = build("sheets", "v4", credentials=creds)
+    sheets_service = build("sheets", "v4", credentials=get_credentials())
 
     # Step 1: Fetch all mappings
     t0 = time.time()
@@ -7391,14 +6915,15 @@ def update_google_sheet_and_get_values_intermediate(
     model_mapping_values = [row + ['', ''] if len(row) == 3 else row for row in model_mapping_values]
     variable_mapping_values = result['valueRanges'][1].get('values', [])
 
-    df = pd.DataFrame(model_mapping_values[1:], columns=model_mapping_values[0])
+    df = ModelVariableMapping.from_values(model_mapping_values)
     variable_data = [dict(zip(variable_mapping_values[0], row)) for row in variable_mapping_values[1:]]
+    remember_mapping(mapping_scope, copied_sheet_id, df)
 
     t1 = time.time()
     timings['load_mapping'] = t1 - t0
-    print(f"✅ Loaded mapping DataFrame with {len(df)} rows in {timings['load_mapping']:.3f}s")
+    print(f"✅ Loaded model variable mapping with {len(df)} rows in {timings['load_mapping']:.3f}s")
 
-    print("MAPPED VALUES", mapped_values)
+    logger.debug("mapped values %s", summarize(mapped_values))
     # mapped_values = [x for x in mapped_values if x.get("section") == "General Property Assumptions"]
     # Step 2: Update cell-level values
     t2 = time.time()
@@ -7433,7 +6958,8 @@ def update_google_sheet_and_get_values_intermediate(
     variables = extract_variables_from_sheet_batch(copied_sheet_id, variable_data, sheets_service, development_model=development_model)
     t7 = time.time()
     timings['extract_variables'] = t7 - t6
-    print(f"📈 Extracted variables: {variables} in {timings['extract_variables']:.3f}s")
+    print(f"📈 Extracted {len(variables)} variables in {timings['extract_variables']:.3f}s")
+    logger.debug("extracted variables %s", variables)
 
     # Total time
     timings['total'] = t7 - t0
@@ -7455,7 +6981,7 @@ def update_google_sheet_and_get_values_intermediate(
     model_mapping_values = [row + ['', ''] if len(row) == 3 else row for row in model_mapping_values]
     variable_mapping_values = result['valueRanges'][1].get('values', [])
 
-    df = pd.DataFrame(model_mapping_values[1:], columns=model_mapping_values[0])
+    df = ModelVariableMapping.from_values(model_mapping_values)
 
     # Fetch NOI table (entire sheet values)
     try:
@@ -7473,7 +6999,7 @@ def update_google_sheet_and_get_values_intermediate(
         "levered_irr": variables.get("Levered IRR"),
         "levered_moic": variables.get("Levered MOIC"),
         "variables": variables,
-        "model_mapping": df.to_dict(orient="records"),
+        "model_mapping": df.to_records(),
         "variable_mapping": variable_data,
         "timings": timings,
         "NOI": noi_values,
@@ -7491,14 +7017,10 @@ def update_google_sheet_field_values_and_get_values(
     print("📤 Starting update_google_sheet_field_values_and_get_value workflow...")
     timings = {}
 
-    # Convert model_mapping (list of dicts) back to DataFrame
-    model_mapping_df = pd.DataFrame(model_mapping)
+    # Rebuild the indexed mapping from the records the client sent back
+    model_mapping_df = ModelVariableMapping.from_records(model_mapping)
     # Use long-timeout transport to avoid "read operation timed out" on batchGet with many ranges
-    sheets_service = (
-        build("sheets", "v4", http=SHEETS_LONG_TIMEOUT_TRANSPORT)
-        if SHEETS_LONG_TIMEOUT_TRANSPORT
-        else build("sheets", "v4", credentials=creds)
-    )
+    sheets_service = build("sheets", "v4", http=sheets_long_timeout_transport())
 
     df = model_mapping_df
     variable_data = variable_mapping
@@ -7530,7 +7052,7 @@ def update_google_sheet_field_values_and_get_values(
     t9 = time.time()
     timings['noi_fetch'] = t9 - t8
 
-    print("timings", timings)
+    logger.info("timings %s", timings)
 
     return {
         "levered_irr": variables.get("Levered IRR"),
@@ -7650,7 +7172,7 @@ def update_google_sheet_and_get_values_final(
     print("update_google_sheet_and_get_values_final")
     timings = {}
     t0 = time.time()
-    sheets_service = build("sheets", "v4", credentials=creds)
+    sheets_service = build("sheets", "v4", credentials=get_credentials())
 
     spreadsheet = gs_client.open_by_key(copied_sheet_id)
 
@@ -7681,7 +7203,8 @@ def update_google_sheet_and_get_values_final(
     variables = extract_variables_from_sheet_batch(copied_sheet_id, variable_data, sheets_service, development_model=development_model)
     t7 = time.time()
     timings['extract_variables'] = t7 - t6
-    print(f"📈 Extracted variables: {variables} in {timings['extract_variables']:.3f}s")
+    print(f"📈 Extracted {len(variables)} variables in {timings['extract_variables']:.3f}s")
+    logger.debug("extracted variables %s", variables)
 
     t4 = time.time()
     tables = extract_tables_for_storage_batch(copied_sheet_id, table_mapping_data, sheets_service)
@@ -7728,28 +7251,7 @@ def insert_expense_rows_to_sheet(spreadsheet, sheet_name, expenses):
     ws = spreadsheet.worksheet(sheet_name)
     sheet_id = ws._properties["sheetId"]
 
-    from string import ascii_uppercase
-
-    def generate_excel_columns(start='J', end='EL'):
-        def col_index(c):
-            result = 0
-            for i, char in enumerate(reversed(c)):
-                result += (ascii_uppercase.index(char) + 1) * (26 ** i)
-            return result
-
-        def col_name(index):
-            name = ""
-            while index > 0:
-                index, remainder = divmod(index - 1, 26)
-                name = chr(65 + remainder) + name
-            return name
-
-        start_idx = col_index(start)
-        end_idx = col_index(end)
-        return [col_name(i) for i in range(start_idx, end_idx + 1)]
-
-    # Example usage
-    month_columns = generate_excel_columns('J', 'EL')
+    month_columns = column_letters('J', 'EL')
     print(month_columns[:5], "...", month_columns[-5:])
 
     # Step 1: Insert rows between row 1 and 2 (no inheritFromBefore)
@@ -7873,7 +7375,7 @@ def update_user_model_expense_table(copied_sheet_id, sheet_name, expenses, devel
     clear_expense_table_rows(spreadsheet, sheet_name)
 
     # Load model_variable_mapping from the sheet so we can reference mapped cells
-    sheets_service = build("sheets", "v4", credentials=creds)
+    sheets_service = build("sheets", "v4", credentials=get_credentials())
     mapping_result = sheets_service.spreadsheets().values().batchGet(
         spreadsheetId=copied_sheet_id,
         ranges=[
@@ -7886,10 +7388,10 @@ def update_user_model_expense_table(copied_sheet_id, sheet_name, expenses, devel
     if not model_mapping_values:
         raise Exception("Model Variable Mapping sheet is empty or missing")
 
-    # Convert to DataFrame for model_variable_mapping, pad rows to header length
+    # Index the mapping, padding rows to header length
     header = model_mapping_values[0]
     normalized_rows = [row + [''] * (len(header) - len(row)) for row in model_mapping_values[1:]]
-    df = pd.DataFrame(normalized_rows, columns=header)
+    df = ModelVariableMapping(header, normalized_rows)
 
     # Build payloads and apply
     insert_request, update_payloads, format_requests = insert_expense_rows_to_sheet_payloads(
@@ -7898,9 +7400,9 @@ def update_user_model_expense_table(copied_sheet_id, sheet_name, expenses, devel
     )
 
     # Perform row inserts
-    spreadsheet.batch_update({"requests": [insert_request, *format_requests]})
+    dispatch_batch_update(spreadsheet, [insert_request, *format_requests], label=f"[expense_table] {sheet_name} batchUpdate")
     # Apply values/formulas
-    spreadsheet.values_batch_update({"valueInputOption": "USER_ENTERED", "data": update_payloads})
+    dispatch_values_update(spreadsheet, update_payloads, label=f"[expense_table] {sheet_name} values")
 
     # spreadsheet.batch_update({"requests": format_requests})
     
@@ -8007,11 +7509,8 @@ def update_inputs(worksheet, row_val, col_val, purchase_price_cell="E62", exit_c
 
 def get_range_string(corner, num_rows, num_cols):
     """Generate range string from corner cell and dimensions"""
-    col_letter = corner[0]
-    row_number = int(corner[1:])
-    end_col = chr(ord(col_letter) + num_cols - 1)
-    end_row = row_number + num_rows - 1
-    return f"{corner}:{end_col}{end_row}"
+    grid = GridRange.from_corner(corner, num_rows, num_cols)
+    return f"{corner}:{to_a1(grid.end_row, grid.end_col)}"
 
 def generate_sensitivity_analysis_tables(sheet_id, max_price, min_cap_rate):
     """
@@ -8020,21 +7519,9 @@ def generate_sensitivity_analysis_tables(sheet_id, max_price, min_cap_rate):
     print(f"🔧 [DEBUG] Starting sensitivity analysis for sheet_id: {sheet_id}")
     print(f"💰 [DEBUG] Max price: {max_price}, Min cap rate: {min_cap_rate}")
     
-    # Configure Google Sheets API
-    SCOPES = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    
-    if SERVICE_ACCOUNT_FILE and os.path.exists("./" + SERVICE_ACCOUNT_FILE):
-        print("🔑 Using local service account credentials for sensitivity analysis")
-        creds = Credentials.from_service_account_file("./" + SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    else:
-        print("🔐 Using default GCP credentials for sensitivity analysis")
-        creds, _ = default(scopes=SCOPES)
-    
-    client = gspread.authorize(creds)
-    sheets_service = build("sheets", "v4", credentials=creds)
+    # Shared service-account clients (same scopes), built on first use
+    client = gs_client
+    sheets_service = build("sheets", "v4", credentials=get_credentials())
     
     try:
         # Extract model_variable_mapping from the Google Sheet
@@ -8051,17 +7538,9 @@ def generate_sensitivity_analysis_tables(sheet_id, max_price, min_cap_rate):
         # For all rows with length 3, append two empty strings
         model_mapping_values = [row + ['', ''] if len(row) == 3 else row for row in model_mapping_values]
         
-        # Convert to DataFrame for model_variable_mapping
-        df = pd.DataFrame(model_mapping_values[1:], columns=model_mapping_values[0])
-        # print(f"✅ [DEBUG] Extracted model_variable_mapping with {len(df)} entries")
-        
-        # # Debug: Print all available entries to see what we have
-        # print("🔍 [DEBUG] Available entries in model variable mapping:")
-        for _, row in df.iterrows():
-            section = row.get('section', '')
-            field_key = row.get('field_key', '')
-            location = row.get('location', '')
-            print(f"  - Section: '{section}', Field: '{field_key}', Location: '{location}'")
+        # Index model_variable_mapping for the lookups below
+        df = ModelVariableMapping.from_values(model_mapping_values)
+        print(f"✅ [DEBUG] Extracted model_variable_mapping with {len(df)} entries")
         
         # Open the spreadsheet
         spreadsheet = client.open_by_key(sheet_id)
@@ -8091,13 +7570,13 @@ def generate_sensitivity_analysis_tables(sheet_id, max_price, min_cap_rate):
         # Construct table start locations by combining column from purchase price and row from exit cap rate
         # IRR table: column from purchase_price_1, row from exit_cap_rate_1
         if sensitivity_purchase_price_1_cell and sensitivity_exit_cap_rate_1_cell:
-            IRR_left_corner = f"{sensitivity_purchase_price_1_cell[0]}{sensitivity_exit_cap_rate_1_cell[1:]}"
+            IRR_left_corner = to_a1(parse_a1(sensitivity_exit_cap_rate_1_cell)[0], parse_a1(sensitivity_purchase_price_1_cell)[1])
         else:
             IRR_left_corner = None
             
         # MOIC table: column from purchase_price_2, row from exit_cap_rate_2  
         if sensitivity_purchase_price_2_cell and sensitivity_exit_cap_rate_2_cell:
-            MOIC_left_corner = f"{sensitivity_purchase_price_2_cell[0]}{sensitivity_exit_cap_rate_2_cell[1:]}"
+            MOIC_left_corner = to_a1(parse_a1(sensitivity_exit_cap_rate_2_cell)[0], parse_a1(sensitivity_purchase_price_2_cell)[1])
         else:
             MOIC_left_corner = None
         
@@ -8166,18 +7645,10 @@ def generate_sensitivity_analysis_tables(sheet_id, max_price, min_cap_rate):
             return location
         
         def build_vertical_range(start_a1: str, count: int) -> str:
-            start_row, start_col = a1_to_rowcol(start_a1)
-            end_row = start_row + count - 1
-            start_cell = rowcol_to_a1(start_row, start_col)
-            end_cell = rowcol_to_a1(end_row, start_col)
-            return f"{start_cell}:{end_cell}"
-        
+            return GridRange.from_corner(start_a1, count, 1).a1
+
         def build_horizontal_range(start_a1: str, count: int) -> str:
-            start_row, start_col = a1_to_rowcol(start_a1)
-            end_col = start_col + count - 1
-            start_cell = rowcol_to_a1(start_row, start_col)
-            end_cell = rowcol_to_a1(start_row, end_col)
-            return f"{start_cell}:{end_cell}"
+            return GridRange.from_corner(start_a1, 1, count).a1
         
         exit1_ref = extract_cell_ref(sensitivity_exit_cap_rate_1_cell)
         price1_ref = extract_cell_ref(sensitivity_purchase_price_1_cell)
@@ -8266,14 +7737,14 @@ def generate_sensitivity_analysis_tables(sheet_id, max_price, min_cap_rate):
         
         # Write the full grids back to the sheet (table body only)
         # Compute table body top-left corners from dynamic header references
-        row1, _col_from_exit = a1_to_rowcol(exit1_ref)
-        _row_from_price, col1 = a1_to_rowcol(price1_ref)
-        irr_corner = rowcol_to_a1(row1, col1)
+        row1, _col_from_exit = parse_a1(exit1_ref)
+        _row_from_price, col1 = parse_a1(price1_ref)
+        irr_corner = to_a1(row1, col1)
         irr_range = get_range_string(irr_corner, len(row_inputs), len(col_inputs))
 
-        row2, _ = a1_to_rowcol(exit2_ref)
-        _r2, col2 = a1_to_rowcol(price2_ref)
-        moic_corner = rowcol_to_a1(row2, col2)
+        row2, _ = parse_a1(exit2_ref)
+        _r2, col2 = parse_a1(price2_ref)
+        moic_corner = to_a1(row2, col2)
         moic_range = get_range_string(moic_corner, len(row_inputs), len(col_inputs))
 
         # Build numeric grids: IRR as decimals (e.g., 90.6% → 0.906), MOIC as plain numbers
@@ -8335,7 +7806,7 @@ def generate_sensitivity_analysis_tables(sheet_id, max_price, min_cap_rate):
         exit_cap_ref_clean = exit_cap_ref.replace("'", "").replace("$", "")
         ecr_col = ''.join(filter(str.isalpha, exit_cap_ref_clean))
         ecr_row = int(''.join(filter(str.isdigit, exit_cap_ref_clean)))
-        ecr_col_index = sum((ord(c) - 64) * (26 ** i) for i, c in enumerate(reversed(ecr_col.upper()))) - 1
+        ecr_col_index = column_index(ecr_col) - 1
         spreadsheet.batch_update({"requests": [{
             "repeatCell": {
                 "range": {
@@ -8425,8 +7896,8 @@ def update_sensitivity_reference_cells(worksheet, purchase_price_1, purchase_pri
 
     # Apply percentage formatting to cap rate header cells
     sheet_gid = worksheet.id
-    cap1_col_index = sum((ord(c) - 64) * (26 ** i) for i, c in enumerate(reversed(cap1_col.upper()))) - 1
-    cap2_col_index = sum((ord(c) - 64) * (26 ** i) for i, c in enumerate(reversed(cap2_col.upper()))) - 1
+    cap1_col_index = column_index(cap1_col) - 1
+    cap2_col_index = column_index(cap2_col) - 1
 
     format_requests = [
         {
@@ -8480,7 +7951,7 @@ def get_rent_roll_vacancy_formula_updates(rent_roll_ws, rental_assumptions_json,
         row_formulas = []
         for j in range(num_columns):
             col_index = start_col_index + j
-            col_letter = rowcol_to_a1(1, col_index).replace("1", "")
+            col_letter = column_letter(col_index)
             # Build the vacancy formula for this cell using dynamic growth range (rows 3 .. 2 + rental_growth_rows)
             end_row = 2 + rental_growth_rows  # e.g., 4 when 2 rates, 5 when 3 rates
             formula = (
@@ -8491,9 +7962,9 @@ def get_rent_roll_vacancy_formula_updates(rent_roll_ws, rental_assumptions_json,
             row_formulas.append(formula)
         formulas.append(row_formulas)
 
-    start_col_letter = rowcol_to_a1(1, start_col_index).replace("1", "")
+    start_col_letter = column_letter(start_col_index)
     end_col_index = start_col_index + num_columns - 1
-    end_col_letter = rowcol_to_a1(1, end_col_index).replace("1", "")
+    end_col_letter = column_letter(end_col_index)
 
     value_payload = {
         "range": f"'Rent Roll Model'!{start_col_letter}{start_row}:{end_col_letter}{start_row + num_rows - 1}",
@@ -8580,13 +8051,13 @@ def get_rent_roll_vacancy_sum_row_update(
     month_formulas = []
     for j in range(num_columns):
         col_index = start_col_index + j
-        col_letter = rowcol_to_a1(1, col_index).replace("1", "")
+        col_letter = column_letter(col_index)
         month_formulas.append(
             f"=SUM({col_letter}{vacancy_start_row}:{col_letter}{vacancy_start_row + num_units - 1})"
         )
 
-    start_col_letter = rowcol_to_a1(1, start_col_index).replace("1", "")
-    end_col_letter = rowcol_to_a1(1, start_col_index + num_columns - 1).replace("1", "")
+    start_col_letter = column_letter(start_col_index)
+    end_col_letter = column_letter(start_col_index + num_columns - 1)
 
     update_payload = {
         "range": f"'Rent Roll Model'!{start_col_letter}{sum_row_index}:{end_col_letter}{sum_row_index}",
@@ -8617,15 +8088,15 @@ def get_noi_walk_egi_row_update_payload(
     row_formulas = []
     for j in range(num_months):
         col_index = start_col + j
-        col_letter = rowcol_to_a1(1, col_index).replace("1", "")
+        col_letter = column_letter(col_index)
         formula = (
             f"=SUM({col_letter}{amenity_start_row}:{col_letter}{amenity_end_row + 1},{col_letter}22)"
         )
                     # f"+IF({col_letter}15>=$H$5,{col_letter}23,0)"
         row_formulas.append(formula)
 
-    start_col_letter = rowcol_to_a1(1, start_col).replace("1", "")
-    end_col_letter = rowcol_to_a1(1, start_col + num_months - 1).replace("1", "")
+    start_col_letter = column_letter(start_col)
+    end_col_letter = column_letter(start_col + num_months - 1)
 
     return {
         "range": f"'{sheet_name}'!{start_col_letter}{target_row}:{end_col_letter}{target_row}",
@@ -8655,14 +8126,14 @@ def get_noi_walk_egi_row_update_payload_development(
     row_formulas = []
     for j in range(num_months):
         col_index = start_col + j
-        col_letter = rowcol_to_a1(1, col_index).replace("1", "")
+        col_letter = column_letter(col_index)
         formula = (
             f"=SUM({col_letter}{amenity_start_row}:{col_letter}{amenity_end_row + 1},{col_letter}22)"
         )
         row_formulas.append(formula)
         #  f"+IF({col_letter}16>=$C$5,0)"
-    start_col_letter = rowcol_to_a1(1, start_col).replace("1", "")
-    end_col_letter = rowcol_to_a1(1, start_col + num_months - 1).replace("1", "")
+    start_col_letter = column_letter(start_col)
+    end_col_letter = column_letter(start_col + num_months - 1)
 
     return {
         "range": f"'{sheet_name}'!{start_col_letter}{target_row}:{end_col_letter}{target_row}",
@@ -8691,14 +8162,14 @@ def get_noi_walk_egi_row_update_payload_industrial(
     row_formulas = []
     for j in range(num_months):
         col_index = start_col + j
-        col_letter = rowcol_to_a1(1, col_index).replace("1", "")
+        col_letter = column_letter(col_index)
         formula = (
             f"=SUM({col_letter}{amenity_start_row}:{col_letter}{amenity_end_row},{col_letter}{amenity_start_row -3})"
         )
         row_formulas.append(formula)
 
-    start_col_letter = rowcol_to_a1(1, start_col).replace("1", "")
-    end_col_letter = rowcol_to_a1(1, start_col + num_months - 1).replace("1", "")
+    start_col_letter = column_letter(start_col)
+    end_col_letter = column_letter(start_col + num_months - 1)
 
     return {
         "range": f"'{sheet_name}'!{start_col_letter}{target_row}:{end_col_letter}{target_row}",
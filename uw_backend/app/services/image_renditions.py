@@ -0,0 +1,172 @@
+"""
+Upload-time image renditions for model pictures and company logos.
+
+After the original is stored, schedule_picture_renditions / schedule_logo_renditions
+hand the bytes to a small background pool (IMAGE_RENDITION_WORKERS) that decodes the
+image once, applies the EXIF orientation, and writes EXIF-free thumb and medium sizes
+in WebP plus a fallback format (JPEG for photos, PNG for logos, which need
+transparency) next to the original object. The resulting URLs and dimensions are
+saved on the row, and pick_rendition serves the smallest one that fits a request.
+"""
+import importlib.util
+import io
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from sqlalchemy.orm import Session
+
+from app.utils.image_fetch import gcs_client
+
+RENDITION_SIZES = {"thumb": 320, "medium": 1280}  # longest side, px
+PICTURE_FORMATS = ("webp", "jpeg")
+LOGO_FORMATS = ("webp", "png")
+CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+QUALITY = int(os.getenv("IMAGE_RENDITION_QUALITY", 80))
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("IMAGE_RENDITION_WORKERS", 2)),
+                               thread_name_prefix="image-renditions")
+
+
+def renditions_available():
+    # Pillow itself is only imported by the rendition workers (build_renditions)
+    return importlib.util.find_spec("PIL") is not None
+
+
+def _encode(image, fmt):
+    buf = io.BytesIO()
+    if fmt == "jpeg":
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(buf, "JPEG", quality=QUALITY, optimize=True, progressive=True)
+    elif fmt == "webp":
+        image.save(buf, "WEBP", quality=QUALITY, method=4)
+    else:
+        image.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def build_renditions(content, formats):
+    """
+    Decode once and return ((width, height), {size: (w, h, {fmt: bytes})}) with EXIF dropped.
+    Sizes at least as large as the original are skipped.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(content)) as src:
+        image = ImageOps.exif_transpose(src)
+        image.load()
+    # Re-encoding from pixel data alone leaves EXIF/GPS and other metadata behind
+    image.info.pop("exif", None)
+    width, height = image.size
+    out = {}
+    for size, longest in RENDITION_SIZES.items():
+        if max(width, height) <= longest:
+            continue
+        resized = image.copy()
+        resized.thumbnail((longest, longest), Image.LANCZOS)
+        out[size] = (resized.width, resized.height, {fmt: _encode(resized, fmt) for fmt in formats})
+    return (width, height), out
+
+
+def _object_url(blob, make_public):
+    if make_public:
+        try:
+            blob.make_public()
+            return blob.public_url
+        except Exception:
+            pass
+    return blob.generate_signed_url(expiration=timedelta(days=3650), method='GET')
+
+
+def upload_renditions(bucket_name, object_name, content, formats, make_public):
+    """Build and store renditions beside object_name. Returns ((width, height), renditions dict)."""
+    (width, height), built = build_renditions(content, formats)
+    bucket = gcs_client().bucket(bucket_name)
+    base, _ = os.path.splitext(object_name)
+    renditions = {}
+    for size, (w, h, encoded) in built.items():
+        entry = {"width": w, "height": h}
+        for fmt, data in encoded.items():
+            name = f"{base}_{size}.{fmt}"
+            blob = bucket.blob(name)
+            blob.cache_control = "public, max-age=31536000"
+            blob.upload_from_string(data, content_type=CONTENT_TYPES[fmt])
+            entry[fmt] = {"url": _object_url(blob, make_public), "object_name": name, "bytes": len(data)}
+        renditions[size] = entry
+    return (width, height), renditions
+
+
+def _run(app, apply, bucket_name, object_name, content, formats, make_public):
+    from app.db import db
+    with app.app_context():
+        session = Session(db.engine)
+        try:
+            try:
+                dims, renditions = upload_renditions(bucket_name, object_name, content, formats, make_public)
+                apply(session, dims, renditions, "ready")
+            except Exception:
+                print(f"❌ Renditions failed for gs://{bucket_name}/{object_name}:\n{traceback.format_exc()}")
+                session.rollback()
+                apply(session, None, None, "failed")
+            session.commit()
+        finally:
+            session.close()
+
+
+def schedule_picture_renditions(app, picture_id, bucket_name, object_name, content, make_public):
+    from app.models.model import ModelPicture
+
+    def apply(session, dims, renditions, status):
+        pic = session.get(ModelPicture, picture_id)
+        if pic is None:
+            return
+        if dims:
+            pic.width, pic.height = dims
+        if renditions is not None:
+            pic.renditions = renditions
+        pic.rendition_status = status
+
+    _executor.submit(_run, app, apply, bucket_name, object_name, content, PICTURE_FORMATS, make_public)
+
+
+def schedule_logo_renditions(app, company_info_id, bucket_name, object_name, content, make_public):
+    from app.models.user import CompanyInfo
+
+    def apply(session, dims, renditions, status):
+        info = session.get(CompanyInfo, company_info_id)
+        # Skip if the logo was replaced while this one was being processed
+        if info is None or not info.company_logo_url or object_name not in info.company_logo_url:
+            return
+        if renditions is not None:
+            info.company_logo_renditions = dict(renditions, original={"width": dims[0], "height": dims[1]})
+        info.company_logo_rendition_status = status
+
+    _executor.submit(_run, app, apply, bucket_name, object_name, content, LOGO_FORMATS, make_public)
+
+
+def parse_size(value):
+    """'thumb' | 'medium' | 'original' | pixel count -> longest side in px (None = original)."""
+    if not value or value == "original":
+        return None
+    if value in RENDITION_SIZES:
+        return RENDITION_SIZES[value]
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        raise ValueError(f"size must be one of thumb, medium, original or a pixel count, got {value!r}")
+
+
+def pick_rendition(renditions, original_url, longest, fmt):
+    """URL of the smallest rendition whose longest side covers `longest` px, else the original."""
+    if longest is None or not renditions:
+        return original_url
+    candidates = sorted(
+        (max(entry["width"], entry["height"]), entry[fmt]["url"])
+        for size, entry in renditions.items()
+        if size in RENDITION_SIZES and fmt in entry
+    )
+    for side, url in candidates:
+        if side >= longest:
+            return url
+    return original_url
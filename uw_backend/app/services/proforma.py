@@ -0,0 +1,566 @@
+"""
+In-process pro-forma for instant previews: monthly NOI, cash flows, levered IRR and MOIC
+computed from the intermediate payload with NumPy, without a Google Sheets round trip.
+
+Google Sheets stays the system of record. This mirrors the template's NOI Walk / Model
+logic closely enough to give feedback in a few milliseconds while an edit is in progress
+(?preview=1 on the intermediate and single-field update routes). Every block is a
+(rows x months) array:
+
+  - rent roll: a unit pays current rent until its vacate month, nothing through rehab and
+    lease-up (vacate = 1), then pro forma rent; growth compounds monthly by rent type.
+    As in the NOI Walk, vacancy is reported but not deducted: the rent roll already
+    zeroes units that are offline.
+  - amenity income: fee x utilization on leased units from the start month, grown by
+    amenity inflation.
+  - turnover (ongoing lease-up cost) from re-stabilization, bad debt on rent + amenities.
+  - operating expenses by cost_per, grown by expense inflation; percent of EGI is monthly.
+  - retail: rent from lease start with annual bumps, expenses on occupied SF and
+    recoveries by SF share from each tenant's recovery start.
+  - CapEx reserves as a percent of EGI.
+
+Cash flows: project costs by month, an acquisition loan (lesser of LTV plus hard cost
+advance and DSCR sizing) on a monthly amortization schedule, an optional refinance sized
+on annualized NOI (lesser of DSCR, debt yield and LTV), and a sale at the exit month on
+NTM NOI over the exit cap, less selling costs.
+
+Known simplifications: fixed loan rates (no SOFR curve), no interest reserve or equity
+draw sequencing, no LP/GP waterfall, and IRR on monthly periods rather than XIRR dates.
+check_proforma.py measures the gap against the project_scoping workbooks.
+
+numpy is imported inside the functions that use it, so importing this module (the routes
+do) stays within check_import_budget.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Canonical assumption -> field_keys in user_model_field_values (first present wins)
+FIELD_KEYS = {
+    "acquisition_price": ("Acquisition Price", "Asking Price"),
+    "gross_sf": ("Gross Square Feet", "Gross Buildable Square Feet"),
+    "net_rentable_sf": ("Net Rentable SF",),
+    "vacancy": ("Vacancy",),
+    "bad_debt": ("Bad Debt",),
+    "retail_vacancy_bad_debt": ("Less: Vacancy and Bad Debt",),
+    "free_months_rent": ("Free Month's Rent",),
+    "broker_fee": ("Broker Fee",),
+    "annual_turnover": ("Annual Turnover",),
+    "rehab_time": ("Rehab Time",),
+    "lease_up_time": ("Lease-up Time",),
+    "capex_reserve": ("CapEx Reserves", "Capital Reserves"),
+    "ltv": ("LTV Max", "LTC on Property"),
+    "ltc_hard_costs": ("LTC on Hard Costs",),
+    "loan_rate": ("Acquisition Loan Rate", "Interest Rate", "Rate"),
+    "loan_amortization_years": ("Acquisition Loan Amortization", "Amortization"),
+    "loan_dscr": ("Required DSCR Minimum",),
+    "loan_fee": ("Origination Fee",),
+    "refinance": ("Permanent Loan Issued?",),
+    "refinance_month": ("Refinancing Month",),
+    "perm_rate": ("Refinancing: Fixed Interest Rate", "Fixed Interest Rate"),
+    "perm_amortization_years": ("Refinancing: Amortization", "Permanent Loan Amortization"),
+    "perm_dscr": ("Refinancing: DSCR Min.", "DSCR Min."),
+    "perm_debt_yield": ("Refinancing: Debt Yield Min.", "Debt Yield Min."),
+    "perm_ltv": ("Refinancing: LTV Max",),
+    "perm_valuation_cap_rate": ("Refinancing: Cap Rate",),
+    "perm_fee": ("Origination Cost (Includes Title)",),
+    "exit_month": ("Exit Month", "Hold Period (Months)"),
+    "exit_cap_rate": ("Applied Exit Cap Rate", "Exit Cap Rate"),
+    "retail_exit_cap_rate": ("Retail Exit Cap Rate",),
+    "selling_costs": ("Selling Costs", "Less: Selling Costs"),
+}
+
+# Entered as percents in the UI (5 = 5%); overrides passed as `proforma` are fractions
+RATE_ASSUMPTIONS = {
+    "vacancy", "bad_debt", "retail_vacancy_bad_debt", "annual_turnover", "capex_reserve", "ltv",
+    "ltc_hard_costs", "loan_rate", "loan_fee", "perm_rate", "perm_debt_yield", "perm_ltv",
+    "perm_valuation_cap_rate", "perm_fee", "exit_cap_rate", "retail_exit_cap_rate", "selling_costs",
+}
+
+DEFAULTS = {
+    "acquisition_price": 0.0, "gross_sf": 0.0, "net_rentable_sf": 0.0,
+    "vacancy": 0.05, "bad_debt": 0.0, "retail_vacancy_bad_debt": 0.0,
+    "free_months_rent": 0.0, "broker_fee": 0.0, "annual_turnover": 0.0,
+    "rehab_time": 2, "lease_up_time": 2, "capex_reserve": 0.0,
+    "loan_amount": None, "ltv": 0.65, "ltc_hard_costs": 0.0, "loan_rate": 0.07,
+    "loan_amortization_years": 30, "loan_dscr": None, "loan_fee": 0.0,
+    "refinance": False, "refinance_month": 36, "perm_rate": 0.06, "perm_amortization_years": 30,
+    "perm_dscr": 1.25, "perm_debt_yield": None, "perm_ltv": 0.75, "perm_valuation_cap_rate": None,
+    "perm_fee": 0.01, "exit_month": 60, "exit_cap_rate": 0.06, "retail_exit_cap_rate": None,
+    "selling_costs": 0.03,
+}
+
+# expenses_json types that are project costs (uses), as split in run_full_sheet_update
+PROJECT_COST_TYPES = ("Closing Costs", "Hard Costs", "Legal and Pre-Development Costs", "Reserves", "Soft Costs")
+
+PAYLOAD_KEYS = (
+    "user_model_field_values", "market_rent_assumptions", "units", "growth_rates", "amenity_income",
+    "operating_expenses", "retail_income", "expenses", "proforma",
+)
+
+_NUMBER_RE = re.compile(r"[^\d.\-eE]")
+
+
+def _number(value, default=0.0):
+    """5, "5", "5%", "$1,200" -> float; blanks and junk -> default."""
+    if value is None or isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float)):
+        return float(value) if math.isfinite(value) else default
+    text = _NUMBER_RE.sub("", str(value))
+    try:
+        return float(text) if text not in ("", "-", ".") else default
+    except ValueError:
+        return default
+
+
+def _flag(value):
+    return str(value).strip().lower() in ("yes", "true", "1", "y")
+
+
+def resolve_assumptions(field_values, overrides=None):
+    """Canonical assumptions from user_model_field_values (UI percents) plus fraction overrides."""
+    by_key = {}
+    for item in field_values or []:
+        key = item.get("field_key")
+        if key and item.get("value") not in (None, ""):
+            by_key.setdefault(key.strip().lower(), item["value"])
+
+    assumptions = dict(DEFAULTS)
+    for name, keys in FIELD_KEYS.items():
+        raw = next((by_key[k.lower()] for k in keys if k.lower() in by_key), None)
+        if raw is None:
+            continue
+        if name == "refinance":
+            assumptions[name] = _flag(raw)
+            continue
+        value = _number(raw, None)
+        if value is not None:
+            assumptions[name] = value / 100 if name in RATE_ASSUMPTIONS else value
+    for name, value in (overrides or {}).items():
+        if name in assumptions:
+            assumptions[name] = _flag(value) if name == "refinance" else _number(value, assumptions[name])
+    return assumptions
+
+
+def _growth(growth_rates, kind):
+    """{name: annual rate} for one growth type; values are percents."""
+    return {
+        str(entry.get("name", "")).strip(): _number(entry.get("value")) / 100
+        for entry in growth_rates or [] if entry.get("type") == kind
+    }
+
+
+def _annual_payment(rate, years):
+    """Payment per unit of principal per period (PMT(rate, years, -1)); interest-only when years is 0."""
+    if years <= 0:
+        return rate
+    if rate == 0:
+        return 1 / years
+    return rate / (1 - (1 + rate) ** -years)
+
+
+def _amortize(np, principal, annual_rate, amortization_years, periods):
+    """Monthly (interest, principal, ending balance) arrays for a fixed-rate loan."""
+    i = annual_rate / 12
+    k = np.arange(1, periods + 1)
+    if principal <= 0 or periods <= 0:
+        zeros = np.zeros(periods)
+        return zeros, zeros, zeros
+    if amortization_years <= 0:
+        interest = np.full(periods, principal * i)
+        return interest, np.zeros(periods), np.full(periods, float(principal))
+    payment = principal * _annual_payment(i, amortization_years * 12)
+    growth = (1 + i) ** k
+    balance = principal * growth - (payment * (growth - 1) / i if i else payment * k)
+    opening = np.concatenate(([principal], balance[:-1]))
+    interest = opening * i
+    return interest, payment - interest, balance
+
+
+def irr(np, cash_flows, periods_per_year=12):
+    """Annualized IRR of evenly spaced cash flows; None when it has no sign change or no root."""
+    flows = np.asarray(cash_flows, dtype=float)
+    if not (flows > 0).any() or not (flows < 0).any():
+        return None
+    t = np.arange(len(flows))
+
+    def npv(rate):
+        return float((flows / (1 + rate) ** t).sum())
+
+    # Newton from a 1%/period guess, falling back to bisection on (-99%, 100%] per period
+    rate = 0.01
+    for _ in range(50):
+        discount = (1 + rate) ** t
+        value = (flows / discount).sum()
+        slope = (-t * flows / (discount * (1 + rate))).sum()
+        if slope == 0:
+            break
+        step = value / slope
+        rate -= step
+        if rate <= -0.99 or not math.isfinite(rate):
+            break
+        if abs(step) < 1e-12:
+            return float((1 + rate) ** periods_per_year - 1)
+    low, high = -0.99, 1.0
+    if npv(low) * npv(high) > 0:
+        return None
+    for _ in range(200):
+        mid = (low + high) / 2
+        if npv(low) * npv(mid) <= 0:
+            high = mid
+        else:
+            low = mid
+    return float((1 + (low + high) / 2) ** periods_per_year - 1)
+
+
+def _moic(np, flows):
+    invested = -flows[flows < 0].sum()
+    return float(flows[flows > 0].sum() / invested) if invested > 0 else None
+
+
+def _rent_roll(np, payload, a, m):
+    """Monthly rent per unit (units x months) and the re-stabilization month."""
+    units = payload.get("units") or []
+    if not units:
+        return np.zeros((0, len(m))), 0
+    market = {str(row.get("layout", "")).strip(): _number(row.get("pf_rent"))
+              for row in payload.get("market_rent_assumptions") or []}
+    growth = _growth(payload.get("growth_rates"), "rental")
+
+    current = np.array([_number(u.get("current_rent")) for u in units])
+    flag = np.array([int(_number(u.get("vacate_flag"))) for u in units])
+    vacate = np.array([_number(u.get("vacate_month")) for u in units])
+    pro_forma = np.array([
+        market.get(str(u.get("layout", "")).strip(), _number(u.get("pro_forma_rent"), _number(u.get("current_rent"))))
+        if f in (1, 2) else _number(u.get("current_rent"))
+        for u, f in zip(units, flag)
+    ])
+    downtime = np.where(flag == 1, a["rehab_time"] + a["lease_up_time"], 0)
+    released = vacate + downtime
+
+    # One growth curve per rent type; unknown types stay flat
+    types = sorted(growth)
+    curves = np.vstack([np.ones(len(m))] + [(1 + growth[name]) ** ((m - 1) / 12) for name in types])
+    index = np.array([types.index(str(u.get("rent_type", "")).strip()) + 1
+                      if str(u.get("rent_type", "")).strip() in growth else 0 for u in units])
+
+    mm = m[None, :]
+    before = (flag[:, None] == 0) | (mm < vacate[:, None])
+    after = mm >= released[:, None]
+    rent = np.where(before, current[:, None], np.where(after, pro_forma[:, None], 0.0)) * curves[index]
+    stabilization = int(released[flag == 1].max()) if (flag == 1).any() else 0
+    return rent, stabilization
+
+
+def _amenity_income(np, payload, m, leased, unit_count):
+    """Monthly amenity income, billed like the NOI Walk: each row on leased units x utilization,
+    except the last (amenity space), which is its own unit count scaled by occupancy."""
+    rows = payload.get("amenity_income") or []
+    if not rows:
+        return np.zeros(len(m))
+    inflation = max(_growth(payload.get("growth_rates"), "amenity").values(), default=0.0)
+    factor = (1 + inflation / 12) ** m
+    utilization = np.array([_number(r.get("utilization")) / 100 for r in rows])
+    fee = np.array([_number(r.get("monthly_fee")) for r in rows])
+    start = np.array([_number(r.get("start_month"), 1) for r in rows])
+    base = np.tile(leased, (len(rows), 1))
+    if unit_count:
+        base[-1] = _number(rows[-1].get("unit_count")) * leased / unit_count
+    monthly = (fee * utilization)[:, None] * base * factor
+    return np.where(m[None, :] >= start[:, None], monthly, 0.0).sum(axis=0)
+
+
+def _operating_expenses(np, payload, a, m, egi, unit_count):
+    """Monthly operating expense rows (expenses x months) in the template's cost_per terms."""
+    rows = payload.get("operating_expenses") or []
+    if not rows:
+        return np.zeros((0, len(m)))
+    inflation = max(_growth(payload.get("growth_rates"), "expense").values(), default=0.0)
+    factor = (1 + inflation / 12) ** m
+    common_area = max(a["gross_sf"] - a["net_rentable_sf"], 0)
+    out = np.zeros((len(rows), len(m)))
+    for i, row in enumerate(rows):
+        cost_per = str(row.get("cost_per", "")).strip().lower()
+        value = _number(row.get("factor"))
+        if cost_per == "percent of egi":
+            out[i] = value / 100 * egi
+            continue
+        statistic = {"per unit": unit_count, "per ca square foot": common_area,
+                     "per total square feet": a["gross_sf"]}.get(cost_per, 1)
+        out[i] = value * statistic / 12 * factor
+    return out
+
+
+def _retail(np, payload, a, m):
+    """Monthly retail (income, recoveries, expenses) totals."""
+    tenants = payload.get("retail_income") or []
+    zeros = np.zeros(len(m))
+    if not tenants:
+        return zeros, zeros, zeros
+    sf = np.array([_number(t.get("square_feet")) for t in tenants])
+    rent = np.array([_number(t.get("rent_per_square_foot_per_year")) for t in tenants]) * sf / 12
+    start = np.array([_number(t.get("lease_start_month"), 1) for t in tenants])
+    bumps = np.array([_number(t.get("annual_bumps")) / 100 for t in tenants])
+    recovery_start = np.array([_number(t.get("recovery_start_month"), _number(t.get("lease_start_month"), 1))
+                               for t in tenants])
+    mm = m[None, :]
+    leased = mm >= start[:, None]
+    years = np.ceil(np.maximum(mm - start[:, None] + 1, 0) / 12) - 1
+    income = (leased * rent[:, None] * (1 + bumps[:, None]) ** np.maximum(years, 0)).sum(axis=0)
+
+    total_sf = sf.sum()
+    if total_sf <= 0:
+        return income, zeros, zeros
+    occupancy = (leased * sf[:, None]).sum(axis=0) / total_sf
+    growth = max(_growth(payload.get("growth_rates"), "retail").values(), default=0.0)
+    per_sf = sum(_number(e.get("cost_per")) for e in payload.get("expenses") or [] if e.get("type") == "Retail")
+    expenses = per_sf * total_sf / 12 * occupancy * (1 + growth) ** (np.ceil(m / 12) - 1)
+    share = sf / total_sf
+    recoveries = ((mm >= recovery_start[:, None]) * share[:, None]).sum(axis=0) * expenses
+    return income, recoveries, expenses
+
+
+def _project_costs(np, payload, a, months, unit_count):
+    """Project costs by month (index 0 = closing) from the uses tables; unpriced rows are counted."""
+    costs = np.zeros(months + 1)
+    costs[0] += a["acquisition_price"]
+    hard_costs = 0.0
+    skipped = 0
+    for item in payload.get("expenses") or []:
+        kind = item.get("type")
+        if kind not in PROJECT_COST_TYPES:
+            continue
+        factor = str(item.get("factor") or item.get("cost_per_type") or "Total").strip().lower()
+        value = _number(item.get("cost_per"))
+        start = int(min(max(_number(item.get("start_month"), 0), 0), months))
+        end = int(min(max(_number(item.get("end_month"), start), start), months))
+        if factor == "per month":
+            amount = value
+            costs[start:end + 1] += amount
+            total = amount * (end - start + 1)
+        else:
+            total = {
+                "total": value,
+                "percent of purchase price": value / 100 * a["acquisition_price"],
+                "per unit": value * unit_count,
+                "per sf": value * a["gross_sf"],
+                "$ / buildable sf": value * a["gross_sf"],
+            }.get(factor)
+            if total is None:
+                skipped += 1
+                continue
+            costs[start] += total
+        if kind == "Hard Costs":
+            hard_costs += total
+    return costs, hard_costs, skipped
+
+
+def run_proforma(payload, include_monthly=True):
+    """
+    Evaluate the pro-forma for an intermediate-style payload.
+
+    `payload` carries the intermediate request keys (user_model_field_values, units,
+    market_rent_assumptions, growth_rates, amenity_income, operating_expenses,
+    retail_income, expenses) plus an optional `proforma` dict of canonical overrides.
+    Returns a JSON-ready dict: summary metrics, the Sheets-named variables, and the
+    monthly series when include_monthly is set.
+    """
+    import numpy as np
+
+    started = time.perf_counter()
+    a = resolve_assumptions(payload.get("user_model_field_values"), payload.get("proforma"))
+    exit_month = max(int(a["exit_month"]), 1)
+    horizon = exit_month + 12  # the sale prices NTM NOI
+    m = np.arange(1, horizon + 1)
+
+    rent, stabilization = _rent_roll(np, payload, a, m)
+    unit_count = rent.shape[0]
+    rental = rent.sum(axis=0)
+    leased = (rent > 0).sum(axis=0)
+    amenity = _amenity_income(np, payload, m, leased, unit_count)
+    ongoing_lease_up = (a["free_months_rent"] + a["broker_fee"]) / (12 + a["free_months_rent"]) * a["annual_turnover"]
+    turnover = np.where(m >= stabilization, -rental * ongoing_lease_up, 0.0) if stabilization else -rental * ongoing_lease_up
+    bad_debt = -a["bad_debt"] * (rental + amenity)
+    egi = rental + amenity + turnover + bad_debt
+    average_rent = np.divide(rental, leased, out=np.zeros(horizon), where=leased > 0)
+    vacancy = np.where(m < stabilization, -(unit_count - leased) * average_rent, -rental * a["vacancy"])
+
+    opex_rows = _operating_expenses(np, payload, a, m, egi, unit_count)
+    opex = opex_rows.sum(axis=0)
+    mf_noi = egi - opex
+
+    retail_income, recoveries, retail_expenses = _retail(np, payload, a, m)
+    retail_noi = (retail_income + recoveries) * (1 - a["retail_vacancy_bad_debt"]) - retail_expenses
+    noi = mf_noi + retail_noi
+    capex = a["capex_reserve"] * egi
+    property_cash_flow = noi - capex
+
+    # Unlevered: costs and operations through the exit month, plus the sale
+    costs, hard_costs, unpriced_costs = _project_costs(np, payload, a, exit_month, unit_count)
+    ntm = slice(exit_month, exit_month + 12)
+    exit_value = mf_noi[ntm].sum() / a["exit_cap_rate"] if a["exit_cap_rate"] else 0.0
+    retail_cap = a["retail_exit_cap_rate"] or a["exit_cap_rate"]
+    exit_value += retail_noi[ntm].sum() / retail_cap if retail_cap else 0.0
+    sale_proceeds = exit_value * (1 - a["selling_costs"])
+    unlevered = -costs.copy()
+    unlevered[1:] += property_cash_flow[:exit_month]
+    unlevered[exit_month] += sale_proceeds
+
+    # Acquisition loan, sized at closing on month-1 NOI
+    annual_noi = property_cash_flow[0] * 12
+    loan_constant = _annual_payment(a["loan_rate"], a["loan_amortization_years"])
+    sizing = [a["ltv"] * a["acquisition_price"] + a["ltc_hard_costs"] * hard_costs]
+    # A zero/negative loan constant (0% rate, no amortization) puts no DSCR limit on the loan
+    if a["loan_dscr"] and loan_constant > 0:
+        sizing.append(max(annual_noi, 0) / a["loan_dscr"] / loan_constant)
+    loan = a["loan_amount"] if a["loan_amount"] is not None else min(sizing)
+
+    refinance_month = int(a["refinance_month"]) if a["refinance"] and 0 < a["refinance_month"] < exit_month else None
+    bridge_months = refinance_month or exit_month
+    interest, principal, balance = _amortize(np, loan, a["loan_rate"], a["loan_amortization_years"], bridge_months)
+    debt = np.zeros(exit_month + 1)
+    debt[0] = loan * (1 - a["loan_fee"])
+    debt[1:bridge_months + 1] -= interest + principal
+    debt[bridge_months] -= balance[-1] if bridge_months else 0.0
+
+    perm = 0.0
+    if refinance_month:
+        refi_noi = property_cash_flow[refinance_month - 1] * 12
+        valuation_cap = a["perm_valuation_cap_rate"] or a["exit_cap_rate"]
+        perm_factor = _annual_payment(a["perm_rate"] / 12, a["perm_amortization_years"] * 12) * 12
+        sizing = [refi_noi / a["perm_dscr"] / perm_factor if a["perm_dscr"] and perm_factor > 0 else math.inf,
+                  refi_noi / a["perm_debt_yield"] if a["perm_debt_yield"] else math.inf,
+                  refi_noi / valuation_cap * a["perm_ltv"] if valuation_cap else math.inf]
+        perm = max(min(sizing), 0.0) if math.isfinite(min(sizing)) else 0.0
+        remaining = exit_month - refinance_month
+        p_interest, p_principal, p_balance = _amortize(np, perm, a["perm_rate"], a["perm_amortization_years"], remaining)
+        debt[refinance_month] += perm * (1 - a["perm_fee"])
+        debt[refinance_month + 1:] -= p_interest + p_principal
+        debt[exit_month] -= p_balance[-1] if remaining else perm
+
+    levered = unlevered + debt
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    equity = float(-levered[levered < 0].sum())
+    summary = {
+        "levered_irr": irr(np, levered),
+        "levered_moic": _moic(np, levered),
+        "unlevered_irr": irr(np, unlevered),
+        "unlevered_moic": _moic(np, unlevered),
+        "noi_year_1": float(noi[:12].sum()),
+        "going_in_cap_rate": float(noi[0] * 12 / a["acquisition_price"]) if a["acquisition_price"] else None,
+        "stabilization_month": stabilization,
+        "total_project_costs": float(costs.sum()),
+        "acquisition_loan": float(loan),
+        "permanent_loan": float(perm),
+        "equity": equity,
+        "exit_month": exit_month,
+        "exit_value": float(exit_value),
+        "units": unit_count,
+        "unpriced_costs": unpriced_costs,
+        "compute_ms": round(elapsed_ms, 2),
+    }
+    result = {
+        "summary": summary,
+        # Same names the sheet extraction returns, for the UI to show side by side
+        "variables": {"Levered IRR": summary["levered_irr"], "Levered MOIC": summary["levered_moic"],
+                      "Unlevered IRR": summary["unlevered_irr"]},
+        "assumptions": a,
+    }
+    if include_monthly:
+        result["monthly"] = {
+            "month": m.tolist(),
+            "rental_income": np.round(rental, 2).tolist(),
+            "vacancy": np.round(vacancy, 2).tolist(),
+            "amenity_income": np.round(amenity, 2).tolist(),
+            "egi": np.round(egi, 2).tolist(),
+            "operating_expenses": np.round(opex, 2).tolist(),
+            "retail_noi": np.round(retail_noi, 2).tolist(),
+            "noi": np.round(noi, 2).tolist(),
+            "capex": np.round(capex, 2).tolist(),
+            "unlevered_cash_flow": np.round(unlevered, 2).tolist(),  # month 0..exit
+            "levered_cash_flow": np.round(levered, 2).tolist(),
+        }
+    logger.info("proforma preview units=%d months=%d irr=%s in %.2fms",
+                unit_count, horizon, summary["levered_irr"], elapsed_ms)
+    return result
+
+
+# Last intermediate payload per (user, sheet), so a single-field edit can be previewed on its
+# own. Per process: a miss (restart, another instance) falls back to the saved version's rows.
+_inputs_cache = OrderedDict()
+_inputs_lock = threading.Lock()
+INPUTS_CACHE_SIZE = 64
+
+
+def remember_inputs(user_id, sheet_id, payload):
+    inputs = {key: payload.get(key) for key in PAYLOAD_KEYS if payload.get(key) is not None}
+    key = (str(user_id), sheet_id)
+    with _inputs_lock:
+        _inputs_cache[key] = inputs
+        _inputs_cache.move_to_end(key)
+        while len(_inputs_cache) > INPUTS_CACHE_SIZE:
+            _inputs_cache.popitem(last=False)
+
+
+def cached_inputs(user_id, sheet_id):
+    with _inputs_lock:
+        return _inputs_cache.get((str(user_id), sheet_id))
+
+
+def apply_field_updates(inputs, updates):
+    """Copy of `inputs` with user_model_field_values replaced/extended by `updates` (matched on field_key)."""
+    changed = {item["field_key"]: item for item in updates or [] if item.get("field_key")}
+    field_values = [changed.pop(item.get("field_key"), item) for item in inputs.get("user_model_field_values") or []]
+    return dict(inputs, user_model_field_values=field_values + list(changed.values()))
+
+
+def refresh_inputs(user_id, sheet_id, updates):
+    """Fold a committed single-field update into the cached inputs so later previews start from it."""
+    inputs = cached_inputs(user_id, sheet_id)
+    if inputs is not None:
+        remember_inputs(user_id, sheet_id, apply_field_updates(inputs, updates))
+
+
+def load_version_inputs(session, user_model_version):
+    """Rebuild an intermediate-style payload from a saved version's rows."""
+    from app.models.model import (
+        Unit, MarketRentAssumption, GrowthRates, AmenityIncome, OperatingExpenses, RetailIncome, Expenses,
+    )
+    from app.utils.field_store import read_field_values
+
+    def rows(model):
+        found = session.query(model).filter_by(user_model_version_id=user_model_version.id).all()
+        return [{column.name: getattr(row, column.name) for column in model.__table__.columns} for row in found]
+
+    return {
+        "user_model_field_values": read_field_values(session, user_model_version),
+        "units": rows(Unit),
+        "market_rent_assumptions": rows(MarketRentAssumption),
+        "growth_rates": rows(GrowthRates),
+        "amenity_income": rows(AmenityIncome),
+        "operating_expenses": rows(OperatingExpenses),
+        "retail_income": rows(RetailIncome),
+        "expenses": rows(Expenses),
+    }
+
+
+def preview_field_updates(user_id, sheet_id, updates, include_monthly=False, load_inputs=None):
+    """
+    Re-run the caller's last payload for sheet_id with `updates` applied. On a cache miss
+    `load_inputs()` (the saved version, if any) is used; None when neither has inputs.
+    """
+    inputs = cached_inputs(user_id, sheet_id)
+    if inputs is None and load_inputs is not None:
+        inputs = load_inputs()
+    if inputs is None:
+        return None
+    payload = apply_field_updates(inputs, updates)
+    remember_inputs(user_id, sheet_id, payload)
+    return run_proforma(payload, include_monthly=include_monthly)
@@ -0,0 +1,210 @@
+"""
+Two-phase structured sheet updates: plan against a snapshot, then execute.
+
+The run_full_sheet_update builders only read three things from the live spreadsheet:
+worksheet handles (sheetId/title), the sheet metadata, and a couple of formula ranges.
+SheetSnapshot captures all of that in two calls (metadata + one batchGet) and serves it to
+the builders through the same interface gspread offers (`worksheet()`, `_properties`,
+`get()`, `fetch_sheet_metadata()`), so planning does no further network I/O. A snapshot
+refuses writes, so a plan can be built without any chance of touching the sheet.
+
+SheetSnapshot.synthetic() needs no Google access at all: it invents sheet ids for the
+template's tabs, and is what the intermediate endpoint's dry_run uses.
+
+The resulting SheetUpdatePlan is an immutable record of the structural requests (already
+optimized), the value payloads and their stats, deep-frozen (read-only dicts, tuples for
+lists) so nothing can edit a plan between planning and execution; both still serialize as
+JSON. google_drive_service.execute_sheet_update_plan applies it.
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from app.utils.a1 import quote_sheet
+from app.services.sheets_batch import (
+    optimize_requests, flatten_requests, split_value_entry, chunk_items, entry_cells, request_cells, payload_bytes,
+)
+
+# Ranges the builders read (get_rental_reference_fix_payload), fetched with the snapshot
+SNAPSHOT_FORMULA_RANGES = {
+    "Assumptions": "A1:Z100",
+    "Cash Flow and Exit": "A1:Z100",
+}
+
+# Tabs a model template has; a synthetic snapshot also creates any other tab on first use
+TEMPLATE_SHEETS = (
+    "Cover", "Assumptions", "Market Rent Assumptions", "Rental Assumptions", "Rent Roll Model",
+    "Amenity Income", "Operating Expenses", "Retail Assumptions", "NOI", "NOI Walk",
+    "Cash Flow and Exit", "Closing Costs", "Hard Costs", "Soft Costs", "Legal and Setup Costs",
+    "Reserves", "Model Variable Mapping", "Variable Mapping", "Table Mapping",
+)
+
+SheetUpdatePlan = namedtuple("SheetUpdatePlan", ["spreadsheet_id", "requests", "values", "enable_iterative", "stats"])
+
+
+class FrozenDict(dict):
+    """A dict that refuses changes; still a dict, so json and jsonify serialize it as-is."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("SheetUpdatePlan contents are read-only")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def freeze(value):
+    """Deep read-only copy: dicts -> FrozenDict, lists/tuples -> tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class SnapshotWorksheet:
+    """Read-only worksheet handle backed by a SheetSnapshot."""
+
+    def __init__(self, snapshot, properties):
+        self._snapshot = snapshot
+        self._properties = properties
+
+    @property
+    def id(self):
+        return self._properties["sheetId"]
+
+    @property
+    def title(self):
+        return self._properties["title"]
+
+    @property
+    def row_count(self):
+        return self._properties.get("gridProperties", {}).get("rowCount", 1000)
+
+    @property
+    def col_count(self):
+        return self._properties.get("gridProperties", {}).get("columnCount", 26)
+
+    def get(self, range_name=None, value_render_option=None, **kwargs):
+        return self._snapshot.values(self.title, range_name, value_render_option)
+
+    def __repr__(self):
+        return f"<SnapshotWorksheet {self.title!r} id:{self.id}>"
+
+
+class SheetSnapshot:
+    """The spreadsheet state the planning builders read, captured up front."""
+
+    def __init__(self, spreadsheet_id, sheets, formulas=None, source=None, synthetic=False):
+        self.id = spreadsheet_id
+        self._sheets = OrderedDict((props["title"], props) for props in sheets)
+        self._formulas = dict(formulas or {})  # (title, range, render option) -> values
+        self._source = source
+        self._synthetic = synthetic
+        self._next_id = itertools.count(max([p["sheetId"] for p in sheets] or [0]) + 1)
+        self.misses = 0
+
+    @classmethod
+    def capture(cls, spreadsheet, formula_ranges=None):
+        """Snapshot a live gspread Spreadsheet: one metadata call plus one formula batchGet."""
+        started = time.perf_counter()
+        metadata = spreadsheet.fetch_sheet_metadata()
+        sheets = [sheet["properties"] for sheet in metadata.get("sheets", [])]
+        titles = {props["title"] for props in sheets}
+        wanted = [(title, cells) for title, cells in (formula_ranges or SNAPSHOT_FORMULA_RANGES).items() if title in titles]
+        formulas = {}
+        if wanted:
+            result = spreadsheet.values_batch_get([f"{quote_sheet(title)}!{cells}" for title, cells in wanted],
+                                                  params={"valueRenderOption": "FORMULA"})
+            for (title, cells), value_range in zip(wanted, result.get("valueRanges", [])):
+                formulas[(title, cells, "FORMULA")] = value_range.get("values", [])
+        snapshot = cls(spreadsheet.id, sheets, formulas, source=spreadsheet)
+        snapshot.capture_ms = round((time.perf_counter() - started) * 1000, 1)
+        return snapshot
+
+    @classmethod
+    def synthetic(cls, spreadsheet_id=None, titles=TEMPLATE_SHEETS):
+        """A stand-in with made-up sheet ids and no cell contents; never calls Google."""
+        sheets = [{"sheetId": index, "title": title, "index": index} for index, title in enumerate(titles)]
+        snapshot = cls(spreadsheet_id or "dry-run", sheets, synthetic=True)
+        snapshot.capture_ms = 0.0
+        return snapshot
+
+    def fetch_sheet_metadata(self, *args, **kwargs):
+        return {"spreadsheetId": self.id, "sheets": [{"properties": props} for props in self._sheets.values()]}
+
+    def worksheets(self, *args, **kwargs):
+        return [SnapshotWorksheet(self, props) for props in self._sheets.values()]
+
+    def worksheet(self, title):
+        props = self._sheets.get(title)
+        if props is None:
+            if not self._synthetic:
+                from gspread.exceptions import WorksheetNotFound
+                raise WorksheetNotFound(title)
+            props = self._sheets[title] = {"sheetId": next(self._next_id), "title": title, "index": len(self._sheets)}
+        return SnapshotWorksheet(self, props)
+
+    def values(self, title, range_name, value_render_option=None):
+        key = (title, range_name, (value_render_option or "FORMATTED_VALUE").upper())
+        if key in self._formulas:
+            return self._formulas[key]
+        self.misses += 1
+        if self._source is None:
+            return []
+        # Not captured up front: read through (counted, so the snapshot ranges can be extended)
+        values = self._source.worksheet(title).get(range_name, value_render_option=value_render_option)
+        self._formulas[key] = values
+        return values
+
+    def _read_only(self, *args, **kwargs):
+        raise RuntimeError("SheetSnapshot is read-only; execute the plan against the spreadsheet")
+
+    batch_update = values_batch_update = values_update = _read_only
+
+
+def build_plan(spreadsheet_id, requests, values, enable_iterative, planning_ms, snapshot=None):
+    """Freeze builder output into a SheetUpdatePlan, optimizing requests and measuring the payloads."""
+    optimized, request_stats = optimize_requests(requests, label="[plan] batchUpdate")
+    entries = [piece for entry in flatten_requests(values) for piece in split_value_entry(entry)]
+    stats = {
+        "planning_ms": round(planning_ms, 1),
+        "snapshot_ms": getattr(snapshot, "capture_ms", None),
+        "snapshot_misses": getattr(snapshot, "misses", 0),
+        "synthetic_snapshot": bool(getattr(snapshot, "_synthetic", False)),
+        "requests": request_stats,
+        "request_chunks": len(chunk_items(optimized, request_cells)),
+        "value_ranges": len(entries),
+        "value_cells": sum(entry_cells(entry) for entry in entries),
+        "value_bytes": payload_bytes(entries),
+        "value_chunks": len(chunk_items(entries, entry_cells)),
+    }
+    return SheetUpdatePlan(spreadsheet_id, freeze(optimized), freeze(entries), bool(enable_iterative), freeze(stats))
+
+
+# ModelVariableMapping last read per sheet, so a dry run can plan without reading the sheet.
+# Keyed by (scope, sheet_id), scope being (user id, user_model_version_id or None) of the caller
+# that read it, so one caller's mapping is never served for another's request.
+_mapping_cache = OrderedDict()
+_mapping_lock = threading.Lock()
+MAPPING_CACHE_SIZE = 64
+
+
+def remember_mapping(scope, sheet_id, mapping):
+    if scope is None:
+        return
+    key = (scope, sheet_id)
+    with _mapping_lock:
+        _mapping_cache[key] = mapping
+        _mapping_cache.move_to_end(key)
+        while len(_mapping_cache) > MAPPING_CACHE_SIZE:
+            _mapping_cache.popitem(last=False)
+
+
+def cached_mapping(scope, sheet_id):
+    if scope is None:
+        return None
+    with _mapping_lock:
+        return _mapping_cache.get((scope, sheet_id))
@@ -0,0 +1,248 @@
+"""
+asyncio variant of the intermediate Sheets workflow.
+
+All pipelines share one event loop on a background thread and one httpx.AsyncClient.
+Sync Flask views hand a coroutine to run_pipeline and block on it, so the request thread
+is still held for the whole build and concurrency stays capped by GUNICORN_THREADS; the
+gain is lower latency per build, with Sheets reads sharing one connection pool and one
+quota limiter. Independent stages overlap:
+
+  - the mapping read runs alongside the gspread metadata load (open_by_key);
+  - after the structured update, each variable read attempt also fetches the
+    re-read mapping and the NOI sheet.
+
+The write stages (update_copied_sheet_values, run_full_sheet_update) are gspread code
+and still run as blocking calls, on the loop's executor (SHEETS_PIPELINE_BLOCKING_WORKERS).
+"""
+import asyncio
+import functools
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import google.auth.transport.requests
+
+from app.utils.model_mapping import ModelVariableMapping
+from app.services.sheet_plan import remember_mapping
+from app.services.sheets_concurrency import read_quota, batch_get_chunker, READ_RETRIES
+from app.services.google_drive_service import (
+    gs_client, get_credentials, update_copied_sheet_values, run_full_sheet_update,
+    collect_variable_ranges, apply_variable_values, _has_stale_values, _get_stale_variables, RETRY_DELAYS,
+)
+
+SHEETS_API = "https://sheets.googleapis.com/v4/spreadsheets"
+TIMEOUT = float(os.getenv("SHEETS_PIPELINE_TIMEOUT", 180))
+MAX_CONNECTIONS = int(os.getenv("SHEETS_PIPELINE_MAX_CONNECTIONS", 20))
+MAPPING_RANGES = ["'Model Variable Mapping'", "'Variable Mapping'"]
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_blocking = ThreadPoolExecutor(max_workers=int(os.getenv("SHEETS_PIPELINE_BLOCKING_WORKERS", 16)),
+                               thread_name_prefix="sheets-pipeline")
+_loop = None
+_loop_lock = threading.Lock()
+_client = None
+
+
+class AsyncSheetsClient:
+    """Minimal Sheets v4 reader on httpx, authorized with the service-account credentials."""
+
+    def __init__(self, credentials):
+        import httpx
+        self._creds = credentials
+        self._http = httpx.AsyncClient(timeout=TIMEOUT, limits=httpx.Limits(max_connections=MAX_CONNECTIONS))
+        self._token_lock = asyncio.Lock()
+
+    async def _headers(self):
+        async with self._token_lock:
+            if not self._creds.valid:
+                await asyncio.to_thread(self._creds.refresh, google.auth.transport.requests.Request())
+        return {"Authorization": f"Bearer {self._creds.token}"}
+
+    async def _get(self, path, params):
+        for attempt in range(READ_RETRIES + 1):
+            await read_quota.acquire_async()
+            response = await self._http.get(SHEETS_API + path, params=params, headers=await self._headers())
+            if response.status_code in RETRY_STATUSES and attempt < READ_RETRIES:
+                await asyncio.sleep(min(2 ** attempt, 8) + random.random())
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    async def batch_get(self, spreadsheet_id, ranges, **params):
+        return await self._get(f"/{spreadsheet_id}/values:batchGet", [("ranges", r) for r in ranges] + list(params.items()))
+
+    async def get_values(self, spreadsheet_id, range_name, **params):
+        return await self._get(f"/{spreadsheet_id}/values/{quote(range_name, safe='')}", params)
+
+
+def _pipeline_loop():
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(_blocking)
+                threading.Thread(target=loop.run_forever, name="sheets-pipeline-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+async def _sheets_client():
+    # Only touched from the pipeline loop; re-check after the await in case another pipeline won
+    global _client
+    if _client is None:
+        credentials = await asyncio.to_thread(get_credentials)
+        if _client is None:
+            _client = AsyncSheetsClient(credentials)
+    return _client
+
+
+def run_pipeline(coro, timeout=None):
+    """Run a pipeline coroutine on the shared event loop and block until it finishes (for sync views)."""
+    return asyncio.run_coroutine_threadsafe(coro, _pipeline_loop()).result(timeout)
+
+
+async def batch_get_values_async(client, spreadsheet_id, ranges, **params):
+    """Concurrent, adaptively chunked batchGet; one valueRange per input range, in order."""
+    if not ranges:
+        return []
+    size = batch_get_chunker.chunk_size(len(ranges))
+    chunks = [ranges[i:i + size] for i in range(0, len(ranges), size)]
+
+    async def one(chunk):
+        started = time.perf_counter()
+        result = await client.batch_get(spreadsheet_id, chunk, **params)
+        batch_get_chunker.record(len(chunk), time.perf_counter() - started)
+        returned = result.get("valueRanges", [])
+        return returned[:len(chunk)] + [{}] * (len(chunk) - len(returned))
+
+    parts = await asyncio.gather(*(one(chunk) for chunk in chunks))
+    return [value_range for part in parts for value_range in part]
+
+
+def _mapping_from_batch(result):
+    """(ModelVariableMapping, variable mapping rows) from a MAPPING_RANGES batchGet."""
+    model_mapping_values = result['valueRanges'][0].get('values', [])
+    # For all rows with length 3, append two empty strings
+    model_mapping_values = [row + ['', ''] if len(row) == 3 else row for row in model_mapping_values]
+    variable_mapping_values = result['valueRanges'][1].get('values', [])
+    df = ModelVariableMapping.from_values(model_mapping_values)
+    variable_data = [dict(zip(variable_mapping_values[0], row)) for row in variable_mapping_values[1:]]
+    return df, variable_data
+
+
+async def _noi_values(client, sheet_id):
+    try:
+        return (await client.get_values(sheet_id, "'NOI'")).get("values", [])
+    except Exception as e:
+        print(f"⚠️ Failed to fetch NOI sheet values: {e}")
+        return []
+
+
+async def _final_reads(client, sheet_id, variable_data, max_retries=3):
+    """
+    Variable extraction with the recalculation retry loop; the mapping re-read and NOI
+    fetch ride along with each attempt so the values returned are from the same pass.
+    """
+    variables, ranges, location_map = collect_variable_ranges(variable_data)
+    remapped, noi_values = None, []
+    for attempt in range(max_retries + 1):
+        delay = RETRY_DELAYS[attempt] if attempt < len(RETRY_DELAYS) else RETRY_DELAYS[-1]
+        await asyncio.sleep(delay)
+        print(f"[extract_variables] Attempt {attempt + 1}/{max_retries + 1} (waited {delay}s, async)")
+        value_ranges, remapped, noi_values = await asyncio.gather(
+            batch_get_values_async(client, sheet_id, ranges, valueRenderOption='FORMATTED_VALUE'),
+            client.batch_get(sheet_id, MAPPING_RANGES, valueRenderOption='FORMULA'),
+            _noi_values(client, sheet_id),
+        )
+        apply_variable_values(variables, ranges, location_map, value_ranges)
+        if not ranges or not _has_stale_values(variables):
+            print(f"[extract_variables] All values look valid on attempt {attempt + 1}")
+            break
+        stale = _get_stale_variables(variables)
+        if attempt < max_retries:
+            print(f"[extract_variables] Stale values detected: {stale}. Retrying...")
+        else:
+            print(f"[extract_variables] WARNING: Still have stale values after {max_retries + 1} attempts: {stale}. Proceeding with current values.")
+    return variables, remapped, noi_values
+
+
+async def run_intermediate_pipeline(
+    copied_sheet_id,
+    copied_sheet_url,
+    mapped_values,
+    market_json,
+    rental_assumptions_json,
+    rental_growth_json,
+    amenity_income_json,
+    expenses_json,
+    operating_expenses_json,
+    retail_income_json,
+    development_model,
+    development_units_json,
+    address,
+    property_name,
+    mapping_scope=None
+):
+    """Same inputs and result as update_google_sheet_and_get_values_intermediate."""
+    print("📤 Starting Google Sheet generation workflow intermediate (async)...")
+    timings = {}
+    client = await _sheets_client()
+
+    # Step 1: mapping read overlapped with the gspread metadata load
+    t0 = time.time()
+    result, spreadsheet = await asyncio.gather(
+        client.batch_get(copied_sheet_id, MAPPING_RANGES, valueRenderOption='FORMULA'),
+        asyncio.to_thread(gs_client.open_by_key, copied_sheet_id),
+    )
+    df, variable_data = _mapping_from_batch(result)
+    remember_mapping(mapping_scope, copied_sheet_id, df)
+    t1 = time.time()
+    timings['load_mapping'] = t1 - t0
+    print(f"✅ Loaded model variable mapping with {len(df)} rows in {timings['load_mapping']:.3f}s")
+
+    # Step 2: cell-level values, then the structured inserts/formulas (blocking gspread writes)
+    await asyncio.to_thread(update_copied_sheet_values, copied_sheet_id, mapped_values, df)
+    t2 = time.time()
+    timings['update_sheet'] = t2 - t1
+    await asyncio.to_thread(functools.partial(
+        run_full_sheet_update,
+        spreadsheet,
+        market_json=market_json,
+        rental_assumptions_json=rental_assumptions_json,
+        rental_growth_json=rental_growth_json,
+        amenity_income_json=amenity_income_json,
+        expenses_json=expenses_json,
+        model_variable_mapping=df,
+        address=address,
+        retail_income=retail_income_json,
+        operating_expenses_json=operating_expenses_json,
+        property_name=property_name,
+        development_model=development_model,
+        development_units_json=development_units_json
+    ))
+    t3 = time.time()
+    timings['run_full_sheet_update'] = t3 - t2
+
+    # Step 3: variables, re-read mapping (growth rates) and NOI together
+    variables, remapped, noi_values = await _final_reads(client, copied_sheet_id, variable_data)
+    if remapped is not None:
+        df, _ = _mapping_from_batch(remapped)
+    t4 = time.time()
+    timings['extract_variables'] = t4 - t3
+    timings['total'] = t4 - t0
+    print(f"⏱️ Timings (async): {timings}")
+
+    return {
+        "sheet_url": copied_sheet_url,
+        "levered_irr": variables.get("Levered IRR"),
+        "levered_moic": variables.get("Levered MOIC"),
+        "variables": variables,
+        "model_mapping": df.to_records(),
+        "variable_mapping": variable_data,
+        "timings": timings,
+        "NOI": noi_values,
+    }
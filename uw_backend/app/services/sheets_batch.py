@@ -0,0 +1,445 @@
+"""
+Optimizer for spreadsheets.batchUpdate request lists.
+
+run_full_sheet_update assembles its requests from dozens of builders, so the combined list
+has nested lists, empty entries, repeated format blocks and runs of adjacent ranges.
+optimize_requests rewrites it without changing what the sheet ends up looking like:
+
+  1. flatten nested lists and drop no-ops (None, {}, empty lists, zero-size ranges);
+  2. drop an idempotent request (repeatCell, updateCells, borders, merges, ...) that
+     repeats an earlier one, but only if nothing in between touches its cells or
+     changes the structure of its sheet;
+  3. merge consecutive repeatCell requests with the same cell/fields whose ranges are
+     adjacent (or overlapping) into one rectangle;
+  4. combine consecutive insertDimension requests on the same sheet and dimension when
+     the second inserts inside or right after the block the first created.
+
+Requests are never reordered. Set SHEETS_OPTIMIZE_REQUESTS=false to send lists unchanged.
+
+dispatch_batch_update / dispatch_values_update send large payloads in chunks bounded by
+SHEETS_WRITE_MAX_BYTES and SHEETS_WRITE_MAX_CELLS, under the shared write quota. Structural
+chunks go out in order; value chunks are pipelined on SHEETS_WRITE_WORKERS threads. Failed
+chunks are retried only when resending can't apply anything twice. Per-chunk latency is
+logged and kept for /api/health/sheets_writes.
+"""
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+
+from app.utils.a1 import GridRange
+from app.services.sheets_concurrency import write_quota
+
+logger = logging.getLogger(__name__)
+
+OPTIMIZE_REQUESTS = os.getenv("SHEETS_OPTIMIZE_REQUESTS", "true").lower() == "true"
+
+# Re-applying these with the same body leaves the sheet unchanged
+IDEMPOTENT = {"repeatCell", "updateCells", "updateBorders", "updateDimensionProperties",
+              "mergeCells", "unmergeCells", "setDataValidation"}
+# Request types that only touch the cells in their range(s); anything else counts as structural
+CELL_SCOPED = IDEMPOTENT | {"addConditionalFormatRule", "findReplace", "autoResizeDimensions"}
+DIMENSION_RANGED = {"updateDimensionProperties", "insertDimension", "deleteDimension", "autoResizeDimensions"}
+
+
+def payload_bytes(obj):
+    return len(json.dumps(obj, separators=(",", ":"), default=str))
+
+
+def flatten_requests(requests):
+    """Nested lists of requests -> one flat list of request dicts (falsy entries dropped)."""
+    flat = []
+    stack = [iter(requests or [])]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, (list, tuple)):
+                stack.append(iter(item))
+                break
+            if item:
+                flat.append(item)
+        else:
+            stack.pop()
+    return flat
+
+
+def _kind(request):
+    return next(iter(request)) if len(request) == 1 else None
+
+
+def _grid_rects(request):
+    """
+    [(sheet_id, row_start, row_end, col_start, col_end)] a request touches; None bounds are
+    unbounded. Returns None when the footprint can't be determined.
+    """
+    kind = _kind(request)
+    body = request.get(kind) if kind else None
+    if not isinstance(body, dict):
+        return None
+    if kind in DIMENSION_RANGED:
+        ranges = [body.get("range") or body.get("dimensions")]
+        rects = []
+        for dim in ranges:
+            if not isinstance(dim, dict):
+                return None
+            span = (dim.get("startIndex"), dim.get("endIndex"))
+            rows = span if dim.get("dimension") == "ROWS" else (None, None)
+            cols = span if dim.get("dimension") == "COLUMNS" else (None, None)
+            rects.append((dim.get("sheetId", 0), *rows, *cols))
+        return rects
+    if kind == "addConditionalFormatRule":
+        ranges = (body.get("rule") or {}).get("ranges")
+    elif kind == "updateCells" and "start" in body:
+        start = body["start"]
+        ranges = [{"sheetId": start.get("sheetId", 0), "startRowIndex": start.get("rowIndex", 0),
+                   "startColumnIndex": start.get("columnIndex", 0)}]
+    elif kind == "findReplace":
+        ranges = [body["range"]] if "range" in body else None
+    else:
+        ranges = [body.get("range")] if "range" in body else None
+    if not ranges:
+        return None
+    return [(r.get("sheetId", 0), r.get("startRowIndex"), r.get("endRowIndex"),
+             r.get("startColumnIndex"), r.get("endColumnIndex")) for r in ranges if isinstance(r, dict)]
+
+
+def _spans_overlap(a_start, a_end, b_start, b_end):
+    return (a_end is None or b_start is None or b_start < a_end) and \
+           (b_end is None or a_start is None or a_start < b_end)
+
+
+def _rects_overlap(a, b):
+    return a[0] == b[0] and _spans_overlap(a[1], a[2], b[1], b[2]) and _spans_overlap(a[3], a[4], b[3], b[4])
+
+
+def _conflicts(request, rects):
+    """Whether `request`, sitting between two copies of a request covering `rects`, could change its effect."""
+    other = _grid_rects(request)
+    sheets = {rect[0] for rect in rects}
+    if _kind(request) not in CELL_SCOPED:
+        # Structural changes shift coordinates on their sheet; an unknown footprint could be anywhere
+        return other is None or any(rect[0] in sheets for rect in other)
+    if other is None:
+        return True
+    return any(_rects_overlap(a, b) for a in other for b in rects)
+
+
+def _is_noop(request):
+    kind = _kind(request)
+    body = request.get(kind) if kind else None
+    if not isinstance(body, dict):
+        return False
+    if kind in ("insertDimension", "deleteDimension"):
+        dim = body.get("range") or {}
+        start, end = dim.get("startIndex"), dim.get("endIndex")
+        return start is not None and end is not None and end <= start
+    if kind in ("repeatCell", "updateBorders", "mergeCells", "unmergeCells", "setDataValidation"):
+        grid = body.get("range") or {}
+        return any(grid.get(f"start{axis}Index") is not None and grid.get(f"end{axis}Index") is not None
+                   and grid[f"end{axis}Index"] <= grid[f"start{axis}Index"] for axis in ("Row", "Column"))
+    return False
+
+
+def drop_duplicates(requests):
+    kept = []
+    last_seen = {}  # serialized request -> index in kept
+    dropped = 0
+    for request in requests:
+        kind = _kind(request)
+        if kind not in IDEMPOTENT:
+            kept.append(request)
+            continue
+        key = json.dumps(request, sort_keys=True, default=str)
+        index = last_seen.get(key)
+        rects = _grid_rects(request)
+        if index is not None and rects is not None and not any(_conflicts(r, rects) for r in kept[index + 1:]):
+            dropped += 1
+            continue
+        last_seen[key] = len(kept)
+        kept.append(request)
+    return kept, dropped
+
+
+def _merged_grid(a, b):
+    """Union of two GridRanges if it is exactly a rectangle, else None."""
+    if a.get("sheetId", 0) != b.get("sheetId", 0):
+        return None
+    for along, across in (("Row", "Column"), ("Column", "Row")):
+        if (a.get(f"start{across}Index"), a.get(f"end{across}Index")) != (b.get(f"start{across}Index"), b.get(f"end{across}Index")):
+            continue
+        a_start, a_end = a.get(f"start{along}Index"), a.get(f"end{along}Index")
+        b_start, b_end = b.get(f"start{along}Index"), b.get(f"end{along}Index")
+        if None in (a_start, a_end, b_start, b_end) or b_start > a_end or a_start > b_end:
+            continue
+        merged = dict(a)
+        merged[f"start{along}Index"] = min(a_start, b_start)
+        merged[f"end{along}Index"] = max(a_end, b_end)
+        return merged
+    return None
+
+
+def merge_repeat_cells(requests):
+    out = []
+    merged_count = 0
+    for request in requests:
+        previous = out[-1] if out else None
+        if previous and _kind(request) == "repeatCell" and _kind(previous) == "repeatCell":
+            a, b = previous["repeatCell"], request["repeatCell"]
+            if a.get("cell") == b.get("cell") and a.get("fields") == b.get("fields"):
+                grid = _merged_grid(a.get("range") or {}, b.get("range") or {})
+                if grid is not None:
+                    out[-1] = {"repeatCell": {**a, "range": grid}}
+                    merged_count += 1
+                    continue
+        out.append(request)
+    return out, merged_count
+
+
+def merge_inserts(requests):
+    out = []
+    merged_count = 0
+    for request in requests:
+        previous = out[-1] if out else None
+        if previous and _kind(request) == "insertDimension" and _kind(previous) == "insertDimension":
+            a, b = previous["insertDimension"], request["insertDimension"]
+            ra, rb = a.get("range") or {}, b.get("range") or {}
+            same_axis = (ra.get("sheetId", 0), ra.get("dimension")) == (rb.get("sheetId", 0), rb.get("dimension"))
+            bounds = (ra.get("startIndex"), ra.get("endIndex"), rb.get("startIndex"), rb.get("endIndex"))
+            # Rows inserted inside (or right after) the block just inserted inherit the same
+            # formatting the block did, so one larger insert is equivalent
+            if same_axis and None not in bounds and bool(a.get("inheritFromBefore")) == bool(b.get("inheritFromBefore")) \
+                    and bounds[0] <= bounds[2] <= bounds[1]:
+                combined = dict(ra, endIndex=bounds[1] + bounds[3] - bounds[2])
+                out[-1] = {"insertDimension": {**a, "range": combined}}
+                merged_count += 1
+                continue
+        out.append(request)
+    return out, merged_count
+
+
+def optimize_requests(requests, label="batchUpdate"):
+    """Returns (optimized request list, stats dict). See the module docstring for the passes."""
+    flat = flatten_requests(requests)
+    stats = {"entries_in": len(requests or []), "requests_in": len(flat), "bytes_in": payload_bytes(requests or [])}
+    if not OPTIMIZE_REQUESTS:
+        stats.update(requests_out=len(flat), bytes_out=payload_bytes(flat))
+        return flat, stats
+
+    optimized = [request for request in flat if not _is_noop(request)]
+    stats["noops"] = len(flat) - len(optimized)
+    optimized, stats["duplicates"] = drop_duplicates(optimized)
+    optimized, stats["merged_formats"] = merge_repeat_cells(optimized)
+    optimized, stats["merged_inserts"] = merge_inserts(optimized)
+    stats.update(requests_out=len(optimized), bytes_out=payload_bytes(optimized))
+    logger.info(
+        "%s optimized: %d -> %d requests, %d -> %d bytes (noops=%d duplicates=%d merged_formats=%d merged_inserts=%d)",
+        label, stats["requests_in"], stats["requests_out"], stats["bytes_in"], stats["bytes_out"],
+        stats["noops"], stats["duplicates"], stats["merged_formats"], stats["merged_inserts"],
+        extra={"batch_stats": stats},
+    )
+    return optimized, stats
+
+
+# --- Chunked, retried dispatch ---
+
+WRITE_WORKERS = int(os.getenv("SHEETS_WRITE_WORKERS", 4))
+WRITE_RETRIES = int(os.getenv("SHEETS_WRITE_RETRIES", 3))
+MAX_CHUNK_BYTES = int(os.getenv("SHEETS_WRITE_MAX_BYTES", 1_000_000))
+MAX_CHUNK_CELLS = int(os.getenv("SHEETS_WRITE_MAX_CELLS", 20_000))
+# Rejected before anything was applied: safe to resend any chunk
+REJECTED_STATUSES = (429, 503)
+# Gateway/server errors can arrive after the batchUpdate was applied: resend idempotent chunks only
+AMBIGUOUS_STATUSES = (500, 502, 504)
+
+_write_executor = ThreadPoolExecutor(max_workers=WRITE_WORKERS, thread_name_prefix="sheets-write")
+_recent_chunks = deque(maxlen=200)
+
+
+def _status(error):
+    # gspread's APIError carries a requests.Response (falsy for error statuses), HttpError a .resp
+    response = getattr(error, "response", None)
+    if response is None:
+        response = getattr(error, "resp", None)
+    status = getattr(response, "status_code", None)
+    return status if status is not None else getattr(response, "status", None)
+
+
+def _retryable(error, idempotent):
+    """
+    429 and 503 mean the call was refused before it ran, so any chunk can be resent. A 500,
+    502 or 504, a timeout or a dropped connection may come back after the batchUpdate was
+    applied, so only chunks that are safe to apply twice (not inserts) are resent.
+    """
+    status = _status(error)
+    if status is not None:
+        status = int(status)
+        if status in REJECTED_STATUSES:
+            return True
+        return idempotent and status in AMBIGUOUS_STATUSES
+    if isinstance(error, (Timeout, RequestsConnectionError)):
+        return idempotent
+    return False
+
+
+def request_cells(request):
+    body = request.get(_kind(request)) if _kind(request) else None
+    if isinstance(body, dict) and "rows" in body:
+        return sum(len(row.get("values", [])) for row in body["rows"])
+    return 1
+
+
+def entry_cells(entry):
+    return sum(len(row) for row in entry.get("values", []) if isinstance(row, (list, tuple))) or 1
+
+
+def chunk_items(items, measure):
+    """Consecutive chunks bounded by MAX_CHUNK_BYTES and MAX_CHUNK_CELLS (an oversized item gets its own)."""
+    chunks, current, size, cells = [], [], 0, 0
+    for item in items:
+        item_size, item_cells = payload_bytes(item), measure(item)
+        if current and (size + item_size > MAX_CHUNK_BYTES or cells + item_cells > MAX_CHUNK_CELLS):
+            chunks.append(current)
+            current, size, cells = [], 0, 0
+        current.append(item)
+        size += item_size
+        cells += item_cells
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _grid(entry):
+    try:
+        return GridRange.from_a1(entry["range"])
+    except (KeyError, ValueError):
+        return None
+
+
+def split_value_entry(entry):
+    """Split one oversized values entry into row slices that each fit MAX_CHUNK_CELLS."""
+    rows = entry.get("values") or []
+    grid = _grid(entry)
+    width = max((len(row) for row in rows if isinstance(row, (list, tuple))), default=1) or 1
+    if grid is None or entry.get("majorDimension") == "COLUMNS" or len(rows) * width <= MAX_CHUNK_CELLS or len(rows) < 2:
+        return [entry]
+    step = max(1, MAX_CHUNK_CELLS // width)
+    anchored = grid.shape == (1, 1)  # a single anchor cell: the API extends it to fit the values
+    pieces = []
+    for offset in range(0, len(rows), step):
+        part = rows[offset:offset + step]
+        start_row = grid.start_row + offset
+        if anchored:
+            piece_range = GridRange(start_row, grid.start_col, sheet=grid.sheet)
+        else:
+            piece_range = GridRange(start_row, grid.start_col, start_row + len(part) - 1, grid.end_col, grid.sheet)
+        pieces.append({**entry, "range": piece_range.a1, "values": part})
+    return pieces
+
+
+def _record(kind, label, index, items, cells, size, started, attempts):
+    record = {"kind": kind, "label": label, "chunk": index, "items": items, "cells": cells, "bytes": size,
+              "ms": round((time.perf_counter() - started) * 1000, 1), "attempts": attempts}
+    _recent_chunks.append(record)
+    return record
+
+
+def _send(kind, label, index, chunk, call, idempotent, measure):
+    size, cells = payload_bytes(chunk), sum(measure(item) for item in chunk)
+    started = time.perf_counter()
+    for attempt in range(WRITE_RETRIES + 1):
+        write_quota.acquire()
+        try:
+            call(chunk)
+            return _record(kind, label, index, len(chunk), cells, size, started, attempt + 1)
+        except Exception as e:
+            if attempt >= WRITE_RETRIES or not _retryable(e, idempotent):
+                logger.error("%s chunk %d failed after %d attempt(s): %s", label, index, attempt + 1, e)
+                raise
+            delay = min(2 ** attempt, 16) + random.random()
+            logger.warning("%s chunk %d attempt %d failed (%s); retrying in %.1fs", label, index, attempt + 1, e, delay)
+            time.sleep(delay)
+
+
+def dispatch_batch_update(spreadsheet, requests, label="batchUpdate"):
+    """
+    spreadsheet.batch_update in size-bounded chunks, sent one after another so later
+    requests still see the inserts of earlier ones. Returns the per-chunk records.
+    """
+    requests = flatten_requests(requests)
+    records = []
+    for index, chunk in enumerate(chunk_items(requests, request_cells)):
+        idempotent = all(_kind(request) in IDEMPOTENT for request in chunk)
+        records.append(_send("batch_update", label, index, chunk,
+                             lambda part: spreadsheet.batch_update({"requests": part}), idempotent, request_cells))
+    _log_dispatch(label, records)
+    return records
+
+
+def dispatch_values_update(spreadsheet, data, value_input_option="USER_ENTERED", label="values_batch_update"):
+    """
+    spreadsheet.values_batch_update in size-bounded chunks sent concurrently. A chunk whose
+    ranges overlap an earlier chunk's (or can't be parsed) waits for that chunk, so the last
+    write to a cell still wins. Writing values is idempotent, so failed chunks are resent.
+    """
+    entries = [piece for entry in flatten_requests(data) for piece in split_value_entry(entry)]
+    chunks = chunk_items(entries, entry_cells)
+    footprints = [[_grid(entry) for entry in chunk] for chunk in chunks]
+
+    def overlaps(a, b):
+        for x in a:
+            for y in b:
+                if x is None or y is None:
+                    return True
+                if x.sheet == y.sheet and x.start_row <= y.end_row and y.start_row <= x.end_row \
+                        and x.start_col <= y.end_col and y.start_col <= x.end_col:
+                    return True
+        return False
+
+    def call(part):
+        spreadsheet.values_batch_update({"valueInputOption": value_input_option, "data": part})
+
+    futures = []
+    try:
+        for index, chunk in enumerate(chunks):
+            for earlier, future in enumerate(futures):
+                if overlaps(footprints[earlier], footprints[index]):
+                    future.result()
+            futures.append(_write_executor.submit(_send, "values", label, index, chunk, call, True, entry_cells))
+        records = [future.result() for future in futures]
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+    _log_dispatch(label, records)
+    return records
+
+
+def _log_dispatch(label, records):
+    if records:
+        logger.info("%s: %d chunk(s), %d items, %d bytes, chunk ms %s", label, len(records),
+                    sum(r["items"] for r in records), sum(r["bytes"] for r in records),
+                    [r["ms"] for r in records], extra={"chunks": records})
+
+
+def write_stats():
+    recent = list(_recent_chunks)
+    by_kind = {}
+    for record in recent:
+        by_kind.setdefault(record["kind"], []).append(record["ms"])
+    summary = {}
+    for kind, samples in by_kind.items():
+        samples.sort()
+        summary[kind] = {"chunks": len(samples), "p50_ms": samples[len(samples) // 2],
+                         "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))], "max_ms": samples[-1]}
+    return {
+        "workers": WRITE_WORKERS,
+        "max_chunk_bytes": MAX_CHUNK_BYTES,
+        "max_chunk_cells": MAX_CHUNK_CELLS,
+        "quota_wait_seconds": round(write_quota.waited_seconds, 3),
+        "latency": summary,
+        "recent_chunks": recent[-20:],
+    }
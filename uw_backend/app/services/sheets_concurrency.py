@@ -0,0 +1,170 @@
+"""
+Concurrent Sheets API reads on a bounded pool.
+
+Independent requests (batchGet chunks, per-table grid reads) are fanned out on one
+shared pool (SHEETS_READ_WORKERS, kept at or below the transport's 10 pooled
+connections). Every request first takes a token from the process-wide quota limiter
+(`read_quota`, SHEETS_READ_REQUESTS_PER_MINUTE with a SHEETS_READ_BURST allowance),
+so parallel requests from several users still stay inside the Sheets per-minute quota.
+Results always come back in request order, whatever order they finish in.
+
+batch_get_values sizes its batchGet chunks from observed latency: it aims for about
+SHEETS_READ_TARGET_SECONDS per request, and never uses fewer chunks than needed to
+keep the pool busy.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+READ_WORKERS = int(os.getenv("SHEETS_READ_WORKERS", 6))
+READ_RETRIES = int(os.getenv("SHEETS_READ_RETRIES", 2))
+TARGET_SECONDS = float(os.getenv("SHEETS_READ_TARGET_SECONDS", 2.0))
+MIN_CHUNK = int(os.getenv("SHEETS_READ_MIN_CHUNK", 10))
+MAX_CHUNK = int(os.getenv("SHEETS_READ_MAX_CHUNK", 100))
+
+_executor = ThreadPoolExecutor(max_workers=READ_WORKERS, thread_name_prefix="sheets-read")
+
+
+class QuotaLimiter:
+    """Token bucket shared by every thread (and the async pipeline) in the process."""
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _take(self):
+        """Take a token if one is free (returns 0), else return the seconds until the next one."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            wait = (1 - self._tokens) / self.rate
+            self.waited_seconds += wait
+            return wait
+
+    def acquire(self):
+        while (wait := self._take()):
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        while (wait := self._take()):
+            await asyncio.sleep(wait)
+
+
+read_quota = QuotaLimiter(float(os.getenv("SHEETS_READ_REQUESTS_PER_MINUTE", 300)),
+                          int(os.getenv("SHEETS_READ_BURST", 20)))
+# Writes have their own (smaller) per-user quota; used by the chunked write dispatcher in sheets_batch
+write_quota = QuotaLimiter(float(os.getenv("SHEETS_WRITE_REQUESTS_PER_MINUTE", 60)),
+                           int(os.getenv("SHEETS_WRITE_BURST", 10)))
+
+
+class AdaptiveChunker:
+    """Moving average of seconds per range in a batchGet, used to pick the next chunk size."""
+
+    def __init__(self, initial_chunk=30, alpha=0.3):
+        self.alpha = alpha
+        self._seconds_per_range = None
+        self._initial = initial_chunk
+        self._lock = threading.Lock()
+
+    def record(self, ranges, seconds):
+        if ranges <= 0:
+            return
+        sample = seconds / ranges
+        with self._lock:
+            if self._seconds_per_range is None:
+                self._seconds_per_range = sample
+            else:
+                self._seconds_per_range += self.alpha * (sample - self._seconds_per_range)
+
+    def chunk_size(self, total_ranges):
+        with self._lock:
+            per_range = self._seconds_per_range
+        by_latency = self._initial if not per_range else int(TARGET_SECONDS / per_range)
+        # Enough chunks to keep the pool busy, but never fewer ranges per call than MIN_CHUNK
+        by_parallelism = math.ceil(total_ranges / READ_WORKERS)
+        return max(MIN_CHUNK, min(MAX_CHUNK, by_latency, by_parallelism))
+
+    def stats(self):
+        with self._lock:
+            return {"seconds_per_range": self._seconds_per_range}
+
+
+batch_get_chunker = AdaptiveChunker()
+
+
+def _execute(request, http):
+    read_quota.acquire()
+    return request.execute(http=http, num_retries=READ_RETRIES)
+
+
+def execute_all(requests, http=None, return_exceptions=False):
+    """
+    Execute googleapiclient requests concurrently and return their results in order.
+    Pass a thread-safe (requests-based) `http`; httplib2 clients must not be shared
+    across threads. With return_exceptions, a failed request yields its exception.
+    """
+    futures = [_executor.submit(_execute, request, http) for request in requests]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            if not return_exceptions:
+                for pending in futures:
+                    pending.cancel()
+                raise
+            results.append(e)
+    return results
+
+
+def batch_get_values(sheets_service, spreadsheet_id, ranges, http=None, **params):
+    """
+    values().batchGet over `ranges` in concurrent, adaptively sized chunks.
+    Returns one valueRange per input range, in input order.
+    """
+    if not ranges:
+        return []
+    size = batch_get_chunker.chunk_size(len(ranges))
+    chunks = [ranges[i:i + size] for i in range(0, len(ranges), size)]
+
+    def timed(chunk):
+        request = sheets_service.spreadsheets().values().batchGet(spreadsheetId=spreadsheet_id, ranges=chunk, **params)
+        started = time.perf_counter()
+        result = _execute(request, http)
+        batch_get_chunker.record(len(chunk), time.perf_counter() - started)
+        return result
+
+    started = time.perf_counter()
+    futures = [_executor.submit(timed, chunk) for chunk in chunks]
+    value_ranges = []
+    try:
+        for chunk, future in zip(chunks, futures):
+            returned = future.result().get("valueRanges", [])
+            # Pad so every input range keeps its position even if the API drops one
+            value_ranges.extend(returned[:len(chunk)] + [{}] * (len(chunk) - len(returned)))
+    except Exception:
+        for pending in futures:
+            pending.cancel()
+        raise
+    print(f"📦 batchGet {len(ranges)} ranges in {len(chunks)} chunks of ≤{size} "
+          f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+    return value_ranges
+
+
+def read_stats():
+    return {
+        "workers": READ_WORKERS,
+        "quota_wait_seconds": round(read_quota.waited_seconds, 3),
+        "batch_get": batch_get_chunker.stats(),
+    }
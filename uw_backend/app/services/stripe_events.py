@@ -0,0 +1,318 @@
+"""
+Stripe webhook intake and ordered, idempotent application.
+
+The webhook route only verifies the signature and stores the raw event (record_event);
+Stripe's retries hit the unique stripe_event_id and are dropped there. A worker then
+applies pending events customer by customer in Stripe `created` order, holding a
+per-customer advisory lock, so concurrent workers never interleave one customer's
+events and a late delivery can't roll a subscription back to an older state.
+
+The webhook route applies the event's customer queue right after the durable insert
+(apply_customer_inline), so nothing waits on background CPU, which Cloud Run throttles
+between requests. A thread (start_worker, disable with STRIPE_WEBHOOK_INLINE_WORKER=false)
+remains as a fallback for customers that were busy or have events awaiting retry, and
+stripe_events_replay.py can drive the same passes from a scheduler.
+"""
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.user import User, SubscriptionEvent, StripeWebhookEvent
+from app.services.subscription_state import mark_synced
+
+logger = logging.getLogger(__name__)
+
+PRICE_ID_MAX = os.environ.get("PRICE_ID_MAX")
+PRICE_ID_PRO = os.environ.get("PRICE_ID_PRO")
+PRICE_ID_FREEMIUM = os.environ.get("PRICE_ID_FREEMIUM")
+
+PRICE_ID_MAP = {
+    PRICE_ID_MAX: "max",
+    PRICE_ID_PRO: "pro",
+    PRICE_ID_FREEMIUM: "freemium"
+}
+
+TIER_PRICE_MAP = {
+    "max": PRICE_ID_MAX,
+    "pro": PRICE_ID_PRO,
+    "freemium": PRICE_ID_FREEMIUM
+}
+
+SUBSCRIPTION_EVENTS = ("customer.subscription.created", "customer.subscription.updated", "customer.subscription.deleted")
+STATE_EVENTS = SUBSCRIPTION_EVENTS + ("invoice.payment_failed",)
+HANDLED_EVENTS = STATE_EVENTS + ("checkout.session.completed",)
+
+MAX_ATTEMPTS = int(os.getenv("STRIPE_WEBHOOK_MAX_ATTEMPTS", 5))
+WORKER_POLL_SECONDS = float(os.getenv("STRIPE_WORKER_POLL_SECONDS", 5))
+CUSTOMERS_PER_PASS = 50
+
+
+def event_customer_id(event):
+    obj = (event.get("data") or {}).get("object") or {}
+    if obj.get("object") == "customer":
+        return obj.get("id")
+    customer = obj.get("customer")
+    if isinstance(customer, dict):
+        customer = customer.get("id")
+    return customer
+
+
+def record_event(session, event):
+    """Store a verified event dict once. Returns False for a redelivery of a known event id."""
+    stmt = pg_insert(StripeWebhookEvent.__table__).values(
+        id=uuid.uuid4(),
+        stripe_event_id=event["id"],
+        event_type=event.get("type") or "",
+        customer_id=event_customer_id(event),
+        stripe_created=event.get("created"),
+        payload=event,
+        status="pending",
+        attempts=0,
+    ).on_conflict_do_nothing(index_elements=["stripe_event_id"])
+    inserted = session.execute(stmt).rowcount == 1
+    session.commit()
+    return inserted
+
+
+def log_subscription_event(session, user_id, event_type, from_tier, to_tier, stripe_event_id):
+    """Audit row for a tier transition; one per Stripe event. Flushed in the caller's transaction."""
+    if not stripe_event_id:
+        return None
+    existing = session.query(SubscriptionEvent).filter(SubscriptionEvent.stripe_event_id == stripe_event_id).first()
+    if existing:
+        return existing
+    event = SubscriptionEvent(
+        user_id=user_id,
+        event_type=event_type,
+        from_tier=from_tier,
+        to_tier=to_tier,
+        stripe_event_id=stripe_event_id
+    )
+    session.add(event)
+    session.flush()
+    return event
+
+
+def _subscription_price_id(sub):
+    try:
+        items = sub.get("items", {}).get("data", [])
+        if items and items[0].get("price"):
+            return items[0]["price"].get("id")
+    except Exception:
+        pass
+    return None
+
+
+def _is_stale(session, record):
+    """A status-changing event older than one already applied for the same customer."""
+    if record.stripe_created is None or not record.customer_id:
+        return False
+    return session.query(StripeWebhookEvent.id).filter(
+        StripeWebhookEvent.customer_id == record.customer_id,
+        StripeWebhookEvent.status == "processed",
+        StripeWebhookEvent.event_type.in_(STATE_EVENTS),
+        StripeWebhookEvent.stripe_created > record.stripe_created,
+    ).first() is not None
+
+
+def apply_event(session, record):
+    """Apply one stored event to its user. Returns the resulting status: 'processed' or 'skipped'."""
+    event = record.payload
+    t = event.get("type")
+    data = (event.get("data") or {}).get("object") or {}
+    stripe_event_id = event.get("id")
+    customer_id = record.customer_id
+    if t not in HANDLED_EVENTS or not customer_id:
+        return "skipped"
+
+    user = session.query(User).filter(User.stripe_customer_id == customer_id).first()
+    if not user:
+        return "skipped"
+
+    if t == "checkout.session.completed":
+        if data.get("subscription"):
+            user.stripe_subscription_id = data.get("subscription")
+        return "processed"
+
+    if _is_stale(session, record):
+        return "skipped"
+
+    mark_synced(user)
+    if t == "invoice.payment_failed":
+        old_tier = user.plan_tier
+        user.plan_tier = "freemium"
+        user.subscription_status = "past_due"
+        log_subscription_event(session, user.id, "downgraded", old_tier, "freemium", stripe_event_id)
+        return "processed"
+
+    sub = data
+    status = sub.get("status")
+    price_id = _subscription_price_id(sub)
+    old_status = user.subscription_status
+    old_tier = user.plan_tier
+
+    user.subscription_status = status
+    user.current_period_end = sub.get("current_period_end")
+    user.cancel_at_period_end = bool(sub.get("cancel_at_period_end"))
+    if price_id:
+        user.plan_price_id = price_id
+    user.stripe_subscription_id = sub.get("id", user.stripe_subscription_id)
+
+    if t == "customer.subscription.deleted" or status in ("past_due", "unpaid", "canceled"):
+        if old_tier != "freemium":
+            user.plan_tier = "freemium"
+            log_subscription_event(session, user.id, "downgraded", old_tier, "freemium", stripe_event_id)
+
+    elif status == "active" and old_status in ("past_due", "unpaid", "incomplete"):
+        last_event = session.query(SubscriptionEvent).filter(
+            SubscriptionEvent.user_id == user.id,
+            SubscriptionEvent.event_type == "downgraded"
+        ).order_by(SubscriptionEvent.created_at.desc()).first()
+
+        if last_event and last_event.from_tier:
+            user.plan_tier = last_event.from_tier
+            log_subscription_event(session, user.id, "upgraded", "freemium", user.plan_tier, stripe_event_id)
+        elif price_id:
+            user.plan_tier = PRICE_ID_MAP.get(price_id, "freemium")
+
+    elif status in ("active", "trialing") and price_id:
+        user.plan_tier = PRICE_ID_MAP.get(price_id, "freemium")
+
+    return "processed"
+
+
+def process_customer(session, customer_id):
+    """
+    Apply one customer's pending events in order inside a single transaction.
+    A failing event stops the customer's queue (retried next pass) until it has
+    used MAX_ATTEMPTS, after which it is marked failed and the queue moves on.
+    Returns {status: count}, or None when another worker holds the customer.
+    """
+    lock_key = f"stripe:{customer_id or 'none'}"
+    if not session.execute(text("SELECT pg_try_advisory_xact_lock(hashtext(:key))"), {"key": lock_key}).scalar():
+        session.rollback()
+        return None
+
+    customer_filter = (StripeWebhookEvent.customer_id == customer_id) if customer_id else StripeWebhookEvent.customer_id.is_(None)
+    records = session.query(StripeWebhookEvent).filter(
+        StripeWebhookEvent.status == "pending", customer_filter
+    ).order_by(StripeWebhookEvent.stripe_created.asc().nulls_first(), StripeWebhookEvent.received_at.asc()).all()
+
+    counts = {}
+    for record in records:
+        record.attempts = (record.attempts or 0) + 1
+        try:
+            with session.begin_nested():
+                outcome = apply_event(session, record)
+            record.status = outcome
+            record.last_error = None
+            record.processed_at = datetime.utcnow()
+        except Exception as e:
+            record.last_error = f"{type(e).__name__}: {e}"[:2000]
+            logger.exception("Stripe event %s (%s) failed", record.stripe_event_id, record.event_type)
+            if record.attempts < MAX_ATTEMPTS:
+                counts["retry"] = counts.get("retry", 0) + 1
+                break
+            record.status = "failed"
+            record.processed_at = datetime.utcnow()
+            outcome = "failed"
+        counts[outcome] = counts.get(outcome, 0) + 1
+    session.commit()
+    return counts
+
+
+def apply_customer_inline(session_factory, event):
+    """
+    Apply the stored event's customer queue within the webhook request. Never raises: the
+    event is already stored, so a busy customer or a failure is left to the fallback worker.
+    """
+    try:
+        with session_factory() as session:
+            counts = process_customer(session, event_customer_id(event))
+    except Exception:
+        logger.exception("Inline apply of Stripe event %s failed; left for the worker", event.get("id"))
+        return None
+    if counts is None or counts.get("retry"):
+        notify_worker()
+    return counts
+
+
+def process_pending(session_factory, max_customers=CUSTOMERS_PER_PASS):
+    """One pass over the customers with the oldest pending events. Returns summed counts."""
+    with session_factory() as session:
+        customers = session.execute(text(
+            "SELECT customer_id FROM stripe_webhook_events WHERE status = 'pending' "
+            "GROUP BY customer_id ORDER BY MIN(received_at) LIMIT :limit"
+        ), {"limit": max_customers}).scalars().all()
+
+    totals = {}
+    for customer_id in customers:
+        with session_factory() as session:
+            counts = process_customer(session, customer_id)
+        if counts is None:
+            totals["busy"] = totals.get("busy", 0) + 1
+            continue
+        for key, value in counts.items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def drain(session_factory):
+    """Run passes until a pass makes no progress (only retries, busy customers or nothing left)."""
+    totals = {}
+    while True:
+        counts = process_pending(session_factory)
+        for key, value in counts.items():
+            totals[key] = totals.get(key, 0) + value
+        if not any(counts.get(k) for k in ("processed", "skipped", "failed")):
+            return totals
+
+
+def webhook_stats(session):
+    rows = session.execute(text(
+        "SELECT status, COUNT(*), EXTRACT(EPOCH FROM now() - MIN(received_at)) "
+        "FROM stripe_webhook_events GROUP BY status"
+    )).fetchall()
+    stats = {status: count for status, count, _ in rows}
+    oldest_pending = next((age for status, _, age in rows if status == "pending"), None)
+    stats["oldest_pending_seconds"] = round(float(oldest_pending), 1) if oldest_pending is not None else None
+    return stats
+
+
+# --- In-process worker ---
+_wakeup = threading.Event()
+_worker_started = False
+_worker_lock = threading.Lock()
+
+
+def notify_worker():
+    _wakeup.set()
+
+
+def start_worker(app):
+    """Start the fallback applier once per process (skipped when STRIPE_WEBHOOK_INLINE_WORKER=false)."""
+    global _worker_started
+    if os.getenv("STRIPE_WEBHOOK_INLINE_WORKER", "true").lower() != "true":
+        return
+    with _worker_lock:
+        if _worker_started:
+            return
+        _worker_started = True
+
+    def _run():
+        from app.db import db
+        while True:
+            _wakeup.wait(WORKER_POLL_SECONDS)
+            _wakeup.clear()
+            try:
+                with app.app_context():
+                    drain(lambda: Session(db.engine))
+            except Exception:
+                logger.exception("Stripe webhook worker pass failed")
+
+    threading.Thread(target=_run, name="stripe-webhook-worker", daemon=True).start()
@@ -0,0 +1,106 @@
+"""
+Subscription state served from the users table instead of live Stripe calls.
+
+The subscription columns on User are kept current by the webhook worker
+(stripe_events.apply_event) and by the billing routes, each stamping
+`subscription_synced_at`. Login paths read those columns directly; when a row is
+older than SUBSCRIPTION_STATE_TTL, schedule_refresh re-reads it from Stripe on a
+small background pool so the request never waits on Stripe.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import stripe
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+
+SUBSCRIPTION_STATE_TTL = int(os.getenv("SUBSCRIPTION_STATE_TTL", 3600))
+REFRESH_RETRY_SECONDS = int(os.getenv("SUBSCRIPTION_REFRESH_RETRY_SECONDS", 60))
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("SUBSCRIPTION_REFRESH_WORKERS", 2)),
+                               thread_name_prefix="subscription-refresh")
+_in_flight = set()
+_last_attempt = {}  # user id -> monotonic time of the last scheduled refresh
+_lock = threading.Lock()
+
+
+def mark_synced(user):
+    user.subscription_synced_at = datetime.utcnow()
+
+
+def is_stale(user):
+    if not user or not user.stripe_customer_id:
+        return False
+    synced_at = user.subscription_synced_at
+    return synced_at is None or datetime.utcnow() - synced_at > timedelta(seconds=SUBSCRIPTION_STATE_TTL)
+
+
+def refresh_user_subscription_from_stripe(session: Session, user: User) -> bool:
+    """
+    Best-effort refresh of the user's subscription fields from Stripe.
+    Returns True if an update was attempted, False if skipped.
+    """
+    if not user or not user.stripe_customer_id:
+        return False
+    try:
+        # Subscription items already carry their price objects, so one list call is enough
+        lst = stripe.Subscription.list(customer=user.stripe_customer_id, limit=1)
+        sub = lst.data[0] if getattr(lst, 'data', []) else None
+        if sub:
+            item = sub.get("items", {}).get("data", [None])[0]
+            price = item.get("price") if item else None
+            user.stripe_subscription_id = sub.get("id", user.stripe_subscription_id)
+            user.subscription_status = sub.get("status")
+            user.current_period_end = sub.get("current_period_end")
+            user.cancel_at_period_end = bool(sub.get("cancel_at_period_end"))
+            user.plan_price_id = (price or {}).get("id")
+        else:
+            user.stripe_subscription_id = None
+            user.subscription_status = None
+            user.current_period_end = None
+            user.cancel_at_period_end = None
+            user.plan_price_id = None
+        mark_synced(user)
+        session.commit()
+        return True
+    except Exception:
+        try:
+            session.rollback()
+        except Exception:
+            pass
+        return False
+
+
+def _refresh(app, user_id):
+    try:
+        with app.app_context():
+            from app.db import db
+            session = Session(db.engine)
+            try:
+                user = session.get(User, user_id)
+                if is_stale(user):
+                    refresh_user_subscription_from_stripe(session, user)
+            finally:
+                session.close()
+    except Exception as e:
+        print(f"⚠️ Background subscription refresh failed for {user_id}: {e}")
+    finally:
+        with _lock:
+            _in_flight.discard(user_id)
+
+
+def schedule_refresh(app, user):
+    """Queue a Stripe refresh for a stale user (at most one in flight and one per retry window). Never blocks."""
+    if not is_stale(user):
+        return False
+    now = time.monotonic()
+    with _lock:
+        if user.id in _in_flight or now - _last_attempt.get(user.id, -REFRESH_RETRY_SECONDS) < REFRESH_RETRY_SECONDS:
+            return False
+        _in_flight.add(user.id)
+        _last_attempt[user.id] = now
+    _executor.submit(_refresh, app, user.id)
+    return True
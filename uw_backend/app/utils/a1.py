@@ -0,0 +1,152 @@
+"""
+A1 / grid coordinates for the sheet payload builders.
+
+Rows and columns are 1-based, as in gspread's rowcol_to_a1 / a1_to_rowcol. Column
+letters for A..ZZ come from precomputed tables, so the monthly builders that resolve
+one letter per cell pay a tuple/dict lookup instead of a divmod loop. Parsing an A1
+reference is memoized, since the same mapped cells are parsed on every run.
+
+GridRange covers both shapes the code needs: an A1 range string for values calls and
+a 0-based, end-exclusive GridRange dict for batchUpdate requests.
+"""
+import re
+from functools import lru_cache
+
+TABLE_COLUMNS = 702  # A..ZZ
+_A1_RE = re.compile(r"^\$?([A-Za-z]{1,3})\$?(\d+)$")
+
+
+def _letters_for(col):
+    name = ""
+    while col > 0:
+        col, remainder = divmod(col - 1, 26)
+        name = chr(65 + remainder) + name
+    return name
+
+
+COLUMN_LETTERS = ("",) + tuple(_letters_for(col) for col in range(1, TABLE_COLUMNS + 1))
+COLUMN_INDEX = {letters: col for col, letters in enumerate(COLUMN_LETTERS) if col}
+
+
+def column_letter(col):
+    """1 -> 'A', 27 -> 'AA'."""
+    if 0 < col <= TABLE_COLUMNS:
+        return COLUMN_LETTERS[col]
+    if col < 1:
+        raise ValueError(f"Column index must be >= 1, got {col}")
+    return _letters_for(col)
+
+
+def column_index(letters):
+    """'A' -> 1, 'aa' -> 27; '$' anchors are ignored."""
+    key = letters.replace("$", "").upper()
+    col = COLUMN_INDEX.get(key)
+    if col is None:
+        if not key.isalpha() or not key.isascii():
+            raise ValueError(f"Invalid column letters: {letters!r}")
+        col = 0
+        for char in key:
+            col = col * 26 + (ord(char) - 64)
+    return col
+
+
+def column_letters(start, end):
+    """Every column letter from start to end inclusive; bounds are letters or 1-based indexes."""
+    first = column_index(start) if isinstance(start, str) else start
+    last = column_index(end) if isinstance(end, str) else end
+    return [column_letter(col) for col in range(first, last + 1)]
+
+
+def split_sheet(ref):
+    """"'My Sheet'!B2" -> ('My Sheet', 'B2'); 'B2' -> (None, 'B2'). Undoes quote_sheet exactly."""
+    ref = ref.strip().lstrip("=")
+    if "!" not in ref:
+        return None, ref
+    sheet, cell = ref.rsplit("!", 1)
+    sheet = sheet.strip()
+    if len(sheet) >= 2 and sheet[0] == sheet[-1] == "'":
+        sheet = sheet[1:-1].replace("''", "'")
+    elif len(sheet) >= 2 and sheet[0] == sheet[-1] == '"':
+        sheet = sheet[1:-1]
+    return sheet, cell.strip()
+
+
+@lru_cache(maxsize=4096)
+def parse_a1(ref):
+    """'B12', '$B$12' or 'Sheet!B12' -> (12, 2)."""
+    _, cell = split_sheet(ref)
+    match = _A1_RE.match(cell)
+    if not match:
+        raise ValueError(f"Invalid A1 cell reference: {ref}")
+    letters, row = match.groups()
+    return int(row), column_index(letters)
+
+
+def to_a1(row, col):
+    return f"{column_letter(col)}{row}"
+
+
+def quote_sheet(sheet):
+    """'O'Brien' -> "'O''Brien'"; split_sheet turns it back into the same name."""
+    return "'" + sheet.replace("'", "''") + "'"
+
+
+class GridRange:
+    """Inclusive, 1-based rectangle of cells, optionally on a named sheet."""
+
+    __slots__ = ("start_row", "start_col", "end_row", "end_col", "sheet")
+
+    def __init__(self, start_row, start_col, end_row=None, end_col=None, sheet=None):
+        self.start_row = start_row
+        self.start_col = start_col
+        self.end_row = start_row if end_row is None else end_row
+        self.end_col = start_col if end_col is None else end_col
+        self.sheet = sheet
+
+    @classmethod
+    def from_a1(cls, ref):
+        """'B2', 'B2:D9' or "'Sheet'!B2:D9"."""
+        sheet, cells = split_sheet(ref)
+        first, _, last = cells.partition(":")
+        start_row, start_col = parse_a1(first)
+        end_row, end_col = parse_a1(last) if last else (start_row, start_col)
+        return cls(start_row, start_col, end_row, end_col, sheet)
+
+    @classmethod
+    def from_corner(cls, corner, num_rows, num_cols, sheet=None):
+        start_row, start_col = parse_a1(corner)
+        return cls(start_row, start_col, start_row + num_rows - 1, start_col + num_cols - 1,
+                   sheet if sheet is not None else split_sheet(corner)[0])
+
+    @property
+    def shape(self):
+        return self.end_row - self.start_row + 1, self.end_col - self.start_col + 1
+
+    @property
+    def a1(self):
+        cells = to_a1(self.start_row, self.start_col)
+        if (self.end_row, self.end_col) != (self.start_row, self.start_col):
+            cells += ":" + to_a1(self.end_row, self.end_col)
+        return f"{quote_sheet(self.sheet)}!{cells}" if self.sheet else cells
+
+    def to_grid_range(self, sheet_id):
+        """The batchUpdate GridRange dict: 0-based, end-exclusive."""
+        return {
+            "sheetId": sheet_id,
+            "startRowIndex": self.start_row - 1,
+            "endRowIndex": self.end_row,
+            "startColumnIndex": self.start_col - 1,
+            "endColumnIndex": self.end_col,
+        }
+
+    def __eq__(self, other):
+        return isinstance(other, GridRange) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def _key(self):
+        return self.sheet, self.start_row, self.start_col, self.end_row, self.end_col
+
+    def __repr__(self):
+        return f"GridRange({self.a1!r})"
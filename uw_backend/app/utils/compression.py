@@ -0,0 +1,113 @@
+"""
+Response compression middleware.
+
+JSON/text responses above COMPRESS_MIN_BYTES are re-emitted as a streamed body: the
+response's own chunks are fed through the compressor as they are iterated (never joined
+into one buffer first), with brotli (when the `brotli` package is installed and the
+client accepts it) or gzip. Per-endpoint totals of raw vs sent bytes are kept in
+memory and served by GET /api/health/compression.
+"""
+import os
+import threading
+import zlib
+from flask import request
+
+try:
+    import brotli  # type: ignore
+except Exception:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+COMPRESS_CHUNK_BYTES = 64 * 1024
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", 5))
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/plain", "text/html", "text/csv"}
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _record(endpoint, encoding, raw_bytes, sent_bytes):
+    with _stats_lock:
+        entry = _stats.setdefault(endpoint, {'responses': 0, 'raw_bytes': 0, 'sent_bytes': 0, 'encodings': {}})
+        entry['responses'] += 1
+        entry['raw_bytes'] += raw_bytes
+        entry['sent_bytes'] += sent_bytes
+        entry['encodings'][encoding] = entry['encodings'].get(encoding, 0) + 1
+
+
+def compression_stats():
+    with _stats_lock:
+        return {
+            endpoint: {
+                **{k: v for k, v in entry.items() if k != 'encodings'},
+                'encodings': dict(entry['encodings']),
+                'bytes_saved': entry['raw_bytes'] - entry['sent_bytes'],
+                'ratio': round(entry['sent_bytes'] / entry['raw_bytes'], 4) if entry['raw_bytes'] else None,
+            }
+            for endpoint, entry in _stats.items()
+        }
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compressed_chunks(chunks, encoding, endpoint):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compress, finish = compressor.compress, compressor.flush
+
+    raw = sent = 0
+    for piece in chunks:
+        for start in range(0, len(piece), COMPRESS_CHUNK_BYTES):
+            block = piece[start:start + COMPRESS_CHUNK_BYTES]
+            raw += len(block)
+            chunk = compress(block)
+            if chunk:
+                sent += len(chunk)
+                yield chunk
+    tail = finish()
+    sent += len(tail)
+    yield tail
+    _record(endpoint, encoding, raw, sent)
+
+
+def compress_response(response):
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    length = response.calculate_content_length() or 0
+    endpoint = request.endpoint or request.path
+    encoding = _choose_encoding() if length >= COMPRESS_MIN_BYTES else None
+    if encoding is None:
+        _record(endpoint, 'identity', length, length)
+        return response
+
+    response.response = _compressed_chunks(response.iter_encoded(), encoding, endpoint)
+    response.headers['Content-Encoding'] = encoding
+    response.headers.pop('Content-Length', None)
+    # A strong ETag must differ per representation; http_cache accepts either form back
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
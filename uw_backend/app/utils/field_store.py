@@ -0,0 +1,87 @@
+"""
+Compact per-version field value store.
+
+Field values used to live one-row-per-field in `user_model_field_values`.
+They now live in `user_model_versions.field_values` as a single JSONB object
+keyed by field_id:
+
+    { "<field_id>": {"value": "...", "start_month": 1, "end_month": 12}, ... }
+
+Versions created before the backfill (see migrate_field_values_store.py)
+still have `field_values = NULL`; reads transparently fall back to the
+legacy rows for those.
+"""
+from app.models.model import UserModelFieldValue, ModelTypeSectionField
+
+
+def _to_month(value):
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def pack_field_values(field_values):
+    """Build the JSONB document from request-style field values (field_id/value/start_month/end_month)."""
+    packed = {}
+    for fv in field_values or []:
+        field_id = fv.get('field_id')
+        if not field_id:
+            continue
+        packed[str(field_id)] = {
+            'value': fv.get('value'),
+            'start_month': _to_month(fv.get('start_month')),
+            'end_month': _to_month(fv.get('end_month')),
+        }
+    return packed
+
+
+def write_field_values(user_model_version, field_values):
+    """Store all field values for a version in one column write."""
+    user_model_version.field_values = pack_field_values(field_values)
+    return user_model_version.field_values
+
+
+def load_field_values(session, user_model_version):
+    """
+    Return {field_id: {"value", "start_month", "end_month"}} for a version.
+    Falls back to legacy EAV rows when the version has not been backfilled.
+    """
+    if user_model_version.field_values is not None:
+        return user_model_version.field_values
+    rows = session.query(UserModelFieldValue).filter_by(user_model_version_id=user_model_version.id).all()
+    return {
+        str(fv.field_id): {
+            'value': fv.value,
+            'start_month': fv.start_month,
+            'end_month': fv.end_month,
+        } for fv in rows
+    }
+
+
+def read_field_values(session, user_model_version, field_key_lookup=None):
+    """
+    Return the version's field values as the list shape the API has always served:
+    [{field_id, field_key, value, start_month, end_month}, ...].
+
+    `field_key_lookup` ({field_id: field_key}) is normally built from the model type's
+    sections, which the caller already has; ids missing from it are resolved with a
+    single query instead of a join per read.
+    """
+    stored = load_field_values(session, user_model_version)
+    lookup = dict(field_key_lookup or {})
+    missing = [fid for fid in stored.keys() if fid not in lookup]
+    if missing:
+        rows = session.query(ModelTypeSectionField.id, ModelTypeSectionField.field_key).filter(
+            ModelTypeSectionField.id.in_(missing)
+        ).all()
+        lookup.update({str(fid): key for fid, key in rows})
+    return [{
+        'field_id': fid,
+        'field_key': lookup[fid],
+        'value': entry.get('value'),
+        'start_month': entry.get('start_month'),
+        'end_month': entry.get('end_month')
+    } for fid, entry in stored.items() if fid in lookup]
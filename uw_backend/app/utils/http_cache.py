@@ -0,0 +1,39 @@
+"""
+Conditional GET helpers for the heavy read endpoints.
+
+ETags are derived from what identifies the content (ids, updated_at stamps, schema
+version, response options) rather than by hashing the body, so a matching
+If-None-Match can short-circuit before any of the expensive loading runs.
+"""
+import hashlib
+from flask import request, current_app
+
+# Suffixes the compression middleware appends to an ETag for encoded bodies
+ENCODING_SUFFIXES = ("", "-gzip", "-br")
+
+
+def make_etag(*parts):
+    key = "|".join("" if p is None else (p.isoformat() if hasattr(p, "isoformat") else str(p)) for p in parts)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def etag_matches(etag):
+    """True when the request's If-None-Match names this ETag (in any content encoding)."""
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return False
+    return any(if_none_match.contains(etag + suffix) for suffix in ENCODING_SUFFIXES)
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    # Let browsers keep the body but always revalidate; responses are per-user
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified(etag):
+    """304 response for a matching If-None-Match, else None."""
+    if not etag_matches(etag):
+        return None
+    return with_etag(current_app.response_class(status=304), etag)
@@ -0,0 +1,179 @@
+"""
+Concurrent, cached image downloads for the data_url endpoints.
+
+Bucket URLs (public, signed or gs://) are read with the GCS client directly; anything
+else falls back to HTTP. Downloads run on one shared, bounded thread pool
+(IMAGE_FETCH_WORKERS). GCS content is cached in memory keyed by
+(bucket, object, generation), so an overwritten object is never served stale; the
+generation lookup itself is reused for IMAGE_GENERATION_TTL seconds. The cache is an
+LRU capped at IMAGE_CACHE_MAX_BYTES.
+"""
+import base64
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse, unquote
+import requests
+
+try:
+    from google.cloud import storage  # type: ignore
+except Exception:
+    storage = None
+
+FETCH_WORKERS = int(os.getenv("IMAGE_FETCH_WORKERS", 8))
+FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", 10))
+CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+GENERATION_TTL = float(os.getenv("IMAGE_GENERATION_TTL", 60))
+GENERATION_CACHE_SIZE = int(os.getenv("IMAGE_GENERATION_CACHE_SIZE", 4096))
+GCS_HOSTS = ("storage.googleapis.com", "storage.cloud.google.com")
+
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="image-fetch")
+_client = None
+_client_lock = threading.Lock()
+
+
+class ImageCache:
+    """Thread-safe LRU of (content, content_type) bounded by total bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def put(self, key, content, content_type):
+        size = len(content)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._items[key] = (content, content_type)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._items), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+cache = ImageCache(CACHE_MAX_BYTES)
+_generations = OrderedDict()  # (bucket, object) -> (generation, content_type, expires_at), LRU
+_generations_lock = threading.Lock()
+
+
+def _known_generation(key):
+    with _generations_lock:
+        known = _known_generation(key)
+        if known is not None:
+            _generations.move_to_end(key)
+        return known
+
+
+def _remember_generation(key, known):
+    with _generations_lock:
+        _remember_generation(key, known)
+        _generations.move_to_end(key)
+        while len(_generations) > GENERATION_CACHE_SIZE:
+            _generations.popitem(last=False)
+
+
+def gcs_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = storage.Client()
+    return _client
+
+
+def parse_gcs_url(url):
+    """(bucket, object) for gs:// and storage.googleapis.com URLs (signed or not), else None."""
+    if not url:
+        return None
+    p = urlparse(url)
+    if p.scheme == "gs":
+        bucket, object_name = p.netloc, unquote(p.path.lstrip("/"))
+    elif p.scheme == "https" and p.netloc in GCS_HOSTS:
+        parts = unquote(p.path.lstrip("/")).split("/", 1)
+        if len(parts) != 2:
+            return None
+        bucket, object_name = parts
+    else:
+        return None
+    return (bucket, object_name) if bucket and object_name else None
+
+
+def _fetch_gcs(bucket_name, object_name):
+    key = (bucket_name, object_name)
+    now = time.monotonic()
+    known = _known_generation(key)
+    bucket = gcs_client().bucket(bucket_name)
+    if known is None or known[2] < now:
+        blob = bucket.get_blob(object_name, timeout=FETCH_TIMEOUT)
+        if blob is None:
+            raise FileNotFoundError(f"gs://{bucket_name}/{object_name}")
+        known = (blob.generation, blob.content_type, now + GENERATION_TTL)
+        _remember_generation(key, known)
+    generation, content_type = known[0], known[1] or "image/jpeg"
+
+    cached = cache.get((bucket_name, object_name, generation))
+    if cached is not None:
+        return cached
+    blob = bucket.blob(object_name, generation=generation)
+    content = blob.download_as_bytes(timeout=FETCH_TIMEOUT)
+    cache.put((bucket_name, object_name, generation), content, content_type)
+    return content, content_type
+
+
+def _fetch_http(url):
+    resp = requests.get(url, timeout=FETCH_TIMEOUT)
+    resp.raise_for_status()
+    return resp.content, resp.headers.get("Content-Type") or "image/jpeg"
+
+
+def fetch_image(url):
+    """(content, content_type) for an image URL; raises on failure."""
+    gcs = parse_gcs_url(url) if storage is not None else None
+    if gcs:
+        try:
+            return _fetch_gcs(*gcs)
+        except Exception as e:
+            print(f"⚠️ GCS fetch failed for {gcs[0]}/{gcs[1]}, trying HTTP: {e}")
+    return _fetch_http(url)
+
+
+def to_data_url(content, content_type):
+    return f"data:{content_type};base64,{base64.b64encode(content).decode('ascii')}"
+
+
+def fetch_images(urls):
+    """
+    Download urls concurrently on the shared pool, yielding (index, content, content_type)
+    as each finishes; content and content_type are None for a failed download.
+    """
+    futures = {_executor.submit(fetch_image, url): i for i, url in enumerate(urls)}
+    for future in as_completed(futures):
+        try:
+            content, content_type = future.result()
+        except Exception as e:
+            print(f"⚠️ Image fetch failed for {urls[futures[future]]}: {e}")
+            content, content_type = None, None
+        yield futures[future], content, content_type
@@ -0,0 +1,141 @@
+"""
+Structured, level-gated logging.
+
+configure_logging installs one handler on the root logger that writes one JSON object
+per line ({"severity", "message", "logger", "request_id", ...}), the shape Cloud Run
+ingests as structured entries. LOG_FORMAT=text switches to plain lines for local runs.
+
+Levels: LOG_LEVEL sets the default (INFO), and LOG_LEVELS overrides per module, e.g.
+LOG_LEVELS="app.services.google_drive_service=DEBUG,app.routes.model=WARNING".
+
+Every request gets an id, taken from X-Request-ID (or the Cloud trace header) or
+generated (init_request_ids). It is attached to every record logged while the request is handled and is
+echoed back as X-Request-ID.
+
+Large payloads should go through summarize(): it renders counts and byte sizes instead
+of contents, and only when the record is actually emitted. Pass it as a %-argument
+(logger.debug("requests %s", summarize(reqs))), not in an f-string.
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+from flask import g, has_request_context, request
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+SUMMARY_SAMPLE_CHARS = int(os.getenv("LOG_SUMMARY_SAMPLE_CHARS", 0))
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def current_request_id():
+    return request_id_var.get()
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "severity": record.levelname,
+            "message": record.getMessage(),
+            "logger": record.name,
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        # Anything passed via extra={...} becomes a structured field
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and key not in entry and key != "request_id":
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class Summary:
+    """Lazy, size-capped description of a payload; only computed when a record is emitted."""
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def __str__(self):
+        payload = self.payload
+        try:
+            rendered = json.dumps(payload, default=str)
+        except Exception:
+            rendered = repr(payload)
+        parts = [type(payload).__name__]
+        if isinstance(payload, (list, tuple, set, dict)):
+            parts.append(f"count={len(payload)}")
+        if isinstance(payload, dict):
+            keys = list(payload)[:8]
+            parts.append(f"keys={keys}{'…' if len(payload) > 8 else ''}")
+        parts.append(f"bytes={len(rendered.encode('utf-8'))}")
+        if SUMMARY_SAMPLE_CHARS:
+            parts.append(f"sample={rendered[:SUMMARY_SAMPLE_CHARS]!r}")
+        return "<" + " ".join(parts) + ">"
+
+    __repr__ = __str__
+
+
+def summarize(payload):
+    return Summary(payload)
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    else:
+        handler.setFormatter(JsonFormatter())
+    handler.addFilter(RequestIdFilter())
+    root.addHandler(handler)
+    for name, level in _parse_levels(os.getenv("LOG_LEVELS")).items():
+        logging.getLogger(name).setLevel(level)
+
+
+def init_request_ids(app):
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def _start_request():
+    incoming = request.headers.get("X-Request-ID") or (request.headers.get("X-Cloud-Trace-Context") or "").split("/")[0]
+    g.request_id = incoming or uuid.uuid4().hex
+    g.request_started = time.perf_counter()
+    g.request_id_token = request_id_var.set(g.request_id)
+
+
+def _finish_request(response):
+    if has_request_context() and getattr(g, "request_id", None):
+        response.headers.setdefault("X-Request-ID", g.request_id)
+        logging.getLogger("app.request").info(
+            "%s %s %s", request.method, request.path, response.status_code,
+            extra={"duration_ms": round((time.perf_counter() - g.request_started) * 1000, 1),
+                   "status": response.status_code},
+        )
+        request_id_var.reset(g.request_id_token)
+    return response
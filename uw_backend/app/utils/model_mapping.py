@@ -0,0 +1,123 @@
+"""
+Indexed, in-memory form of a sheet's `Model Variable Mapping` tab.
+
+Replaces the pandas DataFrame the sheet workflows used to pass around. Rows become
+__slots__ entries, and lookups are dict hits instead of scans over every row:
+
+  - lookup(section, field_key): exact match on the stripped values, first row wins
+    (what get_mapped_cell_location did by iterating the rows);
+  - cell_for_field_key(field_key, column): the (sheet, cell) a `location`-style column
+    points at, matched case-insensitively on field_key alone; the first
+    (section, field_key) mapped in that column wins (what update_copied_sheet_values
+    did by scanning its location maps).
+
+to_records() round-trips to the same list of dicts DataFrame.to_dict(orient="records")
+returned, so API responses and clients sending `model_mapping` back are unchanged.
+"""
+
+from app.utils.a1 import split_sheet
+
+KNOWN_FIELDS = ("section", "field_key", "location", "start_month_location", "end_month_location")
+
+
+class MappingEntry:
+    """One mapping row; the known columns as attributes, every cell kept in `values`."""
+
+    __slots__ = ("section", "field_key", "location", "start_month_location", "end_month_location", "values")
+
+    def __init__(self, values, positions):
+        self.values = values
+        for name in KNOWN_FIELDS:
+            index = positions.get(name)
+            setattr(self, name, values[index] if index is not None else None)
+
+    def get(self, name, default=None):
+        value = getattr(self, name, None) if name in KNOWN_FIELDS else None
+        return default if value is None else value
+
+    def __repr__(self):
+        return f"MappingEntry({self.section!r}, {self.field_key!r}, {self.location!r})"
+
+
+def _key(value):
+    return str(value).strip() if value is not None else ""
+
+
+def parse_sheet_reference(value):
+    """'=Sheet!A1' / "='My Sheet'!A1" -> (sheet_name, cell); anything else -> None."""
+    ref = _key(value)
+    if not (ref.startswith('=') and '!' in ref):
+        return None
+    return split_sheet(ref[1:])
+
+
+class ModelVariableMapping:
+    __slots__ = ("columns", "entries", "_by_key", "_cells_by_field_key")
+
+    def __init__(self, columns, rows):
+        self.columns = list(columns)
+        width = len(self.columns)
+        # Column names are matched stripped, like update_copied_sheet_values did to the DataFrame
+        positions = {}
+        for i, column in enumerate(self.columns):
+            positions.setdefault(_key(column), i)
+        self.entries = []
+        self._by_key = {}
+        self._cells_by_field_key = {}  # column -> {field_key.lower(): (sheet, cell)}, built on first use
+        for row in rows:
+            # Short rows are padded with None, as the DataFrame constructor did
+            values = tuple(row[:width]) + (None,) * (width - len(row))
+            entry = MappingEntry(values, positions)
+            self.entries.append(entry)
+            self._by_key.setdefault((_key(entry.section), _key(entry.field_key)), entry)
+
+    @classmethod
+    def from_values(cls, values):
+        """From raw sheet values: a header row followed by data rows."""
+        if not values:
+            return cls([], [])
+        return cls(values[0], values[1:])
+
+    @classmethod
+    def from_records(cls, records):
+        """From DataFrame-style records (what the API hands back as `model_mapping`)."""
+        records = list(records or [])
+        columns = []
+        for record in records:
+            for column in record:
+                if column not in columns:
+                    columns.append(column)
+        return cls(columns, [[record.get(column) for column in columns] for record in records])
+
+    def to_records(self):
+        return [dict(zip(self.columns, entry.values)) for entry in self.entries]
+
+    def lookup(self, section, field_key):
+        return self._by_key.get((_key(section), _key(field_key)))
+
+    def sheet_cells(self, column="location"):
+        """{(section, field_key): (sheet, cell)} for rows whose `column` is a sheet reference; later rows win."""
+        cells = {}
+        for entry in self.entries:
+            ref = parse_sheet_reference(entry.get(column))
+            if ref:
+                cells[(_key(entry.section), _key(entry.field_key))] = ref
+        return cells
+
+    def cell_for_field_key(self, field_key, column="location"):
+        index = self._cells_by_field_key.get(column)
+        if index is None:
+            index = {}
+            for (_, key), ref in self.sheet_cells(column).items():
+                index.setdefault(key.lower(), ref)
+            self._cells_by_field_key[column] = index
+        return index.get(_key(field_key).lower())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __repr__(self):
+        return f"<ModelVariableMapping {len(self.entries)} entries>"
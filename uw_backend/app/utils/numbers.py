@@ -0,0 +1,34 @@
+"""
+Numeric parsing for sheet-formatted values ("33.9%", "2.78x", "1,250,000").
+Follows the same rules as clean_number in google_drive_service, but returns None
+instead of the original string when a value is not numeric, so results can go
+straight into Float columns.
+"""
+import math
+
+
+def parse_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if math.isfinite(value) else None
+    if not isinstance(value, str):
+        return None
+    s = value.strip().replace("'", "").replace(",", "")
+    if s.endswith('%'):
+        s = s.strip('%')
+    elif s.lower().endswith('x'):
+        s = s[:-1]
+    try:
+        number = float(s)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def set_return_metrics(user_model_version, levered_irr, levered_moic):
+    """Store the display strings and their numeric shadows together."""
+    user_model_version.levered_irr = levered_irr
+    user_model_version.levered_moic = levered_moic
+    user_model_version.levered_irr_value = parse_number(levered_irr)
+    user_model_version.levered_moic_value = parse_number(levered_moic)
@@ -0,0 +1,121 @@
+"""
+Per-process cache of serialized model-type schemas (model type + sections + fields).
+
+Schemas only change through the admin model_types / model_type_sections /
+model_type_section_fields routes, and each of those bumps `ModelType.schema_version`
+in the same transaction (bump_schema_version). A cached tree is reused for as long
+as its version (and the row's name/updated_at) match the row, so every worker notices an edit made by any other
+worker on its next ModelType read without needing cross-process invalidation.
+"""
+import threading
+from sqlalchemy import text
+
+from app.models.model import ModelTypeSection, ModelTypeSectionField
+from app.utils.http_cache import make_etag
+
+_cache = {}  # model_type_id (str) -> (stamp, schema dict)
+_lock = threading.Lock()
+
+
+def _serialize_field(field):
+    return {
+        'id': str(field.id),
+        'description': field.description,
+        'field_title': field.field_title,
+        'field_key': field.field_key,
+        'field_type': field.field_type,
+        'default_value': field.default_value,
+        'required': field.required,
+        'time_phased': field.time_phased,
+        'order': field.order,
+        'active': field.active
+    }
+
+
+def _build_schema(session, model_type):
+    sections = session.query(ModelTypeSection).filter_by(model_type_id=model_type.id).all()
+    fields_by_section = {}
+    if sections:
+        fields = session.query(ModelTypeSectionField).filter(
+            ModelTypeSectionField.section_id.in_([s.id for s in sections])
+        ).all()
+        for field in fields:
+            fields_by_section.setdefault(field.section_id, []).append(_serialize_field(field))
+
+    return {
+        'id': str(model_type.id),
+        'name': model_type.name,
+        'description': model_type.description,
+        'created_at': model_type.created_at.isoformat() if model_type.created_at else None,
+        'updated_at': model_type.updated_at.isoformat() if model_type.updated_at else None,
+        'is_active': model_type.is_active,
+        'google_sheet_url': model_type.google_sheet_url,
+        'development_model': model_type.development_model,
+        'show_retail': model_type.show_retail,
+        'show_rental_units': model_type.show_rental_units,
+        'schema_version': model_type.schema_version or 0,
+        'sections': [{
+            'id': str(section.id),
+            'name': section.name,
+            'order': section.order,
+            'fields': fields_by_section.get(section.id, []),
+            'active': section.active
+        } for section in sections]
+    }
+
+
+def _stamp(model_type):
+    """What a cached tree is valid for: the schema version plus the row's own name/updated_at,
+    so a rename that skipped bump_schema_version is still picked up."""
+    return (model_type.schema_version or 0, model_type.name, model_type.updated_at)
+
+
+def get_schema(session, model_type):
+    """Serialized schema for a loaded ModelType row; rebuilt only when its stamp moved."""
+    key = str(model_type.id)
+    stamp = _stamp(model_type)
+    with _lock:
+        entry = _cache.get(key)
+    if entry and entry[0] == stamp:
+        return entry[1]
+    schema = _build_schema(session, model_type)
+    with _lock:
+        _cache[key] = (stamp, schema)
+    return schema
+
+
+def schema_etag(model_type):
+    version, name, updated_at = _stamp(model_type)
+    return f"mt-{model_type.id}-v{version}-{make_etag(name, updated_at)[:12]}"
+
+
+def field_lookups(schema):
+    """{field_id: {field_title, field_key, field_type, section}} for building mapped sheet values."""
+    return {
+        field['id']: {
+            'field_title': field['field_title'],
+            'field_key': field['field_key'],
+            'field_type': field['field_type'],
+            'section': section['name'],
+        }
+        for section in schema['sections'] for field in section['fields']
+    }
+
+
+def bump_schema_version(session, model_type_id=None, section_id=None):
+    """
+    Increment the schema version for a model type (resolved from a section when needed).
+    Runs inside the caller's transaction, so the bump commits or rolls back with the edit.
+    """
+    if model_type_id is None and section_id is not None:
+        model_type_id = session.execute(
+            text("SELECT model_type_id FROM model_type_sections WHERE id = :id"), {"id": str(section_id)}
+        ).scalar()
+    if model_type_id is None:
+        return
+    session.execute(
+        text("UPDATE model_types SET schema_version = COALESCE(schema_version, 0) + 1 WHERE id = :id"),
+        {"id": str(model_type_id)}
+    )
+    with _lock:
+        _cache.pop(str(model_type_id), None)
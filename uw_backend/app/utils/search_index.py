@@ -0,0 +1,177 @@
+"""
+Full-text / trigram search over a user's deals.
+
+Each user_model has one row in model_search_documents combining its name, address,
+active tag names, the tenant names of its latest version and its active notes. Rows
+are refreshed incrementally: ORM writes to any of those sources record the affected
+user_model ids during flush, and the documents are rebuilt in the same transaction
+just before it commits, inside a savepoint so a failed refresh is logged instead of
+failing the write. Raw-SQL writers can call refresh_search_documents directly.
+"""
+import logging
+import re
+import threading
+import time
+import uuid
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.models.model import UserModel, UserModelVersion, ModelTag, ModelNote, RetailIncome
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'simple'  # text search configuration for documents and queries
+MAX_QUERY_TERMS = 8
+
+REFRESH_SQL = text("""
+    WITH targets AS (
+        SELECT id FROM user_models WHERE id = ANY(CAST(:model_ids AS UUID[]))
+        UNION
+        SELECT user_model_id FROM user_model_versions WHERE id = ANY(CAST(:version_ids AS UUID[]))
+    ),
+    docs AS (
+        SELECT m.id AS user_model_id, m.user_id,
+               COALESCE(m.name, '') AS name,
+               concat_ws(' ', m.street_address, m.city, m.state, m.zip_code) AS address,
+               COALESCE((SELECT string_agg(t.tag_name, ' ') FROM model_tags t
+                          WHERE t.user_model_id = m.id AND t.status = 'active'), '') AS tags,
+               COALESCE((SELECT string_agg(r.tenant_name, ' ') FROM retail_income r
+                          WHERE r.user_model_version_id = (
+                              SELECT v.id FROM user_model_versions v WHERE v.user_model_id = m.id
+                              ORDER BY v.version_number DESC LIMIT 1)), '') AS tenants,
+               COALESCE((SELECT string_agg(n.note_value, ' ') FROM model_notes n
+                          WHERE n.user_model_id = m.id AND n.status = 'active'), '') AS notes
+        FROM user_models m JOIN targets ON targets.id = m.id
+    )
+    INSERT INTO model_search_documents (user_model_id, user_id, document, search_vector, updated_at)
+    SELECT user_model_id, user_id,
+           concat_ws(' ', name, address, tags, tenants, notes),
+           setweight(to_tsvector(CAST(:config AS regconfig), name), 'A')
+           || setweight(to_tsvector(CAST(:config AS regconfig), address), 'B')
+           || setweight(to_tsvector(CAST(:config AS regconfig), tags), 'B')
+           || setweight(to_tsvector(CAST(:config AS regconfig), tenants), 'C')
+           || setweight(to_tsvector(CAST(:config AS regconfig), notes), 'D'),
+           now()
+    FROM docs
+    ON CONFLICT (user_model_id) DO UPDATE SET
+        user_id = EXCLUDED.user_id,
+        document = EXCLUDED.document,
+        search_vector = EXCLUDED.search_vector,
+        updated_at = EXCLUDED.updated_at
+""")
+
+SEARCH_SQL = """
+    WITH ranked AS (
+        SELECT d.user_model_id, d.document,
+               ts_rank_cd(d.search_vector, to_tsquery(CAST(:config AS regconfig), :tsquery))
+                   + word_similarity(:q, d.document) AS rank,
+               COUNT(*) OVER () AS total
+        FROM model_search_documents d
+        JOIN user_models m ON m.id = d.user_model_id
+        WHERE d.user_id = CAST(:user_id AS UUID)
+          AND (d.search_vector @@ to_tsquery(CAST(:config AS regconfig), :tsquery) OR :q <% d.document)
+          {active_filter}
+        ORDER BY rank DESC, d.user_model_id
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT r.user_model_id, r.rank, r.total,
+           m.name, m.street_address, m.city, m.state, m.zip_code, m.active, m.updated_at,
+           mt.name AS model_type_name,
+           ts_headline(CAST(:config AS regconfig), r.document, to_tsquery(CAST(:config AS regconfig), :tsquery),
+                       'MaxFragments=2, MinWords=3, MaxWords=12, StartSel=<b>, StopSel=</b>') AS snippet
+    FROM ranked r
+    JOIN user_models m ON m.id = r.user_model_id
+    JOIN model_types mt ON mt.id = m.model_type_id
+    ORDER BY r.rank DESC, r.user_model_id
+"""
+
+_table_ready = False
+_table_checked_at = None
+_table_lock = threading.Lock()
+TABLE_RECHECK_SECONDS = 60
+
+
+def _search_table_exists(session):
+    """
+    Found once, it is remembered for the process; while missing (before migrate_search_index.py
+    has run) it is rechecked at most every TABLE_RECHECK_SECONDS, so writes keep working meanwhile.
+    """
+    global _table_ready, _table_checked_at
+    if _table_ready:
+        return True
+    with _table_lock:
+        now = time.monotonic()
+        if not _table_ready and (_table_checked_at is None or now - _table_checked_at >= TABLE_RECHECK_SECONDS):
+            _table_checked_at = now
+            _table_ready = bool(session.execute(text("SELECT to_regclass('model_search_documents')")).scalar())
+            if not _table_ready:
+                logger.warning("model_search_documents missing; run migrate_search_index.py to enable search")
+        return _table_ready
+
+
+def refresh_search_documents(session, model_ids=(), version_ids=()):
+    """Rebuild the search rows for the given user_model ids (and the models owning the given versions)."""
+    model_ids = [str(i) for i in model_ids if i]
+    version_ids = [str(i) for i in version_ids if i]
+    if not (model_ids or version_ids) or not _search_table_exists(session):
+        return
+    session.execute(REFRESH_SQL, {"model_ids": model_ids, "version_ids": version_ids, "config": SEARCH_CONFIG})
+
+
+def to_prefix_tsquery(q):
+    """'main st' -> 'main:* & st:*' (terms reduced to word characters, so it is always valid tsquery)."""
+    terms = re.findall(r"\w+", (q or "").lower())[:MAX_QUERY_TERMS]
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def search_user_models(session, user_id, q, limit=20, offset=0, include_inactive=False):
+    """(total, rows) for one user's deals matching q, best first; a non-UUID user_id matches nothing."""
+    tsquery = to_prefix_tsquery(q)
+    try:
+        user_id = uuid.UUID(str(user_id))
+    except ValueError:
+        return 0, []
+    if not tsquery:
+        return 0, []
+    sql = SEARCH_SQL.format(active_filter="" if include_inactive else "AND m.active IS NOT FALSE")
+    rows = session.execute(text(sql), {
+        "user_id": str(user_id), "q": q, "tsquery": tsquery, "config": SEARCH_CONFIG, "limit": limit, "offset": offset,
+    }).fetchall()
+    return (rows[0].total if rows else 0), rows
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_search_sources(session, flush_context):
+    model_ids = session.info.setdefault("_search_model_ids", set())
+    version_ids = session.info.setdefault("_search_version_ids", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, UserModel):
+            model_ids.add(obj.id)
+        elif isinstance(obj, (ModelTag, ModelNote, UserModelVersion)):
+            model_ids.add(obj.user_model_id)
+        elif isinstance(obj, RetailIncome):
+            version_ids.add(obj.user_model_version_id)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_search_documents(session):
+    # before_commit runs ahead of the final flush, so flush pending writes to collect everything
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    model_ids = session.info.pop("_search_model_ids", None)
+    version_ids = session.info.pop("_search_version_ids", None)
+    if not (model_ids or version_ids):
+        return
+    # In a savepoint: a failed refresh is logged and rolled back on its own, never the caller's write
+    try:
+        with session.connection().begin_nested():
+            refresh_search_documents(session, model_ids or (), version_ids or ())
+    except Exception:
+        logger.exception("search document refresh failed for models=%s versions=%s",
+                         sorted(map(str, model_ids or ())), sorted(map(str, version_ids or ())))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_search_sources(session):
+    session.info.pop("_search_model_ids", None)
+    session.info.pop("_search_version_ids", None)
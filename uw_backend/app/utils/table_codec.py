@@ -0,0 +1,105 @@
+"""
+Compact encoding for `UserModelVersion.table_mapping_output`.
+
+extract_tables_for_storage_batch produces, per table, a `data` grid of values and a
+parallel `styles` grid holding a full CSS string for every cell. Most cells share a
+handful of styles, so the compact form interns them:
+
+    {
+        "encoding": "compact-v1",
+        "tables": [{
+            "table_name": ..., "table_order": ..., "summary": ..., "location": ...,
+            "style_table": ["background-color: rgb(255,255,255);", ...],
+            "rows": [[repeat, [values...], style_ids], ...]
+        }]
+    }
+
+`style_ids` is a list of indexes into `style_table`, or a single int when the whole row
+shares one style. Consecutive identical rows collapse into one entry with `repeat` > 1.
+
+Stored values may be either this document or the legacy list; `decode_tables` always
+returns the legacy list so existing clients keep working.
+"""
+
+COMPACT_ENCODING = "compact-v1"
+TABLE_META_KEYS = ("table_name", "table_order", "summary", "location")
+
+
+def is_compact(stored):
+    return isinstance(stored, dict) and stored.get("encoding") == COMPACT_ENCODING
+
+
+def encode_table(table):
+    style_table = []
+    style_index = {}
+    rows = []
+
+    data = table.get("data") or []
+    styles = table.get("styles") or []
+    for i, values in enumerate(data):
+        row_styles = styles[i] if i < len(styles) else []
+        ids = []
+        for style in row_styles:
+            sid = style_index.get(style)
+            if sid is None:
+                sid = style_index[style] = len(style_table)
+                style_table.append(style)
+            ids.append(sid)
+        # Whole-row single style collapses to an int, but only when it covers every value
+        if ids and len(ids) == len(values) and all(s == ids[0] for s in ids):
+            ids = ids[0]
+
+        if rows and rows[-1][1] == values and rows[-1][2] == ids:
+            rows[-1][0] += 1
+        else:
+            rows.append([1, list(values), ids])
+
+    encoded = {key: table.get(key) for key in TABLE_META_KEYS}
+    encoded["style_table"] = style_table
+    encoded["rows"] = rows
+    return encoded
+
+
+def decode_table(encoded):
+    style_table = encoded.get("style_table") or []
+    data, styles = [], []
+    for repeat, values, ids in encoded.get("rows") or []:
+        if isinstance(ids, int):
+            row_styles = [style_table[ids]] * len(values)
+        else:
+            row_styles = [style_table[sid] for sid in ids]
+        for _ in range(repeat):
+            data.append(list(values))
+            styles.append(list(row_styles))
+
+    table = {key: encoded.get(key) for key in TABLE_META_KEYS}
+    table["data"] = data
+    table["styles"] = styles
+    return table
+
+
+def encode_tables(tables):
+    """Encode the legacy list of tables; already-compact input is returned unchanged."""
+    if tables is None or is_compact(tables):
+        return tables
+    return {
+        "encoding": COMPACT_ENCODING,
+        "tables": [encode_table(t) for t in tables]
+    }
+
+
+def decode_tables(stored):
+    """Return the legacy list of tables for either stored form."""
+    if not is_compact(stored):
+        return stored
+    return [decode_table(t) for t in stored.get("tables", [])]
+
+
+def wants_compact_tables(req):
+    """Clients opt in with ?table_format=compact or an X-Table-Format: compact header."""
+    fmt = req.args.get("table_format") or req.headers.get("X-Table-Format") or ""
+    return fmt.lower() == "compact"
+
+
+def tables_for_response(stored, compact=False):
+    return encode_tables(stored) if compact else decode_tables(stored)
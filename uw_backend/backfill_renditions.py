@@ -0,0 +1,79 @@
+"""
+One-time backfill: build thumb/medium renditions for model pictures and company logos
+uploaded before renditions existed. Safe to re-run; rows that are already 'ready' are skipped.
+
+    python backfill_renditions.py [--limit N]
+"""
+import os
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import create_engine, or_
+from sqlalchemy.orm import Session
+
+from app.models.model import ModelPicture
+from app.models.user import CompanyInfo
+from app.services.image_renditions import renditions_available, upload_renditions, PICTURE_FORMATS, LOGO_FORMATS
+from app.utils.image_fetch import parse_gcs_url, gcs_client
+
+LIMIT = int(sys.argv[sys.argv.index("--limit") + 1]) if "--limit" in sys.argv else None
+
+
+def _process(url, formats):
+    location = parse_gcs_url(url)
+    if not location:
+        return None
+    bucket_name, object_name = location
+    content = gcs_client().bucket(bucket_name).blob(object_name).download_as_bytes()
+    # Backfilled renditions use signed URLs, matching the default upload setting
+    return upload_renditions(bucket_name, object_name, content, formats, make_public=False)
+
+
+def run():
+    if not renditions_available():
+        print("❌ Pillow is not installed")
+        exit(1)
+    engine = create_engine(os.getenv("DATABASE_URL"))
+    done = failed = skipped = 0
+    with Session(engine) as session:
+        pictures = session.query(ModelPicture).filter(ModelPicture.status == 'active').filter(
+            or_(ModelPicture.rendition_status.is_(None), ModelPicture.rendition_status != 'ready'))
+        for pic in pictures.limit(LIMIT).all():
+            try:
+                result = _process(pic.picture_url, PICTURE_FORMATS)
+                if result is None:
+                    skipped += 1
+                    continue
+                (pic.width, pic.height), pic.renditions = result
+                pic.rendition_status = 'ready'
+                done += 1
+            except Exception as e:
+                print(f"⚠️ picture {pic.id}: {e}")
+                pic.rendition_status = 'failed'
+                failed += 1
+            session.commit()
+
+        logos = session.query(CompanyInfo).filter(CompanyInfo.company_logo_url.isnot(None)).filter(
+            CompanyInfo.company_logo_renditions.is_(None))
+        for info in logos.limit(LIMIT).all():
+            try:
+                result = _process(info.company_logo_url, LOGO_FORMATS)
+                if result is None:
+                    skipped += 1
+                    continue
+                (width, height), renditions = result
+                info.company_logo_renditions = dict(renditions, original={"width": width, "height": height})
+                info.company_logo_rendition_status = 'ready'
+                done += 1
+            except Exception as e:
+                print(f"⚠️ logo for company_info {info.id}: {e}")
+                info.company_logo_rendition_status = 'failed'
+                failed += 1
+            session.commit()
+    print(f"✅ Backfill complete: {done} processed, {failed} failed, {skipped} skipped (not in GCS)")
+
+
+if __name__ == "__main__":
+    run()
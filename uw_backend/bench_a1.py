@@ -0,0 +1,109 @@
+"""
+Benchmark: cell-address math in the monthly payload builders, before and after app/utils/a1.
+
+Replays the coordinate work one run_full_sheet_update does for a model with ROWS
+inserted rows per monthly table:
+
+  - one column letter per monthly cell (the old code used rowcol_to_a1(1, c).replace("1", "")
+    in some builders and a chr()/ord() if/else in others);
+  - the month column lists (generate_excel_columns, built twice);
+  - A1 parses of the mapped header cells.
+
+The old helpers are reproduced here verbatim, and both paths are checked to produce the
+same addresses.
+
+    python bench_a1.py [rows] [--repeat N]
+"""
+import statistics
+import sys
+import time
+from string import ascii_uppercase
+
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
+
+from app.utils.a1 import column_letter, column_letters, parse_a1
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 60
+REPEAT = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 20
+TABLES = 6          # monthly tables rebuilt per update (expenses, retail, amenity, ...)
+MONTH_COLUMNS = range(11, 145)
+HEADER_PARSES = 300
+
+
+# --- The helpers as they were ---
+
+def generate_excel_columns(start='J', end='EL'):
+    def col_index(c):
+        result = 0
+        for i, char in enumerate(reversed(c)):
+            result += (ascii_uppercase.index(char) + 1) * (26 ** i)
+        return result
+
+    def col_name(index):
+        name = ""
+        while index > 0:
+            index, remainder = divmod(index - 1, 26)
+            name = chr(65 + remainder) + name
+        return name
+
+    start_idx = col_index(start)
+    end_idx = col_index(end)
+    return [col_name(i) for i in range(start_idx, end_idx + 1)]
+
+
+def old_pass(headers):
+    out = []
+    for table in range(TABLES):
+        for row in range(ROWS):
+            for col_idx in MONTH_COLUMNS:
+                if table % 2:
+                    col_letter = rowcol_to_a1(1, col_idx + 1).replace("1", "")
+                elif col_idx < 26:
+                    col_letter = chr(ord('A') + col_idx)
+                else:
+                    col_letter = chr(ord('A') + col_idx // 26 - 1) + chr(ord('A') + col_idx % 26)
+                out.append(col_letter)
+    out.append(generate_excel_columns('J', 'EL'))
+    out.append(generate_excel_columns('J', 'DZ'))
+    out.extend(a1_to_rowcol(cell) for cell in headers)
+    return out
+
+
+def new_pass(headers):
+    out = []
+    for table in range(TABLES):
+        for row in range(ROWS):
+            for col_idx in MONTH_COLUMNS:
+                out.append(column_letter(col_idx + 1))
+    out.append(column_letters('J', 'EL'))
+    out.append(column_letters('J', 'DZ'))
+    out.extend(parse_a1(cell) for cell in headers)
+    return out
+
+
+def cpu_ms(fn, *args):
+    samples = []
+    result = None
+    for _ in range(REPEAT):
+        started = time.process_time()
+        result = fn(*args)
+        samples.append(time.process_time() - started)
+    return statistics.median(samples) * 1000, result
+
+
+def run():
+    headers = [f"{column_letter(2 + i % 40)}{5 + i % 80}" for i in range(HEADER_PARSES)]
+    cells = TABLES * ROWS * len(MONTH_COLUMNS)
+    print(f"📋 {cells} monthly cells, {len(headers)} header parses, median CPU of {REPEAT}")
+    old_ms, old_result = cpu_ms(old_pass, headers)
+    new_ms, new_result = cpu_ms(new_pass, headers)
+    print(f"   before: {old_ms:8.2f}ms")
+    print(f"   after:  {new_ms:8.2f}ms  ({old_ms / new_ms:.1f}x)")
+    same = old_result == new_result
+    print(f"{'✅' if same else '❌'} addresses match")
+    if not same:
+        exit(1)
+
+
+if __name__ == "__main__":
+    run()
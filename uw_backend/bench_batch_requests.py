@@ -0,0 +1,80 @@
+"""
+Report what optimize_requests does to a run_full_sheet_update batchUpdate list.
+
+Prints request count and payload bytes before/after, what each pass removed, and the
+optimizer's own CPU time. The default list is synthetic but shaped like the real one:
+nested builder lists, a format block appended both spread and unspread, per-row format
+requests over adjacent rows, and per-row inserts. --payload FILE uses a captured list
+instead (the `requests` array, or the whole batchUpdate body).
+
+    python bench_batch_requests.py [--payload FILE] [--repeat N]
+"""
+import json
+import statistics
+import sys
+import time
+
+from app.services.sheets_batch import optimize_requests
+
+REPEAT = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 20
+PAYLOAD = sys.argv[sys.argv.index("--payload") + 1] if "--payload" in sys.argv else None
+
+
+def repeat_cell(sheet_id, row, cols, fmt):
+    return {"repeatCell": {
+        "range": {"sheetId": sheet_id, "startRowIndex": row, "endRowIndex": row + 1,
+                  "startColumnIndex": cols[0], "endColumnIndex": cols[1]},
+        "cell": {"userEnteredFormat": fmt},
+        "fields": "userEnteredFormat(" + ",".join(fmt) + ")",
+    }}
+
+
+def insert_rows(sheet_id, start, count=1):
+    return {"insertDimension": {"range": {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": start,
+                                          "endIndex": start + count}, "inheritFromBefore": True}}
+
+
+def synthetic_requests():
+    currency = {"numberFormat": {"type": "CURRENCY", "pattern": "$#,##0"}}
+    black = {"textFormat": {"foregroundColor": {"red": 0, "green": 0, "blue": 0}}}
+    amenity_format = [repeat_cell(20, row, (4, 6), currency) for row in range(5, 9)]
+    expense_rows = 30
+    return [
+        [insert_rows(10, 6 + i) for i in range(12)],          # market rows, one insert each
+        [repeat_cell(10, 6 + i, (1, 12), black) for i in range(12)],
+        [],
+        *amenity_format,
+        [insert_rows(30, 5 + i) for i in range(expense_rows)],
+        [repeat_cell(30, 5 + i, (9, 142), currency) for i in range(expense_rows)],
+        [],
+        [],
+        amenity_format,                                       # appended again, unspread
+        [repeat_cell(40, 10, (0, 8), black)] * 3,
+    ]
+
+
+def run():
+    requests = synthetic_requests()
+    if PAYLOAD:
+        with open(PAYLOAD) as f:
+            payload = json.load(f)
+        requests = payload.get("requests", payload) if isinstance(payload, dict) else payload
+
+    samples = []
+    stats = None
+    for _ in range(REPEAT):
+        started = time.process_time()
+        _, stats = optimize_requests(requests)
+        samples.append(time.process_time() - started)
+
+    print(f"📋 {stats['entries_in']} entries, {stats['requests_in']} requests after flattening")
+    print(f"   requests: {stats['requests_in']:6d} -> {stats.get('requests_out'):6d}")
+    print(f"   bytes:    {stats['bytes_in']:6d} -> {stats.get('bytes_out'):6d} "
+          f"({100 * (1 - stats['bytes_out'] / max(stats['bytes_in'], 1)):.0f}% smaller)")
+    print(f"   no-ops {stats.get('noops', 0)}, duplicates {stats.get('duplicates', 0)}, "
+          f"merged formats {stats.get('merged_formats', 0)}, merged inserts {stats.get('merged_inserts', 0)}")
+    print(f"   optimizer CPU: {statistics.median(samples) * 1000:.2f}ms (median of {REPEAT})")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,101 @@
+"""
+Benchmark: legacy UserModelFieldValue rows vs the JSONB field store.
+Creates a throwaway user/model/version inside a transaction, times write and read
+for both layouts, and rolls everything back.
+Run with: python bench_field_store.py [num_fields] [iterations]
+"""
+import os
+import sys
+import time
+import uuid
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from app.models.user import User
+from app.models.model import (
+    ModelType, ModelTypeSection, ModelTypeSectionField,
+    UserModel, UserModelVersion, UserModelFieldValue
+)
+from app.utils.field_store import write_field_values, read_field_values
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+NUM_FIELDS = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+ITERATIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+
+def _ms(samples):
+    samples = sorted(samples)
+    return f"p50={samples[len(samples) // 2] * 1000:.1f}ms max={samples[-1] * 1000:.1f}ms"
+
+
+def run():
+    engine = create_engine(DATABASE_URL)
+    conn = engine.connect()
+    trans = conn.begin()
+    session = Session(bind=conn)
+    try:
+        user = User(auth0_user_id=f"bench|{uuid.uuid4()}", email=f"bench-{uuid.uuid4()}@example.com")
+        model_type = ModelType(name=f"bench-{uuid.uuid4()}")
+        session.add_all([user, model_type])
+        session.flush()
+        section = ModelTypeSection(model_type_id=model_type.id, name="Bench")
+        session.add(section)
+        session.flush()
+        fields = [ModelTypeSectionField(section_id=section.id, field_title=f"F{i}", field_key=f"f{i}", field_type="number")
+                  for i in range(NUM_FIELDS)]
+        session.add_all(fields)
+        user_model = UserModel(user_id=user.id, model_type_id=model_type.id, name="bench")
+        session.add(user_model)
+        session.flush()
+        payload = [{'field_id': str(f.id), 'value': str(i), 'start_month': 1, 'end_month': 12} for i, f in enumerate(fields)]
+        lookup = {str(f.id): f.field_key for f in fields}
+
+        eav_write, eav_read, store_write, store_read = [], [], [], []
+        for n in range(ITERATIONS):
+            version = UserModelVersion(user_model_id=user_model.id, version_number=n + 1)
+            session.add(version)
+            session.flush()
+
+            t = time.perf_counter()
+            for fv in payload:
+                session.add(UserModelFieldValue(user_model_version_id=version.id, field_id=fv['field_id'], value=fv['value'],
+                                                start_month=fv['start_month'], end_month=fv['end_month']))
+            session.flush()
+            eav_write.append(time.perf_counter() - t)
+
+            session.expire_all()
+            t = time.perf_counter()
+            rows = (
+                session.query(UserModelFieldValue, ModelTypeSectionField)
+                .join(ModelTypeSectionField, UserModelFieldValue.field_id == ModelTypeSectionField.id)
+                .filter(UserModelFieldValue.user_model_version_id == version.id)
+                .all()
+            )
+            [{'field_id': str(fv.field_id), 'field_key': f.field_key, 'value': fv.value} for fv, f in rows]
+            eav_read.append(time.perf_counter() - t)
+
+            t = time.perf_counter()
+            write_field_values(version, payload)
+            session.flush()
+            store_write.append(time.perf_counter() - t)
+
+            session.expire_all()
+            t = time.perf_counter()
+            version = session.query(UserModelVersion).get(version.id)
+            read_field_values(session, version, lookup)
+            store_read.append(time.perf_counter() - t)
+
+        print(f"fields={NUM_FIELDS} iterations={ITERATIONS}")
+        print(f"  legacy rows  write {_ms(eav_write)}  read {_ms(eav_read)}")
+        print(f"  JSONB store  write {_ms(store_write)}  read {_ms(store_read)}")
+    finally:
+        session.close()
+        trans.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    run()
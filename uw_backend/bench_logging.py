@@ -0,0 +1,104 @@
+"""
+Benchmark: CPU spent logging payloads in one model build, old prints vs level-gated logs.
+
+Replays the payload dumps one intermediate build used to make (mapped values, the
+assumption row mapping, every insert request, the extracted variables three times)
+against:
+
+  - print   the old print(...) calls (stdout sent to /dev/null);
+  - INFO    the new logger calls at the default level (nothing rendered);
+  - DEBUG   the new logger calls with debug on (summaries rendered as JSON lines).
+
+Payloads are synthetic and sized like a mid-size multifamily model; --payload FILE uses
+a JSON object with any of the keys below instead (e.g. a captured request body).
+
+    python bench_logging.py [--repeat N] [--payload FILE]
+"""
+import contextlib
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+from app.utils.logs import JsonFormatter, RequestIdFilter, summarize
+
+REPEAT = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 20
+PAYLOAD = sys.argv[sys.argv.index("--payload") + 1] if "--payload" in sys.argv else None
+
+
+def synthetic_payloads():
+    cell = {"userEnteredValue": {"numberValue": 1250.0}, "userEnteredFormat": {"numberFormat": {"type": "CURRENCY", "pattern": "$#,##0"}}}
+    row = {"values": [cell] * 12}
+    insert_requests = [
+        [{"insertDimension": {"range": {"sheetId": 1000 + i, "dimension": "ROWS", "startIndex": 10, "endIndex": 11}}},
+         {"updateCells": {"start": {"sheetId": 1000 + i, "rowIndex": 10, "columnIndex": 0}, "rows": [row] * 20, "fields": "*"}}]
+        for i in range(60)
+    ]
+    return {
+        "mapped_values": [{"section": "General Property Assumptions", "field_key": f"Field {i}", "value": i * 10.5,
+                           "start_month": 1, "end_month": 120} for i in range(300)],
+        "assumption_row_mapping": {f"Expense {i}": {"row": i + 20, "sheet": "Assumptions"} for i in range(120)},
+        "insert_requests": insert_requests,
+        "variables": {f"Variable {i}": f"${i * 1000:,}" for i in range(250)},
+    }
+
+
+def print_path(p):
+    print("MAPPED VALUES", p["mapped_values"])
+    print("assumption_row_mapping", p["assumption_row_mapping"])
+    print("ALL INSERT REQUESTS", p["insert_requests"])
+    for _ in range(3):
+        print(f"📈 Extracted variables: {p['variables']} in 1.234s")
+
+
+def logger_path(p, logger=logging.getLogger("bench.logging")):
+    logger.debug("mapped values %s", summarize(p["mapped_values"]))
+    logger.debug("[run_full_sheet_update] assumption_row_mapping %s", summarize(p["assumption_row_mapping"]))
+    logger.debug("[run_full_sheet_update] insert requests %s", summarize(p["insert_requests"]))
+    for _ in range(3):
+        print(f"📈 Extracted {len(p['variables'])} variables in 1.234s")
+        logger.debug("extracted variables %s", p["variables"])
+
+
+def cpu_ms(fn, payloads):
+    samples = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(REPEAT):
+            started = time.process_time()
+            fn(payloads)
+            samples.append(time.process_time() - started)
+    return statistics.median(samples) * 1000
+
+
+def run():
+    payloads = synthetic_payloads()
+    if PAYLOAD:
+        with open(PAYLOAD) as f:
+            payloads.update(json.load(f))
+    sizes = {k: len(json.dumps(v, default=str)) for k, v in payloads.items()}
+    print(f"📋 payload bytes: {sizes}, median CPU of {REPEAT}")
+
+    logger = logging.getLogger("bench.logging")
+    logger.propagate = False
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(RequestIdFilter())
+    logger.addHandler(handler)
+
+    print_ms = cpu_ms(print_path, payloads)
+    logger.setLevel(logging.INFO)
+    info_ms = cpu_ms(logger_path, payloads)
+    logger.setLevel(logging.DEBUG)
+    debug_ms = cpu_ms(logger_path, payloads)
+    emitted = len(handler.stream.getvalue().encode("utf-8")) // REPEAT
+
+    print(f"   print:  {print_ms:8.2f}ms")
+    print(f"   INFO:   {info_ms:8.2f}ms  (saves {print_ms - info_ms:.2f}ms per build)")
+    print(f"   DEBUG:  {debug_ms:8.2f}ms  ({emitted} bytes of log lines per build)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,133 @@
+"""
+Benchmark: ModelVariableMapping vs the pandas DataFrame path it replaced.
+
+Times what one run_full_sheet_update + update_copied_sheet_values pass does with the
+mapping: build it from sheet values, resolve the (section, field_key) cell lookups made
+by the get_*_update_payload builders, and resolve field_key-only lookups for every
+mapped user value. The old DataFrame code is reproduced here verbatim for comparison,
+and both paths are checked to return the same cells.
+
+Uses a synthetic mapping by default; --sheet SHEET_ID reads the real
+`Model Variable Mapping` tab of a copied model (needs Google credentials).
+
+    python bench_model_mapping.py [rows] [--sheet SHEET_ID] [--repeat N]
+"""
+import random
+import statistics
+import sys
+import time
+
+from app.utils.model_mapping import ModelVariableMapping
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 600
+REPEAT = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 20
+SHEET_ID = sys.argv[sys.argv.index("--sheet") + 1] if "--sheet" in sys.argv else None
+
+SECTIONS = ["General Property Assumptions", "Other Reference", "Leasing Assumptions", "Exit Assumptions",
+            "Financing Assumptions", "Retail Assumptions", "Development Assumptions"]
+LOOKUPS_PER_UPDATE = 40      # get_mapped_cell_location calls in one run_full_sheet_update
+MAPPED_VALUES_PER_UPDATE = 250
+
+
+def synthetic_values(rows):
+    rng = random.Random(7)
+    values = [["section", "field_key", "location", "start_month_location", "end_month_location"]]
+    for i in range(rows):
+        row = [rng.choice(SECTIONS), f"Field {i}", f"='Assumptions'!C{i + 5}"]
+        if i % 5 == 0:
+            row += [f"='Assumptions'!D{i + 5}", f"='Assumptions'!E{i + 5}"]
+        values.append(row)
+    return values
+
+
+def sheet_values(sheet_id):
+    from app.services.google_drive_service import build, get_credentials
+    service = build("sheets", "v4", credentials=get_credentials())
+    result = service.spreadsheets().values().batchGet(
+        spreadsheetId=sheet_id, ranges=["'Model Variable Mapping'"], valueRenderOption='FORMULA').execute()
+    return result['valueRanges'][0].get('values', [])
+
+
+# --- The DataFrame path as it was before ModelVariableMapping ---
+
+def df_get_mapped_cell_location(model_variable_mapping, section, field_key):
+    for row in model_variable_mapping.to_dict(orient="records"):
+        if row["section"].strip() == section.strip() and row["field_key"].strip() == field_key.strip():
+            return row.get("location", "").replace("=", "")
+    return None
+
+
+def df_field_key_cells(df, keys):
+    location_map = {}
+    for _, row in df.iterrows():
+        section = (row.get('section') or '').strip()
+        field_key = (row.get('field_key') or '').strip()
+        loc_str = (row.get('location') or '').strip()
+        if loc_str.startswith('=') and '!' in loc_str:
+            sheet_part, cell = loc_str[1:].split('!', 1)
+            location_map[(section, field_key)] = (sheet_part.strip().strip("'").strip('"'), cell.strip())
+    found = []
+    for key in keys:
+        cell = None
+        for map_key in location_map.keys():
+            if map_key[1].strip().lower() == key.strip().lower():
+                cell = location_map[map_key]
+                break
+        found.append(cell)
+    return found
+
+
+def dataframe_pass(values, lookups, keys):
+    import pandas as pd
+    rows = [row + ['', ''] if len(row) == 3 else row for row in values[1:]]
+    df = pd.DataFrame(rows, columns=values[0])
+    cells = [df_get_mapped_cell_location(df, section, field_key) for section, field_key in lookups]
+    return cells, df_field_key_cells(df, keys)
+
+
+# --- The indexed path ---
+
+def mapping_pass(values, lookups, keys):
+    mapping = ModelVariableMapping.from_values([values[0]] + [row + ['', ''] if len(row) == 3 else row for row in values[1:]])
+    cells = []
+    for section, field_key in lookups:
+        entry = mapping.lookup(section, field_key)
+        cells.append((entry.location or "").replace("=", "") if entry else None)
+    return cells, [mapping.cell_for_field_key(key) for key in keys]
+
+
+def timed(fn, *args):
+    samples = []
+    result = None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = fn(*args)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, result
+
+
+def run():
+    values = sheet_values(SHEET_ID) if SHEET_ID else synthetic_values(ROWS)
+    rng = random.Random(11)
+    rows = values[1:]
+    lookups = [(row[0], row[1]) for row in rng.sample(rows, min(LOOKUPS_PER_UPDATE, len(rows)))]
+    keys = [row[1] for row in rng.choices(rows, k=MAPPED_VALUES_PER_UPDATE)]
+    print(f"📋 {len(rows)} mapping rows, {len(lookups)} cell lookups, {len(keys)} field_key lookups, median of {REPEAT}")
+
+    mapping_ms, mapping_result = timed(mapping_pass, values, lookups, keys)
+    print(f"   ModelVariableMapping: {mapping_ms:8.2f}ms")
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        print("   pandas not installed; skipping the DataFrame comparison")
+        return
+    df_ms, df_result = timed(dataframe_pass, values, lookups, keys)
+    print(f"   DataFrame:            {df_ms:8.2f}ms  ({df_ms / mapping_ms:.0f}x slower)")
+    same = mapping_result == df_result
+    print(f"{'✅' if same else '❌'} cell and field_key lookups match")
+    if not same:
+        exit(1)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,143 @@
+"""
+Benchmark: deal search at scale.
+
+Seeds a *local* throwaway database with one heavy user owning `models` deals (default
+12,000) plus background users, builds model_search_documents, then times ranked search
+queries, an incremental refresh through a normal ORM commit, and prints the plan of
+the search query so index use can be checked.
+
+    SEARCH_BENCH_DATABASE_URL=postgresql://localhost/underwrite_search python bench_search.py [models] [iterations]
+
+All tables in the target database are dropped and recreated.
+"""
+import os
+import sys
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from app.db import Base
+from app.models.model import ModelNote, UserModel
+import app.models  # noqa: F401  (registers every table)
+from app.utils.search_index import REFRESH_SQL, SEARCH_SQL, SEARCH_CONFIG, search_user_models, to_prefix_tsquery
+
+load_dotenv()
+
+BENCH_DATABASE_URL = os.getenv("SEARCH_BENCH_DATABASE_URL", "postgresql://localhost/underwrite_search")
+if BENCH_DATABASE_URL == os.getenv("DATABASE_URL"):
+    print("SEARCH_BENCH_DATABASE_URL must not point at the application database")
+    exit(1)
+
+MODELS = int(sys.argv[1]) if len(sys.argv) > 1 else 12000
+ITERATIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+QUERIES = ["main", "oak street", "starbucks", "refi", "springfeld", "walgreens 62701", "value add", "zzz-no-match"]
+
+WORDS = ["oak", "maple", "cedar", "pine", "elm", "harbor", "river", "summit", "park", "lake"]
+TENANTS = ["Starbucks", "Walgreens", "Chase Bank", "Chipotle", "FedEx", "Subway", "Verizon", "Orangetheory"]
+NOTES = ["refi in year 3", "value add renovation", "seller motivated", "check zoning", "tax appeal pending"]
+
+SEED_SQL = [
+    """INSERT INTO users (id, auth0_user_id, email, is_active, plan_tier)
+       SELECT gen_random_uuid(), 'search-bench|' || g, 'search' || g || '@example.com', true, 'pro'
+       FROM generate_series(1, 50) g""",
+    """INSERT INTO model_types (id, name, is_active) VALUES (gen_random_uuid(), 'Bench Type', true)""",
+    # The first user gets :models deals; the rest get 200 each as background noise
+    """WITH u AS (SELECT id, row_number() OVER (ORDER BY auth0_user_id) AS n FROM users),
+            words AS (SELECT CAST(:words AS TEXT[]) AS w)
+       INSERT INTO user_models (id, user_id, model_type_id, active, name, street_address, city, state, zip_code)
+       SELECT gen_random_uuid(), u.id, (SELECT id FROM model_types LIMIT 1), g % 10 <> 0,
+              initcap(words.w[1 + g % 10]) || ' ' || initcap(words.w[1 + (g / 10) % 10]) || ' ' || g,
+              g || ' ' || initcap(words.w[1 + (g / 7) % 10]) || ' Street', 'Springfield', 'IL', (62700 + g % 50)::text
+       FROM u CROSS JOIN words
+       CROSS JOIN LATERAL generate_series(1, CASE WHEN u.n = 1 THEN :models ELSE 200 END) g""",
+    """INSERT INTO user_model_versions (id, user_model_id, version_number)
+       SELECT gen_random_uuid(), m.id, g FROM user_models m CROSS JOIN generate_series(1, 2) g""",
+    """INSERT INTO retail_income (id, user_model_version_id, suite, tenant_name)
+       SELECT gen_random_uuid(), v.id, 'S' || g, (CAST(:tenants AS TEXT[]))[1 + (abs(hashtext(v.id::text)) + g) % 8]
+       FROM user_model_versions v CROSS JOIN generate_series(1, 3) g""",
+    """INSERT INTO model_tags (id, user_model_id, tag_name, status)
+       SELECT gen_random_uuid(), m.id, 'Tag ' || (abs(hashtext(m.id::text)) % 20), 'active' FROM user_models m""",
+    """INSERT INTO model_notes (id, user_model_id, note_value, status)
+       SELECT gen_random_uuid(), m.id, (CAST(:notes AS TEXT[]))[1 + abs(hashtext(m.id::text)) % 5], 'active'
+       FROM user_models m""",
+]
+
+
+def _ms(samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"p50={samples[len(samples) // 2] * 1000:.1f}ms p95={p95 * 1000:.1f}ms max={samples[-1] * 1000:.1f}ms"
+
+
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    params = {"models": MODELS, "words": WORDS, "tenants": TENANTS, "notes": NOTES}
+    with engine.begin() as conn:
+        for sql in SEED_SQL:
+            conn.execute(text(sql), params)
+
+    started = time.monotonic()
+    with engine.begin() as conn:
+        ids = conn.execute(text("SELECT id FROM user_models")).scalars().all()
+        for start in range(0, len(ids), 500):
+            conn.execute(REFRESH_SQL, {"model_ids": [str(i) for i in ids[start:start + 500]], "version_ids": [], "config": SEARCH_CONFIG})
+    print(f"🌱 Indexed {len(ids)} models in {time.monotonic() - started:.1f}s "
+          f"({(time.monotonic() - started) / len(ids) * 1000:.2f}ms/model)")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def run():
+    engine = create_engine(BENCH_DATABASE_URL)
+    print(f"Seeding {BENCH_DATABASE_URL} with {MODELS} models for the heavy user")
+    seed(engine)
+
+    with Session(engine) as session:
+        user_id = session.execute(text(
+            "SELECT user_id FROM user_models GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1"
+        )).scalar()
+
+        for q in QUERIES:
+            timings = []
+            for _ in range(ITERATIONS):
+                started = time.perf_counter()
+                total, rows = search_user_models(session, user_id, q, limit=20, offset=0)
+                timings.append(time.perf_counter() - started)
+            top = rows[0].name if rows else None
+            print(f"🔎 {q!r}: total={total} top={top!r} {_ms(timings)}")
+
+        # Deep page
+        timings = []
+        for _ in range(ITERATIONS):
+            started = time.perf_counter()
+            search_user_models(session, user_id, "street", limit=20, offset=2000)
+            timings.append(time.perf_counter() - started)
+        print(f"📄 'street' offset=2000: {_ms(timings)}")
+
+        sql = SEARCH_SQL.format(active_filter="AND m.active IS NOT FALSE")
+        plan = session.execute(text("EXPLAIN (ANALYZE, FORMAT TEXT) " + sql), {
+            "user_id": str(user_id), "q": "starbucks", "tsquery": to_prefix_tsquery("starbucks"), "config": SEARCH_CONFIG, "limit": 20, "offset": 0,
+        }).scalars().all()
+        print("\n".join(plan))
+
+    # Incremental maintenance: one ORM note write, refreshed inside its own commit
+    timings = []
+    for n in range(ITERATIONS):
+        with Session(engine) as session:
+            user_model = session.query(UserModel).filter(UserModel.user_id == user_id).first()
+            session.add(ModelNote(user_model_id=user_model.id, note_value=f"incremental marker {n}", status="active"))
+            started = time.perf_counter()
+            session.commit()
+            timings.append(time.perf_counter() - started)
+    print(f"✍️ note insert + search refresh commit: {_ms(timings)}")
+    with Session(engine) as session:
+        total, _ = search_user_models(session, user_id, f"incremental marker {ITERATIONS - 1}")
+        print(f"{'✅' if total >= 1 else '❌'} incremental refresh visible to search (total={total})")
+
+
+if __name__ == "__main__":
+    run()
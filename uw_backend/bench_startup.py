@@ -0,0 +1,96 @@
+"""
+Benchmark: cold start of the Flask app.
+
+Each run is a fresh interpreter that imports the app, calls create_app() and serves a
+first GET /api/health, reporting the time spent in each step. With --google it then
+times the first Google call (check_google_access), which is where the clients are
+built now that import no longer does it. --compare REF runs the same measurement on a
+git worktree of REF (e.g. the commit before lazy client init) for a before/after table.
+
+    python bench_startup.py [runs] [--google] [--compare REF]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 5
+GOOGLE = "--google" in sys.argv
+COMPARE = sys.argv[sys.argv.index("--compare") + 1] if "--compare" in sys.argv else None
+
+CHILD = r"""
+import json, os, sys, time
+sys.path.insert(0, os.getcwd())
+t0 = time.perf_counter()
+import app as app_pkg
+t1 = time.perf_counter()
+application = app_pkg.create_app()
+t2 = time.perf_counter()
+with application.test_client() as client:
+    status = client.get("/api/health").status_code
+t3 = time.perf_counter()
+out = {"import": t1 - t0, "create_app": t2 - t1, "first_request": t3 - t2, "status": status}
+if os.environ.get("BENCH_GOOGLE") == "1":
+    from app.services import google_drive_service as gds
+    t4 = time.perf_counter()
+    if hasattr(gds, "check_google_access"):
+        gds.check_google_access()
+    else:
+        gds.drive_service.files().list(pageSize=1).execute()
+    out["first_google_call"] = time.perf_counter() - t4
+print("BENCH_RESULT " + json.dumps(out))
+"""
+
+
+def measure(cwd):
+    env = dict(os.environ, BENCH_GOOGLE="1" if GOOGLE else "0")
+    env.setdefault("DATABASE_URL", "postgresql://localhost/underwrite_startup_bench")
+    results = []
+    for _ in range(RUNS):
+        proc = subprocess.run([sys.executable, "-c", CHILD], cwd=cwd, env=env, capture_output=True, text=True)
+        line = next((l for l in proc.stdout.splitlines() if l.startswith("BENCH_RESULT ")), None)
+        if line is None:
+            print(f"❌ Run failed in {cwd}:\n{proc.stderr[-2000:]}")
+            exit(1)
+        results.append(json.loads(line[len("BENCH_RESULT "):]))
+    return results
+
+
+def summarize(label, results):
+    keys = [k for k in ("import", "create_app", "first_request", "first_google_call") if k in results[0]]
+    medians = {k: statistics.median(r[k] for r in results) * 1000 for k in keys}
+    medians["total"] = sum(medians.values())
+    print(f"{label:<12}" + "  ".join(f"{k}={v:.0f}ms" for k, v in medians.items()))
+    return medians
+
+
+def run():
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"⏱️ {RUNS} cold starts per tree (median){' including the first Google call' if GOOGLE else ''}")
+    after = summarize("current", measure(here))
+    if not COMPARE:
+        return
+    repo_root = subprocess.check_output(["git", "rev-parse", "--show-toplevel"], cwd=here, text=True).strip()
+    subdir = os.path.relpath(here, repo_root)
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = os.path.join(tmp, "tree")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, COMPARE], cwd=repo_root, check=True,
+                       capture_output=True)
+        try:
+            target = os.path.join(worktree, subdir)
+            # Local credentials / .env are not tracked; share them with the old tree
+            for name in (".env", os.getenv("SERVICE_ACCOUNT_FILE") or ""):
+                if name and os.path.exists(os.path.join(here, name)) and not os.path.exists(os.path.join(target, name)):
+                    os.symlink(os.path.join(here, name), os.path.join(target, name))
+            before = summarize(COMPARE[:12], measure(target))
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=repo_root, capture_output=True)
+    for key in after:
+        if key in before and before[key]:
+            print(f"   {key}: {before[key]:.0f}ms → {after[key]:.0f}ms ({(1 - after[key] / before[key]) * 100:+.0f}% faster)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,114 @@
+"""
+Benchmark: Stripe webhook intake and the ordered event worker, fed by fake_stripe_events.
+
+Runs against a *local* throwaway database (its users / subscription tables are
+recreated). Posts a signed, shuffled event stream with redeliveries to
+POST /api/stripe/webhook from concurrent clients, reports intake latency and
+throughput, drains the queue with the worker, and checks that every customer ends in
+the state of their newest event with exactly one audit row per Stripe event.
+
+    WEBHOOK_BENCH_DATABASE_URL=postgresql://localhost/underwrite_webhooks python bench_stripe_webhooks.py [customers] [events] [threads]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BENCH_DATABASE_URL = os.getenv("WEBHOOK_BENCH_DATABASE_URL", "postgresql://localhost/underwrite_webhooks")
+if BENCH_DATABASE_URL == os.getenv("DATABASE_URL"):
+    print("WEBHOOK_BENCH_DATABASE_URL must not point at the application database")
+    exit(1)
+
+# Configure the app for the bench before it is imported
+SECRET = "whsec_bench"
+os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+os.environ["STRIPE_WEBHOOK_SECRET"] = SECRET
+os.environ["STRIPE_WEBHOOK_INLINE_WORKER"] = "false"
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import create_app
+from app.db import Base
+from app.models.user import User, SubscriptionEvent, StripeWebhookEvent
+from app.services.stripe_events import drain
+from fake_stripe_events import generate_events, sign_payload, encode
+
+CUSTOMERS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+EVENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+THREADS = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+
+def _ms(samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"p50={samples[len(samples) // 2] * 1000:.1f}ms p95={p95 * 1000:.1f}ms max={samples[-1] * 1000:.1f}ms"
+
+
+def reset(engine, expected):
+    tables = [Base.metadata.tables[t] for t in ("users", "subscription_events", "stripe_webhook_events")]
+    Base.metadata.drop_all(bind=engine, tables=tables[::-1])
+    Base.metadata.create_all(bind=engine, tables=tables)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, auth0_user_id, email, stripe_customer_id, plan_tier) "
+            "SELECT gen_random_uuid(), 'bench|' || c, c || '@bench.local', c, 'freemium' FROM unnest(CAST(:ids AS TEXT[])) c"
+        ), {"ids": list(expected)})
+
+
+def run():
+    deliveries, expected = generate_events(CUSTOMERS, EVENTS)
+    engine = create_engine(BENCH_DATABASE_URL, pool_size=THREADS + 2)
+    reset(engine, expected)
+    app = create_app()
+
+    def post(event):
+        payload = encode(event)
+        started = time.perf_counter()
+        with app.test_client() as client:
+            response = client.post("/api/stripe/webhook", data=payload, content_type="application/json",
+                                   headers={"Stripe-Signature": sign_payload(payload, SECRET)})
+        return response.status_code, time.perf_counter() - started
+
+    print(f"📨 Posting {len(deliveries)} deliveries for {CUSTOMERS} customers with {THREADS} clients")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = list(pool.map(post, deliveries))
+    elapsed = time.perf_counter() - started
+    errors = [status for status, _ in results if status != 200]
+    print(f"   intake: {len(results) / elapsed:.0f} events/s, {_ms([t for _, t in results])}, non-200={len(errors)}")
+
+    with Session(engine) as session:
+        stored = session.query(StripeWebhookEvent).count()
+    print(f"   stored {stored} unique events ({len(deliveries) - stored} redeliveries dropped)")
+
+    started = time.perf_counter()
+    with app.app_context():
+        totals = drain(lambda: Session(engine))
+    elapsed = time.perf_counter() - started
+    applied = sum(totals.get(k, 0) for k in ("processed", "skipped", "failed"))
+    print(f"⚙️ worker: {applied / elapsed:.0f} events/s over {elapsed:.2f}s {totals}")
+
+    with Session(engine) as session:
+        users = {u.stripe_customer_id: u for u in session.query(User).all()}
+        mismatched = [
+            cus for cus, final in expected.items()
+            if users[cus].subscription_status != final["status"] or users[cus].plan_price_id != final["price_id"]
+        ]
+        audit_dupes = session.execute(text(
+            "SELECT COUNT(*) FROM (SELECT stripe_event_id FROM subscription_events "
+            "GROUP BY stripe_event_id HAVING COUNT(*) > 1) d"
+        )).scalar()
+        audit_rows = session.query(SubscriptionEvent).count()
+    print(f"{'✅' if not mismatched else '❌'} final state matches newest event for "
+          f"{len(expected) - len(mismatched)}/{len(expected)} customers")
+    print(f"{'✅' if not audit_dupes else '❌'} {audit_rows} audit rows, {audit_dupes} duplicated event ids")
+    if mismatched or audit_dupes or errors:
+        exit(1)
+
+
+if __name__ == "__main__":
+    run()
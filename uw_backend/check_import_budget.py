@@ -0,0 +1,60 @@
+"""
+Import budget check: cold `import app` must stay under IMPORT_BUDGET_MS and must not
+load the spreadsheet stack (pandas, openpyxl, ezodf, gspread_formatting,
+googleapiclient.discovery) or Pillow, which are imported lazily by the code paths that need them.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter, prints the heaviest
+top-level imports, and exits 1 on a violation so it can gate CI or a pre-deploy step.
+
+    IMPORT_BUDGET_MS=1500 python check_import_budget.py [--top N]
+"""
+import os
+import re
+import subprocess
+import sys
+
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 1500))
+TOP = int(sys.argv[sys.argv.index("--top") + 1]) if "--top" in sys.argv else 15
+FORBIDDEN = ("pandas", "numpy", "openpyxl", "ezodf", "gspread_formatting", "googleapiclient.discovery", "PIL")
+
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def run():
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "postgresql://localhost/underwrite_import_budget")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=here, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(f"❌ import app failed:\n{proc.stderr[-3000:]}")
+        exit(1)
+
+    modules = {}
+    top_level = []
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        cumulative_us, depth, name = int(match.group(2)), len(match.group(3)) // 2, match.group(4)
+        modules[name] = cumulative_us
+        if depth <= 1:
+            top_level.append((cumulative_us, name))
+
+    total_ms = modules.get("app", 0) / 1000
+    print(f"⏱️ import app: {total_ms:.0f}ms (budget {BUDGET_MS:.0f}ms), {len(modules)} modules loaded")
+    for cumulative_us, name in sorted(top_level, reverse=True)[:TOP]:
+        print(f"   {cumulative_us / 1000:8.1f}ms  {name}")
+
+    loaded = [name for name in FORBIDDEN if name in modules]
+    if loaded:
+        print(f"❌ Loaded at import time (should be deferred): {', '.join(loaded)}")
+    if total_ms > BUDGET_MS:
+        print(f"❌ Over budget by {total_ms - BUDGET_MS:.0f}ms")
+    if loaded or total_ms > BUDGET_MS:
+        exit(1)
+    print("✅ Import budget OK")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,341 @@
+"""
+Validate the NumPy pro-forma preview (app/services/proforma.py) against real workbooks.
+
+Reads the project_scoping sample models (or the .xlsx files given) with their cached
+values, rebuilds an intermediate-style payload from the Assumptions tab (unit table,
+amenity and operating expense tables, leasing, financing and exit inputs, and the
+monthly project costs from the Model tab), runs the engine, and compares:
+
+  - monthly EGI, operating expenses and multifamily NOI against the NOI Walk, as mean
+    absolute percentage error over the hold;
+  - levered IRR / MOIC and unlevered IRR against the Model tab.
+
+Exits 1 if a workbook is outside tolerance, so it can gate changes to the engine.
+
+    python check_proforma.py [file.xlsx ...] [--noi-tol 0.03] [--irr-tol 0.03] [--moic-tol 0.15]
+"""
+import os
+import re
+import statistics
+import sys
+import time
+
+from app.services.proforma import run_proforma
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLES_DIR = os.path.join(HERE, "..", "project_scoping")
+NOI_TOL = float(sys.argv[sys.argv.index("--noi-tol") + 1]) if "--noi-tol" in sys.argv else 0.03
+IRR_TOL = float(sys.argv[sys.argv.index("--irr-tol") + 1]) if "--irr-tol" in sys.argv else 0.03
+MOIC_TOL = float(sys.argv[sys.argv.index("--moic-tol") + 1]) if "--moic-tol" in sys.argv else 0.15
+REPEAT = 50
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _text(value):
+    return str(value).strip() if isinstance(value, str) else ""
+
+
+class Sheet:
+    """Cached values of one worksheet, addressed by label."""
+
+    def __init__(self, ws):
+        rows = [list(row) for row in ws.iter_rows(values_only=True)]
+        width = max((len(row) for row in rows), default=0)
+        self.rows = [row + [None] * (width - len(row)) for row in rows]
+
+    def find(self, label, occurrence=0, col=None, after_row=0, prefix=False):
+        """(row, col) of the n-th cell whose text equals (or starts with) label."""
+        hits = []
+        for r, row in enumerate(self.rows):
+            if r < after_row:
+                continue
+            for c, value in enumerate(row):
+                text = _text(value)
+                if (text.startswith(label) if prefix else text == label) and (col is None or c == col):
+                    hits.append((r, c))
+        return hits[occurrence] if -len(hits) <= occurrence < len(hits) else None
+
+    def numbers_right(self, r, c):
+        """Numbers to the right of (r, c), up to the next text cell."""
+        out = []
+        for value in self.rows[r][c + 1:]:
+            if _text(value):
+                break
+            if _is_number(value):
+                out.append(float(value))
+        return out
+
+    def scalar(self, label, pick=0, default=None, **find):
+        hit = self.find(label, **find)
+        if hit is None:
+            return default
+        numbers = self.numbers_right(*hit)
+        return numbers[pick] if -len(numbers) <= pick < len(numbers) else default
+
+    def text_right(self, label, **find):
+        hit = self.find(label, **find)
+        if hit is None:
+            return None
+        return next((_text(v) for v in self.rows[hit[0]][hit[1] + 1:] if _text(v)), None)
+
+    def table(self, header_label, stop_label, header_col=1, after_row=0):
+        """Header cells -> column index, and the data rows below until stop_label in header_col."""
+        hit = self.find(header_label, col=header_col, after_row=after_row)
+        if hit is None:
+            return {}, []
+        header_row = hit[0]
+        headers = {}
+        for c, value in enumerate(self.rows[header_row]):
+            if _text(value):
+                headers.setdefault(_text(value).lower(), c)
+        rows = []
+        for row in self.rows[header_row + 1:]:
+            if _text(row[header_col]).startswith(stop_label) or (row[header_col] in (None, "") and rows):
+                break
+            rows.append(row)
+        return headers, rows
+
+    def month_row(self):
+        """(row, first col) of the 1, 2, 3 ... month header."""
+        for r, row in enumerate(self.rows[:30]):
+            for c in range(len(row) - 2):
+                if row[c] == 1 and row[c + 1] == 2 and row[c + 2] == 3:
+                    return r, c
+        return None
+
+    def series(self, label, month_at, months, col=1):
+        hit = self.find(label, col=col)
+        if hit is None or month_at is None:
+            return None
+        r, c0 = hit[0], month_at[1]
+        return [float(v) if _is_number(v) else 0.0 for v in self.rows[r][c0:c0 + months]]
+
+
+def _column(headers, *names):
+    for name in names:
+        for header, c in headers.items():
+            if header.startswith(name):
+                return c
+    return None
+
+
+def build_payload(book):
+    """Intermediate-style payload from a sample workbook's Assumptions and Model tabs."""
+    a = Sheet(book["Assumptions"])
+    model = Sheet(book["Model"])
+
+    headers, unit_rows = a.table("Units", "Total Rental Income")
+    c_type = _column(headers, "rent type")
+    c_flag = _column(headers, "vacate")
+    c_layout = _column(headers, "layout")
+    c_sf = _column(headers, "sq. ft.")
+    c_month = _column(headers, "vacated")
+    c_current = _column(headers, "current rent")
+    c_pf = _column(headers, "pro forma rent", "pf rent")
+    units = [{
+        "rent_type": _text(row[c_type]) if c_type is not None else "Rental Inflation",
+        "vacate_flag": row[c_flag] or 0,
+        "layout": row[c_layout],
+        "square_feet": row[c_sf],
+        "vacate_month": row[c_month] or 0,
+        "current_rent": row[c_current] or 0,
+        "pro_forma_rent": row[c_pf] or 0,
+    } for row in unit_rows if _is_number(row[c_current])]
+
+    growth = [{"type": "rental", "name": name, "value": 100 * a.scalar(name, col=1, default=0)}
+              for name in sorted({u["rent_type"] for u in units}) if a.find(name, col=1)]
+    growth.append({"type": "amenity", "name": "Amenity Inflation", "value": 100 * a.scalar("Amenity Inflation", default=0)})
+    growth.append({"type": "expense", "name": "Expense Inflation", "value": 100 * a.scalar("Expense Inflation", default=0)})
+
+    headers, amenity_rows = a.table("Amenity Income", "Total Amenity Income")
+    c_start, c_util = _column(headers, "start"), _column(headers, "utilization")
+    c_count, c_fee = _column(headers, "units"), _column(headers, "monthly fee")
+    amenities = [{
+        "name": row[1], "start_month": row[c_start], "utilization": 100 * (row[c_util] or 0),
+        "unit_count": row[c_count] or 0, "monthly_fee": row[c_fee] or 0,
+    } for row in amenity_rows if _is_number(row[c_fee])]
+
+    gross_sf = a.scalar("Buildable SF", default=0)
+    net_sf = a.scalar("Net Rentable SF", default=0)
+    headers, expense_rows = a.table("Operating Expenses", "Total Operating Expenses")
+    c_factor, c_stat = _column(headers, "factor"), _column(headers, "statistic")
+    operating = []
+    for row in expense_rows:
+        factor, statistic = row[c_factor], row[c_stat]
+        if not _is_number(factor):
+            continue
+        if not _is_number(statistic):
+            cost_per = "Total"
+        elif statistic == len(units):
+            cost_per = "Per Unit"
+        elif abs(statistic - (gross_sf - net_sf)) < 1:
+            cost_per = "Per CA Square Foot"
+        elif factor < 1:
+            cost_per, factor = "Percent of EGI", 100 * factor
+        else:
+            cost_per = "Per Total Square Feet"
+        operating.append({"name": row[1], "cost_per": cost_per, "factor": factor})
+
+    # Project costs by month from the Model tab (acquisition price comes from the field value)
+    months = model.month_row()
+    expenses = []
+    for label in ("Closing Costs", "Legal and Setup Costs", "Reserves", "Hard Costs"):
+        hit = model.find(label, col=3)
+        if hit is None or months is None:
+            continue
+        for offset, value in enumerate(model.rows[hit[0]][months[1] - 1:]):
+            if _is_number(value) and value:
+                expenses.append({"type": "Hard Costs" if label == "Hard Costs" else "Closing Costs",
+                                 "factor": "Total", "cost_per": value, "start_month": offset})
+
+    capex_row = a.find("CapEx", col=1)
+    exit_row = a.find("Exit (", col=1, prefix=True)
+    fields = {
+        "Acquisition Price": a.scalar("Acquisition Price", pick=-1),
+        "Gross Square Feet": gross_sf,
+        "Net Rentable SF": net_sf,
+        "Vacancy": a.scalar("Vacancy", col=1),
+        "Bad Debt": a.scalar("Bad Debt", col=1),
+        "Rehab Time": a.scalar("Rehab Time"),
+        "Lease-up Time": a.scalar("Lease-up Time"),
+        "Free Month's Rent": a.scalar("Free Month's Rent", occurrence=-1),
+        "Broker Fee": a.scalar("Broker Fee", occurrence=-1),
+        "Annual Turnover": a.scalar("Annual Turnover"),
+        "CapEx Reserves": a.scalar("Reserves", col=1, after_row=capex_row[0]) if capex_row else 0,
+        "LTV Max": a.scalar("LTV Max"),
+        "LTC on Hard Costs": a.scalar("LTC on Hard Costs"),
+        "Rate": a.scalar("Rate", pick=-1),
+        "Amortization": a.scalar("Amortization"),
+        "Required DSCR Minimum": a.scalar("Required DSCR Minimum"),
+        "Origination Fee": a.scalar("Origination Fee"),
+        "Permanent Loan Issued?": a.text_right("Permanent Loan Issued?"),
+        "Refinancing Month": a.scalar("Refinancing Month"),
+        "Refinancing: Fixed Interest Rate": a.scalar("Fixed Interest Rate"),
+        "Refinancing: Amortization": a.scalar("Amortization", occurrence=1),
+        "Refinancing: DSCR Min.": a.scalar("DSCR Min."),
+        "Refinancing: Debt Yield Min.": a.scalar("Debt Yield Min."),
+        "Refinancing: Cap Rate": a.scalar("LTV Max", occurrence=1),
+        "Refinancing: LTV Max": a.scalar("LTV Max", occurrence=1, pick=1),
+        "Origination Cost (Includes Title)": a.scalar("Origination Cost (Includes Title)"),
+        "Exit Month": _exit_month(a, exit_row),
+        "Applied Exit Cap Rate": a.scalar("Applied Exit Cap Rate"),
+        "Selling Costs": a.scalar("Less: Selling Costs"),
+    }
+    percent = {"Vacancy", "Bad Debt", "Annual Turnover", "CapEx Reserves", "LTV Max", "LTC on Hard Costs", "Rate",
+               "Origination Fee", "Refinancing: Fixed Interest Rate", "Refinancing: Debt Yield Min.",
+               "Refinancing: Cap Rate", "Refinancing: LTV Max", "Origination Cost (Includes Title)",
+               "Applied Exit Cap Rate", "Selling Costs"}
+    field_values = [{"field_key": key, "value": 100 * value if key in percent and _is_number(value) else value}
+                    for key, value in fields.items() if value is not None]
+    return {
+        "user_model_field_values": field_values,
+        "units": units,
+        "growth_rates": growth,
+        "amenity_income": amenities,
+        "operating_expenses": operating,
+        "expenses": expenses,
+    }
+
+
+def expected(book, exit_month):
+    noi_walk = Sheet(book["NOI Walk"])
+    model = Sheet(book["Model"])
+    month_at = noi_walk.month_row()
+    out = {
+        "egi": noi_walk.series("Effective Gross Income", month_at, exit_month),
+        "operating_expenses": noi_walk.series("Total Operating Expenses", month_at, exit_month),
+        "noi": noi_walk.series("Multifamily NOI", month_at, exit_month),
+    }
+    for name, label in (("levered_irr", "Levered IRR"), ("levered_moic", "Levered MOIC"),
+                        ("unlevered_irr", "Unlevered IRR")):
+        hit = model.find(label, col=3)
+        numbers = model.numbers_right(*hit) if hit else []
+        out[name] = numbers[0] if numbers else None
+    return out
+
+
+def _exit_month(sheet, exit_row):
+    """Exit month beside the "Exit (date)" label: a number, or text like "Month 60" in older templates."""
+    if not exit_row:
+        return None
+    numbers = sheet.numbers_right(*exit_row)
+    if numbers:
+        return numbers[0]
+    row, col = exit_row
+    text = next((_text(v) for v in sheet.rows[row][col + 1:] if _text(v)), "")
+    digits = re.search(r"\d+", text)
+    return int(digits.group()) if digits else None
+
+
+def mape(actual, target):
+    pairs = [(a, t) for a, t in zip(actual, target) if t]
+    return sum(abs(a - t) / abs(t) for a, t in pairs) / len(pairs) if pairs else None
+
+
+def check(path):
+    from openpyxl import load_workbook
+
+    with open(path, "rb") as f:  # by handle: openpyxl rejects names like "..xlsx"
+        book = load_workbook(f, data_only=True, read_only=True)
+        return _check_book(path, book)
+
+
+def _check_book(path, book):
+    if not {"Assumptions", "NOI Walk", "Model"} <= set(book.sheetnames):
+        print(f"⏭️  {os.path.basename(path)}: not a pro-forma workbook")
+        return True
+    payload = build_payload(book)
+    if not payload["units"]:
+        print(f"⏭️  {os.path.basename(path)}: no unit table found (older layout)")
+        return True
+    samples = []
+    result = None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = run_proforma(payload)
+        samples.append(time.perf_counter() - started)
+    summary = result["summary"]
+    exit_month = summary["exit_month"]
+    target = expected(book, exit_month)
+
+    print(f"📋 {os.path.basename(path)}: {summary['units']} units, exit month {exit_month}, "
+          f"{statistics.median(samples) * 1000:.2f}ms median of {REPEAT}")
+    ok = True
+    for name in ("egi", "operating_expenses", "noi"):
+        if not target[name]:
+            print(f"   ⚠️  {name}: not found in NOI Walk")
+            continue
+        error = mape(result["monthly"][name][:exit_month], target[name])
+        passed = error is not None and error <= NOI_TOL
+        ok &= passed
+        print(f"   {'✅' if passed else '❌'} {name:20s} MAPE {100 * error:6.2f}%")
+    for name, tolerance in (("levered_irr", IRR_TOL), ("unlevered_irr", IRR_TOL), ("levered_moic", MOIC_TOL)):
+        got, want = summary[name], target[name]
+        if want is None or got is None:
+            print(f"   ⚠️  {name}: engine {got}, workbook {want}")
+            continue
+        passed = abs(got - want) <= tolerance
+        ok &= passed
+        print(f"   {'✅' if passed else '❌'} {name:20s} engine {got:8.4f}  workbook {want:8.4f}  Δ {got - want:+.4f}")
+    return ok
+
+
+def run():
+    paths = [arg for arg in sys.argv[1:] if arg.endswith(".xlsx")]
+    skip = {"--noi-tol", "--irr-tol", "--moic-tol"}
+    paths = [p for i, p in enumerate(paths) if sys.argv[sys.argv.index(p) - 1] not in skip]
+    if not paths:
+        paths = sorted(os.path.join(SAMPLES_DIR, name) for name in os.listdir(SAMPLES_DIR)
+                       if name.endswith(".xlsx") and not name.startswith("~$"))
+    results = [check(path) for path in paths]
+    if not all(results):
+        print(f"❌ {results.count(False)} of {len(results)} workbooks outside tolerance")
+        exit(1)
+    print(f"✅ {len(results)} workbooks within tolerance")
+
+
+if __name__ == "__main__":
+    run()
@@ -35,6 +35,10 @@ for cls in Base.__subclasses__():
     if hasattr(cls, '__tablename__'):
         print(f"- {cls.__tablename__}")
 
+# Trigram index on model_search_documents needs pg_trgm
+with engine.begin() as conn:
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
 # Create all tables
 Base.metadata.create_all(bind=engine)
 
@@ -0,0 +1,105 @@
+"""
+Local fake of Stripe's webhook event stream, for replay tests and benchmarks.
+
+generate_events builds a realistic subscription lifecycle per customer (created ->
+trialing/active -> payment failures and recoveries -> plan changes -> maybe deleted),
+then delivers it the way Stripe can: shuffled, so events arrive out of created order,
+and with a share of events redelivered. sign_payload produces a Stripe-Signature
+header that Webhook.construct_event accepts.
+"""
+import hashlib
+import hmac
+import json
+import random
+import time
+
+STATUS_FLOW = ["trialing", "active", "past_due", "active", "active", "unpaid", "active"]
+
+
+def _subscription(customer_id, sub_id, status, price_id, created, cancel_at_period_end=False):
+    return {
+        "id": sub_id,
+        "object": "subscription",
+        "customer": customer_id,
+        "status": status,
+        "current_period_end": created + 30 * 86400,
+        "cancel_at_period_end": cancel_at_period_end,
+        "items": {"object": "list", "data": [{"id": f"si_{sub_id[4:]}", "price": {"id": price_id}}]},
+    }
+
+
+def _event(event_id, event_type, obj, created):
+    return {
+        "id": event_id,
+        "object": "event",
+        "type": event_type,
+        "created": created,
+        "livemode": False,
+        "data": {"object": obj},
+    }
+
+
+def customer_lifecycle(customer_id, price_ids, events, start, rng):
+    """(events, expected final subscription state) for one customer."""
+    sub_id = f"sub_{customer_id[4:]}"
+    price_id = rng.choice(price_ids)
+    created = start
+    stream = [_event(f"evt_{customer_id[4:]}_0", "customer.subscription.created",
+                     _subscription(customer_id, sub_id, "trialing", price_id, created), created)]
+    stream.append(_event(f"evt_{customer_id[4:]}_1", "checkout.session.completed",
+                         {"object": "checkout.session", "customer": customer_id, "subscription": sub_id}, created))
+    final = {"status": "trialing", "price_id": price_id}
+    for n in range(2, events):
+        created += rng.randint(1, 3600)
+        event_id = f"evt_{customer_id[4:]}_{n}"
+        roll = rng.random()
+        if n == events - 1 and roll < 0.2:
+            obj = _subscription(customer_id, sub_id, "canceled", price_id, created)
+            stream.append(_event(event_id, "customer.subscription.deleted", obj, created))
+            final = {"status": "canceled", "price_id": price_id}
+            continue
+        if roll < 0.1:
+            stream.append(_event(event_id, "invoice.payment_failed",
+                                 {"object": "invoice", "customer": customer_id, "subscription": sub_id}, created))
+            final = {"status": "past_due", "price_id": price_id}
+            continue
+        if roll < 0.25:
+            price_id = rng.choice(price_ids)
+        status = STATUS_FLOW[n % len(STATUS_FLOW)]
+        obj = _subscription(customer_id, sub_id, status, price_id, created, cancel_at_period_end=roll > 0.9)
+        stream.append(_event(event_id, "customer.subscription.updated", obj, created))
+        final = {"status": status, "price_id": price_id}
+    return stream, final
+
+
+def generate_events(customers=100, events_per_customer=12, price_ids=("price_pro", "price_max"),
+                    duplicate_rate=0.1, seed=7):
+    """
+    Returns (deliveries, expected) where deliveries is the list of event dicts in
+    delivery order (shuffled, duplicates included) and expected maps customer id ->
+    final {status, price_id} once every event is applied in created order.
+    """
+    rng = random.Random(seed)
+    start = int(time.time()) - 90 * 86400
+    deliveries, expected = [], {}
+    for c in range(customers):
+        customer_id = f"cus_fake{c:06d}"
+        stream, final = customer_lifecycle(customer_id, list(price_ids), events_per_customer, start + c, rng)
+        expected[customer_id] = final
+        deliveries.extend(stream)
+    deliveries.extend(rng.sample(deliveries, int(len(deliveries) * duplicate_rate)))
+    rng.shuffle(deliveries)
+    return deliveries, expected
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """Stripe-Signature header value for a raw payload (bytes or str)."""
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    timestamp = int(timestamp or time.time())
+    signature = hmac.new(secret.encode("utf-8"), f"{timestamp}.{payload}".encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def encode(event):
+    return json.dumps(event, separators=(",", ":")).encode("utf-8")
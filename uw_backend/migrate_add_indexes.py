@@ -0,0 +1,61 @@
+"""
+Migration: indexes for the foreign keys and filters the routes actually use.
+Index names match what SQLAlchemy generates from the models (index=True / Index(...)),
+so create_db.py and this script agree. Built CONCURRENTLY to avoid locking writes.
+Run with: python migrate_add_indexes.py
+"""
+import os
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    print("DATABASE_URL not found in .env")
+    exit(1)
+
+engine = create_engine(DATABASE_URL)
+
+VERSION_CHILD_TABLES = [
+    "units",
+    "market_rent_assumptions",
+    "growth_rates",
+    "amenity_income",
+    "operating_expenses",
+    "expenses",
+    "retail_income",
+    "development_units",
+    "user_model_field_values",
+]
+
+INDEXES = [
+    f"ix_{table}_user_model_version_id ON {table} (user_model_version_id)" for table in VERSION_CHILD_TABLES
+] + [
+    "ix_user_models_user_id ON user_models (user_id)",
+    "ix_user_model_versions_user_model_id_version_number ON user_model_versions (user_model_id, version_number DESC)",
+    "ix_user_model_versions_google_sheet_url ON user_model_versions (google_sheet_url)",
+    "ix_model_type_sections_model_type_id ON model_type_sections (model_type_id)",
+    "ix_model_type_section_fields_section_id ON model_type_section_fields (section_id)",
+    "ix_model_tags_user_model_id_status ON model_tags (user_model_id, status)",
+    "ix_model_notes_user_model_id_status_created_at ON model_notes (user_model_id, status, created_at DESC)",
+    "ix_model_pictures_user_model_id_status_order ON model_pictures (user_model_id, status, picture_order)",
+]
+
+
+def migrate():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index in INDEXES:
+            print(f"Creating index {index.split(' ON ')[0]}...")
+            conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index}"))
+
+        print("Analyzing tables...")
+        for table in VERSION_CHILD_TABLES + ["user_models", "user_model_versions", "model_type_sections",
+                                             "model_type_section_fields", "model_tags", "model_notes", "model_pictures"]:
+            conn.execute(text(f"ANALYZE {table}"))
+    print("Done.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,61 @@
+"""
+Migration: re-encode user_model_versions.table_mapping_output into the compact
+style-interned format (see app/utils/table_codec.py).
+Only rows still holding the legacy list form are touched, so it is safe to re-run.
+Run with: python migrate_compact_tables.py [--dry-run]
+"""
+import os
+import sys
+import json
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+from app.utils.table_codec import encode_tables
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    print("DATABASE_URL not found in .env")
+    exit(1)
+
+engine = create_engine(DATABASE_URL)
+BATCH_SIZE = 200
+
+
+def migrate(dry_run=False):
+    converted = 0
+    bytes_before = 0
+    bytes_after = 0
+    with engine.connect() as conn:
+        while True:
+            rows = conn.execute(text(
+                "SELECT id, table_mapping_output FROM user_model_versions "
+                "WHERE jsonb_typeof(table_mapping_output) = 'array' "
+                "ORDER BY id LIMIT :limit OFFSET :offset"
+            ), {"limit": BATCH_SIZE, "offset": converted if dry_run else 0}).fetchall()
+            if not rows:
+                break
+
+            for version_id, tables in rows:
+                encoded = encode_tables(tables)
+                bytes_before += len(json.dumps(tables))
+                bytes_after += len(json.dumps(encoded))
+                if not dry_run:
+                    conn.execute(
+                        text("UPDATE user_model_versions SET table_mapping_output = CAST(:tables AS JSONB) WHERE id = :id"),
+                        {"tables": json.dumps(encoded), "id": version_id}
+                    )
+                converted += 1
+
+            if not dry_run:
+                conn.commit()
+            print(f"Re-encoded {converted} versions so far...")
+
+    ratio = (bytes_after / bytes_before) if bytes_before else 1
+    print(f"{'Would re-encode' if dry_run else 'Re-encoded'} {converted} versions: "
+          f"{bytes_before} -> {bytes_after} bytes ({ratio:.1%}).")
+
+
+if __name__ == "__main__":
+    migrate(dry_run="--dry-run" in sys.argv)
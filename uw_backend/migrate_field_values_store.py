@@ -0,0 +1,58 @@
+"""
+Migration: move UserModelFieldValue rows into user_model_versions.field_values (JSONB).
+Adds the column and its GIN index, then backfills every version that has legacy rows.
+Legacy rows are left in place so the backfill can be re-run or audited.
+Run with: python migrate_field_values_store.py
+"""
+import os
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    print("DATABASE_URL not found in .env")
+    exit(1)
+
+engine = create_engine(DATABASE_URL)
+
+BACKFILL_SQL = """
+UPDATE user_model_versions v
+SET field_values = agg.field_values
+FROM (
+    SELECT user_model_version_id,
+           jsonb_object_agg(
+               field_id::text,
+               jsonb_build_object('value', value, 'start_month', start_month, 'end_month', end_month)
+               ORDER BY created_at NULLS FIRST
+           ) AS field_values
+    FROM user_model_field_values
+    GROUP BY user_model_version_id
+) agg
+WHERE v.id = agg.user_model_version_id
+  AND v.field_values IS NULL
+"""
+
+
+def migrate():
+    with engine.connect() as conn:
+        print("Adding field_values column to user_model_versions...")
+        conn.execute(text("ALTER TABLE user_model_versions ADD COLUMN IF NOT EXISTS field_values JSONB"))
+        conn.commit()
+
+        print("Creating GIN index on user_model_versions.field_values...")
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_user_model_versions_field_values "
+            "ON user_model_versions USING GIN (field_values)"
+        ))
+        conn.commit()
+
+        print("Backfilling field_values from user_model_field_values...")
+        result = conn.execute(text(BACKFILL_SQL))
+        conn.commit()
+        print(f"Backfilled {result.rowcount} versions.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,72 @@
+"""
+Migration: numeric shadow columns for levered IRR / MOIC plus the indexes the
+portfolio endpoint relies on. Backfills levered_irr_value / levered_moic_value
+from the stored strings using app.utils.numbers.parse_number (clean_number rules).
+Run with: python migrate_return_metrics.py
+"""
+import os
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+from app.utils.numbers import parse_number
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    print("DATABASE_URL not found in .env")
+    exit(1)
+
+engine = create_engine(DATABASE_URL)
+BATCH_SIZE = 1000
+
+DDL = [
+    "ALTER TABLE user_model_versions ADD COLUMN IF NOT EXISTS levered_irr_value DOUBLE PRECISION",
+    "ALTER TABLE user_model_versions ADD COLUMN IF NOT EXISTS levered_moic_value DOUBLE PRECISION",
+    "CREATE INDEX IF NOT EXISTS ix_user_model_versions_user_model_id_version_number "
+    "ON user_model_versions (user_model_id, version_number DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_user_model_versions_levered_irr_value ON user_model_versions (levered_irr_value)",
+    "CREATE INDEX IF NOT EXISTS ix_user_model_versions_levered_moic_value ON user_model_versions (levered_moic_value)",
+    "CREATE INDEX IF NOT EXISTS ix_model_tags_active_tag_name ON model_tags (tag_name, user_model_id) WHERE status = 'active'",
+]
+
+
+def backfill(conn):
+    """Parse every version that has a string value but no numeric shadow yet."""
+    total = 0
+    last_id = None
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, levered_irr, levered_moic FROM user_model_versions "
+            "WHERE ((levered_irr IS NOT NULL AND levered_irr_value IS NULL) "
+            "    OR (levered_moic IS NOT NULL AND levered_moic_value IS NULL)) "
+            "AND (CAST(:last_id AS UUID) IS NULL OR id > CAST(:last_id AS UUID)) "
+            "ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            text("UPDATE user_model_versions SET levered_irr_value = :irr, levered_moic_value = :moic WHERE id = :id"),
+            [{"id": r.id, "irr": parse_number(r.levered_irr), "moic": parse_number(r.levered_moic)} for r in rows]
+        )
+        conn.commit()
+        total += len(rows)
+        last_id = str(rows[-1].id)
+        print(f"Backfilled {total} versions so far...")
+    return total
+
+
+def migrate():
+    with engine.connect() as conn:
+        for statement in DDL:
+            print(f"Running: {statement}")
+            conn.execute(text(statement))
+            conn.commit()
+
+        print("Backfilling numeric IRR / MOIC...")
+        total = backfill(conn)
+        print(f"Done. Backfilled {total} versions.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,61 @@
+"""
+Migration: create model_search_documents (with its GIN full-text and trigram indexes)
+and build a search row for every existing user_model. After this the rows are kept
+current by app/utils/search_index.py on every commit; re-running only refreshes them.
+Run with: python migrate_search_index.py
+"""
+import os
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+from app.db import Base
+from app.models.model import ModelSearchDocument
+from app.utils.search_index import REFRESH_SQL, SEARCH_CONFIG
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    print("DATABASE_URL not found in .env")
+    exit(1)
+
+engine = create_engine(DATABASE_URL)
+BATCH_SIZE = 500
+
+
+def backfill(conn):
+    total = 0
+    last_id = None
+    while True:
+        ids = conn.execute(text(
+            "SELECT id FROM user_models "
+            "WHERE (CAST(:last_id AS UUID) IS NULL OR id > CAST(:last_id AS UUID)) "
+            "ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": BATCH_SIZE}).scalars().all()
+        if not ids:
+            break
+        conn.execute(REFRESH_SQL, {"model_ids": [str(i) for i in ids], "version_ids": [], "config": SEARCH_CONFIG})
+        conn.commit()
+        total += len(ids)
+        last_id = str(ids[-1])
+        print(f"Indexed {total} models so far...")
+    return total
+
+
+def migrate():
+    with engine.connect() as conn:
+        print("Running: CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.commit()
+
+    print("Creating model_search_documents (if missing)...")
+    Base.metadata.tables[ModelSearchDocument.__tablename__].create(bind=engine, checkfirst=True)
+
+    with engine.connect() as conn:
+        print("Building search documents...")
+        total = backfill(conn)
+        print(f"Done. Indexed {total} models.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -1,7 +1,7 @@
 import os
 from sqlalchemy import create_engine
 from app.db import Base
-from app.models.user import User, UserInfo, CompanyInfo, SubscriptionEvent
+from app.models.user import User, UserInfo, CompanyInfo, SubscriptionEvent, StripeWebhookEvent
 from dotenv import load_dotenv
 
 load_dotenv()
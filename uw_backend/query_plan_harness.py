@@ -0,0 +1,229 @@
+"""
+Query-plan regression harness.
+
+Builds the schema from the models in a *local* Postgres database, seeds a large
+synthetic dataset, runs EXPLAIN on the queries the routes issue, and fails if any
+of them stops using its index (or falls back to a sequential scan on a big table).
+
+    PLAN_DATABASE_URL=postgresql://localhost/underwrite_plans python query_plan_harness.py [scale]
+
+The target database is dropped and recreated table by table, so it must not be the
+application database. `scale` multiplies the seed sizes (default 1 = 2,000 users,
+20,000 models, 60,000 versions, ~1.5M child rows).
+"""
+import os
+import sys
+import time
+from sqlalchemy import create_engine, text, func
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from app.db import Base
+from app.models import (
+    User, ModelType, ModelTypeSection, ModelTypeSectionField,
+    UserModel, UserModelVersion, UserModelFieldValue,
+    Unit, MarketRentAssumption
+)
+from app.models.model import (
+    GrowthRates, AmenityIncome, OperatingExpenses, Expenses, RetailIncome, DevelopmentUnit,
+    ModelNote, ModelPicture, ModelTag
+)
+
+load_dotenv()
+
+PLAN_DATABASE_URL = os.getenv("PLAN_DATABASE_URL", "postgresql://localhost/underwrite_plans")
+if PLAN_DATABASE_URL == os.getenv("DATABASE_URL"):
+    print("PLAN_DATABASE_URL must not point at the application database")
+    exit(1)
+
+SCALE = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+SIZES = {
+    "users": int(2000 * SCALE),
+    "model_types": 200,
+    "sections": 8,
+    "fields": 12,
+    "models_per_user": 10,
+    "versions_per_model": 3,
+    "children_per_version": 8,
+    "field_values_per_version": 40,
+    "extras_per_model": 3,
+}
+
+VERSION_CHILD_SEEDS = {
+    "units": "rent_type, layout, square_feet, current_rent) SELECT gen_random_uuid(), v.id, 'market', '1BR', 650 + g, 2000 + g",
+    "market_rent_assumptions": "layout, pf_rent) SELECT gen_random_uuid(), v.id, '1BR', 2100 + g",
+    "growth_rates": "name, value, type) SELECT gen_random_uuid(), v.id, 'Rent Growth ' || g, 0.03, 'rent'",
+    "amenity_income": "name, start_month, utilization, unit_count, monthly_fee) SELECT gen_random_uuid(), v.id, 'Parking ' || g, 1, 0.9, 10, 75",
+    "operating_expenses": "name, factor, broker, cost_per) SELECT gen_random_uuid(), v.id, 'Insurance ' || g, 1.0, 0, 'unit'",
+    "expenses": "name, factor, cost_per, start_month, end_month, type) SELECT gen_random_uuid(), v.id, 'Capex ' || g, 'unit', 500, 1, 12, 'capex'",
+    "retail_income": "suite, tenant_name, square_feet, rent_per_square_foot_per_year) SELECT gen_random_uuid(), v.id, 'S' || g, 'Tenant ' || g, 1200, 32",
+    "development_units": "unit_type, avg_sf, units, avg_rent) SELECT gen_random_uuid(), v.id, 'Studio', 480, 12, 1850",
+}
+
+SEED_SQL = [
+    ("users", """
+        INSERT INTO users (id, auth0_user_id, email, is_active, plan_tier)
+        SELECT gen_random_uuid(), 'seed|' || g, 'seed' || g || '@example.com', true, 'pro'
+        FROM generate_series(1, :users) g
+    """),
+    ("model_types", """
+        INSERT INTO model_types (id, name, is_active, show_retail, show_rental_units)
+        SELECT gen_random_uuid(), 'Seed Type ' || g, true, true, true FROM generate_series(1, :model_types) g
+    """),
+    ("model_type_sections", """
+        INSERT INTO model_type_sections (id, model_type_id, name, "order", active)
+        SELECT gen_random_uuid(), mt.id, 'Section ' || g, g, true FROM model_types mt, generate_series(1, :sections) g
+    """),
+    ("model_type_section_fields", """
+        INSERT INTO model_type_section_fields (id, section_id, field_title, field_key, field_type, "order", active)
+        SELECT gen_random_uuid(), s.id, 'Field ' || g, 'field_' || g, 'number', g, true
+        FROM model_type_sections s, generate_series(1, :fields) g
+    """),
+    ("user_models", """
+        WITH types AS (SELECT array_agg(id) AS ids FROM model_types)
+        INSERT INTO user_models (id, user_id, model_type_id, active, name, street_address, city, state, zip_code)
+        SELECT gen_random_uuid(), u.id, types.ids[1 + (g % array_length(types.ids, 1))], true,
+               'Deal ' || g, g || ' Main St', 'Springfield', 'IL', '62701'
+        FROM users u CROSS JOIN generate_series(1, :models_per_user) g CROSS JOIN types
+    """),
+    ("user_model_versions", """
+        INSERT INTO user_model_versions (id, user_model_id, version_number, google_sheet_url,
+                                         levered_irr, levered_moic, levered_irr_value, levered_moic_value, created_at)
+        SELECT gen_random_uuid(), r.user_model_id, r.g,
+               'https://docs.google.com/spreadsheets/d/' || r.user_model_id || '-' || r.g || '/edit',
+               r.irr::numeric(6,1) || '%', r.moic::numeric(6,2) || 'x', r.irr::numeric(6,1), r.moic::numeric(6,2),
+               now() - (r.g || ' days')::interval
+        FROM (
+            SELECT m.id AS user_model_id, g, random() * 40 AS irr, 1 + random() * 3 AS moic
+            FROM user_models m CROSS JOIN generate_series(1, :versions_per_model) g
+        ) r
+    """),
+] + [
+    (table, f"""
+        INSERT INTO {table} (id, user_model_version_id, {columns}
+        FROM user_model_versions v CROSS JOIN generate_series(1, :children_per_version) g
+    """) for table, columns in VERSION_CHILD_SEEDS.items()
+] + [
+    ("user_model_field_values", """
+        WITH fields AS (SELECT array_agg(id) AS ids FROM model_type_section_fields)
+        INSERT INTO user_model_field_values (id, user_model_version_id, field_id, value, start_month, end_month)
+        SELECT gen_random_uuid(), v.id, fields.ids[1 + (g % array_length(fields.ids, 1))], g::text, 1, 12
+        FROM user_model_versions v CROSS JOIN generate_series(1, :field_values_per_version) g CROSS JOIN fields
+    """),
+    ("model_tags", """
+        INSERT INTO model_tags (id, user_model_id, tag_name, status)
+        SELECT gen_random_uuid(), m.id, 'Tag ' || (g % 5), CASE WHEN g = 1 THEN 'deleted' ELSE 'active' END
+        FROM user_models m CROSS JOIN generate_series(1, :extras_per_model) g
+    """),
+    ("model_notes", """
+        INSERT INTO model_notes (id, user_model_id, note_value, status, created_at)
+        SELECT gen_random_uuid(), m.id, 'Note ' || g, 'active', now() - (g || ' hours')::interval
+        FROM user_models m CROSS JOIN generate_series(1, :extras_per_model) g
+    """),
+    ("model_pictures", """
+        INSERT INTO model_pictures (id, user_model_id, picture_url, picture_order, status)
+        SELECT gen_random_uuid(), m.id, 'https://storage.googleapis.com/seed/' || m.id || '/' || g || '.jpg', g, 'active'
+        FROM user_models m CROSS JOIN generate_series(1, :extras_per_model) g
+    """),
+]
+
+
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table, sql in SEED_SQL:
+            started = time.monotonic()
+            result = conn.execute(text(sql), SIZES)
+            print(f"🌱 {table}: {result.rowcount} rows in {time.monotonic() - started:.1f}s")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def route_queries(session):
+    """(name, statement, expected index) for the lookups the routes issue, using real seeded ids."""
+    user_model = session.query(UserModel).first()
+    version = session.query(UserModelVersion).filter_by(user_model_id=user_model.id).first()
+    model_type_id = user_model.model_type_id
+    section_id = session.query(ModelTypeSection.id).filter_by(model_type_id=model_type_id).first()[0]
+    user = session.query(User).get(user_model.user_id)
+
+    queries = [
+        ("user by auth0 id", session.query(User).filter_by(auth0_user_id=user.auth0_user_id), "users_auth0_user_id_key"),
+        ("user models by user", session.query(UserModel, ModelType.name).join(
+            ModelType, UserModel.model_type_id == ModelType.id).filter(UserModel.user_id == user.id),
+         "ix_user_models_user_id"),
+        ("model count by user", session.query(func.count(UserModel.id)).filter_by(user_id=user.id), "ix_user_models_user_id"),
+        ("versions by model", session.query(UserModelVersion).filter_by(user_model_id=user_model.id),
+         "ix_user_model_versions_user_model_id_version_number"),
+        ("latest version", session.query(UserModelVersion).filter_by(user_model_id=user_model.id).order_by(
+            UserModelVersion.version_number.desc()).limit(1),
+         "ix_user_model_versions_user_model_id_version_number"),
+        ("version by sheet url", session.query(UserModelVersion).filter_by(google_sheet_url=version.google_sheet_url).order_by(
+            UserModelVersion.version_number.desc()).limit(1),
+         "ix_user_model_versions_google_sheet_url"),
+        ("sections by model type", session.query(ModelTypeSection).filter_by(model_type_id=model_type_id),
+         "ix_model_type_sections_model_type_id"),
+        ("fields by section", session.query(ModelTypeSectionField).filter_by(section_id=section_id),
+         "ix_model_type_section_fields_section_id"),
+        ("active tags by model", session.query(ModelTag).filter(
+            ModelTag.user_model_id == user_model.id, ModelTag.status == 'active'),
+         "ix_model_tags_user_model_id_status"),
+        ("active notes by model", session.query(ModelNote).filter(
+            ModelNote.user_model_id == user_model.id, ModelNote.status == 'active').order_by(ModelNote.created_at.desc()),
+         "ix_model_notes_user_model_id_status_created_at"),
+        ("active pictures by model", session.query(ModelPicture).filter_by(user_model_id=user_model.id).filter(
+            ModelPicture.status == 'active').order_by(ModelPicture.picture_order.asc().nulls_last(), ModelPicture.created_at.asc()),
+         "ix_model_pictures_user_model_id_status_order"),
+    ]
+    for model in (Unit, MarketRentAssumption, GrowthRates, AmenityIncome, OperatingExpenses,
+                  Expenses, RetailIncome, DevelopmentUnit, UserModelFieldValue):
+        queries.append((
+            f"{model.__tablename__} by version",
+            session.query(model).filter_by(user_model_version_id=version.id),
+            f"ix_{model.__tablename__}_user_model_version_id",
+        ))
+    return queries
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def check_plans(engine):
+    failures = []
+    with Session(engine) as session:
+        for name, query, expected_index in route_queries(session):
+            sql = str(query.statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            plan = session.execute(text("EXPLAIN (FORMAT JSON) " + sql)).scalar()[0]["Plan"]
+            nodes = list(_plan_nodes(plan))
+            indexes = {n.get("Index Name") for n in nodes if n.get("Index Name")}
+            seq_scans = {n.get("Relation Name") for n in nodes if n.get("Node Type") == "Seq Scan"}
+            # Tiny lookup tables (model_types) may legitimately be seq-scanned
+            seq_scans.discard("model_types")
+
+            ok = expected_index in indexes and not seq_scans
+            print(f"{'✅' if ok else '❌'} {name}: cost={plan.get('Total Cost')} indexes={sorted(indexes)}"
+                  + (f" seq_scans={sorted(seq_scans)}" if seq_scans else ""))
+            if not ok:
+                failures.append(name)
+    return failures
+
+
+def run():
+    engine = create_engine(PLAN_DATABASE_URL)
+    print(f"Seeding {PLAN_DATABASE_URL} with {SIZES}")
+    seed(engine)
+    failures = check_plans(engine)
+    if failures:
+        print(f"❌ {len(failures)} queries regressed: {failures}")
+        exit(1)
+    print("✅ All route queries use their indexes.")
+
+
+if __name__ == "__main__":
+    run()
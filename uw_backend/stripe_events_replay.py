@@ -0,0 +1,126 @@
+"""
+Inspect and replay stored Stripe webhook events.
+
+    python stripe_events_replay.py status
+    python stripe_events_replay.py replay [--event evt_...] [--customer cus_...] [--since 2025-01-01] [--failed]
+    python stripe_events_replay.py backfill --since 2025-01-01     # fetch missed events from Stripe's Events API
+    python stripe_events_replay.py fake [--customers 100] [--events 12]   # load a fake event stream (local DBs only)
+    python stripe_events_replay.py drain
+
+`replay` resets the selected events to pending and applies them again in per-customer
+order; events older than one already applied for the same customer are skipped, so
+replaying a whole customer history is safe. Every command finishes with a drain.
+"""
+import argparse
+import os
+from datetime import datetime
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import stripe
+from app.services.stripe_events import drain, record_event, webhook_stats
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    print("DATABASE_URL not found in .env")
+    exit(1)
+
+stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
+engine = create_engine(DATABASE_URL)
+
+
+def _session():
+    return Session(engine)
+
+
+def _since_ts(value):
+    return int(datetime.fromisoformat(value).timestamp()) if value else None
+
+
+def replay(args):
+    filters, params = ["TRUE"], {}
+    if args.event:
+        filters.append("stripe_event_id = :event_id")
+        params["event_id"] = args.event
+    if args.customer:
+        filters.append("customer_id = :customer_id")
+        params["customer_id"] = args.customer
+    if args.since:
+        filters.append("stripe_created >= :since")
+        params["since"] = _since_ts(args.since)
+    if args.failed:
+        filters.append("status = 'failed'")
+    with _session() as session:
+        count = session.execute(text(
+            "UPDATE stripe_webhook_events SET status = 'pending', attempts = 0, last_error = NULL, processed_at = NULL "
+            f"WHERE {' AND '.join(filters)}"
+        ), params).rowcount
+        session.commit()
+    print(f"🔁 Reset {count} events to pending")
+
+
+def backfill(args):
+    created = {"gte": _since_ts(args.since)} if args.since else None
+    stored = duplicates = 0
+    with _session() as session:
+        for event in stripe.Event.list(created=created, limit=100).auto_paging_iter():
+            if record_event(session, event.to_dict()):
+                stored += 1
+            else:
+                duplicates += 1
+    print(f"📥 Stored {stored} missed events ({duplicates} already present)")
+
+
+def fake(args):
+    from fake_stripe_events import generate_events
+
+    if "localhost" not in DATABASE_URL and "127.0.0.1" not in DATABASE_URL:
+        print("Refusing to load fake events into a non-local database")
+        exit(1)
+    deliveries, expected = generate_events(args.customers, args.events)
+    with _session() as session:
+        for customer_id in expected:
+            session.execute(text(
+                "INSERT INTO users (id, auth0_user_id, email, stripe_customer_id, plan_tier) "
+                "VALUES (gen_random_uuid(), :sub, :email, :cus, 'freemium') ON CONFLICT DO NOTHING"
+            ), {"sub": f"fake|{customer_id}", "email": f"{customer_id}@fake.local", "cus": customer_id})
+        session.commit()
+        stored = sum(record_event(session, event) for event in deliveries)
+    print(f"🧪 Stored {stored} fake events ({len(deliveries) - stored} redeliveries dropped) for {len(expected)} customers")
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status")
+    sub.add_parser("drain")
+    p = sub.add_parser("replay")
+    p.add_argument("--event")
+    p.add_argument("--customer")
+    p.add_argument("--since")
+    p.add_argument("--failed", action="store_true")
+    p = sub.add_parser("backfill")
+    p.add_argument("--since")
+    p = sub.add_parser("fake")
+    p.add_argument("--customers", type=int, default=100)
+    p.add_argument("--events", type=int, default=12)
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        replay(args)
+    elif args.command == "backfill":
+        backfill(args)
+    elif args.command == "fake":
+        fake(args)
+
+    if args.command != "status":
+        print(f"⚙️ Applied: {drain(_session)}")
+    with _session() as session:
+        print(f"📊 {webhook_stats(session)}")
+
+
+if __name__ == "__main__":
+    run()
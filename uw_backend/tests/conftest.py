@@ -0,0 +1,13 @@
+"""
+Unit tests for the pure helpers (A1 math, batchUpdate optimizer, mapping index, pro-forma).
+
+`import app` builds nothing at import time but reads DATABASE_URL when the app is created,
+so a placeholder is set like check_import_budget.py does. Run from uw_backend/:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/underwrite_tests")
@@ -0,0 +1,61 @@
+import pytest
+
+from app.utils.a1 import (
+    GridRange, column_index, column_letter, column_letters, parse_a1, quote_sheet, split_sheet, to_a1,
+)
+
+
+@pytest.mark.parametrize("col, letters", [
+    (1, "A"), (26, "Z"), (27, "AA"), (52, "AZ"), (53, "BA"),
+    (702, "ZZ"), (703, "AAA"), (704, "AAB"), (18278, "ZZZ"),
+])
+def test_column_boundaries(col, letters):
+    assert column_letter(col) == letters
+    assert column_index(letters) == col
+    assert column_index(letters.lower()) == col
+
+
+def test_column_letter_rejects_zero():
+    with pytest.raises(ValueError):
+        column_letter(0)
+
+
+def test_column_index_rejects_non_letters():
+    with pytest.raises(ValueError):
+        column_index("A1")
+
+
+def test_column_letters_spans_table_edge():
+    assert column_letters("ZY", "AAB") == ["ZY", "ZZ", "AAA", "AAB"]
+    assert column_letters(25, 28) == ["Y", "Z", "AA", "AB"]
+
+
+def test_parse_a1():
+    assert parse_a1("B12") == (12, 2)
+    assert parse_a1("$AA$3") == (3, 27)
+    assert parse_a1("'Rent Roll'!ZZ1") == (1, 702)
+    assert to_a1(1, 703) == "AAA1"
+    with pytest.raises(ValueError):
+        parse_a1("12B")
+
+
+@pytest.mark.parametrize("name", ["Sheet1", "Rent Roll", "O'Brien", "a''b", "'quoted'", "x!y"])
+def test_quote_and_split_round_trip(name):
+    assert split_sheet(f"{quote_sheet(name)}!B2") == (name, "B2")
+    grid = GridRange(2, 26, 9, 27, name)
+    assert GridRange.from_a1(grid.a1) == grid
+
+
+def test_split_sheet_unescapes_once():
+    assert quote_sheet("O'Brien") == "'O''Brien'"
+    assert split_sheet("='O''Brien'!A1") == ("O'Brien", "A1")
+    assert split_sheet("Sheet1!A1") == ("Sheet1", "A1")
+    assert split_sheet("A1") == (None, "A1")
+
+
+def test_grid_range_shapes():
+    grid = GridRange.from_a1("'Assumptions'!Z2:AA4")
+    assert grid.shape == (3, 2)
+    assert grid.a1 == "'Assumptions'!Z2:AA4"
+    assert grid.to_grid_range(7) == {"sheetId": 7, "startRowIndex": 1, "endRowIndex": 4,
+                                     "startColumnIndex": 25, "endColumnIndex": 27}
@@ -0,0 +1,47 @@
+from app.utils.model_mapping import ModelVariableMapping, parse_sheet_reference
+
+VALUES = [
+    ["section", "field_key", "location", "start_month_location", " end_month_location "],
+    ["General", "Acquisition Price", "='Assumptions'!C5", "", ""],
+    ["General ", " Vacancy", "=Assumptions!C9"],
+    ["Leasing", "vacancy", "='Rent Roll'!D2", "='Rent Roll'!E2", "='Rent Roll'!F2"],
+    ["General", "Acquisition Price", "=Other!A1", "", ""],
+]
+
+
+def test_from_values_pads_short_rows():
+    mapping = ModelVariableMapping.from_values(VALUES)
+    assert len(mapping) == 4
+    assert mapping.entries[1].values == ("General ", " Vacancy", "=Assumptions!C9", None, None)
+    assert mapping.entries[1].end_month_location is None
+
+
+def test_lookup_strips_and_first_row_wins():
+    mapping = ModelVariableMapping.from_values(VALUES)
+    assert mapping.lookup("General", "Vacancy").location == "=Assumptions!C9"
+    assert mapping.lookup(" General", "Acquisition Price ").location == "='Assumptions'!C5"
+    assert mapping.lookup("General", "Missing") is None
+
+
+def test_cell_for_field_key_is_case_insensitive():
+    mapping = ModelVariableMapping.from_values(VALUES)
+    # First (section, field_key) wins across sections; a repeated pair takes its later row
+    assert mapping.cell_for_field_key("VACANCY") == ("Assumptions", "C9")
+    assert mapping.cell_for_field_key("acquisition price") == ("Other", "A1")
+    assert mapping.cell_for_field_key("vacancy", "end_month_location") == ("Rent Roll", "F2")
+    assert mapping.cell_for_field_key("nothing") is None
+
+
+def test_records_round_trip():
+    mapping = ModelVariableMapping.from_values(VALUES)
+    again = ModelVariableMapping.from_records(mapping.to_records())
+    assert again.columns == mapping.columns
+    assert [entry.values for entry in again] == [entry.values for entry in mapping]
+
+
+def test_parse_sheet_reference():
+    assert parse_sheet_reference("='Rent Roll'!B2") == ("Rent Roll", "B2")
+    assert parse_sheet_reference("='O''Brien'!B2") == ("O'Brien", "B2")
+    assert parse_sheet_reference(" =Assumptions!C9 ") == ("Assumptions", "C9")
+    assert parse_sheet_reference("B2") is None
+    assert parse_sheet_reference(None) is None
@@ -0,0 +1,87 @@
+import math
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.services.proforma import (
+    _annual_payment, apply_field_updates, cached_inputs, remember_inputs, resolve_assumptions, run_proforma,
+)
+
+
+def fields(**values):
+    return [{"field_key": key, "value": value} for key, value in values.items()]
+
+
+def payload(field_values, units=12, rent=2000):
+    return {
+        "user_model_field_values": field_values,
+        "units": [{"layout": "1BR", "current_rent": rent, "vacate_flag": 0} for _ in range(units)],
+        "expenses": [{"type": "Closing Costs", "cost_per": 2, "factor": "Percent of Purchase Price"}],
+    }
+
+
+BASE = {"Acquisition Price": 3_000_000, "LTV Max": 65, "Exit Month": 36, "Exit Cap Rate": 5.5}
+
+
+def test_annual_payment():
+    assert _annual_payment(0, 0) == 0
+    assert _annual_payment(0.06, 0) == 0.06
+    assert _annual_payment(0, 20) == pytest.approx(0.05)
+    assert _annual_payment(0.06, 30) == pytest.approx(0.0726489, rel=1e-5)
+
+
+def test_zero_rate_interest_only_loan_with_dscr():
+    # 0% interest and no amortization: a zero loan constant, so DSCR can't size the loan
+    result = run_proforma(payload(fields(**BASE, **{"Rate": 0, "Amortization": 0, "Required DSCR Minimum": 1.25})))
+    summary = result["summary"]
+    assert summary["acquisition_loan"] == pytest.approx(0.65 * 3_000_000)
+    levered = result["monthly"]["levered_cash_flow"]
+    unlevered = result["monthly"]["unlevered_cash_flow"]
+    # No debt service in between: levered and unlevered only differ at closing and at the payoff
+    assert levered[1:-1] == unlevered[1:-1]
+    assert levered[-1] == pytest.approx(unlevered[-1] - 0.65 * 3_000_000, abs=0.01)
+    assert summary["levered_irr"] is not None and math.isfinite(summary["levered_irr"])
+
+
+def test_zero_rate_amortizing_loan_repays_straight_line():
+    result = run_proforma(payload(fields(**BASE, **{"Rate": 0, "Amortization": 30})))
+    levered = result["monthly"]["levered_cash_flow"]
+    unlevered = result["monthly"]["unlevered_cash_flow"]
+    loan = result["summary"]["acquisition_loan"]
+    assert unlevered[1] - levered[1] == pytest.approx(loan / 360, abs=0.01)
+
+
+def test_zero_rate_permanent_loan_with_dscr():
+    result = run_proforma(payload(fields(**BASE, **{
+        "Permanent Loan Issued?": "Yes", "Refinancing Month": 12,
+        "Refinancing: Fixed Interest Rate": 0, "Refinancing: Amortization": 0, "Refinancing: DSCR Min.": 1.25,
+    })))
+    assert result["summary"]["permanent_loan"] > 0
+
+
+def test_dscr_sizes_the_loan_when_rate_is_positive():
+    loose = run_proforma(payload(fields(**BASE, **{"Rate": 7})), include_monthly=False)["summary"]
+    tight = run_proforma(payload(fields(**BASE, **{"Rate": 7, "Required DSCR Minimum": 3})),
+                         include_monthly=False)["summary"]
+    assert tight["acquisition_loan"] < loose["acquisition_loan"]
+
+
+def test_resolve_assumptions_reads_percents():
+    a = resolve_assumptions(fields(**{"Vacancy": "5%", "Asking Price": "$1,200,000"}), {"loan_rate": 0.05})
+    assert a["vacancy"] == pytest.approx(0.05)
+    assert a["acquisition_price"] == 1_200_000
+    assert a["loan_rate"] == 0.05
+
+
+def test_apply_field_updates_leaves_inputs_unchanged():
+    inputs = payload(fields(**BASE))
+    updated = apply_field_updates(inputs, [{"field_key": "Exit Month", "value": 48}])
+    assert resolve_assumptions(updated["user_model_field_values"])["exit_month"] == 48
+    assert resolve_assumptions(inputs["user_model_field_values"])["exit_month"] == 36
+
+
+def test_cached_inputs_are_per_user():
+    remember_inputs("user-a", "sheet-1", payload(fields(**BASE)))
+    assert cached_inputs("user-a", "sheet-1") is not None
+    assert cached_inputs("user-b", "sheet-1") is None
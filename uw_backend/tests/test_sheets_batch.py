@@ -0,0 +1,100 @@
+import pytest
+
+from app.services import sheets_batch
+from app.services.sheets_batch import optimize_requests
+
+
+@pytest.fixture(autouse=True)
+def optimizer_on(monkeypatch):
+    monkeypatch.setattr(sheets_batch, "OPTIMIZE_REQUESTS", True)
+
+
+BOLD = {"userEnteredFormat": {"textFormat": {"bold": True}}}
+
+
+def repeat(sheet_id, rows, cols, cell=BOLD):
+    return {"repeatCell": {
+        "range": {"sheetId": sheet_id, "startRowIndex": rows[0], "endRowIndex": rows[1],
+                  "startColumnIndex": cols[0], "endColumnIndex": cols[1]},
+        "cell": cell,
+        "fields": "userEnteredFormat.textFormat.bold",
+    }}
+
+
+def insert(sheet_id, start, end, dimension="ROWS"):
+    return {"insertDimension": {
+        "range": {"sheetId": sheet_id, "dimension": dimension, "startIndex": start, "endIndex": end},
+        "inheritFromBefore": True,
+    }}
+
+
+def test_flattens_and_drops_noops():
+    requests = [[repeat(1, (0, 1), (0, 1))], None, {}, [], [insert(1, 5, 5)]]
+    optimized, stats = optimize_requests(requests)
+    assert optimized == [repeat(1, (0, 1), (0, 1))]
+    assert stats["noops"] == 1
+    assert stats["requests_out"] == 1
+
+
+def test_drops_repeated_idempotent_request():
+    optimized, stats = optimize_requests([repeat(1, (0, 1), (0, 1)), repeat(2, (0, 1), (0, 1)),
+                                          repeat(1, (0, 1), (0, 1))])
+    assert optimized == [repeat(1, (0, 1), (0, 1)), repeat(2, (0, 1), (0, 1))]
+    assert stats["duplicates"] == 1
+
+
+def test_keeps_duplicate_after_structural_change_on_its_sheet():
+    requests = [repeat(1, (0, 1), (0, 1)), insert(1, 0, 2), repeat(1, (0, 1), (0, 1))]
+    optimized, stats = optimize_requests(requests)
+    assert optimized == requests
+    assert stats["duplicates"] == 0
+
+
+def test_structural_change_on_another_sheet_does_not_block_dedup():
+    optimized, stats = optimize_requests([repeat(1, (0, 1), (0, 1)), insert(2, 0, 2),
+                                          repeat(1, (0, 1), (0, 1))])
+    assert optimized == [repeat(1, (0, 1), (0, 1)), insert(2, 0, 2)]
+    assert stats["duplicates"] == 1
+
+
+def test_merges_adjacent_repeat_cells():
+    optimized, stats = optimize_requests([repeat(1, (0, 2), (0, 3)), repeat(1, (2, 5), (0, 3))])
+    assert optimized == [repeat(1, (0, 5), (0, 3))]
+    assert stats["merged_formats"] == 1
+
+
+def test_does_not_merge_repeat_cells_that_differ_or_leave_gaps():
+    italic = {"userEnteredFormat": {"textFormat": {"italic": True}}}
+    requests = [repeat(1, (0, 2), (0, 3)), repeat(1, (3, 5), (0, 3)), repeat(1, (5, 6), (0, 3), italic),
+                repeat(1, (6, 7), (0, 2), italic)]
+    optimized, stats = optimize_requests(requests)
+    assert optimized == requests
+    assert stats["merged_formats"] == 0
+
+
+def test_merges_contiguous_inserts():
+    optimized, stats = optimize_requests([insert(1, 5, 7), insert(1, 7, 9), insert(1, 6, 8)])
+    assert optimized == [insert(1, 5, 11)]
+    assert stats["merged_inserts"] == 2
+
+
+def test_does_not_merge_inserts_across_a_gap_sheet_or_axis():
+    requests = [insert(1, 5, 7), insert(1, 10, 12), insert(2, 12, 14), insert(2, 14, 15, "COLUMNS")]
+    optimized, stats = optimize_requests(requests)
+    assert optimized == requests
+    assert stats["merged_inserts"] == 0
+
+
+def test_preserves_order_across_structural_requests():
+    requests = [repeat(1, (0, 1), (0, 1)), insert(1, 0, 2), repeat(1, (1, 2), (0, 1)),
+                {"deleteDimension": {"range": {"sheetId": 1, "dimension": "ROWS", "startIndex": 9, "endIndex": 10}}},
+                insert(1, 3, 4)]
+    optimized, _ = optimize_requests(requests)
+    assert optimized == requests
+
+
+def test_disabled_optimizer_only_flattens(monkeypatch):
+    monkeypatch.setattr(sheets_batch, "OPTIMIZE_REQUESTS", False)
+    requests = [[repeat(1, (0, 1), (0, 1))], repeat(1, (0, 1), (0, 1))]
+    optimized, _ = optimize_requests(requests)
+    assert optimized == [repeat(1, (0, 1), (0, 1)), repeat(1, (0, 1), (0, 1))]